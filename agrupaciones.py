@@ -0,0 +1,304 @@
+"""
+Materializaciones de los modos ``group_by`` de ``/datos``.
+
+Cada agrupación (player, team, season, career) se calcula una sola vez por
+versión del dataset: se guardan los grupos en el orden en que los devolvía
+``df.groupby(...)``, las filas de cada grupo y el registro ya listo para
+serializar. Una consulta sin filtros es un slice de la lista precalculada; una
+consulta filtrada restringe los grupos a las filas seleccionadas y solo
+construye los registros de la página pedida.
+"""
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from serializacion import FragmentoJSON, codificar_json, lista_json
+
+logger = logging.getLogger(__name__)
+
+CLAVE_JUGADOR = ['First name', 'Last name', 'Adjusted first name', 'Adjusted last name']
+
+MODOS_AGRUPACION = ("player", "team", "season", "career")
+
+
+def _es_nulo(valor) -> bool:
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def _primero(valores: List[Any]) -> Any:
+    """Equivalente a la agregación 'first' de pandas: primer valor no nulo"""
+    for valor in valores:
+        if not _es_nulo(valor):
+            return valor
+    return np.nan
+
+
+def _distintos(valores: List[Any], tipo) -> List[Any]:
+    """Valores no nulos sin repetir y ordenados, para que la respuesta no dependa del hash de la sesión"""
+    return sorted({tipo(valor) for valor in valores if pd.notna(valor)})
+
+
+def _numero_o_none(valor):
+    if pd.isna(valor) or np.isinf(valor):
+        return None
+    return valor
+
+
+class Agrupacion:
+    """
+    Grupos de un modo concreto.
+
+    Args:
+        claves: Clave de cada grupo, en el orden de salida
+        filas_por_grupo: Row ids de cada grupo en el orden original del CSV
+        construir: Función que arma el registro de un grupo a partir de sus row ids
+        total_filas: Número de filas del dataset
+        anterior: La misma agrupación en la versión anterior del dataset
+        mapa_filas: Fila anterior idéntica a cada fila de esta versión, o -1;
+            los grupos formados exactamente por las mismas filas reutilizan
+            su registro (y su JSON) de ``anterior``
+    """
+
+    def __init__(self, claves: List[Any], filas_por_grupo: List[np.ndarray], construir: Callable[[np.ndarray], Dict[str, Any]], total_filas: int,
+                 anterior: Optional["Agrupacion"] = None, mapa_filas: Optional[np.ndarray] = None):
+        self.claves = claves
+        self.filas_por_grupo = filas_por_grupo
+        self._construir = construir
+        self.grupo_de_fila = np.full(total_filas, -1, dtype=np.int64)
+        for grupo, filas in enumerate(filas_por_grupo):
+            self.grupo_de_fila[filas] = grupo
+
+        # Grupo de la versión anterior con idénticas filas, por grupo de esta versión
+        self._previos: Dict[int, int] = {}
+        self._anterior = anterior
+        if anterior is not None:
+            posicion_anterior = {clave: grupo for grupo, clave in enumerate(anterior.claves)}
+            for grupo, (clave, filas) in enumerate(zip(claves, filas_por_grupo)):
+                previo = posicion_anterior.get(clave)
+                if previo is not None and np.array_equal(mapa_filas[filas], anterior.filas_por_grupo[previo]):
+                    self._previos[grupo] = previo
+        self.registros = [
+            anterior.registros[self._previos[grupo]] if grupo in self._previos else construir(filas)
+            for grupo, filas in enumerate(filas_por_grupo)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.registros)
+
+    @cached_property
+    def fragmentos(self) -> List[bytes]:
+        """JSON de cada registro precalculado"""
+        anterior, self._anterior = self._anterior, None
+        if anterior is None:
+            return [codificar_json(registro) for registro in self.registros]
+        return [
+            anterior.fragmentos[self._previos[grupo]] if grupo in self._previos else codificar_json(registro)
+            for grupo, registro in enumerate(self.registros)
+        ]
+
+    @property
+    def reutilizados(self) -> int:
+        """Número de grupos cuyo registro se tomó de la versión anterior"""
+        return len(self._previos)
+
+    def _seleccion(self, filas: Optional[np.ndarray], inicio: int, fin: int, despues_de: Optional[int] = None) -> Tuple[int, List[Union[int, Dict[str, Any]]], Optional[int]]:
+        """
+        Total de grupos, contenido de la página y grupo desde el que sigue la próxima.
+
+        Cada elemento de la página es el número de grupo si se puede usar el
+        registro precalculado, o el registro construido para el subconjunto de
+        filas filtradas.
+
+        Args:
+            filas: Row ids seleccionados por los filtros (ordenados), o None si no hay filtros
+            inicio: Posición del primer grupo de la página
+            fin: Posición siguiente al último grupo de la página
+            despues_de: Si se indica (paginación por cursor), la página empieza en el primer
+                grupo posterior a este y ``inicio``/``fin`` solo determinan el tamaño
+
+        Returns:
+            Tupla (total de grupos, página, último grupo de la página o None si no hay más)
+        """
+        if filas is None:
+            total = len(self.registros)
+            if despues_de is not None:
+                inicio, fin = despues_de + 1, despues_de + 1 + (fin - inicio)
+            grupos = list(range(max(inicio, 0), min(fin, total)))
+            siguiente = grupos[-1] if grupos and fin < total else None
+            return total, grupos, siguiente
+
+        grupos = self.grupo_de_fila[filas]
+        validas = grupos >= 0
+        filas, grupos = filas[validas], grupos[validas]
+        # Ordenar por grupo conservando el orden original de las filas dentro de cada uno
+        orden = np.argsort(grupos, kind="stable")
+        grupos_ordenados = grupos[orden]
+        presentes, comienzos = np.unique(grupos_ordenados, return_index=True)
+        limites = np.append(comienzos, len(grupos_ordenados))
+
+        if despues_de is not None:
+            desplazamiento = int(np.searchsorted(presentes, despues_de, side="right"))
+            inicio, fin = desplazamiento, desplazamiento + (fin - inicio)
+
+        seleccion = []
+        for posicion in range(inicio, min(fin, len(presentes))):
+            grupo = int(presentes[posicion])
+            filas_grupo = filas[orden[limites[posicion]:limites[posicion + 1]]]
+            if len(filas_grupo) == len(self.filas_por_grupo[grupo]):
+                # El filtro conserva el grupo completo: se reutiliza el registro precalculado
+                seleccion.append(grupo)
+            else:
+                seleccion.append(self._construir(filas_grupo))
+        siguiente = int(presentes[fin - 1]) if seleccion and fin < len(presentes) else None
+        return len(presentes), seleccion, siguiente
+
+    def pagina(self, filas: Optional[np.ndarray], inicio: int, fin: int, despues_de: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]], Optional[int]]:
+        """Total de grupos, registros de la página y último grupo si hay más (ver ``_seleccion``)"""
+        total, seleccion, siguiente = self._seleccion(filas, inicio, fin, despues_de)
+        return total, [self.registros[item] if isinstance(item, int) else item for item in seleccion], siguiente
+
+    def pagina_json(self, filas: Optional[np.ndarray], inicio: int, fin: int, despues_de: Optional[int] = None) -> Tuple[int, FragmentoJSON, Optional[int]]:
+        """Igual que ``pagina`` pero con los registros ya codificados a JSON"""
+        total, seleccion, siguiente = self._seleccion(filas, inicio, fin, despues_de)
+        datos = lista_json([self.fragmentos[item] if isinstance(item, int) else codificar_json(item) for item in seleccion])
+        return total, datos, siguiente
+
+
+class Agrupaciones:
+    """Las cuatro agrupaciones de ``/datos`` de una versión del dataset"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.total_filas = len(df)
+        # Valores como objetos de Python, igual que al iterar una Series dentro de agg()
+        self._valores = {col: df[col].tolist() for col in df.columns}
+        self._df = df
+        self._cache: Dict[str, Agrupacion] = {}
+        self._anterior: Optional[Tuple["Agrupaciones", np.ndarray]] = None
+
+    def heredar(self, anterior: "Agrupaciones", mapa_filas: np.ndarray):
+        """Reutiliza los registros de los grupos que no cambiaron respecto de la versión anterior"""
+        self._anterior = (anterior, mapa_filas)
+
+    def soltar_anterior(self):
+        """Libera la referencia a la versión anterior una vez materializados los modos"""
+        self._anterior = None
+
+    def obtener(self, modo: str) -> Agrupacion:
+        """Agrupación materializada de un modo (se construye la primera vez)"""
+        if modo not in self._cache:
+            constructores = {
+                "player": (CLAVE_JUGADOR, self._registro_jugador),
+                "team": (['Team'], self._registro_equipo),
+                "season": (['Season'], self._registro_temporada),
+                "career": (CLAVE_JUGADOR, self._registro_trayectoria),
+            }
+            columnas, construir = constructores[modo]
+            claves, filas_por_grupo = self._agrupar(columnas)
+            previa, mapa_filas = None, None
+            if self._anterior is not None and modo in self._anterior[0]._cache:
+                previa, mapa_filas = self._anterior[0]._cache[modo], self._anterior[1]
+            agrupacion = Agrupacion(claves, filas_por_grupo, construir, self.total_filas, previa, mapa_filas)
+            self._cache[modo] = agrupacion
+            if previa is not None:
+                logger.info(f"Agrupación '{modo}' materializada: {len(agrupacion)} grupos ({agrupacion.reutilizados} sin cambios)")
+            else:
+                logger.info(f"Agrupación '{modo}' materializada: {len(agrupacion)} grupos")
+        return self._cache[modo]
+
+    def registro(self, modo: str, filas: np.ndarray) -> Dict[str, Any]:
+        """Registro de un modo para un conjunto cualquiera de filas (p. ej. las de un jugador)"""
+        constructores = {
+            "player": self._registro_jugador,
+            "team": self._registro_equipo,
+            "season": self._registro_temporada,
+            "career": self._registro_trayectoria,
+        }
+        return constructores[modo](filas)
+
+    def pagina(self, modo: str, filas: Optional[np.ndarray], inicio: int, fin: int, despues_de: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]], Optional[int]]:
+        return self.obtener(modo).pagina(filas, inicio, fin, despues_de)
+
+    def pagina_json(self, modo: str, filas: Optional[np.ndarray], inicio: int, fin: int, despues_de: Optional[int] = None) -> Tuple[int, FragmentoJSON, Optional[int]]:
+        return self.obtener(modo).pagina_json(filas, inicio, fin, despues_de)
+
+    def _agrupar(self, columnas: List[str]) -> Tuple[List[Any], List[np.ndarray]]:
+        """Grupos ordenados por clave, descartando filas con claves nulas (como groupby)"""
+        grupos = self._df.groupby(columnas, sort=True, dropna=True, observed=True).indices
+        claves = sorted(grupos.keys())
+        return claves, [np.sort(grupos[clave]) for clave in claves]
+
+    def _columna(self, col: str, filas: np.ndarray) -> List[Any]:
+        valores = self._valores[col]
+        return [valores[i] for i in filas]
+
+    def _registro_jugador(self, filas: np.ndarray) -> Dict[str, Any]:
+        primera = filas[0]
+        return {
+            "nombre": self._valores['First name'][primera],
+            "apellido": self._valores['Last name'][primera],
+            "nombre_ajustado": self._valores['Adjusted first name'][primera],
+            "apellido_ajustado": self._valores['Adjusted last name'][primera],
+            "equipos": _distintos(self._columna('Team', filas), str),
+            "temporadas": _distintos(self._columna('Season', filas), int),
+            "posiciones": _distintos(self._columna('Position', filas), str),
+            "altura": _numero_o_none(_primero(self._columna('Height', filas))),
+            "peso": _numero_o_none(_primero(self._columna('Weight', filas))),
+            "nacionalidad": None if pd.isna(nacionalidad := _primero(self._columna('Nationality', filas))) else nacionalidad,
+            "fecha_nacimiento": None if pd.isna(fecha := _primero(self._columna('Birthdate', filas))) else fecha,
+        }
+
+    def _registro_equipo(self, filas: np.ndarray) -> Dict[str, Any]:
+        return {
+            "equipo": str(self._valores['Team'][filas[0]]),
+            "total_jugadores": sum(1 for item in self._columna('First name', filas) if pd.notna(item)),
+            "temporadas": _distintos(self._columna('Season', filas), int),
+            "posiciones": _distintos(self._columna('Position', filas), str),
+            "nacionalidades": _distintos(self._columna('Nationality', filas), str),
+        }
+
+    def _registro_temporada(self, filas: np.ndarray) -> Dict[str, Any]:
+        return {
+            "temporada": int(self._valores['Season'][filas[0]]),
+            "total_jugadores": sum(1 for item in self._columna('First name', filas) if pd.notna(item)),
+            "equipos": _distintos(self._columna('Team', filas), str),
+            "posiciones": _distintos(self._columna('Position', filas), str),
+            "nacionalidades": _distintos(self._columna('Nationality', filas), str),
+        }
+
+    def _registro_trayectoria(self, filas: np.ndarray) -> Dict[str, Any]:
+        primera = filas[0]
+
+        # Pares temporada-equipo ordenados cronológicamente, agrupando los equipos de una misma temporada
+        pares = [
+            (int(temporada), str(equipo))
+            for equipo, temporada in zip(self._columna('Team', filas), self._columna('Season', filas))
+            if pd.notna(equipo) and pd.notna(temporada)
+        ]
+        pares.sort(key=lambda par: par[0])
+        trayectoria_agrupada: Dict[int, List[str]] = {}
+        for temporada, equipo in pares:
+            equipos = trayectoria_agrupada.setdefault(temporada, [])
+            if equipo not in equipos:
+                equipos.append(equipo)
+
+        return {
+            "nombre": str(self._valores['First name'][primera]),
+            "apellido": str(self._valores['Last name'][primera]),
+            "nombre_ajustado": str(self._valores['Adjusted first name'][primera]),
+            "apellido_ajustado": str(self._valores['Adjusted last name'][primera]),
+            "trayectoria": [
+                {'temporada': temporada, 'equipos': trayectoria_agrupada[temporada]}
+                for temporada in sorted(trayectoria_agrupada.keys())
+            ],
+            "posiciones": _distintos(self._columna('Position', filas), str),
+            "altura": _numero_o_none(_primero(self._columna('Height', filas))),
+            "peso": _numero_o_none(_primero(self._columna('Weight', filas))),
+            "nacionalidad": None if pd.isna(nacionalidad := _primero(self._columna('Nationality', filas))) else nacionalidad,
+            "fecha_nacimiento": None if pd.isna(fecha := _primero(self._columna('Birthdate', filas))) else fecha,
+            "total_temporadas": len(trayectoria_agrupada),
+            "total_equipos": len(set([equipo for equipos in trayectoria_agrupada.values() for equipo in equipos])),
+        }
@@ -0,0 +1,168 @@
+"""
+Arranque de cada worker: calentar el proceso antes de recibir tráfico.
+
+Sin esto, las primeras peticiones después de un deploy pagan la descarga del
+CSV, la construcción de los índices y agrupaciones y el primer cálculo de
+cada respuesta. ``Arranque`` corre en segundo plano, desde el ``lifespan`` de
+la app, una lista de etapas en orden (cargar el dataset, esperar sus
+estructuras derivadas, precalcular las respuestas más pedidas) y recién al
+terminar la última marca el proceso como listo. Mientras tanto ``/health``
+(liveness) responde y ``/health/ready`` (readiness) devuelve 503, así que el
+balanceador solo manda tráfico a instancias ya calientes.
+
+Las respuestas se precalculan pidiéndolas a la propia app en el mismo
+proceso (``precalentar``), con las mismas claves de caché y la misma
+compresión que usarían los clientes.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Una etapa del arranque: su nombre y la corrutina que la ejecuta
+Etapa = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class Arranque:
+    """
+    Etapas de arranque de un worker, sus tiempos y la bandera de disponibilidad.
+
+    Args:
+        reintento: Segundos de espera antes de reintentar una etapa que falló
+    """
+
+    def __init__(self, reintento: float = 5.0):
+        self.reintento = reintento
+        self.listo = False
+        self.iniciado_en = time.time()
+        self.listo_en: Optional[float] = None
+        # Milisegundos que tardó cada etapa terminada, en orden
+        self.tiempos_ms: Dict[str, float] = {}
+        self.etapa_actual: Optional[str] = None
+        self.ultimo_error: Optional[str] = None
+        self._tarea: Optional[asyncio.Task] = None
+
+    def iniciar(self, etapas: Sequence[Etapa]):
+        """Lanza las etapas en segundo plano (el servidor ya acepta conexiones mientras corren)"""
+        self.listo = False
+        self.iniciado_en = time.time()
+        self.listo_en = None
+        self.tiempos_ms = {}
+        self._tarea = asyncio.create_task(self.ejecutar(etapas))
+
+    async def esperar(self):
+        """Espera a que terminen las etapas lanzadas con ``iniciar``"""
+        if self._tarea is not None:
+            await asyncio.shield(self._tarea)
+
+    async def detener(self):
+        """Cancela el arranque si todavía está en curso"""
+        if self._tarea is not None and not self._tarea.done():
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        self._tarea = None
+
+    async def ejecutar(self, etapas: Sequence[Etapa]):
+        """
+        Ejecuta las etapas en orden y marca el proceso como listo.
+
+        Una etapa que falla se reintenta cada ``reintento`` segundos: el
+        proceso no se declara listo hasta completarlas todas.
+        """
+        for nombre, etapa in etapas:
+            self.etapa_actual = nombre
+            inicio = time.perf_counter()
+            while True:
+                try:
+                    await etapa()
+                    break
+                except Exception as e:
+                    self.ultimo_error = f"{nombre}: {str(e)}"
+                    logger.error(f"Error en la etapa '{nombre}' del arranque, se reintenta en {self.reintento:g}s: {str(e)}")
+                    await asyncio.sleep(self.reintento)
+            self.tiempos_ms[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+        self.etapa_actual = None
+        self.ultimo_error = None
+        self.listo_en = time.time()
+        self.listo = True
+        logger.info(f"Worker listo en {self.listo_en - self.iniciado_en:.2f}s: {self.tiempos_ms}")
+
+    def estado(self) -> Dict[str, Any]:
+        """Resumen para /health/ready"""
+        estado: Dict[str, Any] = {
+            "ready": self.listo,
+            "stages_ms": dict(self.tiempos_ms),
+        }
+        if self.listo:
+            estado["seconds_to_ready"] = round(self.listo_en - self.iniciado_en, 3)
+        else:
+            estado["stage"] = self.etapa_actual
+            estado["seconds_since_start"] = round(time.time() - self.iniciado_en, 3)
+            if self.ultimo_error:
+                estado["error"] = self.ultimo_error
+        return estado
+
+
+async def pedir(app, url: str, headers: Optional[Dict[str, str]] = None) -> int:
+    """
+    Hace un GET a una app ASGI dentro del mismo proceso y devuelve el estado HTTP.
+
+    Se usa con ``app.router``: así la petición no pasa por los middlewares y
+    no cuenta en las métricas de tráfico.
+    """
+    ruta, _, consulta = url.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode("utf-8"),
+        "root_path": "",
+        "query_string": consulta.encode("utf-8"),
+        "headers": [(nombre.lower().encode("latin-1"), valor.encode("latin-1")) for nombre, valor in (headers or {}).items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 0),
+    }
+    respuesta: Dict[str, int] = {}
+
+    async def recibir():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["estado"] = mensaje["status"]
+
+    await app(scope, recibir, enviar)
+    return respuesta.get("estado", 500)
+
+
+async def precalentar(app, rutas: List[str], codificaciones: Sequence[str]) -> Dict[str, int]:
+    """
+    Pide cada ruta a la app para dejar su respuesta en la caché.
+
+    Se pide una vez por codificación habilitada (o una sin comprimir si no
+    hay ninguna), así la versión comprimida también queda guardada. Una ruta
+    que falla se informa en el log y no frena el arranque.
+
+    Returns:
+        El estado HTTP de cada ruta (0 si la petición falló)
+    """
+    estados: Dict[str, int] = {}
+    for ruta in rutas:
+        try:
+            for codificacion in codificaciones or ("identity",):
+                estados[ruta] = await pedir(app, ruta, {"Accept-Encoding": codificacion})
+        except Exception as e:
+            estados[ruta] = 0
+            logger.warning(f"No se pudo precalcular {ruta}: {str(e)}")
+            continue
+        if estados[ruta] >= 400:
+            logger.warning(f"El precálculo de {ruta} respondió {estados[ruta]}")
+    return estados
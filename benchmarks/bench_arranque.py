@@ -0,0 +1,161 @@
+"""
+Tiempo hasta la primera respuesta rápida después de arrancar un worker.
+
+Levanta ``uvicorn main:app`` contra el servidor local de CSVs (sin snapshot
+previo, como un deploy nuevo, o con ``--snapshot`` desde un snapshot ya
+guardado, como arrancan los workers de gunicorn que siguen al cargador) y
+mide dos formas de mandarle tráfico:
+
+- ``antes``: sin precálculo (``PRECALENTAR_RUTAS`` vacío) y con el tráfico
+  llegando en cuanto ``/health`` tiene datos, como hacía el health check.
+- ``despues``: con el precálculo por defecto y el tráfico llegando recién
+  cuando ``/health/ready`` responde 200.
+
+En ambos casos, desde que llega el tráfico se piden las rutas más pedidas
+(las de ``PRECALENTAR_RUTAS`` por defecto) una tras otra, en vueltas, hasta
+que una vuelta completa responde cada ruta por debajo de ``--umbral-ms``.
+Reporta cuándo llegó el tráfico, la latencia de la primera vuelta y el
+tiempo desde el lanzamiento del proceso hasta esa vuelta rápida.
+
+Uso:
+    python benchmarks/bench_arranque.py --filas 200000 --umbral-ms 50 [--snapshot]
+"""
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from servidor_csv import ServidorCSV
+
+# Las rutas precalculadas por defecto (sin importar main: el proceso medido es otro)
+RUTAS = [
+    "/info", "/datos", "/datos?group_by=player", "/datos?group_by=team", "/datos?group_by=season",
+    "/datos?group_by=career", "/datos/facets", "/stats",
+]
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_trafico(sesion: requests.Session, base: str, modo: str, limite: float):
+    """Espera a que el health check del modo deje pasar el tráfico"""
+    while time.time() < limite:
+        try:
+            if modo == "antes":
+                respuesta = sesion.get(base + "/health", timeout=5)
+                if respuesta.status_code == 200 and "dataset" in respuesta.json():
+                    return
+            elif sesion.get(base + "/health/ready", timeout=5).status_code == 200:
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"El worker no quedó disponible ({modo}) a tiempo")
+
+
+def medir_arranque(url_csv: str, modo: str, umbral_ms: float, vueltas_max: int, snapshots: str) -> Dict[str, Any]:
+    """Lanza un worker, espera su health check y recorre las rutas hasta una vuelta rápida"""
+    puerto = _puerto_libre()
+    base = f"http://127.0.0.1:{puerto}"
+    entorno = {
+        **os.environ,
+        "CSV_URL": url_csv,
+        "SNAPSHOT_DIR": snapshots,
+        "DATASET_MODO": "autonomo",
+        "DATASET_TTL_SEGUNDOS": "3600",
+    }
+    if modo == "antes":
+        entorno["PRECALENTAR_RUTAS"] = ""
+    else:
+        entorno.pop("PRECALENTAR_RUTAS", None)
+    lanzado = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        sesion = requests.Session()
+        _esperar_trafico(sesion, base, modo, time.time() + 300)
+        trafico_s = time.perf_counter() - lanzado
+        vueltas: List[Dict[str, float]] = []
+        rapida_s = None
+        while len(vueltas) < vueltas_max:
+            vuelta = {}
+            for ruta in RUTAS:
+                inicio = time.perf_counter()
+                sesion.get(base + ruta, timeout=120).raise_for_status()
+                vuelta[ruta] = round((time.perf_counter() - inicio) * 1000, 2)
+            vueltas.append(vuelta)
+            if max(vuelta.values()) < umbral_ms:
+                rapida_s = time.perf_counter() - lanzado
+                break
+        listo = sesion.get(base + "/health/ready", timeout=5).json()
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        try:
+            proceso.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+    return {
+        "modo": modo,
+        "trafico_s": round(trafico_s, 3),
+        "primera_vuelta_ms": vueltas[0],
+        "primera_vuelta_max_ms": max(vueltas[0].values()),
+        "vueltas": len(vueltas),
+        "primera_rapida_s": round(rapida_s, 3) if rapida_s is not None else None,
+        "arranque": listo,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200_000, help="Filas del CSV sintético")
+    parser.add_argument("--umbral-ms", type=float, default=50.0, help="Latencia por debajo de la cual una respuesta cuenta como rápida")
+    parser.add_argument("--vueltas-max", type=int, default=20, help="Vueltas por las rutas antes de abandonar")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--snapshot", action="store_true", help="Arrancar desde un snapshot ya guardado en lugar de descargar el CSV")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/arranque-<fecha>.json)")
+    args = parser.parse_args()
+
+    resultados: Dict[str, Any] = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parametros": {"filas": args.filas, "umbral_ms": args.umbral_ms, "semilla": args.semilla, "snapshot": args.snapshot},
+        "corridas": [],
+    }
+    with ServidorCSV(semilla=args.semilla) as servidor, tempfile.TemporaryDirectory(prefix="bench-arranque-") as carpeta:
+        servidor.csv(args.filas)
+        if args.snapshot:
+            # Un primer arranque deja guardado el snapshot del que parten las dos corridas
+            medir_arranque(servidor.url(args.filas), "despues", args.umbral_ms, 1, carpeta)
+        for modo in ("antes", "despues"):
+            snapshots = carpeta if args.snapshot else tempfile.mkdtemp(prefix="bench-arranque-", dir=carpeta)
+            corrida = medir_arranque(servidor.url(args.filas), modo, args.umbral_ms, args.vueltas_max, snapshots)
+            resultados["corridas"].append(corrida)
+            rapida = f"{corrida['primera_rapida_s']:.2f}s" if corrida["primera_rapida_s"] is not None else "nunca"
+            print(f"{modo:<8} tráfico a los {corrida['trafico_s']:>6.2f}s  primera vuelta máx {corrida['primera_vuelta_max_ms']:>8.1f}ms  "
+                  f"vuelta rápida (<{args.umbral_ms:g}ms) a los {rapida}", file=sys.stderr)
+
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados", f"arranque-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados en {salida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Búsqueda de jugadores por nombre: índice de trigramas de ``/jugadores/search``
+frente al filtro ``last_name`` de ``/datos`` (``str.contains`` sobre la
+columna, y el mismo filtro resuelto con ``IndiceFiltros``).
+
+El filtro por subcadena solo encuentra la grafía exacta del apellido
+ajustado; la búsqueda por trigramas también encuentra las variantes con
+acentos y errores de tipeo, por eso se informa cuántos jugadores distintos
+devuelve cada camino para cada consulta.
+
+Uso:
+    python benchmarks/bench_busqueda.py --filas 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agrupaciones import CLAVE_JUGADOR
+from compactacion import compactar
+from dataset import Dataset
+from datos_sinteticos import generar_dataframe
+
+CONSULTAS = ["Campazzo", "campazo", "Ñañez", "nanez", "Fernandez", "fernandes", "Juan Perez", "jose sosa"]
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--limite", type=int, default=10)
+    args = parser.parse_args()
+
+    df = compactar(generar_dataframe(args.filas))
+    dataset = Dataset(df, "bench")
+    inicio = time.perf_counter()
+    indice = dataset.busqueda
+    print(f"{args.filas} filas, {len(indice.nombres)} nombres distintos. Construcción del índice (con group_by=player): {time.perf_counter() - inicio:.1f}s")
+
+    print(f"{'consulta':<12} {'str.contains':>13} {'IndiceFiltros':>14} {'trigramas':>10}   jugadores (contains / trigramas)")
+    for consulta in CONSULTAS:
+        apellido = consulta.split()[-1]
+        columna = df["Adjusted last name"]
+        contains_ms = _medir(lambda: columna.str.contains(apellido, case=False, na=False), max(1, args.repeticiones // 10))
+        filtros = dataset.indices
+        # Sin memorizar el resultado, para medir el filtrado en sí
+        indices_ms = _medir(lambda: filtros._filtrar({"last_name": apellido}), args.repeticiones)
+        trigramas_ms = _medir(lambda: indice.buscar(consulta, args.limite, 0.3), args.repeticiones)
+
+        filas = filtros._filtrar({"last_name": apellido})
+        encontrados = len(df.iloc[filas].groupby(CLAVE_JUGADOR, observed=True)) if filas is not None else 0
+        print(f"{consulta:<12} {contains_ms:>11.2f}ms {indices_ms:>12.3f}ms {trigramas_ms:>8.3f}ms   {encontrados} / {len(indice.buscar(consulta, args.limite, 0.3))} (top {args.limite})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Estadísticas de ``/stats``: resumen vectorizado de ``Estadisticas`` frente
+a ``groupby(...).describe()`` de pandas sobre las mismas filas filtradas.
+
+Uso:
+    python benchmarks/bench_estadisticas.py --filas 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compactacion import compactar
+from dataset import Dataset
+from datos_sinteticos import generar_dataframe
+from estadisticas import AGRUPACIONES_ESTADISTICAS, PERCENTILES_POR_DEFECTO
+
+CONSULTAS = [{}, {"season_from": 2015}, {"team": "Boca"}]
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    df = compactar(generar_dataframe(args.filas))
+    dataset = Dataset(df, "bench")
+    inicio = time.perf_counter()
+    estadisticas = dataset.estadisticas
+    print(f"{args.filas} filas. Preparación de las columnas (con facetas): {time.perf_counter() - inicio:.1f}s")
+
+    percentiles = [p / 100 for p in PERCENTILES_POR_DEFECTO]
+    print(f"{'filtros':<24} {'group_by':<12} {'describe':>10} {'vectorizado':>12}")
+    for filtros in CONSULTAS:
+        filas = dataset.indices._filtrar(filtros)
+        sub = df if filas is None else df.iloc[filas]
+        for agrupar_por in (None, *AGRUPACIONES_ESTADISTICAS):
+            columnas = sub[["Height", "Weight"]]
+            agrupado = columnas if agrupar_por is None else columnas.groupby(sub[AGRUPACIONES_ESTADISTICAS[agrupar_por]], observed=True)
+            pandas_ms = _medir(lambda: agrupado.describe(percentiles=percentiles), args.repeticiones)
+            vectorizado_ms = _medir(lambda: estadisticas.resumen(filas, agrupar_por), args.repeticiones)
+            print(f"{str(filtros or '-'):<24} {agrupar_por or '-':<12} {pandas_ms:>8.1f}ms {vectorizado_ms:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
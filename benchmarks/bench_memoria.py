@@ -0,0 +1,55 @@
+"""
+Reporte de memoria por worker de la tabla de jugadores: DataFrame tal como
+lo deja ``pd.read_csv`` frente a la representación compacta (categóricas y
+tipos numéricos reducidos), columna por columna, más el tiempo de los
+filtros de texto sobre cada una.
+
+Uso:
+    python benchmarks/bench_memoria.py --filas 1000000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compactacion import compactar, reporte_memoria
+from datos_sinteticos import generar_dataframe
+from indices import IndiceFiltros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # Pasar por CSV para medir exactamente lo que produce read_csv
+    import pandas as pd
+    contenido = generar_dataframe(args.filas).to_csv(index=False).encode("utf-8")
+    df = pd.read_csv(io.BytesIO(contenido))
+
+    inicio = time.perf_counter()
+    compacto = compactar(df)
+    print(f"Compactación: {(time.perf_counter() - inicio) * 1000:.0f}ms")
+
+    reporte = reporte_memoria(df, compacto)
+    print(f"{'columna':<22} {'tipo':>22} {'antes':>10} {'después':>10}")
+    for col, datos in reporte["columnas"].items():
+        tipo = f"{datos['tipo_antes']}->{datos['tipo_despues']}"
+        print(f"{col:<22} {tipo:>22} {datos['bytes_antes'] / 1e6:>8.1f}MB {datos['bytes_despues'] / 1e6:>8.1f}MB")
+    print(f"{'total':<22} {'':>22} {reporte['bytes_antes'] / 1e6:>8.1f}MB {reporte['bytes_despues'] / 1e6:>8.1f}MB ({reporte['ahorro_pct']}% menos)")
+
+    for nombre, tabla in (("read_csv", df), ("compacta", compacto)):
+        inicio = time.perf_counter()
+        IndiceFiltros(tabla).filtrar({"team": "San", "position": "G"})
+        indices_ms = (time.perf_counter() - inicio) * 1000
+        inicio = time.perf_counter()
+        tabla[tabla["Team"].str.contains("San", case=False, na=False)]
+        contains_ms = (time.perf_counter() - inicio) * 1000
+        print(f"{nombre:<10} índices + filtro: {indices_ms:>8.1f}ms   str.contains(Team): {contains_ms:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
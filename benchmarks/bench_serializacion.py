@@ -0,0 +1,71 @@
+"""
+Benchmark de la codificación JSON de /datos: jsonable_encoder + json (como
+FastAPI con listas de diccionarios) frente a la composición con fragmentos
+precodificados.
+
+Uso:
+    python benchmarks/bench_serializacion.py --filas 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from dataset import Dataset
+from datos_sinteticos import generar_dataframe
+from serializacion import JSONRapido
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"p50_ms": statistics.median(tiempos), "min_ms": min(tiempos)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    dataset = Dataset(generar_dataframe(args.filas), "bench")
+    dataset.preparar()
+    filas = np.arange(1000, 1100)
+    filtradas = dataset.indices.filtrar({"team": "San"})
+
+    casos = {
+        "limit=100 sin agrupar": (
+            lambda: JSONResponse(jsonable_encoder(dataset.serializador.registros(filas))).body,
+            lambda: JSONRapido(dataset.serializador.registros_json(filas)).body,
+        ),
+    }
+    for modo in ("player", "team", "season", "career"):
+        casos[f"group_by={modo} limit=100"] = (
+            lambda modo=modo: JSONResponse(jsonable_encoder(dataset.agrupaciones.pagina(modo, None, 0, 100)[1])).body,
+            lambda modo=modo: JSONRapido(dataset.agrupaciones.pagina_json(modo, None, 0, 100)[1]).body,
+        )
+        casos[f"group_by={modo} limit=100 team=San"] = (
+            lambda modo=modo: JSONResponse(jsonable_encoder(dataset.agrupaciones.pagina(modo, filtradas, 0, 100)[1])).body,
+            lambda modo=modo: JSONRapido(dataset.agrupaciones.pagina_json(modo, filtradas, 0, 100)[1]).body,
+        )
+
+    print(f"{'caso':<40} {'actual p50':>12} {'fragmentos p50':>15} {'mejora':>8}")
+    for nombre, (actual, rapido) in casos.items():
+        assert actual() == rapido(), nombre
+        a = medir(actual, args.repeticiones)
+        r = medir(rapido, args.repeticiones)
+        print(f"{nombre:<40} {a['p50_ms']:>10.3f}ms {r['p50_ms']:>13.3f}ms {a['p50_ms'] / r['p50_ms']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
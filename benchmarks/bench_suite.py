@@ -0,0 +1,376 @@
+"""
+Suite de benchmarks reproducible: micro-benchmarks y carga HTTP contra la
+app, con un servidor local de CSVs sintéticos en lugar de Google Sheets.
+
+Para cada tamaño (por defecto 10k, 100k y 1M filas) mide:
+
+- ``carga``: descarga del CSV desde el servidor local, descarga condicional
+  (``304``), parseo y compactación, y preparación de las estructuras.
+- ``filtros``: cada filtro de ``/datos`` resuelto con los índices, sin
+  memorizar el resultado.
+- ``group_by``: la página de cada modo, sin filtros y con un filtro de equipo.
+- ``serializacion``: la codificación JSON de esas páginas.
+- ``compresion``: tamaño comprimido, ahorro y tiempo de CPU de cada
+  codificación disponible sobre ``/info`` y las páginas sin filtros.
+- ``http``: un generador de carga asíncrono contra la app ASGI (en el mismo
+  proceso, sin red) con varios escenarios de consultas aleatorias
+  reproducibles, reportando req/s y latencias p50/p95/p99 por escenario
+  (el cliente acepta gzip, así que las respuestas grandes van comprimidas).
+  El escenario ``health_saturado`` mide ``/health`` mientras los demás
+  clientes mantienen lleno el pool de consultas con ``group_by=career``.
+
+Los resultados se escriben en JSON. Con ``--comparar`` se contrastan con una
+corrida anterior y el proceso termina con código 1 si alguna métrica empeoró
+más que ``--tolerancia`` (tiempos ``*_ms`` más altos o ``req_s`` más bajo).
+
+Uso:
+    python benchmarks/bench_suite.py --tamanos 10000,100000
+    python benchmarks/bench_suite.py --tamanos 10000 --comparar benchmarks/resultados/base.json
+"""
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from agrupaciones import MODOS_AGRUPACION
+from compresion import COMPRESORES, comprimir
+from consultas import Consulta, ejecutar_consulta
+from dataset import Dataset
+from fuentes import FuenteHTTP
+from lectura import leer_csv_en_bloques
+from serializacion import JSONRapido
+from servidor_csv import ServidorCSV
+
+TAMANOS_POR_DEFECTO = (10_000, 100_000, 1_000_000)
+
+
+def _medir(funcion: Callable, repeticiones: int) -> Dict[str, float]:
+    """Mediana y mínimo en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"p50_ms": round(statistics.median(tiempos), 4), "min_ms": round(min(tiempos), 4)}
+
+
+def _una_vez(funcion: Callable) -> Tuple[Any, float]:
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, round((time.perf_counter() - inicio) * 1000, 2)
+
+
+def _percentil(tiempos: List[float], p: float) -> float:
+    return round(float(np.percentile(tiempos, p)), 3) if tiempos else 0.0
+
+
+def filtros_de_ejemplo(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Un caso por filtro de /datos, con valores presentes en la tabla"""
+    fila = df.dropna().iloc[len(df.dropna()) // 2]
+    return {
+        "team": {"team": "Boca"},
+        "team_varios": {"team": "Boca,Quimsa,Atenas"},
+        "season": {"season": int(fila["Season"])},
+        "position": {"position": "G"},
+        "nationality": {"nationality": "ARG"},
+        "first_name": {"first_name": str(fila["Adjusted first name"])},
+        "last_name": {"last_name": str(fila["Adjusted last name"])},
+        "birthdate": {"birthdate": str(fila["Birthdate"])},
+        "height": {"height": float(fila["Height"])},
+        "weight": {"weight": float(fila["Weight"])},
+        "season_rango": {"season_from": 2010, "season_to": 2015},
+        "height_rango": {"height_min": 195, "height_max": 205},
+        "birthdate_rango": {"birthdate_from": "1985-01-01", "birthdate_to": "1990-12-31"},
+        "combinado": {"team": "San", "season_from": 2005, "position": "F"},
+    }
+
+
+def medir_carga(servidor: ServidorCSV, filas: int) -> Tuple[Dataset, Dict[str, float]]:
+    """Descarga, parseo y preparación de una versión desde el servidor local"""
+    fuente = FuenteHTTP(servidor.url(filas))
+    contenido = servidor.csv(filas)[0]
+    respuesta, descarga_ms = _una_vez(lambda: fuente.descargar())
+    # La descarga del cuerpo va en streaming junto con el parseo
+    (df, _, memoria), parseo_ms = _una_vez(lambda: leer_csv_en_bloques(respuesta.partes_en_bloques()))
+    _, condicional_ms = _una_vez(lambda: fuente.descargar(respuesta.etag))
+    dataset = Dataset(df, "bench")
+    _, preparacion_ms = _una_vez(dataset.preparar)
+    return dataset, {
+        "bytes_csv": len(contenido),
+        "descarga_ms": descarga_ms,
+        "descarga_304_ms": condicional_ms,
+        "parseo_ms": parseo_ms,
+        "preparacion_ms": preparacion_ms,
+        "memoria_bytes": memoria["bytes_despues"],
+    }
+
+
+def medir_micro(dataset: Dataset, repeticiones: int) -> Dict[str, Dict[str, Any]]:
+    """Filtros, páginas de cada group_by, su serialización y su compresión"""
+    resultados: Dict[str, Dict[str, Any]] = {"filtros": {}, "group_by": {}, "serializacion": {}, "compresion": {}}
+    for nombre, filtros in filtros_de_ejemplo(dataset.df).items():
+        filas = dataset.indices._filtrar(filtros)
+        resultados["filtros"][nombre] = {
+            **_medir(lambda: dataset.indices._filtrar(filtros), repeticiones),
+            "filas": len(dataset.df) if filas is None else len(filas),
+        }
+
+    consultas = {"sin_agrupar": Consulta(limit=100), "sin_agrupar_team": Consulta(limit=100, team="San")}
+    for modo in MODOS_AGRUPACION:
+        consultas[modo] = Consulta(limit=100, group_by=modo)
+        consultas[f"{modo}_team"] = Consulta(limit=100, group_by=modo, team="San")
+    for nombre, consulta in consultas.items():
+        resultado = ejecutar_consulta(dataset, consulta)
+        resultados["group_by"][nombre] = _medir(lambda: ejecutar_consulta(dataset, consulta), repeticiones)
+        resultados["serializacion"][nombre] = {
+            **_medir(lambda: JSONRapido(resultado.contenido).body, repeticiones),
+            "bytes": len(JSONRapido(resultado.contenido).body),
+        }
+
+    # Bytes enviados y CPU de cada codificación sobre las respuestas de /info y de las páginas sin filtros
+    from main import calcular_info
+    cuerpos = {"info": JSONRapido(calcular_info(dataset)).body}
+    for nombre in ("sin_agrupar", *MODOS_AGRUPACION):
+        cuerpos[nombre] = JSONRapido(ejecutar_consulta(dataset, consultas[nombre]).contenido).body
+    for nombre, cuerpo in cuerpos.items():
+        for codificacion in COMPRESORES:
+            comprimido = comprimir(cuerpo, codificacion)
+            resultados["compresion"][f"{nombre}_{codificacion}"] = {
+                **_medir(lambda: comprimir(cuerpo, codificacion), repeticiones),
+                "bytes": len(cuerpo),
+                "bytes_comprimidos": len(comprimido),
+                "ahorro": round(1 - len(comprimido) / len(cuerpo), 4),
+            }
+    return resultados
+
+
+def escenarios(dataset: Dataset) -> Dict[str, Callable[[random.Random], str]]:
+    """Generadores de URLs por escenario; cada uno elige parámetros al azar con el generador recibido"""
+    equipos = [str(equipo).split()[0] for equipo in dataset.facetas.valores("teams")]
+    temporadas = [int(temporada) for temporada in dataset.facetas.valores("seasons")]
+    apellidos = ["campazo", "Ñañez", "perez", "fernandes", "scola", "vildoza"]
+    casos = {
+        "datos": lambda r: f"/datos?page={r.randint(1, 50)}&limit=50",
+        "datos_filtros": lambda r: f"/datos?team={r.choice(equipos)}&season={r.choice(temporadas)}&include_stats=true",
+        "datos_rangos": lambda r: f"/datos?season_from={r.choice(temporadas)}&height_min={r.randint(185, 205)}&limit=100",
+        "facets": lambda r: f"/datos/facets?season={r.choice(temporadas)}",
+        "stats": lambda r: f"/stats?group_by=team&season_from={r.choice(temporadas)}",
+        "search": lambda r: f"/jugadores/search?q={r.choice(apellidos)}",
+        "info": lambda r: "/info",
+    }
+    for modo in MODOS_AGRUPACION:
+        casos[f"datos_group_by_{modo}"] = lambda r, modo=modo: f"/datos?group_by={modo}&page={r.randint(1, 5)}&team={r.choice(equipos)}"
+    return casos
+
+
+async def carga_http(url_csv: str, duracion: float, concurrencia: int, semilla: int, cache: bool) -> Dict[str, Dict[str, Any]]:
+    """
+    Generador de carga contra la app ASGI con el dataset del servidor local.
+
+    Cada escenario corre ``duracion`` segundos con ``concurrencia`` clientes
+    que envían peticiones una tras otra.
+    """
+    import main
+    from cache_respuestas import CacheRespuestas
+    from dataset import GestorDataset
+
+    main.gestor_dataset = GestorDataset(FuenteHTTP(url_csv), ttl=0)
+    main.cache_respuestas = CacheRespuestas(main.CACHE_RESPUESTAS_MAX if cache else 0)
+    resultados = {}
+    async with main.lifespan(main.app):
+        await main.arranque.esperar()
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for nombre, generar in escenarios(main.gestor_dataset.actual).items():
+                rnd = random.Random(f"{semilla}-{nombre}")
+                tiempos: List[float] = []
+                errores = 0
+                fin = time.perf_counter() + duracion
+
+                async def cliente_de_carga():
+                    nonlocal errores
+                    while time.perf_counter() < fin:
+                        inicio = time.perf_counter()
+                        respuesta = await cliente.get(generar(rnd))
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                        if respuesta.status_code >= 400:
+                            errores += 1
+
+                inicio = time.perf_counter()
+                await asyncio.gather(*(cliente_de_carga() for _ in range(concurrencia)))
+                transcurrido = time.perf_counter() - inicio
+                resultados[nombre] = _resumen_carga(tiempos, errores, transcurrido)
+
+            resultados["health_saturado"] = await _health_saturado(cliente, duracion, concurrencia, semilla)
+    return resultados
+
+
+def _resumen_carga(tiempos: List[float], errores: int, transcurrido: float) -> Dict[str, Any]:
+    return {
+        "peticiones": len(tiempos),
+        "errores": errores,
+        "req_s": round(len(tiempos) / transcurrido, 1),
+        "p50_ms": _percentil(tiempos, 50),
+        "p95_ms": _percentil(tiempos, 95),
+        "p99_ms": _percentil(tiempos, 99),
+    }
+
+
+async def _health_saturado(cliente, duracion: float, concurrencia: int, semilla: int) -> Dict[str, Any]:
+    """
+    Latencia de ``/health`` mientras ``concurrencia`` clientes piden trayectorias
+    completas sin filtros (páginas distintas, para que no las resuelva la caché)
+    y mantienen ocupado el pool de consultas. Los 503 de los clientes pesados no
+    cuentan como errores: son la admisión funcionando.
+    """
+    rnd = random.Random(f"{semilla}-health_saturado")
+    tiempos: List[float] = []
+    errores = 0
+    fin = time.perf_counter() + duracion
+
+    async def pesado():
+        while time.perf_counter() < fin:
+            await cliente.get(f"/datos?group_by=career&limit=100&page={rnd.randint(1, 10_000)}")
+
+    async def salud():
+        nonlocal errores
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            respuesta = await cliente.get("/health")
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if respuesta.status_code >= 400:
+                errores += 1
+            await asyncio.sleep(0.01)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(salud(), *(pesado() for _ in range(concurrencia)))
+    return _resumen_carga(tiempos, errores, time.perf_counter() - inicio)
+
+
+def _aplanar(datos: Any, prefijo: str = "") -> Dict[str, float]:
+    if isinstance(datos, dict):
+        plano = {}
+        for clave, valor in datos.items():
+            plano.update(_aplanar(valor, f"{prefijo}.{clave}" if prefijo else str(clave)))
+        return plano
+    return {prefijo: datos} if isinstance(datos, (int, float)) else {}
+
+
+def comparar(base: Dict[str, Any], actual: Dict[str, Any], tolerancia: float, piso_ms: float = 0.05) -> List[Dict[str, Any]]:
+    """
+    Métricas que empeoraron más que ``tolerancia`` (proporción) respecto de ``base``.
+
+    Se comparan los tiempos (``*_ms``, más es peor) y el throughput (``req_s``,
+    menos es peor) presentes en las dos corridas. Los tiempos por debajo de
+    ``piso_ms`` en ambas se ignoran: a esa escala domina el ruido.
+    """
+    anteriores, nuevas = _aplanar(base.get("tamanos", {})), _aplanar(actual.get("tamanos", {}))
+    regresiones = []
+    for clave in sorted(anteriores.keys() & nuevas.keys()):
+        antes, despues = anteriores[clave], nuevas[clave]
+        if clave.endswith("_ms"):
+            if max(antes, despues) < piso_ms:
+                continue
+            cambio = (despues - antes) / antes if antes else 0.0
+        elif clave.endswith("req_s"):
+            cambio = (antes - despues) / antes if antes else 0.0
+        else:
+            continue
+        if cambio > tolerancia:
+            regresiones.append({"metrica": clave, "antes": antes, "despues": despues, "empeora_pct": round(cambio * 100, 1)})
+    return regresiones
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def ejecutar(tamanos: List[int], repeticiones: int, duracion: float, concurrencia: int, semilla: int, cache: bool) -> Dict[str, Any]:
+    """Corre la suite completa y devuelve los resultados"""
+    resultados: Dict[str, Any] = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _commit(),
+        "entorno": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {"repeticiones": repeticiones, "duracion_s": duracion, "concurrencia": concurrencia, "semilla": semilla, "cache": cache},
+        "tamanos": {},
+    }
+    with ServidorCSV(semilla=semilla) as servidor:
+        for filas in tamanos:
+            print(f"== {filas} filas", file=sys.stderr)
+            dataset, carga = medir_carga(servidor, filas)
+            micro = medir_micro(dataset, repeticiones)
+            del dataset
+            http = asyncio.run(carga_http(servidor.url(filas), duracion, concurrencia, semilla, cache)) if duracion > 0 else {}
+            resultados["tamanos"][str(filas)] = {"carga": carga, **micro, "http": http}
+            for nombre, compresion in micro["compresion"].items():
+                print(f"   {nombre:<24} {compresion['bytes']:>10} -> {compresion['bytes_comprimidos']:>9} bytes  "
+                      f"ahorro {compresion['ahorro']:>6.1%}  {compresion['p50_ms']:>8.2f}ms", file=sys.stderr)
+            for nombre, escenario in http.items():
+                print(f"   {nombre:<24} {escenario['req_s']:>8.1f} req/s  p50 {escenario['p50_ms']:>8.2f}ms  "
+                      f"p95 {escenario['p95_ms']:>8.2f}ms  p99 {escenario['p99_ms']:>8.2f}ms", file=sys.stderr)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS_POR_DEFECTO), help="Filas de cada CSV, separadas por coma")
+    parser.add_argument("--repeticiones", type=int, default=20, help="Repeticiones de cada micro-benchmark")
+    parser.add_argument("--duracion", type=float, default=5.0, help="Segundos de carga HTTP por escenario (0 la omite)")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Clientes simultáneos de la carga HTTP")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--sin-cache", action="store_true", help="Desactivar la caché de respuestas durante la carga HTTP")
+    parser.add_argument("--logs", action="store_true", help="Mantener los logs INFO de la app (por defecto se silencian)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/<fecha>-<commit>.json)")
+    parser.add_argument("--comparar", help="Resultados JSON de una corrida anterior contra los que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento máximo aceptado al comparar (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if not args.logs:
+        logging.disable(logging.INFO)
+    resultados = ejecutar([int(t) for t in args.tamanos.split(",")], args.repeticiones, args.duracion,
+                          args.concurrencia, args.semilla, not args.sin_cache)
+
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados", f"{time.strftime('%Y%m%d-%H%M%S')}-{resultados['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados en {salida}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(base, resultados, args.tolerancia)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion['metrica']}: {regresion['antes']} -> {regresion['despues']} (+{regresion['empeora_pct']}%)", file=sys.stderr)
+        if regresiones:
+            sys.exit(1)
+        print(f"Sin regresiones mayores al {args.tolerancia:.0%} respecto de {args.comparar}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
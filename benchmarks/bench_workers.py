@@ -0,0 +1,225 @@
+"""
+Escalado con varios workers: throughput y memoria de ``gunicorn -c gunicorn.conf.py``
+con 1, 2, ... N workers sobre el mismo CSV sintético.
+
+Para cada cantidad de workers levanta gunicorn (con su proceso cargador)
+contra el servidor local de CSVs, espera a que todos los workers tengan el
+dataset y genera carga desde varios procesos cliente con una mezcla de
+consultas aleatorias reproducibles (por defecto sin caché de respuestas, para
+medir el cálculo). Reporta req/s, latencias, la aceleración respecto de un
+worker y la memoria de cada proceso: RSS y PSS (``/proc/<pid>/smaps_rollup``;
+PSS reparte las páginas compartidas, como las columnas mapeadas de los
+snapshots, entre los procesos que las usan).
+
+Uso:
+    python benchmarks/bench_workers.py --filas 200000 --workers 1,2,4
+"""
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import requests
+
+from servidor_csv import ServidorCSV
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentil(tiempos: List[float], p: float) -> float:
+    return round(float(np.percentile(tiempos, p)), 3) if tiempos else 0.0
+
+
+def urls_de_carga(info: Dict[str, Any], cantidad: int, semilla: int) -> List[str]:
+    """Mezcla reproducible de consultas que no se repiten mucho (filtros, group_by y /stats)"""
+    filtros = info["filters_available"]
+    equipos = [str(equipo).split()[0] for equipo in filtros["teams"]]
+    temporadas = filtros["seasons"]
+    rnd = random.Random(semilla)
+    generadores = [
+        lambda: f"/datos?team={rnd.choice(equipos)}&season={rnd.choice(temporadas)}&include_stats=true",
+        lambda: f"/datos?season_from={rnd.choice(temporadas)}&height_min={rnd.randint(185, 205)}&limit=100",
+        lambda: f"/datos?group_by=player&team={rnd.choice(equipos)}&page={rnd.randint(1, 3)}",
+        lambda: f"/datos?group_by=team&season_from={rnd.choice(temporadas)}",
+        lambda: f"/stats?group_by=team&season_from={rnd.choice(temporadas)}",
+        lambda: f"/datos/facets?season={rnd.choice(temporadas)}",
+    ]
+    return [rnd.choice(generadores)() for _ in range(cantidad)]
+
+
+def _cliente(argumentos) -> List[float]:
+    """Proceso cliente: recorre sus URLs en orden hasta que se acaba el tiempo; devuelve las latencias en ms"""
+    base, urls, fin = argumentos
+    sesion = requests.Session()
+    tiempos = []
+    i = 0
+    while time.time() < fin:
+        inicio = time.perf_counter()
+        respuesta = sesion.get(base + urls[i % len(urls)], timeout=60)
+        tiempos.append((time.perf_counter() - inicio) * 1000 if respuesta.status_code < 400 else -1.0)
+        i += 1
+    return tiempos
+
+
+def _memoria(pid: int) -> Dict[str, float]:
+    """RSS y PSS de un proceso en MB"""
+    valores = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as archivo:
+            for linea in archivo:
+                partes = linea.split()
+                if partes[0] in ("Rss:", "Pss:"):
+                    valores[partes[0][:-1].lower() + "_mb"] = round(int(partes[1]) / 1024, 1)
+    except OSError:
+        pass
+    return valores
+
+
+def _hijos(pid: int) -> List[int]:
+    salida = subprocess.run(["ps", "-o", "pid=", "--ppid", str(pid)], capture_output=True, text=True).stdout
+    return [int(linea) for linea in salida.split()]
+
+
+def _es_cargador(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as archivo:
+            return b"cargador.py" in archivo.read()
+    except OSError:
+        return False
+
+
+def _esperar_workers(base: str, workers: int, limite: float):
+    """Espera a que respondan con datos suficientes peticiones como para haber pasado por todos los workers"""
+    sesion = requests.Session()
+    listos = 0
+    while listos < workers * 10:
+        if time.time() > limite:
+            raise TimeoutError("Los workers no cargaron el dataset a tiempo")
+        try:
+            respuesta = requests.get(base + "/health", timeout=5)
+            listos = listos + 1 if "dataset" in respuesta.json() else 0
+            if listos:
+                sesion.get(base + "/datos?limit=1", timeout=30)
+        except (requests.RequestException, ValueError):
+            time.sleep(0.2)
+
+
+def medir_workers(url_csv: str, workers: int, clientes: int, duracion: float, semilla: int,
+                  cache: bool) -> Dict[str, Any]:
+    """Levanta gunicorn con ``workers`` workers, genera carga y mide throughput y memoria"""
+    puerto = _puerto_libre()
+    base = f"http://127.0.0.1:{puerto}"
+    with tempfile.TemporaryDirectory(prefix="bench-workers-") as snapshots:
+        entorno = {
+            **os.environ,
+            "CSV_URL": url_csv,
+            "SNAPSHOT_DIR": snapshots,
+            "WEB_CONCURRENCY": str(workers),
+            "PORT": str(puerto),
+            "DATASET_TTL_SEGUNDOS": "3600",
+            "CACHE_RESPUESTAS_MAX": os.environ.get("CACHE_RESPUESTAS_MAX", "512") if cache else "0",
+        }
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "--log-level", "warning", "main:app"],
+            cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _esperar_workers(base, workers, time.time() + 300)
+            info = requests.get(base + "/info", timeout=30).json()
+            fin = time.time() + duracion
+            tareas = [(base, urls_de_carga(info, 2000, semilla + i), fin) for i in range(clientes)]
+            inicio = time.perf_counter()
+            with Pool(clientes) as pool:
+                por_cliente = pool.map(_cliente, tareas)
+            transcurrido = time.perf_counter() - inicio
+
+            hijos = _hijos(proceso.pid)
+            memoria_workers = [_memoria(pid) for pid in hijos if not _es_cargador(pid)]
+            memoria_cargador = [_memoria(pid) for pid in hijos if _es_cargador(pid)]
+        finally:
+            proceso.send_signal(signal.SIGTERM)
+            try:
+                proceso.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+
+    tiempos = [t for lista in por_cliente for t in lista if t >= 0]
+    errores = sum(1 for lista in por_cliente for t in lista if t < 0)
+    return {
+        "workers": workers,
+        "peticiones": len(tiempos),
+        "errores": errores,
+        "req_s": round(len(tiempos) / transcurrido, 1),
+        "p50_ms": _percentil(tiempos, 50),
+        "p95_ms": _percentil(tiempos, 95),
+        "p99_ms": _percentil(tiempos, 99),
+        "memoria_workers": memoria_workers,
+        "memoria_cargador": memoria_cargador[0] if memoria_cargador else None,
+        "pss_total_mb": round(sum(m.get("pss_mb", 0) for m in memoria_workers + memoria_cargador), 1),
+    }
+
+
+def ejecutar(filas: int, lista_workers: List[int], clientes: Optional[int], duracion: float, semilla: int,
+             cache: bool) -> Dict[str, Any]:
+    resultados: Dict[str, Any] = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "parametros": {"filas": filas, "duracion_s": duracion, "semilla": semilla, "cache": cache},
+        "corridas": [],
+    }
+    with ServidorCSV(semilla=semilla) as servidor:
+        servidor.csv(filas)
+        for workers in lista_workers:
+            # Suficientes clientes para saturar a todos los workers
+            corrida = medir_workers(servidor.url(filas), workers, clientes or 2 * workers, duracion, semilla, cache)
+            base = resultados["corridas"][0]["req_s"] if resultados["corridas"] else corrida["req_s"]
+            corrida["aceleracion"] = round(corrida["req_s"] / base, 2) if base else 0.0
+            resultados["corridas"].append(corrida)
+            pss = [m.get("pss_mb", 0) for m in corrida["memoria_workers"]]
+            print(f"{workers:>3} workers  {corrida['req_s']:>8.1f} req/s  x{corrida['aceleracion']:<5}  "
+                  f"p50 {corrida['p50_ms']:>8.2f}ms  p99 {corrida['p99_ms']:>8.2f}ms  "
+                  f"PSS por worker {np.mean(pss) if pss else 0:>6.1f}MB  PSS total {corrida['pss_total_mb']:>7.1f}MB  "
+                  f"errores {corrida['errores']}", file=sys.stderr)
+    return resultados
+
+
+def main():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    por_defecto = sorted({1, *(w for w in (2, 4, 8, 16) if w <= cpus), cpus})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200_000, help="Filas del CSV sintético")
+    parser.add_argument("--workers", default=",".join(str(w) for w in por_defecto), help="Cantidades de workers, separadas por coma")
+    parser.add_argument("--clientes", type=int, help="Procesos cliente de la carga (por defecto, el doble de workers)")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga por cantidad de workers")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--con-cache", action="store_true", help="Dejar activa la caché de respuestas")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/workers-<fecha>.json)")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.filas, [int(w) for w in args.workers.split(",")], args.clientes, args.duracion,
+                          args.semilla, args.con_cache)
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados", f"workers-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados en {salida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
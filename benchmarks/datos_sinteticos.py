@@ -0,0 +1,87 @@
+"""
+Generador de CSVs sintéticos con la forma del CSV de la LNB para benchmarks
+"""
+from typing import Optional
+import argparse
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS = [
+    "First name", "Last name", "Adjusted first name", "Adjusted last name", "Team",
+    "Season", "Position", "Height", "Weight", "Nationality", "Birthdate",
+]
+
+_NOMBRES = ["Pablo", "José", "Juan", "Nicolás", "Martín", "Agustín", "Lucas", "Facundo", "Tomás", "Iván",
+            "Germán", "Marcos", "Luis", "Diego", "Federico", "Leonardo", "Gabriel", "Andrés", "Emanuel", "Santiago"]
+_APELLIDOS = ["Pérez", "García", "Gómez", "Ñañez", "Aaron", "Fernández", "Delía", "Scola", "Prigioni",
+              "Campazzo", "Vildoza", "Rodríguez", "López", "Martínez", "Sánchez", "Romero", "Sosa", "Álvarez",
+              "Torres", "Ruiz", "Ramírez", "Flores", "Acosta", "Benítez", "Medina", "Herrera", "Suárez", "Aguirre"]
+_EQUIPOS = ["Boca Juniors", "Quimsa", "San Lorenzo", "Instituto", "Obras Basket", "Peñarol",
+            "San Martín (Corrientes)", "Regatas Corrientes", "Ferro Carril Oeste", "Argentino de Junín",
+            "Gimnasia (CR)", "Atenas", "Olímpico", "Platense", "Independiente (O)", "Hispano Americano",
+            "Riachuelo", "Oberá", "La Unión", "Zárate Basket"]
+_POSICIONES = ["G", "F", "C", "PG", "SG", "SF", "PF"]
+_NACIONALIDADES = ["ARG", "USA", "URU", "BRA", "ARG/ITA", "ARG/ESP", "PUR", "DOM", "VEN"]
+
+_SIN_ACENTOS = str.maketrans("áéíóúÁÉÍÓÚñÑ", "aeiouAEIOUnN")
+
+
+def generar_dataframe(filas: int, semilla: int = 42) -> pd.DataFrame:
+    """
+    Tabla jugador-temporada-equipo de ``filas`` filas.
+
+    Cada jugador aparece en varias temporadas consecutivas (como en el CSV
+    real) y hay huecos en altura, peso, nacionalidad y fecha de nacimiento.
+    """
+    rng = np.random.default_rng(semilla)
+    temporadas_por_jugador = rng.integers(1, 9, size=max(1, filas // 3))
+    jugador = np.repeat(np.arange(len(temporadas_por_jugador)), temporadas_por_jugador)[:filas]
+    if len(jugador) < filas:
+        jugador = np.concatenate([jugador, rng.integers(0, len(temporadas_por_jugador), filas - len(jugador))])
+    n_jugadores = int(jugador.max()) + 1
+
+    nombres = rng.choice(_NOMBRES, n_jugadores)
+    apellidos = np.array([f"{a}{'' if i < len(_APELLIDOS) * 4 else ' ' + str(i % 9973)}" for i, a in
+                          enumerate(rng.choice(_APELLIDOS, n_jugadores))], dtype=object)
+    nacimiento = pd.to_datetime("1975-01-01") + pd.to_timedelta(rng.integers(0, 30 * 365, n_jugadores), unit="D")
+    inicio = rng.integers(1995, 2024, n_jugadores)
+    altura = rng.integers(175, 216, n_jugadores).astype(float)
+    peso = rng.integers(70, 121, n_jugadores) + rng.choice([0.0, 0.5], n_jugadores)
+
+    desplazamiento = np.arange(filas) - np.searchsorted(jugador, jugador)
+    df = pd.DataFrame({
+        "First name": nombres[jugador],
+        "Last name": apellidos[jugador],
+        "Adjusted first name": [n.translate(_SIN_ACENTOS) for n in nombres[jugador]],
+        "Adjusted last name": [a.translate(_SIN_ACENTOS) for a in apellidos[jugador]],
+        "Team": rng.choice(_EQUIPOS, filas),
+        "Season": np.minimum(inicio[jugador] + np.maximum(desplazamiento, 0), 2025),
+        "Position": rng.choice(_POSICIONES, n_jugadores)[jugador],
+        "Height": altura[jugador],
+        "Weight": peso[jugador],
+        "Nationality": rng.choice(_NACIONALIDADES, n_jugadores)[jugador],
+        "Birthdate": nacimiento.strftime("%Y-%m-%d").to_numpy()[jugador],
+    }, columns=COLUMNAS)
+
+    for col, proporcion in (("Height", 0.08), ("Weight", 0.12), ("Nationality", 0.03), ("Birthdate", 0.02)):
+        df.loc[rng.random(filas) < proporcion, col] = np.nan
+    return df
+
+
+def generar_csv(filas: int, semilla: int = 42, destino: Optional[str] = None) -> bytes:
+    """CSV sintético en bytes (y opcionalmente guardado en ``destino``)"""
+    contenido = generar_dataframe(filas, semilla).to_csv(index=False).encode("utf-8")
+    if destino:
+        with open(destino, "wb") as archivo:
+            archivo.write(contenido)
+    return contenido
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un CSV sintético con la forma del de la LNB")
+    parser.add_argument("filas", type=int)
+    parser.add_argument("destino")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    generar_csv(args.filas, args.semilla, args.destino)
@@ -0,0 +1,124 @@
+"""
+Servidor HTTP local que reemplaza a Google Sheets en los benchmarks.
+
+Sirve CSVs sintéticos con la forma del de la LNB en ``/lnb_<filas>.csv``
+(se generan la primera vez que se piden y quedan en memoria), con ``ETag``
+y ``Last-Modified`` y respondiendo ``304`` a las peticiones condicionales,
+igual que la exportación de Google Sheets.
+
+Uso:
+    python benchmarks/servidor_csv.py --puerto 8765
+    CSV_URL=http://127.0.0.1:8765/lnb_100000.csv uvicorn main:app
+"""
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datos_sinteticos import generar_csv
+
+_RUTA = re.compile(r"^/lnb_(\d+)\.csv$")
+
+
+class ServidorCSV:
+    """
+    Servidor en un hilo propio, para usar desde los benchmarks.
+
+    Args:
+        puerto: Puerto local (0 elige uno libre)
+        semilla: Semilla de los CSVs sintéticos
+    """
+
+    def __init__(self, puerto: int = 0, semilla: int = 42):
+        self.semilla = semilla
+        self.peticiones = 0
+        self._csvs: Dict[int, Tuple[bytes, str, str]] = {}
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="servidor-csv", daemon=True)
+
+    @property
+    def puerto(self) -> int:
+        return self._servidor.server_address[1]
+
+    def url(self, filas: int) -> str:
+        return f"http://127.0.0.1:{self.puerto}/lnb_{filas}.csv"
+
+    def csv(self, filas: int) -> Tuple[bytes, str, str]:
+        """Contenido, ETag y Last-Modified del CSV de ``filas`` filas"""
+        with self._lock:
+            if filas not in self._csvs:
+                contenido = generar_csv(filas, self.semilla)
+                etag = f'"{hashlib.sha1(contenido).hexdigest()[:16]}"'
+                self._csvs[filas] = (contenido, etag, formatdate(time.time(), usegmt=True))
+            return self._csvs[filas]
+
+    def iniciar(self) -> "ServidorCSV":
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> "ServidorCSV":
+        return self.iniciar()
+
+    def __exit__(self, *excepcion):
+        self.detener()
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.peticiones += 1
+                coincidencia = _RUTA.match(self.path.split("?")[0])
+                if coincidencia is None:
+                    self.send_error(404, "Rutas disponibles: /lnb_<filas>.csv")
+                    return
+                contenido, etag, modificado = servidor.csv(int(coincidencia.group(1)))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(contenido)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", modificado)
+                self.end_headers()
+                self.wfile.write(contenido)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    servidor = ServidorCSV(args.puerto, args.semilla)
+    print(f"Sirviendo CSVs sintéticos en {servidor.url(10000)} (cualquier cantidad de filas). Ctrl+C para terminar")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
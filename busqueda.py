@@ -0,0 +1,140 @@
+"""
+Búsqueda aproximada de jugadores por nombre (``/jugadores/search``).
+
+Los nombres se pliegan (sin acentos, en minúsculas, solo letras y dígitos) y
+se descomponen en trigramas con el relleno de ``pg_trgm``: dos espacios antes
+y uno después de cada palabra, así que ``"Ñañez"`` y ``"nanez"`` comparten
+todos sus trigramas y ``"campazo"`` comparte casi todos con ``"Campazzo"``.
+
+El índice se construye una vez por versión sobre los jugadores de
+``group_by=player`` (la misma identidad y el mismo registro): cada nombre
+plegado distinto tiene su lista de jugadores, y cada trigrama la lista de
+nombres que lo contienen. Una búsqueda suma con ``bincount`` las listas de
+los trigramas de la consulta y ordena por la proporción de la consulta
+encontrada en el nombre, desempatando por la similitud (Jaccard) de ambos.
+"""
+from typing import Dict, List, Set, Tuple
+import logging
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+from agrupaciones import Agrupacion
+from serializacion import FragmentoJSON, componer_json, lista_json
+
+logger = logging.getLogger(__name__)
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def plegar(texto) -> str:
+    """Texto sin acentos ni signos, en minúsculas y con un espacio entre palabras"""
+    if not isinstance(texto, str):
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.casefold()).strip()
+
+
+def trigramas(texto: str) -> Set[str]:
+    """Trigramas de un texto ya plegado, palabra por palabra"""
+    resultado = set()
+    for palabra in texto.split():
+        rellena = f"  {palabra} "
+        resultado.update(rellena[i:i + 3] for i in range(len(rellena) - 2))
+    return resultado
+
+
+class IndiceJugadores:
+    """
+    Índice de trigramas sobre los nombres de los jugadores de una versión.
+
+    Args:
+        agrupacion: Agrupación ``player`` de la versión; sus claves son
+            (nombre, apellido, nombre ajustado, apellido ajustado)
+        id_de_fila: ID estable del jugador de cada fila de la versión
+    """
+
+    def __init__(self, agrupacion: Agrupacion, id_de_fila: np.ndarray):
+        self._agrupacion = agrupacion
+        # Con homónimos (mismo nombre, distinta fecha de nacimiento) el grupo lleva el ID de su primera fila
+        self._ids = [int(id_de_fila[filas[0]]) for filas in agrupacion.filas_por_grupo]
+        nombres: Dict[str, int] = {}
+        nombre_de_jugador = np.empty(len(agrupacion.claves), dtype=np.int64)
+        for jugador, (nombre, apellido, nombre_ajustado, apellido_ajustado) in enumerate(agrupacion.claves):
+            # El nombre original y el ajustado casi siempre coinciden una vez plegados
+            original = plegar(f"{nombre} {apellido}")
+            ajustado = plegar(f"{nombre_ajustado} {apellido_ajustado}")
+            texto = original if original == ajustado else f"{original} {ajustado}"
+            nombre_de_jugador[jugador] = nombres.setdefault(texto, len(nombres))
+        self.nombres: List[str] = list(nombres)
+
+        # Jugadores de cada nombre: los del nombre i están en orden[limites[i]:limites[i + 1]]
+        self._orden = np.argsort(nombre_de_jugador, kind="stable")
+        self._limites = np.searchsorted(nombre_de_jugador[self._orden], np.arange(len(self.nombres) + 1))
+
+        listas: Dict[str, List[int]] = {}
+        self._cantidad_trigramas = np.empty(len(self.nombres), dtype=np.int64)
+        for i, texto in enumerate(self.nombres):
+            grams = trigramas(texto)
+            self._cantidad_trigramas[i] = len(grams)
+            for gram in grams:
+                listas.setdefault(gram, []).append(i)
+        self._listas = {gram: np.array(ids, dtype=np.int32) for gram, ids in listas.items()}
+        logger.info(f"Índice de búsqueda de jugadores: {len(agrupacion.claves)} jugadores, {len(self.nombres)} nombres, {len(self._listas)} trigramas")
+
+    def buscar(self, consulta: str, limite: int = 10, minimo: float = 0.0) -> List[Tuple[int, float, float]]:
+        """
+        Jugadores más parecidos a la consulta.
+
+        Args:
+            consulta: Nombre, apellido o ambos, con o sin acentos
+            limite: Cantidad máxima de jugadores devueltos
+            minimo: Puntaje mínimo (proporción de trigramas de la consulta presentes en el nombre)
+
+        Returns:
+            Tuplas (índice del jugador en la agrupación, puntaje, similitud), de la más parecida a la menos
+        """
+        grams = trigramas(plegar(consulta))
+        listas = [self._listas[gram] for gram in grams if gram in self._listas]
+        if not grams or not listas:
+            return []
+
+        compartidos = np.bincount(np.concatenate(listas), minlength=len(self.nombres))
+        # El puntaje mínimo se traduce a trigramas en común antes de calcular nada por candidato
+        candidatos = np.flatnonzero(compartidos >= max(1, math.ceil(minimo * len(grams) - 1e-9)))
+        comunes = compartidos[candidatos]
+        puntajes = comunes / len(grams)
+        similitudes = comunes / (len(grams) + self._cantidad_trigramas[candidatos] - comunes)
+
+        # Orden por trigramas en común y, a igualdad, por similitud (que nunca llega a sumar uno más)
+        clave = comunes + similitudes
+        if len(candidatos) > limite:
+            # Solo hace falta ordenar los mejores: cada nombre aporta al menos un jugador. Se
+            # incluyen los empatados con el último para que el orden no dependa de argpartition
+            umbral = np.partition(clave, len(clave) - limite)[len(clave) - limite]
+            mejores = np.flatnonzero(clave >= umbral)
+            candidatos, puntajes, similitudes, clave = candidatos[mejores], puntajes[mejores], similitudes[mejores], clave[mejores]
+        orden = np.lexsort((candidatos, -clave))
+
+        resultado = []
+        for i in orden:
+            nombre = candidatos[i]
+            for jugador in self._orden[self._limites[nombre]:self._limites[nombre + 1]]:
+                resultado.append((int(jugador), float(puntajes[i]), float(similitudes[i])))
+                if len(resultado) == limite:
+                    return resultado
+        return resultado
+
+    def resultados_json(self, consulta: str, limite: int = 10, minimo: float = 0.0) -> FragmentoJSON:
+        """Lista JSON de ``{"id", "score", "similarity", "jugador"}`` con el registro de ``group_by=player``"""
+        fragmentos = self._agrupacion.fragmentos
+        return lista_json([
+            componer_json({
+                "id": self._ids[jugador], "score": round(puntaje, 4), "similarity": round(similitud, 4),
+                "jugador": FragmentoJSON(fragmentos[jugador])
+            })
+            for jugador, puntaje, similitud in self.buscar(consulta, limite, minimo)
+        ])
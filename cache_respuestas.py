@@ -0,0 +1,121 @@
+"""
+Caché LRU de respuestas ya codificadas (y comprimidas) y soporte de ETag / 304.
+
+La clave de cada entrada incluye la versión del dataset, así que una versión
+nueva del CSV invalida automáticamente todas las respuestas anteriores. Las
+de la versión anterior no se vacían al ver una nueva: durante un refresco, o
+con varios workers siguiendo al cargador, llegan peticiones de las dos
+versiones intercaladas, y vaciar la caché en cada cambio la dejaría sin
+aciertos justo cuando hay más carga. Las que ya no se piden salen por LRU.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple, Union
+import hashlib
+import logging
+import threading
+
+from compresion import comprimir
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RespuestaCacheada:
+    """Cuerpo JSON codificado, su ETag, headers propios de la respuesta y sus versiones comprimidas"""
+    cuerpo: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    comprimidos: Dict[str, bytes] = field(default_factory=dict)
+
+    def codificado(self, codificacion: str) -> bytes:
+        """El cuerpo comprimido con ``codificacion``; se comprime una sola vez por entrada"""
+        cuerpo = self.comprimidos.get(codificacion)
+        if cuerpo is None:
+            cuerpo = self.comprimidos[codificacion] = comprimir(self.cuerpo, codificacion)
+        return cuerpo
+
+
+def calcular_etag(version: str, ruta: str, clave: str) -> str:
+    """ETag fuerte derivado de la versión del dataset y de la consulta normalizada"""
+    resumen = hashlib.sha1(f"{ruta}?{clave}".encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{resumen}"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Evalúa If-None-Match (comparación débil, como indica RFC 9110 para este header)"""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+class CacheRespuestas:
+    """
+    Caché LRU acotada de respuestas por (versión, ruta, consulta).
+
+    Args:
+        max_entradas: Número máximo de respuestas guardadas (0 la desactiva)
+    """
+
+    def __init__(self, max_entradas: int = 512):
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas: "OrderedDict[Tuple[str, str, str], RespuestaCacheada]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _buscar(self, llave: Tuple[str, str, str], contar: bool = True) -> Optional[RespuestaCacheada]:
+        entrada = self._entradas.get(llave)
+        if entrada is not None:
+            self._entradas.move_to_end(llave)
+            if contar:
+                self.aciertos += 1
+        return entrada
+
+    def buscar(self, version: str, ruta: str, clave: str) -> Optional[RespuestaCacheada]:
+        """La respuesta guardada, o None sin calcularla (el fallo lo cuenta ``obtener`` al calcularla)"""
+        with self._lock:
+            return self._buscar((version, ruta, clave))
+
+    def obtener(self, version: str, ruta: str, clave: str, calcular: Callable[[], Union[bytes, Tuple[bytes, Dict[str, str]]]],
+                contar_acierto: bool = True) -> RespuestaCacheada:
+        """
+        Devuelve la respuesta guardada o la calcula con ``calcular`` y la guarda.
+
+        ``calcular`` devuelve el cuerpo, o una tupla (cuerpo, headers). Las
+        excepciones de ``calcular`` se propagan y no se guarda nada. Con
+        ``contar_acierto=False`` encontrarla no suma un acierto, para cuando la
+        misma petición ya lo contó en ``buscar``.
+        """
+        llave = (version, ruta, clave)
+        with self._lock:
+            entrada = self._buscar(llave, contar_acierto)
+            if entrada is not None:
+                return entrada
+            self.fallos += 1
+
+        calculado = calcular()
+        cuerpo, headers = calculado if isinstance(calculado, tuple) else (calculado, {})
+        entrada = RespuestaCacheada(cuerpo, calcular_etag(version, ruta, clave), headers)
+        if self.max_entradas <= 0:
+            return entrada
+        with self._lock:
+            self._entradas[llave] = entrada
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return entrada
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {"entradas": len(self._entradas), "aciertos": self.aciertos, "fallos": self.fallos}
@@ -0,0 +1,164 @@
+"""
+Diferencias fila a fila entre dos versiones del dataset.
+
+Cada fila se identifica por una clave estable (nombres, fecha de nacimiento,
+temporada y equipo, más el número de aparición si la clave se repite) y se
+compara por el contenido que devuelve ``/datos``. La diferencia indica qué
+filas se agregaron, eliminaron o modificaron, y qué filas de la versión nueva
+son idénticas a una de la anterior: esas reutilizan su JSON, los registros de
+sus grupos y los conteos de facetas en lugar de recalcularlos.
+
+Los cambios publicados (``Cambios``) guardan los registros ya codificados para
+servirlos en ``/datos/changes``.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+import time
+
+import numpy as np
+import pandas as pd
+
+from serializacion import CAMPOS_FILA, FragmentoJSON, componer_json, lista_json
+
+CLAVE_FILA = ["First name", "Last name", "Adjusted first name", "Adjusted last name", "Birthdate", "Season", "Team"]
+
+# Si cambia más que esta proporción de filas, la versión se trata como una recarga completa
+MAX_PROPORCION_CAMBIOS = 0.5
+
+
+def huellas(columnas: dict) -> tuple:
+    """
+    Hash de la clave y del contenido de cada fila.
+
+    Args:
+        columnas: Columnas ya limpias de ``SerializadorFilas`` (los valores tal como se devuelven)
+
+    Returns:
+        Tupla (hash de la clave con su número de aparición, hash del contenido), ambos uint64
+    """
+    clave = pd.util.hash_pandas_object(pd.DataFrame({c: columnas[c] for c in CLAVE_FILA}), index=False).to_numpy()
+    aparicion = pd.Series(clave).groupby(clave).cumcount().to_numpy()
+    clave = pd.util.hash_pandas_object(pd.DataFrame({"clave": clave, "aparicion": aparicion}), index=False).to_numpy()
+    contenido = pd.util.hash_pandas_object(pd.DataFrame({c: columnas[c] for c in CAMPOS_FILA}), index=False).to_numpy()
+    return clave, contenido
+
+
+@dataclass
+class Diferencia:
+    """
+    Diferencia entre dos versiones en términos de row ids.
+
+    ``mapa_filas[i]`` es la fila de la versión anterior idéntica a la fila
+    ``i`` de la nueva, o -1 si la fila es nueva o cambió.
+    """
+    agregadas: np.ndarray
+    eliminadas: np.ndarray
+    modificadas: np.ndarray
+    modificadas_antes: np.ndarray
+    mapa_filas: np.ndarray
+
+    @property
+    def total(self) -> int:
+        return len(self.agregadas) + len(self.eliminadas) + len(self.modificadas)
+
+    def es_incremental(self, filas_anteriores: int) -> bool:
+        """True si el cambio es lo bastante chico como para parchear las estructuras derivadas"""
+        return self.total <= MAX_PROPORCION_CAMBIOS * max(filas_anteriores, len(self.mapa_filas), 1)
+
+
+def calcular_diferencia(anteriores: dict, nuevas: dict) -> Diferencia:
+    """
+    Compara las filas de dos versiones.
+
+    Args:
+        anteriores: Columnas limpias de la versión anterior
+        nuevas: Columnas limpias de la versión nueva
+    """
+    clave_ant, contenido_ant = huellas(anteriores)
+    clave_nue, contenido_nue = huellas(nuevas)
+    if len(clave_ant) == 0:
+        vacio = np.empty(0, dtype=np.int64)
+        return Diferencia(np.arange(len(clave_nue)), vacio, vacio, vacio, np.full(len(clave_nue), -1))
+
+    orden = np.argsort(clave_ant, kind="stable")
+    ordenadas = clave_ant[orden]
+    posiciones = np.minimum(np.searchsorted(ordenadas, clave_nue), len(ordenadas) - 1)
+    encontradas = ordenadas[posiciones] == clave_nue
+    fila_anterior = np.where(encontradas, orden[posiciones], -1)
+    iguales = encontradas & (contenido_ant[orden[posiciones]] == contenido_nue)
+
+    presentes = np.zeros(len(clave_ant), dtype=bool)
+    presentes[fila_anterior[encontradas]] = True
+    modificadas = np.flatnonzero(encontradas & ~iguales)
+    return Diferencia(
+        agregadas=np.flatnonzero(~encontradas),
+        eliminadas=np.flatnonzero(~presentes),
+        modificadas=modificadas,
+        modificadas_antes=fila_anterior[modificadas],
+        mapa_filas=np.where(iguales, fila_anterior, -1),
+    )
+
+
+@dataclass
+class Cambios:
+    """Cambios publicados entre dos versiones consecutivas, con los registros ya codificados"""
+    desde: str
+    hasta: str
+    agregadas: FragmentoJSON
+    eliminadas: FragmentoJSON
+    modificadas: FragmentoJSON
+    totales: dict
+    publicado_en: float = field(default_factory=time.time)
+
+    @classmethod
+    def registrar(cls, anterior, nuevo, diferencia: Diferencia) -> "Cambios":
+        """Codifica las filas de la diferencia (las eliminadas con sus valores anteriores)"""
+        viejos, nuevos = anterior.serializador.fragmentos, nuevo.serializador.fragmentos
+        return cls(
+            desde=anterior.version,
+            hasta=nuevo.version,
+            agregadas=lista_json(nuevos[diferencia.agregadas].tolist()),
+            eliminadas=lista_json(viejos[diferencia.eliminadas].tolist()),
+            modificadas=lista_json(nuevos[diferencia.modificadas].tolist()),
+            totales={
+                "agregadas": len(diferencia.agregadas),
+                "eliminadas": len(diferencia.eliminadas),
+                "modificadas": len(diferencia.modificadas),
+            },
+        )
+
+    def json(self) -> bytes:
+        """Objeto JSON de estos cambios"""
+        return componer_json({
+            "desde": self.desde,
+            "hasta": self.hasta,
+            "publicado_en": self.publicado_en,
+            "totales": self.totales,
+            "agregadas": self.agregadas,
+            "eliminadas": self.eliminadas,
+            "modificadas": self.modificadas,
+        })
+
+
+def encadenar(historial: List[Cambios], desde: str, hasta: str) -> Optional[List[Cambios]]:
+    """
+    Cambios consecutivos que llevan de la versión ``desde`` a ``hasta``.
+
+    Returns:
+        La lista (vacía si ``desde == hasta``), o None si el historial no
+        alcanza para reconstruir el camino
+    """
+    if desde == hasta:
+        return []
+    for inicio, cambios in enumerate(historial):
+        if cambios.desde != desde:
+            continue
+        cadena = [cambios]
+        for siguiente in historial[inicio + 1:]:
+            if cadena[-1].hasta == hasta:
+                break
+            if siguiente.desde != cadena[-1].hasta:
+                return None
+            cadena.append(siguiente)
+        return cadena if cadena[-1].hasta == hasta else None
+    return None
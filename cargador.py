@@ -0,0 +1,67 @@
+"""
+Proceso cargador del dataset para servir con varios workers.
+
+Con ``gunicorn -c gunicorn.conf.py main:app`` el master lanza este proceso
+antes que los workers. Es el único que consulta la fuente: descarga y compacta
+el CSV, guarda cada versión como snapshot en ``SNAPSHOT_DIR`` y anota su
+generación en el estado compartido. Los workers (``DATASET_MODO=lector``)
+abren esos snapshots con las columnas mapeadas en memoria, así que la tabla
+está una sola vez en la memoria de la máquina, y cambian de versión cuando
+aumenta la generación.
+
+El cargador no construye índices ni agrupaciones y no atiende peticiones.
+Cada ``INTERVALO_LATIDO`` segundos deja un latido en la carpeta compartida:
+los workers dejan de declararse listos si deja de latir, y el master de
+gunicorn lo relanza si termina.
+Se puede ejecutar solo (``DATASET_MODO=cargador python cargador.py``) junto a
+workers lanzados de otra forma, siempre que compartan ``SNAPSHOT_DIR``.
+"""
+import asyncio
+import logging
+import os
+import signal
+
+logger = logging.getLogger("cargador")
+
+# Segundos entre latidos del cargador (ver LectorDataset.estado_cargador)
+INTERVALO_LATIDO = 5.0
+
+
+async def latir(coordinador, parar: asyncio.Event):
+    """Late cada ``INTERVALO_LATIDO`` segundos hasta que se pida parar"""
+    while not parar.is_set():
+        try:
+            coordinador.latir()
+        except OSError as e:
+            logger.warning(f"No se pudo anotar el latido del cargador: {str(e)}")
+        try:
+            await asyncio.wait_for(parar.wait(), INTERVALO_LATIDO)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def ejecutar(gestor):
+    """Carga el dataset y lo mantiene refrescado hasta recibir SIGTERM o SIGINT"""
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(senal, parar.set)
+    # Late desde antes de la primera descarga, que puede tardar
+    latido = asyncio.create_task(latir(gestor.coordinador, parar)) if gestor.coordinador is not None else None
+    await gestor.iniciar()
+    logger.info(f"Cargador del dataset activo (pid {os.getpid()}), refresco cada {gestor.ttl:.0f}s")
+    await parar.wait()
+    if latido is not None:
+        await latido
+    await gestor.detener()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    # Solo la configuración del dataset: importar main construiría la app de FastAPI entera
+    from configuracion import crear_gestor_dataset
+    asyncio.run(ejecutar(crear_gestor_dataset("cargador")))
+
+
+if __name__ == "__main__":
+    main()
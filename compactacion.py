@@ -0,0 +1,107 @@
+"""
+Representación compacta en memoria de la tabla de jugadores.
+
+``pd.read_csv`` deja las columnas de texto como objetos ``str`` de Python
+(uno por celda) y los números en 64 bits. Después de parsear, cada versión
+del dataset se compacta:
+
+- Las columnas de texto con pocos valores distintos (equipos, posiciones,
+  nacionalidades, nombres, fechas) pasan a categóricas: códigos enteros más
+  un diccionario de valores, sobre el que trabajan los índices de filtrado.
+- Los enteros se reducen al tipo más pequeño que los contiene y los decimales
+  pasan a ``float32`` solo si la conversión es exacta, así que los valores
+  (y la salida JSON) no cambian. Los nulos quedan como NaN en las columnas
+  decimales y como código -1 en las categóricas, que es como los reconocen
+  los índices, las facetas y las estadísticas.
+
+La fecha de nacimiento además se interpreta como fecha real
+(``columna_fecha``) para los filtros por rango.
+"""
+from typing import Any, Dict
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Proporción máxima de valores distintos para convertir una columna de texto en categórica
+MAX_PROPORCION_DISTINTOS = 0.5
+
+FORMATO_FECHA = "%Y-%m-%d"
+
+
+def _solo_texto(serie: pd.Series) -> bool:
+    """True si todos los valores no nulos son ``str`` (los únicos para los que ``.str`` da igual resultado)"""
+    return all(isinstance(valor, str) for valor in serie.dropna().unique())
+
+
+def _float32_exacto(valores: np.ndarray) -> bool:
+    """True si todos los valores (incluidos NaN e infinitos) sobreviven la ida y vuelta a float32"""
+    with np.errstate(over="ignore"):
+        reducidos = valores.astype(np.float32)
+    return np.array_equal(reducidos.astype(np.float64), valores, equal_nan=True)
+
+
+def compactar_columna(serie: pd.Series) -> pd.Series:
+    """La columna en su representación compacta, o la misma si no se puede reducir sin pérdida"""
+    if serie.dtype == object:
+        if len(serie) and serie.nunique(dropna=True) <= MAX_PROPORCION_DISTINTOS * len(serie) and _solo_texto(serie):
+            return serie.astype("category")
+        return serie
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return pd.to_numeric(serie, downcast="integer")
+    if serie.dtype == np.float64 and _float32_exacto(serie.to_numpy()):
+        return serie.astype(np.float32)
+    return serie
+
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """Copia del DataFrame con cada columna en su representación compacta"""
+    return pd.DataFrame({col: compactar_columna(df[col]) for col in df.columns}, columns=df.columns)
+
+
+def columna_fecha(serie: pd.Series) -> np.ndarray:
+    """
+    Fechas ``YYYY-MM-DD`` como ``datetime64[D]`` (NaT si el valor es nulo o no es una fecha válida).
+
+    En una columna categórica solo se interpretan los valores distintos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = pd.to_datetime(pd.Series(serie.cat.categories, dtype=object), format=FORMATO_FECHA, errors="coerce")
+        diccionario = np.append(categorias.to_numpy(dtype="datetime64[D]"), np.datetime64("NaT", "D"))
+        # El código -1 (nulo) toma el último elemento
+        return diccionario[serie.cat.codes.to_numpy()]
+    fechas = pd.to_datetime(serie, format=FORMATO_FECHA, errors="coerce")
+    return fechas.to_numpy(dtype="datetime64[D]")
+
+
+def reporte_memoria(antes: pd.DataFrame, despues: pd.DataFrame) -> Dict[str, Any]:
+    """Memoria (en bytes) de cada columna antes y después de compactar"""
+    bytes_antes = antes.memory_usage(index=False, deep=True)
+    return reporte_columnas(
+        {col: str(antes[col].dtype) for col in antes.columns},
+        {col: int(bytes_antes[col]) for col in antes.columns},
+        despues,
+    )
+
+
+def reporte_columnas(tipos_antes: Dict[str, str], bytes_antes: Dict[str, int], despues: pd.DataFrame) -> Dict[str, Any]:
+    """Como ``reporte_memoria``, con el tipo y los bytes de cada columna antes de compactar ya medidos"""
+    bytes_despues = despues.memory_usage(index=False, deep=True)
+    total_antes, total_despues = sum(bytes_antes.values()), int(bytes_despues.sum())
+    return {
+        "filas": len(despues),
+        "bytes_antes": total_antes,
+        "bytes_despues": total_despues,
+        "ahorro_pct": round(100 * (1 - total_despues / total_antes), 1) if total_antes else 0.0,
+        "columnas": {
+            col: {
+                "tipo_antes": tipos_antes[col],
+                "tipo_despues": str(despues[col].dtype),
+                "bytes_antes": bytes_antes[col],
+                "bytes_despues": int(bytes_despues[col]),
+            }
+            for col in despues.columns
+        },
+    }
@@ -0,0 +1,139 @@
+"""
+Compresión de las respuestas según ``Accept-Encoding``.
+
+``gzip`` está siempre disponible; ``br`` y ``zstd`` solo si están instalados
+``brotli`` y ``zstandard`` (opcionales, ver README). Las respuestas de la
+caché guardan cada codificación la primera vez que se pide
+(``RespuestaCacheada.codificado``), así que los aciertos siguientes no
+vuelven a serializar ni a comprimir. Las exportaciones se comprimen en
+bloques a medida que se generan.
+"""
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import gzip
+import logging
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Niveles elegidos por su relación compresión / CPU en respuestas JSON de algunos cientos de KB
+NIVEL_GZIP = 6
+CALIDAD_BROTLI = 5
+NIVEL_ZSTD = 3
+
+
+def _gzip(cuerpo: bytes) -> bytes:
+    # mtime=0: la misma respuesta siempre produce los mismos bytes
+    return gzip.compress(cuerpo, compresslevel=NIVEL_GZIP, mtime=0)
+
+
+def _brotli(cuerpo: bytes) -> bytes:
+    return brotli.compress(cuerpo, quality=CALIDAD_BROTLI)
+
+
+def _zstd(cuerpo: bytes) -> bytes:
+    # Un compresor por llamada: ZstdCompressor no se puede compartir entre hilos
+    return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(cuerpo)
+
+
+def _flujo_gzip() -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    # wbits=31: formato gzip (encabezado con mtime 0), como gzip.compress
+    compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+    return compresor.compress, compresor.flush
+
+
+def _flujo_brotli() -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+    return compresor.process, compresor.finish
+
+
+def _flujo_zstd() -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD).compressobj()
+    return compresor.compress, compresor.flush
+
+
+# Paquete opcional de cada codificación
+_PAQUETES = {"br": "brotli", "zstd": "zstandard"}
+
+# Compresores instalados, en orden de preferencia del servidor: de un cuerpo entero y en bloques
+COMPRESORES: Dict[str, Callable[[bytes], bytes]] = {}
+_FLUJOS: Dict[str, Callable[[], Tuple[Callable[[bytes], bytes], Callable[[], bytes]]]] = {}
+if brotli is not None:
+    COMPRESORES["br"], _FLUJOS["br"] = _brotli, _flujo_brotli
+if zstandard is not None:
+    COMPRESORES["zstd"], _FLUJOS["zstd"] = _zstd, _flujo_zstd
+COMPRESORES["gzip"], _FLUJOS["gzip"] = _gzip, _flujo_gzip
+
+
+def codificaciones_habilitadas(configuracion: str) -> Tuple[str, ...]:
+    """
+    Codificaciones de la configuración (separadas por coma) que están instaladas, en el orden de preferencia del servidor.
+
+    Las que no están instaladas o no existen se informan en el log y se ignoran.
+    """
+    pedidas = [nombre.strip().lower() for nombre in configuracion.split(",") if nombre.strip()]
+    for nombre in pedidas:
+        if nombre in _PAQUETES and nombre not in COMPRESORES:
+            logger.info(f"Compresión '{nombre}' no disponible: falta el paquete {_PAQUETES[nombre]}")
+        elif nombre not in _PAQUETES and nombre != "gzip":
+            logger.warning(f"Codificación desconocida en COMPRESION: '{nombre}'")
+    return tuple(nombre for nombre in COMPRESORES if nombre in pedidas)
+
+
+def elegir_codificacion(accept_encoding: Optional[str], disponibles: Sequence[str]) -> Optional[str]:
+    """
+    Codificación para la respuesta según ``Accept-Encoding`` (RFC 9110, sección 12.5.3).
+
+    Gana la de mayor ``q``; a igualdad, la primera de ``disponibles``. Devuelve
+    None (sin comprimir) si el cliente no acepta ninguna.
+    """
+    if not accept_encoding or not disponibles:
+        return None
+    calidades: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.partition(";")
+        nombre = nombre.strip().lower()
+        calidad = 1.0
+        parametros = parametros.strip().lower()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            calidades[nombre] = calidad
+    elegida, mejor = None, 0.0
+    for codificacion in disponibles:
+        calidad = calidades.get(codificacion, calidades.get("*", 0.0))
+        if calidad > mejor:
+            elegida, mejor = codificacion, calidad
+    return elegida
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    """
+    Comprime el cuerpo con una de las codificaciones de ``COMPRESORES``.
+
+    Raises:
+        KeyError: Si la codificación no está disponible
+    """
+    return COMPRESORES[codificacion](cuerpo)
+
+
+def comprimir_en_bloques(bloques: Iterable[bytes], codificacion: str) -> Iterator[bytes]:
+    """Comprime un cuerpo que se genera en bloques (las exportaciones) sin juntarlo en memoria"""
+    agregar, terminar = _FLUJOS[codificacion]()
+    for bloque in bloques:
+        comprimido = agregar(bloque)
+        if comprimido:
+            yield comprimido
+    yield terminar()
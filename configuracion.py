@@ -0,0 +1,76 @@
+"""
+Configuración del dataset compartida por la API y el proceso cargador.
+
+Lee de las variables de entorno de dónde sale el CSV, cada cuánto se refresca,
+dónde se guardan los snapshots y el modo del proceso, y arma el gestor del
+dataset que corresponde. No crea la aplicación ni nada más al importarse, así
+que ``cargador.py`` la usa sin construir la app de FastAPI.
+"""
+import os
+import tempfile
+
+from coordinacion import CoordinadorRefresco
+from dataset import GestorDataset, LectorDataset
+from fuentes import crear_fuente
+from snapshot import AlmacenSnapshots
+
+# URL del archivo CSV en Google Drive (también acepta file:// o una ruta local; varias separadas por coma se combinan)
+CSV_URL = os.getenv("CSV_URL", "https://docs.google.com/spreadsheets/d/e/2PACX-1vSf4n2VLM5ie-XRD3_ZzwoOfukCTZLoF_KgJRsCKDHVZ-OJ9ugG1hL5gc32Y24gUgngxkzX-FuYpBF7/pub?gid=20714965&single=true&output=csv")
+
+# Pestañas (gid) de la planilla separadas por coma, unidas en una sola tabla (vacío: la de CSV_URL)
+CSV_GIDS = os.getenv("CSV_GIDS", "")
+
+# Segundos que una versión del CSV se considera fresca antes de refrescarla en segundo plano
+DATASET_TTL_SEGUNDOS = float(os.getenv("DATASET_TTL_SEGUNDOS", "300"))
+
+# Servir la copia vencida mientras se refresca en lugar de esperar a la descarga
+DATASET_STALE_WHILE_REVALIDATE = os.getenv("DATASET_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+
+# Guardar la tabla en representación compacta (categóricas y tipos numéricos reducidos)
+DATASET_COMPACTO = os.getenv("DATASET_COMPACTO", "true").lower() == "true"
+
+# Carpeta de snapshots columnares para arrancar sin esperar al CSV (vacío los desactiva)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "arg-lnb-snapshots"))
+
+# Versiones del dataset que se conservan en disco
+SNAPSHOT_CONSERVAR = int(os.getenv("SNAPSHOT_CONSERVAR", "2"))
+
+# Cómo obtiene el dataset este proceso: "autonomo" (consulta la fuente, coordinado con los demás workers
+# por SNAPSHOT_DIR), "lector" (sigue las versiones que publica el cargador) o "cargador" (ver gunicorn.conf.py)
+DATASET_MODO = os.getenv("DATASET_MODO", "autonomo")
+
+# Segundos entre lecturas del estado que publica el cargador, en los workers lectores
+DATASET_SONDEO_SEGUNDOS = float(os.getenv("DATASET_SONDEO_SEGUNDOS", "1"))
+
+# Segundos sin latido del cargador a partir de los cuales un worker lector deja de declararse listo (0 no lo controla)
+CARGADOR_LATIDO_MAX_SEGUNDOS = float(os.getenv("CARGADOR_LATIDO_MAX_SEGUNDOS", "60"))
+
+
+def crear_gestor_dataset(modo: str = DATASET_MODO) -> GestorDataset:
+    """Gestor del dataset según el modo del proceso (por defecto, DATASET_MODO)"""
+    if modo not in ("autonomo", "lector", "cargador"):
+        raise ValueError(f"DATASET_MODO inválido: '{modo}'. Valores válidos: autonomo, lector, cargador")
+    if modo != "autonomo" and not SNAPSHOT_DIR:
+        raise ValueError(f"DATASET_MODO={modo} necesita SNAPSHOT_DIR: ahí publica el cargador las versiones")
+    snapshots = AlmacenSnapshots(SNAPSHOT_DIR, SNAPSHOT_CONSERVAR) if SNAPSHOT_DIR else None
+    # Los procesos de la máquina comparten el candado del refresco y el estado en la carpeta de snapshots
+    coordinador = CoordinadorRefresco(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+    if modo == "lector":
+        return LectorDataset(
+            snapshots,
+            coordinador,
+            sondeo=DATASET_SONDEO_SEGUNDOS,
+            latido_max=CARGADOR_LATIDO_MAX_SEGUNDOS,
+            ttl=DATASET_TTL_SEGUNDOS,
+            stale_while_revalidate=DATASET_STALE_WHILE_REVALIDATE,
+        )
+    return GestorDataset(
+        crear_fuente(CSV_URL, CSV_GIDS),
+        ttl=DATASET_TTL_SEGUNDOS,
+        stale_while_revalidate=DATASET_STALE_WHILE_REVALIDATE,
+        snapshots=snapshots,
+        compacto=DATASET_COMPACTO,
+        coordinador=coordinador,
+        # El cargador no atiende peticiones: solo parsea y publica
+        estructuras=modo != "cargador"
+    )
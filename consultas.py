@@ -0,0 +1,372 @@
+"""
+Ejecución de las consultas de ``/datos`` sobre una versión del dataset.
+
+``Consulta`` es el conjunto normalizado de parámetros de ``obtener_datos``
+(con los valores por defecto ya aplicados y tipados), de modo que dos URLs
+equivalentes producen la misma consulta y la misma clave de caché.
+
+Además de ``page``, las consultas se pueden paginar con un cursor opaco que
+codifica la versión del dataset, la consulta y la clave de la última fila (o
+grupo) devuelta: la página siguiente se reanuda por bisección desde esa
+posición sobre el resultado de filtrado ya recordado, sin recalcularlo.
+
+``contar_facetas`` resuelve ``/datos/facets``: los conteos por valor de las
+columnas filtrables bajo los mismos filtros, a partir de esos row ids, y
+``resumir_estadisticas`` hace lo mismo con los estadísticos de ``/stats``.
+``explicar_consulta`` devuelve el plan de filtrado (``explain=true``).
+"""
+from dataclasses import asdict, dataclass, field, replace
+from datetime import date
+from typing import Any, Dict, Optional, Sequence
+import base64
+import hashlib
+import json
+import logging
+import time
+
+import numpy as np
+
+from agrupaciones import MODOS_AGRUPACION
+from estadisticas import PERCENTILES_POR_DEFECTO
+from facetas import COLUMNAS_FILTRABLES
+from ejecucion import comprobar_plazo
+from metricas import medir
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Consulta:
+    """Parámetros de una consulta a ``/datos``"""
+    page: int = 1
+    limit: int = 50
+    team: Optional[str] = None
+    season: Optional[int] = None
+    position: Optional[str] = None
+    nationality: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    birthdate: Optional[str] = None
+    height: Optional[float] = None
+    weight: Optional[float] = None
+    # Rangos (extremos inclusivos) y edad en años cumplidos
+    season_from: Optional[int] = None
+    season_to: Optional[int] = None
+    height_min: Optional[float] = None
+    height_max: Optional[float] = None
+    weight_min: Optional[float] = None
+    weight_max: Optional[float] = None
+    birthdate_from: Optional[str] = None
+    birthdate_to: Optional[str] = None
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    group_by: Optional[str] = None
+    include_stats: bool = False
+    # Paginación por cursor: clave de la última fila o grupo ya entregado (-1 = desde el principio)
+    despues_de: Optional[int] = None
+
+    def filtros(self) -> Dict[str, Any]:
+        """Los nueve filtros de columna, en el orden original de obtener_datos"""
+        return {
+            "team": self.team,
+            "season": self.season,
+            "position": self.position,
+            "nationality": self.nationality,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "birthdate": self.birthdate,
+            "height": self.height,
+            "weight": self.weight
+        }
+
+    def rangos(self) -> Dict[str, Any]:
+        """Los filtros de rango indicados, tal como se pidieron (incluida la edad)"""
+        return {nombre: getattr(self, nombre) for nombre in CAMPOS_RANGO if getattr(self, nombre) is not None}
+
+    def filtros_indice(self, hoy: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Filtros para ``IndiceFiltros.filtrar``: los nueve de columna más los rangos,
+        con la edad traducida a un rango de fechas de nacimiento.
+
+        Args:
+            hoy: Fecha de referencia para la edad (por defecto, la de hoy)
+        """
+        filtros = {**self.filtros(), **{k: v for k, v in self.rangos().items() if not k.startswith("age_")}}
+        if self.age_min is None and self.age_max is None:
+            return filtros
+        hoy = hoy or date.today()
+        desde, hasta = filtros.get("birthdate_from"), filtros.get("birthdate_to")
+        if self.age_min is not None:
+            # Tiene al menos age_min años si nació a más tardar hoy hace age_min años
+            limite = _restar_anios(hoy, self.age_min).isoformat()
+            hasta = min(hasta, limite) if hasta else limite
+        if self.age_max is not None:
+            # Tiene como mucho age_max años si nació después de hoy hace age_max + 1 años
+            limite = date.fromordinal(_restar_anios(hoy, self.age_max + 1).toordinal() + 1).isoformat()
+            desde = max(desde, limite) if desde else limite
+        filtros["birthdate_from"], filtros["birthdate_to"] = desde, hasta
+        return filtros
+
+    def filtros_aplicados(self) -> Dict[str, Any]:
+        """``filters_applied`` de las estadísticas: los nueve filtros y, si hay, los rangos"""
+        return {**self.filtros(), **self.rangos()}
+
+    def clave(self) -> str:
+        """Representación canónica, estable entre procesos (para ETags y cachés)"""
+        clave = repr(sorted(asdict(self).items()))
+        if self.age_min is not None or self.age_max is not None:
+            # La edad depende del día: la respuesta no se reutiliza de un día para otro
+            clave += f"@{date.today().isoformat()}"
+        return clave
+
+    def huella(self) -> str:
+        """Resumen de lo que define el conjunto de resultados (filtros y agrupación), sin la paginación"""
+        base = replace(self, page=1, limit=50, include_stats=False, despues_de=None)
+        return hashlib.sha1(base.clave().encode("utf-8")).hexdigest()[:12]
+
+
+CAMPOS_RANGO = (
+    "season_from", "season_to", "height_min", "height_max", "weight_min", "weight_max",
+    "birthdate_from", "birthdate_to", "age_min", "age_max",
+)
+
+
+def _restar_anios(dia: date, anios: int) -> date:
+    """La misma fecha ``anios`` años antes (el 29 de febrero pasa al 28 si hace falta)"""
+    try:
+        return dia.replace(year=dia.year - anios)
+    except ValueError:
+        return dia.replace(year=dia.year - anios, day=28)
+
+
+class CursorInvalido(ValueError):
+    """El cursor no se puede decodificar o no corresponde a la consulta"""
+
+
+class CursorVencido(ValueError):
+    """El cursor pertenece a una versión del dataset que ya no está vigente"""
+
+
+def codificar_cursor(version: str, consulta: Consulta, clave: int) -> str:
+    """Cursor opaco: versión del dataset + consulta + clave de la última posición entregada"""
+    contenido = json.dumps({"v": version, "q": consulta.huella(), "k": clave}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, version: str, consulta: Consulta) -> int:
+    """
+    Clave desde la que continúa la paginación (``-1`` si el cursor está vacío).
+
+    Raises:
+        CursorInvalido: Si el cursor está mal formado o es de otra consulta
+        CursorVencido: Si el cursor es de una versión anterior del dataset
+    """
+    if not cursor:
+        return -1
+    try:
+        contenido = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        clave = int(contenido["k"])
+        version_cursor, huella = contenido["v"], contenido["q"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorInvalido(f"Cursor mal formado: {str(e)}")
+    if huella != consulta.huella():
+        raise CursorInvalido("El cursor corresponde a otros filtros o a otra agrupación")
+    if version_cursor != version:
+        raise CursorVencido("El cursor corresponde a una versión anterior del dataset; vuelve a empezar la paginación")
+    return clave
+
+
+@dataclass
+class ResultadoConsulta:
+    """Contenido de la respuesta de /datos y clave para el cursor de la página siguiente"""
+    contenido: Any
+    siguiente: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def ejecutar_consulta(dataset, consulta: Consulta, json_rapido: bool = True) -> ResultadoConsulta:
+    """
+    Calcula la respuesta de ``/datos`` para una consulta.
+
+    Args:
+        dataset: Versión del dataset sobre la que se ejecuta
+        consulta: Parámetros de la consulta
+        json_rapido: Si es True, los registros se devuelven como fragmentos JSON precodificados
+
+    Returns:
+        Resultado cuyo contenido está listo para ``JSONRapido``: la lista de
+        registros, o un diccionario con ``data`` y ``stats`` si se pidieron
+        estadísticas
+    """
+    page, limit, group_by = consulta.page, consulta.limit, consulta.group_by
+    despues_de = consulta.despues_de
+    df = dataset.df
+
+    # Aplicar filtros si se proporcionan, intersecando los índices de esta versión
+    filtros = consulta.filtros_aplicados()
+    with medir("filtrado"):
+        filas = dataset.indices.filtrar(consulta.filtros_indice())
+    comprobar_plazo()
+    if filas is not None:
+        df = df.iloc[filas]
+        aplicados = {k: v for k, v in filtros.items() if v is not None}
+        logger.info(f"Filtrado por {aplicados}: {len(df)} registros")
+
+    start_idx = (page - 1) * limit
+    end_idx = start_idx + limit
+
+    # Manejar agrupación si se solicita
+    if group_by and group_by in MODOS_AGRUPACION:
+        # Las agrupaciones están materializadas por versión: sin filtros la página
+        # es un slice de la lista precalculada y con filtros se restringen los grupos
+        with medir("agrupacion"):
+            if json_rapido:
+                total_records, datos, siguiente = dataset.agrupaciones.pagina_json(group_by, filas, start_idx, end_idx, despues_de)
+            else:
+                total_records, datos, siguiente = dataset.agrupaciones.pagina(group_by, filas, start_idx, end_idx, despues_de)
+    else:
+        # Sin agrupación: las posiciones de la página salen de los row ids filtrados
+        total_records = len(df)
+        if despues_de is not None:
+            # La clave del cursor es el row id de la última fila entregada
+            start_idx = despues_de + 1 if filas is None else int(np.searchsorted(filas, despues_de, side="right"))
+            end_idx = start_idx + limit
+        if filas is None:
+            filas_pagina = np.arange(start_idx, min(end_idx, total_records))
+        else:
+            filas_pagina = filas[start_idx:end_idx]
+        siguiente = int(filas_pagina[-1]) if len(filas_pagina) and end_idx < total_records else None
+
+        with medir("registros"):
+            if group_by:
+                # Agrupación no válida, continuar con datos normales
+                logger.warning(f"Agrupación '{group_by}' no válida, devolviendo datos sin agrupar")
+                datos = dataset.df.iloc[filas_pagina].to_dict(orient="records")
+            elif json_rapido:
+                # Armar los registros de la página desde las columnas ya limpias de esta versión
+                datos = dataset.serializador.registros_json(filas_pagina)
+            else:
+                datos = dataset.serializador.registros(filas_pagina)
+
+    comprobar_plazo()
+    total_pages = (total_records + limit - 1) // limit
+    resultado = ResultadoConsulta(datos, siguiente)
+    if despues_de is not None:
+        resultado.extra["next_cursor"] = codificar_cursor(dataset.version, consulta, siguiente) if siguiente is not None else None
+
+    # Agregar estadísticas si se solicitan
+    if consulta.include_stats:
+        stats = {
+            "total_records": total_records,
+            "total_pages": total_pages,
+            "current_page": page,
+            "records_per_page": limit,
+            "filters_applied": filtros
+        }
+
+        # Agregar estadísticas básicas si hay datos
+        if len(df) > 0:
+            # Distintos contados con los códigos por fila de esta versión, sin groupby
+            stats["data_stats"] = {
+                "unique_players": dataset.facetas.jugadores_distintos(filas),
+                "unique_teams": dataset.facetas.distintos('Team', filas),
+                "unique_seasons": dataset.facetas.distintos('Season', filas)
+            }
+        stats.update(resultado.extra)
+
+        resultado.contenido = {
+            "data": datos,
+            "stats": stats
+        }
+        return resultado
+
+    logger.info(f"Datos procesados: página {page}/{total_pages}, registros {start_idx+1}-{min(end_idx, total_records)} de {total_records}")
+    return resultado
+
+
+class FacetaDesconocida(ValueError):
+    """Se pidió una faceta que no es una columna filtrable"""
+
+
+def contar_facetas(dataset, consulta: Consulta, facetas: Sequence[str]) -> Dict[str, Any]:
+    """
+    Conteos por valor de las columnas filtrables bajo los filtros de una consulta.
+
+    Args:
+        dataset: Versión del dataset sobre la que se cuenta
+        consulta: Consulta con los filtros (la paginación y la agrupación no se usan)
+        facetas: Nombres de los filtros de /datos a contar (``team``, ``season``, ...)
+
+    Returns:
+        Diccionario con el total de registros, los filtros aplicados y, por
+        faceta, la lista de valores con sus registros y jugadores distintos
+
+    Raises:
+        FacetaDesconocida: Si alguna faceta no es un filtro de /datos
+    """
+    desconocidas = [nombre for nombre in facetas if nombre not in COLUMNAS_FILTRABLES]
+    if desconocidas:
+        raise FacetaDesconocida(f"Facetas desconocidas: {', '.join(desconocidas)}. Disponibles: {', '.join(COLUMNAS_FILTRABLES)}")
+
+    filtros = consulta.filtros_aplicados()
+    with medir("filtrado"):
+        filas = dataset.indices.filtrar(consulta.filtros_indice())
+    comprobar_plazo()
+    return {
+        "total_records": len(dataset.df) if filas is None else len(filas),
+        "filters_applied": filtros,
+        "facets": {nombre: dataset.facetas.conteos_filtrados(nombre, filas) for nombre in facetas}
+    }
+
+
+def resumir_estadisticas(dataset, consulta: Consulta, agrupar_por: Optional[str] = None,
+                         percentiles: Sequence[float] = PERCENTILES_POR_DEFECTO, hoy: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Estadísticos de altura, peso y edad bajo los filtros de una consulta.
+
+    Args:
+        dataset: Versión del dataset sobre la que se calcula
+        consulta: Consulta con los filtros (la paginación y la agrupación de /datos no se usan)
+        agrupar_por: ``team``, ``season``, ``position`` o ``nationality``, o None para el total
+        percentiles: Percentiles a incluir además de la mediana
+        hoy: Fecha de referencia para la edad y sus filtros (por defecto, la de hoy)
+
+    Returns:
+        Diccionario con el total de registros, los filtros aplicados, el
+        resumen de todas las filas filtradas y, si se agrupa, el de cada grupo
+    """
+    hoy = hoy or date.today()
+    with medir("filtrado"):
+        filas = dataset.indices.filtrar(consulta.filtros_indice(hoy))
+    comprobar_plazo()
+    estadisticas = dataset.estadisticas
+    with medir("estadisticas"):
+        return {
+            "total_records": len(dataset.df) if filas is None else len(filas),
+            "filters_applied": consulta.filtros_aplicados(),
+            "group_by": agrupar_por,
+            "percentiles": list(percentiles),
+            "overall": estadisticas.resumen(filas, None, percentiles, hoy)[0],
+            "groups": estadisticas.resumen(filas, agrupar_por, percentiles, hoy) if agrupar_por is not None else []
+        }
+
+
+def explicar_consulta(dataset, consulta: Consulta) -> Dict[str, Any]:
+    """
+    Plan de filtrado de una consulta (``/datos?explain=true``).
+
+    Returns:
+        Diccionario con los filtros aplicados, el total de registros y, por
+        paso del plan, la condición, las filas estimadas, la estrategia, las
+        filas que quedaron y su tiempo en milisegundos
+    """
+    inicio = time.perf_counter()
+    with medir("filtrado"):
+        filas, pasos = dataset.indices.explicar(consulta.filtros_indice())
+    return {
+        "total_rows": len(dataset.df),
+        "total_records": len(dataset.df) if filas is None else len(filas),
+        "filters_applied": consulta.filtros_aplicados(),
+        "plan": [paso.json() for paso in pasos],
+        "time_ms": round((time.perf_counter() - inicio) * 1000, 3)
+    }
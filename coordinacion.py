@@ -0,0 +1,127 @@
+"""
+Coordinación del refresco del dataset entre procesos de la misma máquina.
+
+Dentro de un proceso las peticiones concurrentes ya comparten un único
+refresco en curso (ver ``GestorDataset.refrescar``). Entre workers, el
+refresco se hace con un candado de archivo (``flock``): el worker que lo
+obtiene consulta la fuente, guarda el snapshot y anota el resultado en
+``estado.json``; los demás esperan el candado, encuentran el estado recién
+verificado y cargan ese snapshot en lugar de volver a descargar el CSV.
+
+El estado lleva un número de generación que aumenta cada vez que se publica
+una versión distinta: los workers lectores (``dataset.LectorDataset``) lo
+consultan periódicamente y cambian de versión cuando aumenta. El proceso
+cargador además late (``latir``) cada pocos segundos, aunque la fuente no
+responda, así los lectores distinguen un cargador caído de un CSV que
+simplemente no cambió.
+"""
+from dataclasses import asdict, dataclass
+from typing import Optional
+import json
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sin coordinación entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_CANDADO = "refresco.lock"
+_ESTADO = "estado.json"
+_LATIDO = "cargador.latido"
+
+
+@dataclass
+class EstadoCompartido:
+    """Última versión confirmada contra la fuente por cualquier worker"""
+    version: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    verificado_en: float
+    # Aumenta en uno con cada versión distinta publicada
+    generacion: int = 0
+
+    @property
+    def edad(self) -> float:
+        return time.time() - self.verificado_en
+
+
+class CoordinadorRefresco:
+    """
+    Candado y estado compartidos en un directorio.
+
+    Args:
+        directorio: Carpeta común a todos los workers (la de los snapshots)
+        espera_maxima: Segundos máximos esperando el candado antes de fallar
+    """
+
+    def __init__(self, directorio: str, espera_maxima: float = 120.0):
+        self.directorio = directorio
+        self.espera_maxima = espera_maxima
+        self._archivo = None
+
+    def adquirir(self):
+        """
+        Bloquea hasta obtener el candado del refresco.
+
+        Raises:
+            TimeoutError: Si otro worker lo retiene más de ``espera_maxima`` segundos
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        archivo = open(os.path.join(self.directorio, _CANDADO), "a+")
+        if fcntl is None:
+            self._archivo = archivo
+            return
+        limite = time.monotonic() + self.espera_maxima
+        while True:
+            try:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._archivo = archivo
+                return
+            except BlockingIOError:
+                if time.monotonic() > limite:
+                    archivo.close()
+                    raise TimeoutError(f"Otro worker retiene el refresco del dataset hace más de {self.espera_maxima}s")
+                time.sleep(0.05)
+
+    def liberar(self):
+        if self._archivo is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+        self._archivo.close()
+        self._archivo = None
+
+    def leer_estado(self) -> Optional[EstadoCompartido]:
+        try:
+            with open(os.path.join(self.directorio, _ESTADO), encoding="utf-8") as f:
+                return EstadoCompartido(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Estado compartido del dataset ilegible, se ignora: {str(e)}")
+            return None
+
+    def escribir_estado(self, estado: EstadoCompartido):
+        temporal = os.path.join(self.directorio, f".{_ESTADO}.{os.getpid()}")
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(asdict(estado), f)
+        os.replace(temporal, os.path.join(self.directorio, _ESTADO))
+
+    def latir(self):
+        """Anota que el cargador sigue vivo (en la fecha de modificación del archivo de latido)"""
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(self.directorio, _LATIDO)
+        with open(ruta, "a"):
+            pass
+        os.utime(ruta)
+
+    def ultimo_latido(self) -> Optional[float]:
+        """Momento (``time.time``) del último latido del cargador, o None si nunca latió"""
+        try:
+            return os.stat(os.path.join(self.directorio, _LATIDO)).st_mtime
+        except FileNotFoundError:
+            return None
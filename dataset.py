@@ -0,0 +1,558 @@
+"""
+Gestión en memoria del dataset de jugadores.
+
+El CSV se descarga una sola vez al iniciar la aplicación y se refresca en segundo
+plano cada ``ttl`` segundos. Cada versión descargada se publica como un objeto
+``Dataset`` inmutable que se reemplaza de forma atómica, por lo que las
+peticiones nunca esperan a la red mientras exista una copia válida.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from agrupaciones import MODOS_AGRUPACION, Agrupaciones
+from busqueda import IndiceJugadores
+from cambios import Cambios, Diferencia, calcular_diferencia, encadenar
+from compactacion import columna_fecha
+from coordinacion import CoordinadorRefresco, EstadoCompartido
+from estadisticas import Estadisticas
+from facetas import Facetas
+from fuentes import RespuestaFuente
+from indices import IndiceFiltros
+from jugadores import TablaJugadores
+from lectura import leer_csv_en_bloques
+from metricas import medir
+from serializacion import SerializadorFilas
+from snapshot import AlmacenSnapshots
+
+logger = logging.getLogger(__name__)
+
+
+class Dataset:
+    """
+    Una versión concreta del CSV ya parseada.
+
+    El DataFrame nunca se modifica después de publicarse: los endpoints solo
+    leen de él y los filtros generan copias nuevas.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.df = df
+        self.version = version
+        self.etag = etag
+        self.last_modified = last_modified
+        self.cargado_en = time.time()
+        self.verificado_en = self.cargado_en
+        # Reporte de compactación (ver compactacion.reporte_memoria), si esta versión se parseó en este proceso
+        self.memoria: Optional[Dict[str, Any]] = None
+        # Milisegundos que tardó en construirse cada estructura derivada (ver preparar)
+        self.tiempos_preparacion: Dict[str, float] = {}
+        # Versión anterior y diferencia con ella mientras se preparan las estructuras (ver heredar)
+        self._herencia: Optional[Tuple["Dataset", Diferencia]] = None
+
+    @property
+    def edad(self) -> float:
+        """Segundos desde la última vez que se confirmó contra la fuente"""
+        return time.time() - self.verificado_en
+
+    @cached_property
+    def memoria_bytes(self) -> int:
+        """Bytes que ocupa la tabla en este worker (para /health, que no debe recorrer las columnas en cada llamada)"""
+        return int(self.df.memory_usage(index=False, deep=True).sum())
+
+    @cached_property
+    def fechas_nacimiento(self) -> np.ndarray:
+        """Columna Birthdate como datetime64[D] (NaT si falta o no es una fecha)"""
+        return columna_fecha(self.df['Birthdate'])
+
+    @cached_property
+    def indices(self) -> IndiceFiltros:
+        """Índices de filtrado de esta versión"""
+        anterior = self._herencia[0].indices if self._herencia is not None else None
+        return IndiceFiltros(self.df, anterior, self.fechas_nacimiento)
+
+    @cached_property
+    def agrupaciones(self) -> Agrupaciones:
+        """Materializaciones de los modos group_by de esta versión"""
+        agrupaciones = Agrupaciones(self.df)
+        if self._herencia is not None:
+            anterior, diferencia = self._herencia
+            agrupaciones.heredar(anterior.agrupaciones, diferencia.mapa_filas)
+        return agrupaciones
+
+    @cached_property
+    def jugadores(self) -> TablaJugadores:
+        """Jugadores de esta versión por ID estable, con su ficha y su trayectoria"""
+        if self._herencia is None:
+            return TablaJugadores(self.df, self.agrupaciones)
+        anterior, diferencia = self._herencia
+        return TablaJugadores(self.df, self.agrupaciones, anterior.jugadores, diferencia.mapa_filas)
+
+    @cached_property
+    def busqueda(self) -> IndiceJugadores:
+        """Índice de trigramas de los nombres de los jugadores de group_by=player"""
+        return IndiceJugadores(self.agrupaciones.obtener("player"), self.jugadores.id_de_fila)
+
+    @cached_property
+    def serializador(self) -> SerializadorFilas:
+        """Columnas limpias para los registros sin agrupar de esta versión"""
+        return SerializadorFilas(self.df)
+
+    @cached_property
+    def facetas(self) -> Facetas:
+        """Valores distintos y conteos de las facetas de /info"""
+        if self._herencia is None:
+            return Facetas(self.df)
+        anterior, diferencia = self._herencia
+        quitadas = np.concatenate([diferencia.eliminadas, diferencia.modificadas_antes])
+        sumadas = np.concatenate([diferencia.agregadas, diferencia.modificadas])
+        return Facetas.parchear(anterior.facetas, anterior.df, self.df, quitadas, sumadas)
+
+    @cached_property
+    def estadisticas(self) -> Estadisticas:
+        """Columnas numéricas para los resúmenes de /stats"""
+        return Estadisticas(self.df, self.facetas, self.fechas_nacimiento)
+
+    def heredar(self, anterior: "Dataset", diferencia: Diferencia):
+        """
+        Prepara esta versión a partir de la anterior: las filas y grupos sin
+        cambios reutilizan su JSON y sus registros, y las facetas se parchean.
+        Debe llamarse antes de ``preparar``.
+        """
+        self._herencia = (anterior, diferencia)
+        self.serializador.heredar(anterior.serializador, diferencia.mapa_filas)
+
+    def preparar(self):
+        """Construye las estructuras derivadas antes de publicar la versión, midiendo cuánto tarda cada una"""
+        pasos = [
+            ("indices", lambda: self.indices),
+            ("registros", lambda: self.serializador.fragmentos),
+            ("facetas", lambda: self.facetas),
+            ("estadisticas", lambda: self.estadisticas),
+            ("agrupaciones", lambda: [self.agrupaciones.obtener(modo).fragmentos for modo in MODOS_AGRUPACION]),
+            ("jugadores", lambda: (self.jugadores.fichas.fragmentos, self.jugadores.trayectorias.fragmentos)),
+            ("busqueda", lambda: self.busqueda),
+            ("memoria", lambda: self.memoria_bytes),
+        ]
+        for nombre, construir in pasos:
+            inicio = time.perf_counter()
+            construir()
+            self.tiempos_preparacion[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+        # La versión anterior ya no hace falta: se libera para no retenerla en memoria
+        self._herencia = None
+        self.agrupaciones.soltar_anterior()
+
+
+class GestorDataset:
+    """
+    Mantiene la versión vigente del dataset y la refresca contra la fuente.
+
+    Args:
+        fuente: Objeto con un método ``descargar(etag, last_modified)``
+        ttl: Segundos que una versión se considera fresca
+        stale_while_revalidate: Si es True, una petición que encuentra datos
+            vencidos los recibe igualmente y dispara el refresco en segundo
+            plano; si es False, espera al refresco (y cae a la copia anterior
+            si falla)
+        snapshots: Almacén donde se guarda cada versión nueva y desde el que
+            se arranca sin esperar a la fuente (None lo desactiva)
+        compacto: Si es True, las columnas se guardan en su representación
+            compacta (categóricas y tipos numéricos reducidos)
+        coordinador: Candado compartido con los demás workers de la máquina
+            para que solo uno consulte la fuente; los otros adoptan su
+            snapshot (requiere ``snapshots``)
+        hilos: Tamaño del pool de hilos de descarga y parseo
+        historial: Número de cambios entre versiones consecutivas que se
+            conservan para ``/datos/changes``
+        incremental: Si es True, una versión nueva con pocos cambios reutiliza
+            las estructuras de la anterior en lugar de reconstruirlas
+        estructuras: Si es False, las versiones solo se parsean y se guardan
+            en snapshot, sin índices ni agrupaciones (el proceso cargador de
+            ``cargador.py``, que no atiende peticiones)
+    """
+
+    def __init__(self, fuente, ttl: float = 300.0, stale_while_revalidate: bool = True, snapshots: Optional[AlmacenSnapshots] = None,
+                 compacto: bool = True, coordinador: Optional[CoordinadorRefresco] = None, hilos: int = 2,
+                 historial: int = 20, incremental: bool = True, estructuras: bool = True):
+        if coordinador is not None and snapshots is None:
+            raise ValueError("La coordinación entre workers necesita un almacén de snapshots")
+        self.fuente = fuente
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.snapshots = snapshots
+        self.compacto = compacto
+        self.coordinador = coordinador
+        self.incremental = incremental
+        self.estructuras = estructuras
+        self.historial_cambios: "deque[Cambios]" = deque(maxlen=historial)
+        # Pool propio: la descarga y el parseo nunca bloquean el event loop ni compiten con el pool por defecto
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="dataset")
+        self.ultimo_error: Optional[str] = None
+        self._actual: Optional[Dataset] = None
+        self._refresco: Optional[asyncio.Task] = None
+        self._tarea_periodica: Optional[asyncio.Task] = None
+        self._preparacion: Optional[asyncio.Task] = None
+
+    @property
+    def actual(self) -> Optional[Dataset]:
+        return self._actual
+
+    async def iniciar(self):
+        """
+        Carga inicial y arranque del refresco periódico.
+
+        Si hay un snapshot en disco se publica de inmediato y la consulta a la
+        fuente se hace en segundo plano; si no, se espera a la descarga.
+        """
+        if self._actual is None and self.snapshots is not None:
+            await self._cargar_snapshot()
+        if self._actual is not None:
+            self._lanzar_refresco()
+        else:
+            try:
+                await self.refrescar()
+            except Exception as e:
+                # Las peticiones volverán a intentar la carga si todavía no hay datos
+                logger.error(f"Error en la carga inicial del dataset: {str(e)}")
+        if self.ttl > 0 and self._tarea_periodica is None:
+            self._tarea_periodica = asyncio.create_task(self._refrescar_periodicamente())
+
+    async def detener(self):
+        """Cancela el refresco periódico"""
+        if self._tarea_periodica is not None:
+            self._tarea_periodica.cancel()
+            try:
+                await self._tarea_periodica
+            except asyncio.CancelledError:
+                pass
+            self._tarea_periodica = None
+
+    async def esperar_preparacion(self):
+        """
+        Espera a que la versión vigente tenga sus estructuras derivadas.
+
+        Las versiones nuevas se publican ya preparadas; solo la que se toma de
+        un snapshot al iniciar las construye en segundo plano. Si esa
+        construcción falló, se vuelve a lanzar y se propaga el error.
+        """
+        if self._preparacion is None:
+            return
+        try:
+            await asyncio.shield(self._preparacion)
+        except Exception:
+            dataset = self._actual
+            self._preparacion = asyncio.create_task(self._en_hilo(dataset.preparar))
+            self._preparacion.add_done_callback(self._registrar_fallo)
+            raise
+
+    async def obtener(self) -> Dataset:
+        """
+        Devuelve la versión vigente del dataset.
+
+        Solo espera a la red si todavía no hay ninguna copia cargada, o si la
+        copia venció y el modo stale-while-revalidate está desactivado.
+        """
+        dataset = self._actual
+        if dataset is None:
+            return await self.refrescar()
+
+        if self.ttl > 0 and dataset.edad > self.ttl:
+            if self.stale_while_revalidate:
+                self._lanzar_refresco()
+            else:
+                try:
+                    return await self.refrescar()
+                except Exception as e:
+                    logger.warning(f"Refresco fallido, se sirve la última copia válida: {str(e)}")
+        return self._actual
+
+    async def refrescar(self) -> Dataset:
+        """
+        Consulta la fuente y publica una versión nueva si el CSV cambió.
+
+        Las llamadas concurrentes comparten el mismo refresco en curso.
+
+        Raises:
+            Exception: Si la descarga o el parseo fallan
+        """
+        if self._refresco is None or self._refresco.done():
+            self._refresco = asyncio.create_task(self._refrescar())
+        return await asyncio.shield(self._refresco)
+
+    def _lanzar_refresco(self):
+        """Dispara un refresco en segundo plano sin esperar su resultado"""
+        if self._refresco is not None and not self._refresco.done():
+            return
+        self._refresco = asyncio.create_task(self._refrescar())
+        self._refresco.add_done_callback(self._registrar_fallo)
+
+    @staticmethod
+    def _registrar_fallo(tarea: asyncio.Task):
+        if not tarea.cancelled() and tarea.exception() is not None:
+            logger.error(f"Error en una tarea del dataset en segundo plano: {str(tarea.exception())}")
+
+    def cambios_desde(self, version: str) -> Optional[List[Cambios]]:
+        """
+        Cambios que llevan de ``version`` a la versión vigente, en orden.
+
+        Returns:
+            La lista de cambios (vacía si ``version`` es la vigente), o None si
+            el historial de este proceso no la alcanza
+        """
+        if self._actual is None:
+            return None
+        return encadenar(list(self.historial_cambios), version, self._actual.version)
+
+    def _preparar_version(self, nuevo: Dataset, anterior: Optional[Dataset]) -> Optional[Cambios]:
+        """
+        Construye las estructuras de una versión nueva (en el pool de hilos).
+
+        Si la diferencia con la anterior es chica se parchean en lugar de
+        reconstruirse, y se devuelven los cambios para el historial.
+        """
+        if not self.estructuras:
+            return None
+        if anterior is None or not self.incremental:
+            nuevo.preparar()
+            return None
+        diferencia = calcular_diferencia(anterior.serializador.columnas, nuevo.serializador.columnas)
+        if not diferencia.es_incremental(len(anterior.df)):
+            logger.info(f"Cambiaron {diferencia.total} filas: se reconstruyen todas las estructuras")
+            nuevo.preparar()
+            return None
+        nuevo.heredar(anterior, diferencia)
+        nuevo.preparar()
+        logger.info(
+            f"Refresco incremental {anterior.version} -> {nuevo.version}: {len(diferencia.agregadas)} filas agregadas, "
+            f"{len(diferencia.eliminadas)} eliminadas, {len(diferencia.modificadas)} modificadas"
+        )
+        return Cambios.registrar(anterior, nuevo, diferencia)
+
+    def _publicar(self, nuevo: Dataset, cambios: Optional[Cambios]):
+        """Reemplazo atómico de la versión vigente: las peticiones en curso conservan su referencia"""
+        if cambios is None:
+            # Sin diferencia registrada el historial ya no lleva hasta la versión nueva
+            self.historial_cambios.clear()
+        else:
+            self.historial_cambios.append(cambios)
+        self._actual = nuevo
+        self.ultimo_error = None
+
+    async def _en_hilo(self, funcion: Callable, *args):
+        """Ejecuta una función bloqueante en el pool del gestor"""
+        return await asyncio.get_running_loop().run_in_executor(self._ejecutor, partial(funcion, *args))
+
+    async def _cargar_snapshot(self):
+        """Publica la versión del snapshot más reciente (las estructuras derivadas se construyen en segundo plano)"""
+        inicio = time.perf_counter()
+        snapshot = await self._en_hilo(self.snapshots.cargar)
+        if snapshot is None:
+            return
+        dataset = Dataset(snapshot.df, snapshot.version, etag=snapshot.etag, last_modified=snapshot.last_modified)
+        # Se considera vencido para que el primer refresco lo confirme contra la fuente
+        dataset.verificado_en = snapshot.guardado_en
+        self._actual = dataset
+        logger.info(
+            f"Dataset versión {dataset.version} cargado desde snapshot en {(time.perf_counter() - inicio) * 1000:.1f}ms. "
+            f"Filas: {len(dataset.df)}, Columnas: {len(dataset.df.columns)}"
+        )
+        if self.estructuras:
+            self._preparacion = asyncio.create_task(self._en_hilo(dataset.preparar))
+            self._preparacion.add_done_callback(self._registrar_fallo)
+
+    async def _guardar_snapshot(self, dataset: Dataset):
+        try:
+            await self._en_hilo(self.snapshots.guardar, dataset.df, dataset.version, dataset.etag, dataset.last_modified)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el snapshot de la versión {dataset.version}: {str(e)}")
+
+    async def _refrescar(self) -> Dataset:
+        if self.coordinador is None:
+            return await self._consultar_fuente()
+
+        await self._en_hilo(self.coordinador.adquirir)
+        try:
+            # Otro worker pudo haber refrescado mientras se esperaba el candado
+            estado = await self._en_hilo(self.coordinador.leer_estado)
+            if estado is not None and self.ttl > 0 and estado.edad < self.ttl:
+                adoptado = await self._adoptar(estado)
+                if adoptado is not None:
+                    return adoptado
+            elif estado is not None and (self._actual is None or self._actual.version != estado.version):
+                # Estado vencido: se parte de la última versión conocida para que la consulta sea condicional
+                await self._adoptar(estado)
+            nuevo = await self._consultar_fuente()
+            generacion = estado.generacion if estado is not None else 0
+            if estado is None or estado.version != nuevo.version:
+                generacion += 1
+            await self._en_hilo(
+                self.coordinador.escribir_estado,
+                EstadoCompartido(nuevo.version, nuevo.etag, nuevo.last_modified, nuevo.verificado_en, generacion)
+            )
+            return nuevo
+        finally:
+            await self._en_hilo(self.coordinador.liberar)
+
+    async def _adoptar(self, estado: EstadoCompartido) -> Optional[Dataset]:
+        """Toma la versión que otro worker acaba de confirmar, o None si su snapshot no está disponible"""
+        actual = self._actual
+        if actual is not None and actual.version == estado.version:
+            actual.verificado_en = estado.verificado_en
+            self.ultimo_error = None
+            return actual
+
+        snapshot = await self._en_hilo(self.snapshots.cargar, estado.version)
+        if snapshot is None:
+            return None
+        nuevo = Dataset(snapshot.df, snapshot.version, etag=snapshot.etag, last_modified=snapshot.last_modified)
+        nuevo.verificado_en = estado.verificado_en
+        cambios = await self._en_hilo(self._preparar_version, nuevo, actual)
+        self._publicar(nuevo, cambios)
+        logger.info(f"Dataset versión {nuevo.version} tomado del snapshot de otro worker")
+        return nuevo
+
+    async def _consultar_fuente(self) -> Dataset:
+        actual = self._actual
+        inicio = time.perf_counter()
+        try:
+            with medir("descarga"):
+                respuesta: Optional[RespuestaFuente] = await self._en_hilo(
+                    self.fuente.descargar,
+                    actual.etag if actual else None,
+                    actual.last_modified if actual else None,
+                )
+
+            if respuesta is None and actual is not None:
+                actual.verificado_en = time.time()
+                self.ultimo_error = None
+                return actual
+            if respuesta is None:
+                raise RuntimeError("La fuente no devolvió contenido")
+
+            # El cuerpo se descarga mientras se parsea, y la versión sale del contenido leído
+            with medir("parseo"):
+                df, version, memoria = await self._en_hilo(
+                    leer_csv_en_bloques, respuesta.partes_en_bloques(), self.compacto
+                )
+            if actual is not None and version == actual.version:
+                # Contenido idéntico: se conservan las estructuras ya calculadas
+                actual.etag = respuesta.etag
+                actual.last_modified = respuesta.last_modified
+                actual.verificado_en = time.time()
+                self.ultimo_error = None
+                return actual
+
+            nuevo = Dataset(df, version, etag=respuesta.etag, last_modified=respuesta.last_modified)
+            nuevo.memoria = memoria
+            with medir("preparacion"):
+                cambios = await self._en_hilo(self._preparar_version, nuevo, actual)
+        except Exception as e:
+            self.ultimo_error = str(e)
+            raise
+
+        self._publicar(nuevo, cambios)
+        logger.info(
+            f"Dataset versión {nuevo.version} cargado en {time.perf_counter() - inicio:.2f}s. "
+            f"Filas: {len(nuevo.df)}, Columnas: {len(nuevo.df.columns)}"
+        )
+        if memoria is not None:
+            logger.info(
+                f"Memoria de la tabla: {memoria['bytes_antes'] / 1e6:.1f}MB parseada, "
+                f"{memoria['bytes_despues'] / 1e6:.1f}MB compacta ({memoria['ahorro_pct']}% menos)"
+            )
+        if self.snapshots is not None:
+            await self._guardar_snapshot(nuevo)
+        return nuevo
+
+    async def _refrescar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                await self.refrescar()
+            except Exception as e:
+                logger.error(f"Error al refrescar el dataset, se mantiene la versión anterior: {str(e)}")
+
+
+class LectorDataset(GestorDataset):
+    """
+    Gestor de un worker que nunca consulta la fuente: sigue las versiones que
+    publica el proceso cargador (``cargador.py``) en la carpeta de snapshots.
+
+    Cada ``sondeo`` segundos lee el estado compartido; cuando su generación
+    cambia abre el snapshot de la versión nueva, cuyas columnas quedan
+    mapeadas en memoria y compartidas con los demás workers, construye sus
+    estructuras y la publica.
+
+    Un lector sigue sirviendo la última versión aunque el cargador se caiga,
+    así que ``estado_cargador`` informa si el cargador dejó de latir: con el
+    cargador caído el dataset nunca más se refrescaría.
+
+    Args:
+        snapshots: Almacén en el que publica el cargador
+        coordinador: Estado compartido con el cargador (la misma carpeta)
+        sondeo: Segundos entre lecturas del estado compartido
+        espera_inicial: Segundos que una petición espera la primera versión si el cargador todavía no publicó ninguna
+        latido_max: Segundos sin latido a partir de los cuales el cargador se considera caído (0 no lo controla)
+        **kwargs: Resto de los argumentos de ``GestorDataset``
+    """
+
+    def __init__(self, snapshots: AlmacenSnapshots, coordinador: CoordinadorRefresco, sondeo: float = 1.0,
+                 espera_inicial: float = 120.0, latido_max: float = 0.0, **kwargs):
+        super().__init__(None, snapshots=snapshots, coordinador=coordinador, **kwargs)
+        self.sondeo = sondeo
+        self.espera_inicial = espera_inicial
+        self.latido_max = latido_max
+        # Generación del estado compartido de la versión vigente (None hasta leerlo)
+        self.generacion: Optional[int] = None
+
+    async def iniciar(self):
+        """Publica el snapshot más reciente, si hay, y empieza a seguir al cargador sin esperarlo"""
+        if self._actual is None:
+            await self._cargar_snapshot()
+        self._lanzar_refresco()
+        if self._tarea_periodica is None:
+            self._tarea_periodica = asyncio.create_task(self._refrescar_periodicamente())
+
+    def estado_cargador(self) -> Optional[Dict[str, Any]]:
+        """Si el cargador sigue latiendo y la edad de su último latido, o None si no se controla"""
+        if self.latido_max <= 0:
+            return None
+        latido = self.coordinador.ultimo_latido()
+        edad = None if latido is None else max(time.time() - latido, 0.0)
+        return {
+            "alive": edad is not None and edad <= self.latido_max,
+            "heartbeat_age_seconds": None if edad is None else round(edad, 1),
+        }
+
+    async def _refrescar(self) -> Dataset:
+        limite = time.monotonic() + self.espera_inicial
+        while True:
+            estado = await self._en_hilo(self.coordinador.leer_estado)
+            if estado is not None:
+                if self._actual is not None and estado.generacion == self.generacion:
+                    self._actual.verificado_en = estado.verificado_en
+                    return self._actual
+                adoptado = await self._adoptar(estado)
+                if adoptado is not None:
+                    self.generacion = estado.generacion
+                    return adoptado
+            if self._actual is not None:
+                return self._actual
+            if time.monotonic() > limite:
+                raise RuntimeError(f"El cargador no publicó ninguna versión del dataset en {self.espera_inicial:.0f}s")
+            await asyncio.sleep(self.sondeo)
+
+    async def _refrescar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.sondeo)
+            try:
+                await self.refrescar()
+            except Exception as e:
+                logger.error(f"Error al seguir al cargador del dataset, se mantiene la versión anterior: {str(e)}")
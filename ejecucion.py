@@ -0,0 +1,159 @@
+"""
+Ejecución de las consultas fuera del event loop, con control de admisión y plazos.
+
+Los handlers de la API son ``async``: si el filtrado, la agrupación y la
+serialización de una consulta corrieran dentro del handler, una sola consulta
+costosa (``group_by=career`` sobre toda la tabla) frenaría ``/health`` y a
+todas las demás peticiones del worker. ``EjecutorConsultas`` las corre en un
+pool acotado de hilos:
+
+- Como mucho ``hilos`` consultas a la vez y ``cola_max`` esperando un hilo
+  libre. Con el pool lleno, una consulta nueva se rechaza enseguida con
+  ``Saturado`` (503 con ``Retry-After``) en lugar de acumular latencia.
+- Cada consulta tiene un plazo desde que se admite, con la espera en la cola
+  incluida. Al vencer, la petición responde con ``PlazoVencido`` (504) sin
+  esperar al hilo. Un hilo no se puede interrumpir desde afuera, así que la
+  consulta se corta en el siguiente punto de control (``comprobar_plazo``,
+  entre los tramos de la consulta) y una que venció en la cola ni empieza.
+
+Se usan hilos y no procesos porque las estructuras de cada versión del
+dataset (índices, agrupaciones, fragmentos JSON) viven en la memoria del
+worker: pasarlas a otro proceso costaría más que la consulta.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import contextvars
+import math
+import threading
+import time
+
+from metricas import LIMITES_SEGUNDOS, registro
+
+ESPERA_CONSULTAS = registro.histograma(
+    "query_queue_wait_seconds", "Espera de las consultas por un hilo libre del pool", (), LIMITES_SEGUNDOS
+)
+
+# Límite (time.monotonic) de la consulta que corre en este contexto, o None si no tiene plazo
+_limite_actual: ContextVar[Optional[float]] = ContextVar("limite_consulta", default=None)
+
+
+class Saturado(Exception):
+    """Hay demasiadas consultas en curso y en cola; conviene reintentar más tarde"""
+
+    def __init__(self, reintentar_en: int):
+        super().__init__(f"El servidor está atendiendo demasiadas consultas; reintentar en {reintentar_en} s")
+        self.reintentar_en = reintentar_en
+
+
+class PlazoVencido(Exception):
+    """La consulta no terminó dentro de su plazo"""
+
+
+def comprobar_plazo():
+    """
+    Punto de control de la cancelación: corta la consulta en curso si ya venció su plazo.
+
+    Fuera de ``EjecutorConsultas`` no hay plazo y no hace nada.
+
+    Raises:
+        PlazoVencido: Si el plazo de la consulta ya pasó
+    """
+    limite = _limite_actual.get()
+    if limite is not None and time.monotonic() > limite:
+        raise PlazoVencido("La consulta superó su plazo y se canceló")
+
+
+class EjecutorConsultas:
+    """
+    Pool acotado de hilos para las consultas, con admisión y plazos.
+
+    Args:
+        hilos: Consultas que se ejecutan a la vez
+        cola_max: Consultas que pueden esperar un hilo libre; las que no entran se rechazan
+        plazo: Segundos que tiene cada consulta desde que se admite (0 para no limitarlas)
+    """
+
+    def __init__(self, hilos: int = 4, cola_max: int = 32, plazo: float = 30.0):
+        self.hilos = hilos
+        self.cola_max = cola_max
+        self.plazo = plazo
+        self.pendientes = 0
+        self.en_curso = 0
+        self.rechazadas = 0
+        self.vencidas = 0
+        self._duracion_media = 0.0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="consulta")
+
+    def reintentar_en(self) -> int:
+        """Segundos sugeridos para ``Retry-After``: lo que tardaría en vaciarse la cola al ritmo actual"""
+        espera = self._duracion_media * self.pendientes / max(self.hilos, 1)
+        return max(1, min(60, math.ceil(espera)))
+
+    async def ejecutar(self, funcion: Callable[..., Any], *args) -> Any:
+        """
+        Ejecuta ``funcion(*args)`` en el pool, con el contexto de la petición, y espera su resultado.
+
+        Raises:
+            Saturado: Si ya hay ``hilos + cola_max`` consultas pendientes
+            PlazoVencido: Si la consulta no terminó dentro del plazo
+        """
+        with self._lock:
+            if self.pendientes >= self.hilos + self.cola_max:
+                self.rechazadas += 1
+                raise Saturado(self.reintentar_en())
+            self.pendientes += 1
+
+        admitida = time.monotonic()
+        limite = admitida + self.plazo if self.plazo > 0 else None
+        # Con el contexto copiado, los tramos quedan en la traza de la petición y el hilo ve el plazo
+        contexto = contextvars.copy_context()
+        contexto.run(_limite_actual.set, limite)
+        futuro = asyncio.get_running_loop().run_in_executor(self._pool, contexto.run, self._correr, admitida, funcion, args)
+        futuro.add_done_callback(self._descartar)
+        try:
+            if limite is None:
+                return await futuro
+            # shield: al vencer el plazo se deja de esperar, pero el hilo sigue hasta su punto de control
+            return await asyncio.wait_for(asyncio.shield(futuro), max(limite - time.monotonic(), 0))
+        except (asyncio.TimeoutError, PlazoVencido):
+            with self._lock:
+                self.vencidas += 1
+            raise PlazoVencido(f"La consulta superó el plazo de {self.plazo:g} s") from None
+
+    def _correr(self, admitida: float, funcion: Callable[..., Any], args: tuple) -> Any:
+        # La consulta deja de estar pendiente cuando termina el hilo, aunque ya nadie la espere
+        try:
+            ESPERA_CONSULTAS.observar(time.monotonic() - admitida)
+            # Si venció mientras esperaba en la cola, ni se empieza
+            comprobar_plazo()
+            with self._lock:
+                self.en_curso += 1
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args)
+            finally:
+                duracion = time.perf_counter() - inicio
+                with self._lock:
+                    self.en_curso -= 1
+                    self._duracion_media = duracion if not self._duracion_media else 0.8 * self._duracion_media + 0.2 * duracion
+        finally:
+            with self._lock:
+                self.pendientes -= 1
+
+    @staticmethod
+    def _descartar(futuro: asyncio.Future):
+        if not futuro.cancelled():
+            # Marca como recuperada la excepción de una consulta que nadie esperó (la que venció)
+            futuro.exception()
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "en_curso": self.en_curso,
+                "en_cola": max(self.pendientes - self.en_curso, 0),
+                "rechazadas": self.rechazadas,
+                "vencidas": self.vencidas,
+            }
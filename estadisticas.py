@@ -0,0 +1,242 @@
+"""
+Estadísticas numéricas de ``/stats``: cantidad, media, mediana, mínimo,
+máximo y percentiles de altura, peso y edad, en total o por equipo,
+temporada, posición o nacionalidad.
+
+Cada versión guarda las tres columnas como ``float64`` (NaN si falta el
+valor o no es un número finito), ordenadas una vez, y los grupos salen de los
+códigos por fila de ``Facetas``. Una consulta deja los valores seleccionados
+ordenados por (grupo, valor) con un orden estable por grupo; a partir de ahí
+todos los estadísticos de todos los grupos se obtienen con ``bincount`` e
+indexación sobre los límites de cada grupo, sin ``groupby`` ni recorrer los
+grupos en Python.
+
+La edad es la de hoy, en años con decimales, como en los filtros
+``age_min``/``age_max``.
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from facetas import Facetas
+
+logger = logging.getLogger(__name__)
+
+# Parámetro group_by de /stats -> columna del CSV
+AGRUPACIONES_ESTADISTICAS = {
+    "team": "Team",
+    "season": "Season",
+    "position": "Position",
+    "nationality": "Nationality",
+}
+
+# Métricas de /stats -> columna del CSV de la que salen
+METRICAS = {
+    "height": "Height",
+    "weight": "Weight",
+    "age": "Birthdate",
+}
+
+PERCENTILES_POR_DEFECTO = (10, 25, 75, 90)
+
+DIAS_POR_ANIO = 365.2425
+
+_EPOCA = date(1970, 1, 1)
+
+
+class PercentilesInvalidos(ValueError):
+    """La lista de percentiles pedida no se puede interpretar"""
+
+
+def leer_percentiles(texto: Optional[str]) -> Tuple[float, ...]:
+    """
+    Percentiles de una lista separada por comas (``"25,50,97.5"``), ordenados y sin repetir.
+
+    Raises:
+        PercentilesInvalidos: Si algún valor no es un número entre 0 y 100
+    """
+    if texto is None:
+        return PERCENTILES_POR_DEFECTO
+    try:
+        percentiles = sorted({float(parte) for parte in texto.split(",") if parte.strip()})
+    except ValueError:
+        raise PercentilesInvalidos(f"Percentiles inválidos: '{texto}'. Deben ser números entre 0 y 100 separados por coma")
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise PercentilesInvalidos(f"Percentiles fuera de rango: '{texto}'. Deben estar entre 0 y 100")
+    return tuple(int(p) if p.is_integer() else p for p in percentiles)
+
+
+def _numerica(serie: pd.Series) -> np.ndarray:
+    """Columna como float64, con NaN en los nulos y en los valores que no son números finitos"""
+    if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object:
+        serie = pd.to_numeric(serie.astype(object), errors="coerce")
+    valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    # Un infinito rompería la media y los cuantiles (inf - inf) y no se puede devolver en JSON
+    return np.where(np.isfinite(valores), valores, np.nan)
+
+
+def resumir_por_grupo(grupos: np.ndarray, valores: np.ndarray, cantidad: int,
+                      percentiles: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Estadísticos de ``valores`` por grupo, ignorando los NaN.
+
+    Args:
+        grupos: Código de grupo (0 a ``cantidad - 1``) de cada valor
+        valores: Valores a resumir
+        cantidad: Cantidad de grupos
+        percentiles: Percentiles a calcular (0 a 100), con interpolación lineal como ``np.percentile``
+
+    Returns:
+        Un arreglo de largo ``cantidad`` por estadístico (``count``, ``mean``,
+        ``median``, ``min``, ``max`` y ``p<percentil>``), con NaN en los grupos sin valores
+    """
+    validos = ~np.isnan(valores)
+    orden = np.argsort(valores[validos], kind="stable")
+    return resumir_ordenados(grupos[validos][orden], valores[validos][orden], cantidad, percentiles)
+
+
+def resumir_ordenados(grupos: np.ndarray, valores: np.ndarray, cantidad: int,
+                      percentiles: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Como ``resumir_por_grupo``, con los valores ya ordenados de menor a mayor y sin NaN.
+
+    Un orden estable por grupo los deja ordenados por (grupo, valor), así que
+    cada grupo ocupa un tramo contiguo y sus cuantiles son posiciones en él.
+    """
+    if cantidad > 1:
+        # Con pocos grupos el código cabe en 16 bits y NumPy ordena por radix
+        tipo = np.int16 if cantidad <= np.iinfo(np.int16).max else np.int64
+        orden = np.argsort(grupos.astype(tipo), kind="stable")
+        grupos, valores = grupos[orden], valores[orden]
+
+    n = np.bincount(grupos, minlength=cantidad)
+    inicio = np.cumsum(n) - n
+    con_valores = n > 0
+    resultado: Dict[str, np.ndarray] = {"count": n}
+    if not len(valores):
+        vacio = np.full(cantidad, np.nan)
+        resultado.update({nombre: vacio for nombre in ("mean", "median", "min", "max")})
+        resultado.update({f"p{p:g}": vacio for p in percentiles})
+        return resultado
+
+    def cuantil(fraccion: float) -> np.ndarray:
+        # Posición (con decimales) del cuantil dentro del tramo de cada grupo
+        posicion = inicio + (n - 1) * fraccion
+        abajo = np.clip(np.floor(posicion).astype(np.int64), 0, len(valores) - 1)
+        arriba = np.clip(np.ceil(posicion).astype(np.int64), 0, len(valores) - 1)
+        interpolado = valores[abajo] + (valores[arriba] - valores[abajo]) * (posicion - np.floor(posicion))
+        return np.where(con_valores, interpolado, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resultado["mean"] = np.bincount(grupos, weights=valores, minlength=cantidad) / n
+    resultado["median"] = cuantil(0.5)
+    resultado["min"] = cuantil(0.0)
+    resultado["max"] = cuantil(1.0)
+    for p in percentiles:
+        resultado[f"p{p:g}"] = cuantil(p / 100)
+    return resultado
+
+
+def _redondear(valor: float) -> Optional[float]:
+    return round(float(valor), 2) if np.isfinite(valor) else None
+
+
+class Estadisticas:
+    """
+    Columnas numéricas de una versión del dataset, listas para resumir.
+
+    Además de los valores, cada métrica guarda una vez por versión el orden
+    de sus filas con valor de menor a mayor; una consulta solo se queda con
+    las filas seleccionadas de ese orden y las reordena por grupo.
+
+    Args:
+        df: Tabla de la versión
+        facetas: Facetas de la versión (códigos de grupo y de jugador por fila)
+        fechas: Fecha de nacimiento de cada fila como ``datetime64[D]``
+    """
+
+    def __init__(self, df: pd.DataFrame, facetas: Facetas, fechas: np.ndarray):
+        self._facetas = facetas
+        self.total_filas = len(df)
+        self._columnas = {
+            "height": _numerica(df[METRICAS["height"]]),
+            "weight": _numerica(df[METRICAS["weight"]]),
+        }
+        dias = fechas.astype("datetime64[D]").astype(np.int64).astype(np.float64)
+        dias[np.isnat(fechas)] = np.nan
+        self._dias_nacimiento = dias
+
+        self._orden = {metrica: self._ordenar(valores) for metrica, valores in self._columnas.items()}
+        # Más edad es nacer antes: el orden de la edad es el de las fechas al revés
+        self._orden["age"] = self._ordenar(dias)[::-1]
+
+    @staticmethod
+    def _ordenar(valores: np.ndarray) -> np.ndarray:
+        """Row ids de las filas con valor, de menor a mayor"""
+        con_valor = np.flatnonzero(~np.isnan(valores))
+        return con_valor[np.argsort(valores[con_valor], kind="stable")]
+
+    def valores(self, metrica: str, hoy: Optional[date] = None) -> np.ndarray:
+        """Valores por fila de una métrica (la edad, en años a la fecha ``hoy``)"""
+        if metrica == "age":
+            dia = ((hoy or date.today()) - _EPOCA).days
+            return (dia - self._dias_nacimiento) / DIAS_POR_ANIO
+        return self._columnas[metrica]
+
+    def resumen(self, filas: Optional[np.ndarray] = None, agrupar_por: Optional[str] = None,
+                percentiles: Sequence[float] = PERCENTILES_POR_DEFECTO, hoy: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Registros, jugadores distintos y estadísticos de cada métrica, en total o por grupo.
+
+        Args:
+            filas: Row ids seleccionados por los filtros, o None para toda la tabla
+            agrupar_por: ``team``, ``season``, ``position`` o ``nationality``; None para un solo grupo
+            percentiles: Percentiles a incluir además de la mediana
+            hoy: Fecha de referencia para la edad (por defecto, la de hoy)
+
+        Returns:
+            Un elemento por grupo con al menos una fila, en el orden de sus valores
+            (las filas sin valor en la columna de agrupación no cuentan en ningún grupo);
+            sin agrupación, un único elemento sin ``value``
+        """
+        if agrupar_por is None:
+            codigos, nombres = np.zeros(self.total_filas, dtype=np.int32), [None]
+        else:
+            codigos, nombres = self._facetas.codigos(AGRUPACIONES_ESTADISTICAS[agrupar_por])
+        seleccionadas = None
+        if filas is not None:
+            seleccionadas = np.zeros(self.total_filas, dtype=bool)
+            seleccionadas[filas] = True
+
+        codigos_filas = codigos if filas is None else codigos[filas]
+        jugadores = self._facetas.jugador if filas is None else self._facetas.jugador[filas]
+        validos = codigos_filas >= 0
+        registros = np.bincount(codigos_filas[validos], minlength=len(nombres))
+        distintos = self._facetas.jugadores_por_codigo(codigos_filas[validos], jugadores[validos], len(nombres))
+
+        resumenes = {}
+        for metrica in METRICAS:
+            orden = self._orden[metrica]
+            if seleccionadas is not None:
+                orden = orden[seleccionadas[orden]]
+            grupos = codigos[orden]
+            if agrupar_por is not None:
+                con_grupo = grupos >= 0
+                orden, grupos = orden[con_grupo], grupos[con_grupo]
+            resumenes[metrica] = resumir_ordenados(grupos, self.valores(metrica, hoy)[orden], len(nombres), percentiles)
+
+        grupos = []
+        for codigo in np.flatnonzero(registros) if agrupar_por is not None else [0]:
+            # Sin agrupación hay un solo resumen, que no tiene valor de grupo
+            grupo = {} if agrupar_por is None else {"value": nombres[codigo]}
+            grupo.update(records=int(registros[codigo]), players=int(distintos[codigo]))
+            for metrica, resumen in resumenes.items():
+                grupo[metrica] = {
+                    nombre: int(valores[codigo]) if nombre == "count" else _redondear(valores[codigo])
+                    for nombre, valores in resumen.items()
+                }
+            grupos.append(grupo)
+        return grupos
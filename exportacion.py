@@ -0,0 +1,51 @@
+"""
+Exportación completa de las filas filtradas de ``/datos`` en streaming.
+
+Los generadores producen la salida por bloques de filas, así que la memoria
+usada no depende del tamaño del resultado (solo se mantiene el array de row
+ids filtrados, que ya está recordado por el índice).
+"""
+from typing import Iterator, Optional
+import csv
+import io
+
+import numpy as np
+
+from serializacion import CAMPOS_FILA
+
+# Filas por bloque enviado al cliente
+TAMANO_BLOQUE = 1000
+
+FORMATOS_EXPORTACION = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _bloques(dataset, filas: Optional[np.ndarray], tamano_bloque: int) -> Iterator[np.ndarray]:
+    total = dataset.indices.total_filas if filas is None else len(filas)
+    for inicio in range(0, total, tamano_bloque):
+        fin = min(inicio + tamano_bloque, total)
+        yield np.arange(inicio, fin) if filas is None else filas[inicio:fin]
+
+
+def exportar_ndjson(dataset, filas: Optional[np.ndarray], tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[bytes]:
+    """Un registro JSON por línea, con los mismos campos que /datos sin agrupar"""
+    fragmentos = dataset.serializador.fragmentos
+    for bloque in _bloques(dataset, filas, tamano_bloque):
+        yield b"\n".join(fragmentos[bloque].tolist()) + b"\n"
+
+
+def exportar_csv(dataset, filas: Optional[np.ndarray], tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[bytes]:
+    """CSV con encabezado y las mismas columnas que /datos sin agrupar (nulos como celdas vacías)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(CAMPOS_FILA)
+    columnas = [dataset.serializador.columnas[campo] for campo in CAMPOS_FILA]
+    for bloque in _bloques(dataset, filas, tamano_bloque):
+        escritor.writerows(zip(*[columna[bloque].tolist() for columna in columnas]))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,192 @@
+"""
+Facetas de ``/info``: los valores distintos de equipo, temporada, posición y
+nacionalidad, con la cantidad de filas de cada uno.
+
+Los conteos se calculan una vez por versión del dataset. En un refresco
+incremental se parten de los de la versión anterior, restando las filas
+eliminadas o modificadas y sumando las nuevas, en lugar de recorrer la tabla.
+
+Además cada columna filtrable tiene su código entero por fila (y cada fila
+el código de su jugador), de modo que los conteos por valor bajo unos
+filtros (``/datos/facets``) y los distintos de ``include_stats`` se resuelven
+con ``bincount`` sobre los row ids filtrados, sin ``groupby``.
+"""
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indices import COLUMNAS_NUMERICAS, COLUMNAS_TEXTO
+
+logger = logging.getLogger(__name__)
+
+# Nombre en /info -> columna del CSV
+COLUMNAS_FACETAS = {
+    "teams": "Team",
+    "seasons": "Season",
+    "positions": "Position",
+    "nationalities": "Nationality",
+}
+
+
+# Parámetro de /datos -> columna del CSV, para las facetas de /datos/facets
+COLUMNAS_FILTRABLES = {**COLUMNAS_TEXTO, **COLUMNAS_NUMERICAS}
+
+# Facetas que devuelve /datos/facets si no se piden otras
+FACETAS_POR_DEFECTO = ("team", "season", "position", "nationality")
+
+# Tamaño máximo (grupos x jugadores) de la tabla de presencia para contar jugadores distintos;
+# por encima se ordenan los pares con np.unique
+MAX_CELDAS_PRESENCIA = 1 << 24
+
+
+def _codificar(serie: pd.Series) -> tuple:
+    """Código entero por fila (-1 si es nulo o no es un número finito) y valores de Python de cada código"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype(np.int32), serie.cat.categories.tolist()
+    if serie.dtype.kind == "f":
+        # Un infinito no es un valor que se pueda devolver en JSON: cuenta como nulo
+        serie = serie.where(np.isfinite(serie.to_numpy()))
+    codigos, valores = pd.factorize(serie, sort=True, use_na_sentinel=True)
+    return codigos.astype(np.int32), valores.tolist()
+
+
+def _tipo(serie: pd.Series) -> str:
+    """Tipo de los valores de Python que produce la columna (texto, entero o decimal)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.categories.dtype.kind
+    return serie.dtype.kind
+
+
+def _contar(serie: pd.Series) -> Dict[Any, int]:
+    conteos = serie.value_counts(dropna=True)
+    return {valor: cantidad for valor, cantidad in zip(conteos.index.tolist(), conteos.tolist()) if cantidad > 0}
+
+
+class Facetas:
+    """
+    Conteo de filas por valor de cada columna de facetas.
+
+    Args:
+        df: Tabla de la versión
+        conteos: Conteos ya calculados (ver ``parchear``); si es None se cuentan sobre ``df``
+    """
+
+    def __init__(self, df: pd.DataFrame, conteos: Optional[Dict[str, Dict[Any, int]]] = None):
+        self.tipos = {col: _tipo(df[col]) for col in COLUMNAS_FACETAS.values()}
+        self.conteos = conteos if conteos is not None else {col: _contar(df[col]) for col in COLUMNAS_FACETAS.values()}
+        self.total_filas = len(df)
+        self._df = df
+        self._codigos: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        for col in COLUMNAS_FACETAS.values():
+            self.codigos(col)
+
+        # Código de jugador por fila: el par (nombre, apellido), con el nulo como un valor más en
+        # cada parte, igual que cuenta len(df.groupby(['First name', 'Last name'])) en /datos
+        nombres, valores_nombres = self.codigos("First name")
+        apellidos, valores_apellidos = self.codigos("Last name")
+        pares = (nombres.astype(np.int64) + 1) * (len(valores_apellidos) + 1) + (apellidos + 1)
+        # Numerados de 0 a total_jugadores - 1 para contar distintos con una tabla de presencia
+        unicos, self.jugador = np.unique(pares, return_inverse=True)
+        self.total_jugadores = len(unicos)
+
+    @classmethod
+    def parchear(cls, anterior: "Facetas", df_anterior: pd.DataFrame, df: pd.DataFrame,
+                 quitadas: np.ndarray, sumadas: np.ndarray) -> "Facetas":
+        """
+        Facetas de ``df`` a partir de las de la versión anterior.
+
+        Args:
+            anterior: Facetas de la versión anterior
+            df_anterior: Tabla de la versión anterior
+            df: Tabla de la versión nueva
+            quitadas: Row ids de ``df_anterior`` que ya no están (eliminadas o modificadas)
+            sumadas: Row ids de ``df`` que no estaban (agregadas o modificadas)
+        """
+        conteos = {}
+        for col in COLUMNAS_FACETAS.values():
+            if _tipo(df[col]) != anterior.tipos[col]:
+                # Cambió el tipo de los valores (p. ej. enteros que pasan a decimales): se cuenta de nuevo
+                conteos[col] = _contar(df[col])
+                continue
+            actual = dict(anterior.conteos[col])
+            for valor, cantidad in _contar(df_anterior[col].iloc[quitadas]).items():
+                actual[valor] -= cantidad
+            for valor, cantidad in _contar(df[col].iloc[sumadas]).items():
+                actual[valor] = actual.get(valor, 0) + cantidad
+            conteos[col] = {valor: cantidad for valor, cantidad in actual.items() if cantidad > 0}
+        return cls(df, conteos)
+
+    def valores(self, nombre: str) -> List[Any]:
+        """Valores distintos ordenados de una faceta (``teams``, ``seasons``, ...)"""
+        return sorted(self.conteos[COLUMNAS_FACETAS[nombre]])
+
+    def codigos(self, col: str) -> tuple:
+        """Código por fila y valores de una columna (se calcula la primera vez que se pide)"""
+        with self._lock:
+            if col not in self._codigos:
+                self._codigos[col] = _codificar(self._df[col])
+            return self._codigos[col]
+
+    def distintos(self, col: str, filas: Optional[np.ndarray] = None) -> int:
+        """Cantidad de valores distintos de una columna, contando el nulo como uno más (como ``Series.unique``)"""
+        codigos, valores = self.codigos(col)
+        codigos = codigos if filas is None else codigos[filas]
+        presentes = np.bincount(codigos + 1, minlength=len(valores) + 1) > 0
+        return int(presentes.sum())
+
+    def jugadores_distintos(self, filas: Optional[np.ndarray] = None) -> int:
+        """Cantidad de pares (nombre, apellido) distintos"""
+        if filas is None:
+            return self.total_jugadores
+        presentes = np.zeros(self.total_jugadores, dtype=bool)
+        presentes[self.jugador[filas]] = True
+        return int(presentes.sum())
+
+    def jugadores_por_codigo(self, codigos: np.ndarray, jugadores: np.ndarray, cantidad: int) -> np.ndarray:
+        """
+        Jugadores distintos por código de grupo.
+
+        Args:
+            codigos: Código de grupo (0 a ``cantidad - 1``) de cada fila seleccionada
+            jugadores: Código de jugador (``self.jugador``) de las mismas filas
+            cantidad: Cantidad de grupos
+        """
+        # Pares (grupo, jugador) distintos: cada jugador cuenta una vez por grupo
+        pares = codigos.astype(np.int64) * self.total_jugadores + jugadores
+        if cantidad * self.total_jugadores <= MAX_CELDAS_PRESENCIA:
+            presentes = np.zeros(cantidad * self.total_jugadores, dtype=bool)
+            presentes[pares] = True
+            return presentes.reshape(cantidad, self.total_jugadores).sum(axis=1)
+        return np.bincount(np.unique(pares) // self.total_jugadores, minlength=cantidad)
+
+    def conteos_filtrados(self, param: str, filas: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Filas y jugadores distintos por valor de una columna filtrable, bajo una selección de filas.
+
+        Args:
+            param: Nombre del filtro de /datos (``team``, ``season``, ...)
+            filas: Row ids seleccionados por los filtros, o None para toda la tabla
+
+        Returns:
+            Valores con al menos una fila, de mayor a menor cantidad de filas
+        """
+        codigos, valores = self.codigos(COLUMNAS_FILTRABLES[param])
+        jugadores = self.jugador
+        if filas is not None:
+            codigos, jugadores = codigos[filas], jugadores[filas]
+        validos = codigos >= 0
+        codigos, jugadores = codigos[validos], jugadores[validos]
+
+        filas_por_valor = np.bincount(codigos, minlength=len(valores))
+        jugadores_por_valor = self.jugadores_por_codigo(codigos, jugadores, len(valores))
+
+        presentes = np.flatnonzero(filas_por_valor)
+        orden = presentes[np.argsort(-filas_por_valor[presentes], kind="stable")]
+        return [
+            {"value": valores[codigo], "records": int(filas_por_valor[codigo]), "players": int(jugadores_por_valor[codigo])}
+            for codigo in orden
+        ]
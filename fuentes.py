@@ -0,0 +1,228 @@
+"""
+Fuentes desde las que se descarga el CSV de jugadores.
+
+Todas entregan el CSV en bloques (``RespuestaFuente.partes``) para que
+``lectura.leer_csv_en_bloques`` lo parsee mientras llega, sin armar el archivo
+entero en memoria:
+
+- ``FuenteHTTP``: una URL (por defecto la exportación de Google Sheets),
+  descargada en streaming.
+- ``FuenteArchivo``: un archivo local.
+- ``FuenteCombinada``: varias fuentes (p. ej. varias pestañas ``gid`` de la
+  misma planilla) unidas en una sola tabla.
+
+``crear_fuente`` arma la fuente a partir de la configuración (``CSV_URL`` y
+``CSV_GIDS``).
+"""
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from typing import Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+import json
+import logging
+import os
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Bytes por bloque al leer de la red o de disco
+TAMANO_BLOQUE = 1 << 20
+
+
+@dataclass
+class RespuestaFuente:
+    """
+    Contenido descargado de una fuente junto con sus validadores HTTP.
+
+    El contenido llega entero (``contenido``, para fuentes chicas y pruebas) o
+    como una o más partes, cada una un CSV con encabezado que se lee en bloques
+    una sola vez.
+    """
+    contenido: Optional[bytes] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    partes: List[Iterable[bytes]] = field(default_factory=list)
+
+    def partes_en_bloques(self) -> List[Iterable[bytes]]:
+        """Las partes del CSV, cada una como un iterable de bloques de bytes"""
+        if self.contenido is not None:
+            return [[self.contenido]]
+        return self.partes
+
+
+class FuenteHTTP:
+    """
+    Descarga el CSV desde una URL (por defecto la exportación de Google Sheets).
+
+    Usa peticiones condicionales (If-None-Match / If-Modified-Since) cuando se
+    conocen los validadores de la versión anterior, de modo que un refresco sin
+    cambios no vuelve a transferir el archivo completo. El cuerpo se lee en
+    streaming a medida que se parsea.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+
+    def descargar(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[RespuestaFuente]:
+        """
+        Descarga el CSV. Devuelve None si el servidor responde 304 (sin cambios).
+
+        Raises:
+            requests.RequestException: Si la descarga falla
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        respuesta = requests.get(self.url, headers=headers, timeout=self.timeout, stream=True)
+        if respuesta.status_code == 304:
+            respuesta.close()
+            logger.info("La fuente respondió 304: el CSV no cambió")
+            return None
+        try:
+            respuesta.raise_for_status()
+        except requests.RequestException:
+            respuesta.close()
+            raise
+
+        return RespuestaFuente(
+            etag=respuesta.headers.get("ETag"),
+            last_modified=respuesta.headers.get("Last-Modified"),
+            partes=[self._bloques(respuesta)],
+        )
+
+    @staticmethod
+    def _bloques(respuesta: requests.Response) -> Iterator[bytes]:
+        try:
+            yield from respuesta.iter_content(TAMANO_BLOQUE)
+        finally:
+            respuesta.close()
+
+
+class FuenteArchivo:
+    """
+    Lee el CSV de un archivo local.
+
+    La fecha de modificación y el tamaño hacen de ETag: si no cambiaron desde
+    la versión anterior, ``descargar`` devuelve None sin leer el archivo.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def descargar(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[RespuestaFuente]:
+        """
+        Abre el CSV. Devuelve None si el archivo no cambió.
+
+        Raises:
+            OSError: Si el archivo no existe o no se puede leer
+        """
+        estado = os.stat(self.ruta)
+        actual = f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+        if etag is not None and etag == actual:
+            logger.info(f"El archivo {self.ruta} no cambió")
+            return None
+        return RespuestaFuente(
+            etag=actual,
+            last_modified=formatdate(estado.st_mtime, usegmt=True),
+            partes=[self._bloques()],
+        )
+
+    def _bloques(self) -> Iterator[bytes]:
+        with open(self.ruta, "rb") as archivo:
+            while True:
+                bloque = archivo.read(TAMANO_BLOQUE)
+                if not bloque:
+                    return
+                yield bloque
+
+
+def _unir_validadores(valores: Sequence[Optional[str]]) -> Optional[str]:
+    """Validadores de varias fuentes en uno solo (una lista JSON), o None si ninguna tiene"""
+    if all(valor is None for valor in valores):
+        return None
+    return json.dumps(list(valores))
+
+
+def _separar_validadores(valor: Optional[str], cantidad: int) -> List[Optional[str]]:
+    """Inversa de ``_unir_validadores``; sin validadores válidos, None para cada fuente"""
+    if valor:
+        try:
+            valores = json.loads(valor)
+        except ValueError:
+            valores = None
+        if isinstance(valores, list) and len(valores) == cantidad:
+            return valores
+    return [None] * cantidad
+
+
+class FuenteCombinada:
+    """
+    Une varias fuentes en una sola tabla: las filas de cada una, en orden.
+
+    Cada fuente conserva sus propios validadores (el ETag combinado es la lista
+    de todos), así que un refresco sin cambios en ninguna no transfiere nada.
+    Si cambió alguna, las demás se vuelven a leer completas para armar la tabla.
+    """
+
+    def __init__(self, fuentes: Sequence):
+        self.fuentes = list(fuentes)
+
+    def descargar(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[RespuestaFuente]:
+        """
+        Descarga todas las fuentes. Devuelve None si ninguna cambió.
+        """
+        etags = _separar_validadores(etag, len(self.fuentes))
+        fechas = _separar_validadores(last_modified, len(self.fuentes))
+        respuestas = [fuente.descargar(e, f) for fuente, e, f in zip(self.fuentes, etags, fechas)]
+        if all(respuesta is None for respuesta in respuestas):
+            return None
+        respuestas = [
+            respuesta if respuesta is not None else fuente.descargar()
+            for fuente, respuesta in zip(self.fuentes, respuestas)
+        ]
+        return RespuestaFuente(
+            etag=_unir_validadores([respuesta.etag for respuesta in respuestas]),
+            last_modified=_unir_validadores([respuesta.last_modified for respuesta in respuestas]),
+            partes=[parte for respuesta in respuestas for parte in respuesta.partes_en_bloques()],
+        )
+
+
+def _con_gid(url: str, gid: str) -> str:
+    """La URL de exportación de Google Sheets apuntando a otra pestaña"""
+    partes = urlsplit(url)
+    parametros = [(clave, valor) for clave, valor in parse_qsl(partes.query, keep_blank_values=True) if clave != "gid"]
+    return urlunsplit(partes._replace(query=urlencode([("gid", gid)] + parametros)))
+
+
+def _fuente_unica(ubicacion: str):
+    if ubicacion.startswith(("http://", "https://")):
+        return FuenteHTTP(ubicacion)
+    if ubicacion.startswith("file://"):
+        return FuenteArchivo(unquote(urlsplit(ubicacion).path))
+    return FuenteArchivo(ubicacion)
+
+
+def crear_fuente(ubicaciones: str, gids: str = ""):
+    """
+    Fuente del CSV según la configuración.
+
+    Args:
+        ubicaciones: URL ``http(s)://``, ``file://`` o ruta local; varias separadas por coma se combinan
+        gids: Pestañas (``gid``) de la planilla separadas por coma; cada URL se lee una vez por pestaña
+
+    Raises:
+        ValueError: Si no hay ninguna ubicación
+    """
+    lista = [ubicacion.strip() for ubicacion in ubicaciones.split(",") if ubicacion.strip()]
+    lista_gids = [gid.strip() for gid in gids.split(",") if gid.strip()]
+    if not lista:
+        raise ValueError("No se configuró ninguna fuente para el CSV")
+    if lista_gids:
+        lista = [_con_gid(ubicacion, gid) for ubicacion in lista for gid in lista_gids]
+    fuentes = [_fuente_unica(ubicacion) for ubicacion in lista]
+    return fuentes[0] if len(fuentes) == 1 else FuenteCombinada(fuentes)
@@ -0,0 +1,102 @@
+"""
+Configuración de gunicorn para servir la API con varios workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Los workers son de uvicorn (``WEB_CONCURRENCY``, por defecto 2) y no
+consultan la fuente: al arrancar, el master lanza el proceso
+cargador (``cargador.py``), que descarga y compacta el CSV y publica cada
+versión en ``SNAPSHOT_DIR``. Cada worker abre el snapshot con las columnas
+mapeadas en memoria (la tabla ocupa la memoria de la máquina una sola vez) y
+cambia de versión cuando el cargador publica una generación nueva.
+
+Todo esto solo con ``DATASET_MODO=lector`` (el valor por defecto); si el
+entorno ya fija otro modo, se respeta y el master no lanza el cargador.
+
+Un hilo del master vigila al cargador y lo relanza si termina, con una
+espera creciente si se cae enseguida una y otra vez. Mientras no late, los
+workers responden 503 en ``/health/ready`` (``CARGADOR_LATIDO_MAX_SEGUNDOS``).
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# Pocos workers por defecto: la tabla mapeada se comparte, pero cada worker construye sus propios índices,
+# agrupaciones, JSON precalculado y cachés, y en un plan con poca memoria uno por CPU la multiplica
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Las respuestas grandes (exportaciones) pueden tardar más que el timeout por defecto
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+accesslog = "-"
+
+# Los workers heredan el entorno del master: por defecto siguen al cargador en lugar de descargar el CSV
+# (con otro DATASET_MODO explícito, como autonomo, no se lanza el cargador)
+DATASET_MODO = os.environ.setdefault("DATASET_MODO", "lector")
+
+# Segundos entre comprobaciones de que el cargador sigue corriendo
+VIGILANCIA_SEGUNDOS = 2.0
+# Un cargador que termina antes de esto cuenta como caída seguida para la espera antes de relanzarlo
+VIDA_MINIMA_SEGUNDOS = 60.0
+ESPERA_MAXIMA_SEGUNDOS = 60.0
+
+_cargador = None
+_lanzado_en = 0.0
+_parar = threading.Event()
+_vigilante = None
+
+
+def comando_cargador() -> list:
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cargador.py")]
+
+
+def _lanzar_cargador(server):
+    global _cargador, _lanzado_en
+    entorno = {**os.environ, "DATASET_MODO": "cargador"}
+    _cargador = subprocess.Popen(comando_cargador(), env=entorno)
+    _lanzado_en = time.monotonic()
+    server.log.info(f"Cargador del dataset lanzado (pid {_cargador.pid})")
+
+
+def _vigilar_cargador(server):
+    """Relanza el cargador cada vez que termina, hasta que el master se detiene"""
+    caidas = 0
+    while not _parar.wait(VIGILANCIA_SEGUNDOS):
+        # poll() también lo cosecha; si ya lo cosechó el master (SIGCHLD) devuelve 0
+        codigo = _cargador.poll()
+        if codigo is None:
+            continue
+        caidas = caidas + 1 if time.monotonic() - _lanzado_en < VIDA_MINIMA_SEGUNDOS else 1
+        espera = min(2 ** (caidas - 1), ESPERA_MAXIMA_SEGUNDOS)
+        server.log.error(f"El cargador del dataset terminó (código {codigo}); se relanza en {espera:g}s")
+        if _parar.wait(espera):
+            return
+        _lanzar_cargador(server)
+
+
+def on_starting(server):
+    global _vigilante
+    if DATASET_MODO != "lector":
+        server.log.info(f"DATASET_MODO={DATASET_MODO}: no se lanza el cargador del dataset")
+        return
+    _parar.clear()
+    _lanzar_cargador(server)
+    _vigilante = threading.Thread(target=_vigilar_cargador, args=(server,), name="vigilancia-cargador", daemon=True)
+    _vigilante.start()
+
+
+def on_exit(server):
+    # Primero se detiene la vigilancia, para que no lo relance mientras se lo termina
+    _parar.set()
+    if _vigilante is not None:
+        _vigilante.join(timeout=VIGILANCIA_SEGUNDOS + 1)
+    if _cargador is None or _cargador.poll() is not None:
+        return
+    _cargador.terminate()
+    try:
+        _cargador.wait(timeout=graceful_timeout)
+    except subprocess.TimeoutExpired:
+        _cargador.kill()
@@ -0,0 +1,504 @@
+"""
+Índices de filtrado construidos una vez por versión del dataset.
+
+Los filtros de ``/datos`` devuelven conjuntos de posiciones de fila (row ids)
+ordenados que se intersecan empezando por el más pequeño, en lugar de recorrer
+la tabla completa con ``str.contains`` una vez por filtro.
+
+Los filtros de texto aceptan varios valores separados por coma (``team=A,B``,
+la unión de cada uno) y los de rango (temporada, altura, peso y fecha de
+nacimiento) se resuelven por bisección sobre los valores ya ordenados.
+
+Con varios filtros, un plan (``IndiceFiltros.planificar``) cuenta primero
+cuántas filas cumple cada condición con las frecuencias de los índices (la
+cantidad de filas de cada valor distinto, o la bisección sobre los valores
+ordenados) y las evalúa de la más selectiva a la menos: si alguna no tiene
+filas el resultado es vacío sin evaluar ninguna, y cuando las candidatas que
+quedan son muchas menos que las filas de la condición siguiente, esta se
+comprueba solo sobre esas candidatas en lugar de recorrer su índice.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from metricas import medir
+
+logger = logging.getLogger(__name__)
+
+# Parámetro de /datos -> columna del CSV
+COLUMNAS_TEXTO = {
+    "team": "Team",
+    "position": "Position",
+    "nationality": "Nationality",
+    "first_name": "Adjusted first name",
+    "last_name": "Adjusted last name",
+    "birthdate": "Birthdate",
+}
+COLUMNAS_NUMERICAS = {
+    "season": "Season",
+    "height": "Height",
+    "weight": "Weight",
+}
+
+# Filtros de rango (extremos inclusivos): parámetro -> (columna indexada, extremo)
+FILTROS_RANGO = {
+    "season_from": ("season", "desde"),
+    "season_to": ("season", "hasta"),
+    "height_min": ("height", "desde"),
+    "height_max": ("height", "hasta"),
+    "weight_min": ("weight", "desde"),
+    "weight_max": ("weight", "hasta"),
+    "birthdate_from": ("birthdate", "desde"),
+    "birthdate_to": ("birthdate", "hasta"),
+}
+
+# Caracteres con significado especial en una expresión regular
+_METACARACTERES = set(".^$*+?{}[]\\|()")
+
+# Longitud máxima de los n-gramas indexados
+_N_MAXIMO = 3
+
+# Resultados de filtrado recordados por versión (p. ej. para las páginas sucesivas de un cursor)
+_MAX_RESULTADOS_RECORDADOS = 128
+
+# Una condición se comprueba sobre las candidatas (sin recorrer su índice) si cumple
+# al menos este múltiplo de la cantidad de candidatas que quedan
+_FACTOR_VERIFICACION = 4
+
+# Patrones de texto con sus valores coincidentes recordados por índice
+_MAX_PATRONES_RECORDADOS = 256
+
+_VACIO = np.empty(0, dtype=np.int64)
+
+
+def _es_literal(patron: str) -> bool:
+    """True si el patrón no usa sintaxis de expresiones regulares"""
+    return not any(c in _METACARACTERES for c in patron)
+
+
+def _ngramas(texto: str, n: int) -> Set[str]:
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceTexto:
+    """
+    Índice invertido sobre los valores distintos de una columna de texto.
+
+    Cada valor distinto tiene su lista de row ids, y un índice de n-gramas
+    (hasta trigramas, sobre el texto en minúsculas) permite descartar los
+    valores que no pueden contener un patrón literal. La coincidencia final se
+    comprueba siempre con la misma expresión regular que usaría
+    ``Series.str.contains(patron, case=False, na=False)``, por lo que la
+    semántica es idéntica, incluidos los patrones con sintaxis de regex.
+    """
+
+    def __init__(self, serie: pd.Series, anterior: Optional["IndiceTexto"] = None):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Columna ya codificada: se reutilizan su diccionario y sus códigos
+            categorias = serie.cat.categories
+            codigos = serie.cat.codes.to_numpy()
+            self.es_texto = categorias.dtype == object or pd.api.types.is_string_dtype(categorias.dtype)
+        else:
+            codigos, categorias = pd.factorize(serie, use_na_sentinel=True)
+            self.es_texto = serie.dtype == object or pd.api.types.is_string_dtype(serie.dtype)
+        self.categorias: List[str] = [str(c) for c in categorias]
+        self.codigos = codigos
+
+        # Row ids agrupados por código: los de la categoría c están en orden[limites[c]:limites[c + 1]]
+        self._orden = np.argsort(codigos, kind="stable")
+        codigos_ordenados = codigos[self._orden]
+        self._limites = np.searchsorted(codigos_ordenados, np.arange(len(self.categorias) + 1), side="left")
+        # Filas de cada valor distinto: la frecuencia con la que el plan estima cada condición
+        self.frecuencias = np.diff(self._limites)
+        self._coincidencias: Dict[str, np.ndarray] = {}
+
+        if anterior is not None and anterior.categorias == self.categorias:
+            # Mismos valores distintos que la versión anterior: los n-gramas no cambian
+            self._ngramas = anterior._ngramas
+            return
+        self._ngramas: Dict[str, Set[int]] = {}
+        for codigo, categoria in enumerate(self.categorias):
+            plegada = categoria.casefold()
+            for n in range(1, _N_MAXIMO + 1):
+                for gram in _ngramas(plegada, n):
+                    self._ngramas.setdefault(gram, set()).add(codigo)
+
+    def filas_de(self, codigo: int) -> np.ndarray:
+        return self._orden[self._limites[codigo]:self._limites[codigo + 1]]
+
+    def candidatos(self, patron: str) -> range | Set[int]:
+        """Códigos de categoría que podrían contener el patrón"""
+        if not _es_literal(patron):
+            return range(len(self.categorias))
+        plegado = patron.casefold()
+        n = min(_N_MAXIMO, len(plegado))
+        grams = sorted((self._ngramas.get(g, set()) for g in _ngramas(plegado, n)), key=len)
+        if not grams:
+            return range(len(self.categorias))
+        resultado = set(grams[0])
+        for conjunto in grams[1:]:
+            resultado &= conjunto
+            if not resultado:
+                break
+        return resultado
+
+    def coincidencias(self, patron: str) -> np.ndarray:
+        """
+        Códigos de los valores distintos que contienen el patrón sin distinguir mayúsculas.
+
+        Raises:
+            re.error: Si el patrón no es una expresión regular válida
+            AttributeError: Si la columna no es de texto (igual que ``.str``)
+        """
+        if not self.es_texto:
+            raise AttributeError("Can only use .str accessor with string values!")
+        codigos = self._coincidencias.get(patron)
+        if codigos is None:
+            regex = re.compile(patron, flags=re.IGNORECASE)
+            codigos = np.array(sorted(c for c in self.candidatos(patron) if regex.search(self.categorias[c]) is not None), dtype=np.int64)
+            if len(self._coincidencias) >= _MAX_PATRONES_RECORDADOS:
+                self._coincidencias.clear()
+            self._coincidencias[patron] = codigos
+        return codigos
+
+    def buscar(self, patron: str) -> np.ndarray:
+        """
+        Row ids (ordenados) cuyo valor contiene el patrón sin distinguir mayúsculas.
+
+        Raises:
+            re.error: Si el patrón no es una expresión regular válida
+            AttributeError: Si la columna no es de texto (igual que ``.str``)
+        """
+        coincidencias = self.coincidencias(patron)
+        if not len(coincidencias):
+            return _VACIO
+        if len(coincidencias) == 1:
+            return np.sort(self.filas_de(coincidencias[0]))
+        return np.sort(np.concatenate([self.filas_de(c) for c in coincidencias]))
+
+
+class IndiceNumerico:
+    """
+    Índice ordenado sobre una columna numérica: los valores se ordenan una vez
+    y la igualdad se resuelve por bisección (``searchsorted``).
+    """
+
+    def __init__(self, serie: pd.Series):
+        valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64)
+        # Valores en el orden de las filas, para comprobar solo algunas filas sin recorrer el índice
+        self._por_fila = valores
+        self._orden = np.argsort(valores, kind="stable")
+        self._valores = valores[self._orden]
+
+    def _tramo_igual(self, valor: float) -> Tuple[int, int]:
+        if valor is None or np.isnan(valor):
+            return 0, 0
+        return np.searchsorted(self._valores, valor, side="left"), np.searchsorted(self._valores, valor, side="right")
+
+    def _tramo_rango(self, desde: Optional[float], hasta: Optional[float]) -> Tuple[int, int]:
+        izquierda = 0 if desde is None else np.searchsorted(self._valores, desde, side="left")
+        # Los NaN quedan al final del orden: "sin tope" llega hasta el último valor no nulo
+        derecha = np.searchsorted(self._valores, np.inf if hasta is None else hasta, side="right")
+        return izquierda, max(izquierda, derecha)
+
+    def igual(self, valor: float) -> np.ndarray:
+        """Row ids (ordenados) cuyo valor es igual a ``valor``"""
+        izquierda, derecha = self._tramo_igual(valor)
+        if izquierda >= derecha:
+            return _VACIO
+        return np.sort(self._orden[izquierda:derecha])
+
+    def rango(self, desde: Optional[float] = None, hasta: Optional[float] = None) -> np.ndarray:
+        """Row ids (ordenados) con ``desde <= valor <= hasta``; un extremo None no acota y los nulos nunca entran"""
+        izquierda, derecha = self._tramo_rango(desde, hasta)
+        if izquierda >= derecha:
+            return _VACIO
+        return np.sort(self._orden[izquierda:derecha])
+
+    def contar_igual(self, valor: float) -> int:
+        izquierda, derecha = self._tramo_igual(valor)
+        return int(derecha - izquierda)
+
+    def contar_rango(self, desde: Optional[float] = None, hasta: Optional[float] = None) -> int:
+        izquierda, derecha = self._tramo_rango(desde, hasta)
+        return int(derecha - izquierda)
+
+    def valores_de(self, filas: np.ndarray) -> np.ndarray:
+        """Valores de esas filas (NaN los nulos)"""
+        return self._por_fila[filas]
+
+
+def dias_desde_epoca(fechas: np.ndarray) -> np.ndarray:
+    """Fechas ``datetime64[D]`` como días desde 1970-01-01 en float (NaN si son NaT)"""
+    dias = fechas.astype("datetime64[D]").astype(np.int64).astype(np.float64)
+    dias[np.isnat(fechas)] = np.nan
+    return dias
+
+
+def dia_de(fecha: str) -> float:
+    """Una fecha ``YYYY-MM-DD`` como días desde 1970-01-01"""
+    return float(np.datetime64(fecha, "D").astype(np.int64))
+
+
+@dataclass
+class PasoPlan:
+    """
+    Un paso del plan de filtrado.
+
+    ``estimadas`` son las filas que cumple la condición sola (según las
+    frecuencias del índice) y ``filas`` las que quedan después de aplicarla
+    sobre las de los pasos anteriores (None si no llegó a evaluarse).
+    ``estrategia`` es ``recordado`` (row ids ya calculados), ``indice``
+    (recorriendo el índice e intersecando), ``verificacion`` (comprobando
+    solo las filas que quedaban) u ``omitido``.
+    """
+    condicion: Dict[str, object]
+    estimadas: int
+    estrategia: str = "omitido"
+    filas: Optional[int] = None
+    tiempo_ms: float = 0.0
+
+    def json(self) -> Dict[str, Any]:
+        return {
+            "condition": self.condicion,
+            "estimated_rows": self.estimadas,
+            "strategy": self.estrategia,
+            "rows_after": self.filas,
+            "time_ms": round(self.tiempo_ms, 3),
+        }
+
+
+class IndiceFiltros:
+    """
+    Índices de todas las columnas filtrables de ``/datos``.
+
+    Args:
+        df: Tabla de la versión
+        anterior: Índices de la versión anterior, de los que se reutilizan los
+            n-gramas de las columnas cuyos valores distintos no cambiaron
+        fechas: Fecha de nacimiento de cada fila como ``datetime64[D]``, para
+            los filtros por rango de fecha y edad (None los desactiva)
+    """
+
+    def __init__(self, df: pd.DataFrame, anterior: Optional["IndiceFiltros"] = None, fechas: Optional[np.ndarray] = None):
+        self.total_filas = len(df)
+        previos = anterior.texto if anterior is not None else {}
+        self.texto = {param: IndiceTexto(df[col], previos.get(param)) for param, col in COLUMNAS_TEXTO.items() if col in df.columns}
+        self.numerico = {param: IndiceNumerico(df[col]) for param, col in COLUMNAS_NUMERICAS.items() if col in df.columns}
+        if fechas is not None:
+            self.numerico["birthdate"] = IndiceNumerico(pd.Series(dias_desde_epoca(fechas)))
+        self._recordados: "OrderedDict[Tuple, Optional[np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filtrar(self, filtros: Dict[str, Optional[object]]) -> Optional[np.ndarray]:
+        """
+        Row ids que cumplen todos los filtros, o None si no se aplicó ninguno.
+
+        Los filtros vacíos se ignoran con las mismas reglas que la versión
+        original de ``obtener_datos``: texto y temporada si son "verdaderos",
+        altura y peso si no son None. Los últimos resultados se recuerdan, así
+        que las páginas sucesivas de una misma consulta no vuelven a filtrar.
+        El array devuelto es de solo lectura.
+
+        Raises:
+            KeyError: Si se filtra por una columna que no existe en el CSV
+        """
+        clave = _clave(filtros)
+        with self._lock:
+            if clave in self._recordados:
+                self._recordados.move_to_end(clave)
+                return self._recordados[clave]
+
+        filas = self._filtrar(filtros)
+        if filas is not None:
+            filas.flags.writeable = False
+        with self._lock:
+            self._recordados[clave] = filas
+            if len(self._recordados) > _MAX_RESULTADOS_RECORDADOS:
+                self._recordados.popitem(last=False)
+        return filas
+
+    def explicar(self, filtros: Dict[str, Optional[object]]) -> Tuple[Optional[np.ndarray], List[PasoPlan]]:
+        """
+        Ejecuta el plan de los filtros y devuelve los row ids junto con sus pasos.
+
+        No usa el resultado recordado de la combinación completa (sí el de cada
+        condición), así que los pasos muestran el plan aunque la consulta ya
+        se haya hecho.
+
+        Raises:
+            KeyError: Si se filtra por una columna que no existe en el CSV
+        """
+        condiciones = self._condiciones(filtros)
+        if not condiciones:
+            return None, []
+        pasos = self.planificar(condiciones)
+        filas = self._ejecutar(pasos)
+        filas.flags.writeable = False
+        return filas, pasos
+
+    def _condiciones(self, filtros: Dict[str, Optional[object]]) -> List[Dict[str, object]]:
+        # Cada condición: los filtros que la definen y el índice que la resuelve
+        condiciones = []
+        for param in COLUMNAS_TEXTO:
+            patron = filtros.get(param)
+            if patron:
+                if param not in self.texto:
+                    raise KeyError(COLUMNAS_TEXTO[param])
+                condiciones.append({param: patron})
+        for param in COLUMNAS_NUMERICAS:
+            valor = filtros.get(param)
+            if valor is None or (param == "season" and not valor):
+                continue
+            if param not in self.numerico:
+                raise KeyError(COLUMNAS_NUMERICAS[param])
+            condiciones.append({param: valor})
+        rangos: Dict[str, Dict[str, object]] = {}
+        for param, (columna, _) in FILTROS_RANGO.items():
+            if filtros.get(param) is not None:
+                if columna not in self.numerico:
+                    raise KeyError(COLUMNAS_TEXTO.get(columna) or COLUMNAS_NUMERICAS[columna])
+                # Los dos extremos de una misma columna forman una sola condición
+                rangos.setdefault(columna, {})[param] = filtros[param]
+        condiciones.extend(rangos.values())
+        return condiciones
+
+    def _filtrar(self, filtros: Dict[str, Optional[object]]) -> Optional[np.ndarray]:
+        condiciones = self._condiciones(filtros)
+        if not condiciones:
+            return None
+        if len(condiciones) == 1:
+            return self._condicion(condiciones[0])
+        return self._ejecutar(self.planificar(condiciones))
+
+    def estimar(self, condicion: Dict[str, object]) -> int:
+        """Filas que cumple una condición, contadas con las frecuencias del índice sin armar sus row ids"""
+        param, valor = next(iter(condicion.items()))
+        if param in COLUMNAS_TEXTO:
+            return int(self.texto[param].frecuencias[self._codigos_texto(param, valor)].sum())
+        if param in COLUMNAS_NUMERICAS:
+            return self.numerico[param].contar_igual(valor)
+        columna, desde, hasta = self._extremos(condicion)
+        return self.numerico[columna].contar_rango(desde, hasta)
+
+    def planificar(self, condiciones: List[Dict[str, object]]) -> List[PasoPlan]:
+        """
+        Ordena las condiciones de la más selectiva a la menos.
+
+        A igual cantidad de filas van primero las que ya tienen sus row ids
+        recordados.
+        """
+        with medir("plan"):
+            pasos = [PasoPlan(condicion, self.estimar(condicion)) for condicion in condiciones]
+            with self._lock:
+                recordadas = {id(paso): _clave(paso.condicion) in self._recordados for paso in pasos}
+            pasos.sort(key=lambda paso: (paso.estimadas, not recordadas[id(paso)]))
+        return pasos
+
+    def _ejecutar(self, pasos: List[PasoPlan]) -> np.ndarray:
+        """Row ids que cumplen todos los pasos del plan, completando en cada paso las filas y el tiempo"""
+        if pasos[0].estimadas == 0:
+            # Alguna condición no tiene filas: el resultado es vacío sin recorrer ningún índice
+            pasos[0].filas = 0
+            return _VACIO
+        resultado: Optional[np.ndarray] = None
+        for paso in pasos:
+            inicio = time.perf_counter()
+            with self._lock:
+                recordado = _clave(paso.condicion) in self._recordados
+            if resultado is not None and not recordado and len(resultado) * _FACTOR_VERIFICACION <= paso.estimadas:
+                # Quedan pocas candidatas frente a las filas de la condición: se comprueban solo esas
+                paso.estrategia = "verificacion"
+                resultado = self._verificar(paso.condicion, resultado)
+            else:
+                # Cada condición pasa por filtrar(), así que las consultas que comparten
+                # un filtro (la misma temporada, el mismo equipo) reutilizan sus row ids
+                paso.estrategia = "recordado" if recordado else "indice"
+                filas = self.filtrar(paso.condicion)
+                resultado = filas if resultado is None else np.intersect1d(resultado, filas, assume_unique=True)
+            paso.filas = len(resultado)
+            paso.tiempo_ms = (time.perf_counter() - inicio) * 1000
+            if not len(resultado):
+                break
+        return resultado
+
+    def _condicion(self, condicion: Dict[str, object]) -> np.ndarray:
+        """Row ids que cumplen una única condición (un filtro, o los extremos de un rango)"""
+        param, valor = next(iter(condicion.items()))
+        if param in COLUMNAS_TEXTO:
+            with medir(f"filtro_{param}"):
+                partes = _partes(valor)
+                if len(partes) == 1:
+                    return self.texto[param].buscar(partes[0])
+                return np.unique(np.concatenate([self.texto[param].buscar(parte) for parte in partes]))
+        if param in COLUMNAS_NUMERICAS:
+            with medir(f"filtro_{param}"):
+                return self.numerico[param].igual(valor)
+
+        columna, desde, hasta = self._extremos(condicion)
+        with medir(f"filtro_{columna}_rango"):
+            return self.numerico[columna].rango(desde, hasta)
+
+    def _verificar(self, condicion: Dict[str, object], filas: np.ndarray) -> np.ndarray:
+        """De unos row ids ordenados, los que además cumplen la condición, comprobando solo esas filas"""
+        param, valor = next(iter(condicion.items()))
+        if param in COLUMNAS_TEXTO:
+            with medir(f"filtro_{param}"):
+                return filas[np.isin(self.texto[param].codigos[filas], self._codigos_texto(param, valor))]
+        if param in COLUMNAS_NUMERICAS:
+            with medir(f"filtro_{param}"):
+                return filas[self.numerico[param].valores_de(filas) == valor]
+
+        columna, desde, hasta = self._extremos(condicion)
+        with medir(f"filtro_{columna}_rango"):
+            valores = self.numerico[columna].valores_de(filas)
+            # Los nulos (NaN) no cumplen ninguna de las dos comparaciones
+            mascara = (valores >= (-np.inf if desde is None else desde)) & (valores <= (np.inf if hasta is None else hasta))
+            return filas[mascara]
+
+    def _codigos_texto(self, param: str, valor: str) -> np.ndarray:
+        """Códigos de los valores distintos que coinciden con alguna de las partes del filtro"""
+        indice = self.texto[param]
+        partes = _partes(valor)
+        if len(partes) == 1:
+            return indice.coincidencias(partes[0])
+        return np.unique(np.concatenate([indice.coincidencias(parte) for parte in partes]))
+
+    @staticmethod
+    def _extremos(condicion: Dict[str, object]) -> Tuple[str, Optional[float], Optional[float]]:
+        """Columna y extremos (None si no acota) de una condición de rango"""
+        columna = FILTROS_RANGO[next(iter(condicion))][0]
+        extremos = {FILTROS_RANGO[p][1]: v for p, v in condicion.items()}
+        if columna == "birthdate":
+            extremos = {extremo: dia_de(fecha) for extremo, fecha in extremos.items()}
+        return columna, extremos.get("desde"), extremos.get("hasta")
+
+
+def _clave(filtros: Dict[str, Optional[object]]) -> Tuple:
+    """Clave de los resultados recordados: los filtros indicados, en orden"""
+    return tuple(sorted((k, v) for k, v in filtros.items() if v is not None))
+
+
+# Caracteres que hacen de un valor una expresión regular
+_METACARACTERES = frozenset(".^$*+?{}[]()|\\")
+
+
+def _partes(valor: str) -> List[str]:
+    """
+    Varios valores separados por coma: la unión de cada uno.
+
+    Solo se separan los valores sin metacaracteres de expresión regular; uno
+    con ellos es una única expresión (``a{1,3}``, ``(x|y),z``), donde ``|``
+    une alternativas y ``\\,`` es una coma literal.
+    """
+    if "," not in valor or not _METACARACTERES.isdisjoint(valor):
+        return [valor]
+    partes = [parte.strip() for parte in valor.split(",") if parte.strip()]
+    return partes or [valor]
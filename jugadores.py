@@ -0,0 +1,108 @@
+"""
+Identidad de los jugadores: un ID entero estable por jugador y sus fichas.
+
+Un jugador es la combinación de nombre, apellido, nombre y apellido
+ajustados y fecha de nacimiento. Su ID se deriva de un hash de esos valores,
+así que es el mismo en cada versión del dataset, en cada worker y después de
+reiniciar, y los clientes pueden guardarlo. Por versión se mantienen las
+filas de cada jugador y sus dos registros ya codificados (la ficha con el
+formato de ``group_by=player`` y la trayectoria con el de ``group_by=career``),
+por lo que ``/jugadores/{id}`` y ``/jugadores/{id}/trayectoria`` son una
+búsqueda en un diccionario.
+"""
+from typing import Dict, List, Optional
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+from agrupaciones import CLAVE_JUGADOR, Agrupacion, Agrupaciones
+
+logger = logging.getLogger(__name__)
+
+CLAVE_IDENTIDAD = CLAVE_JUGADOR + ['Birthdate']
+
+# Campos de los registros con los valores de CLAVE_JUGADOR
+_CAMPOS_NOMBRE = ("nombre", "apellido", "nombre_ajustado", "apellido_ajustado")
+
+# Los IDs se limitan a 53 bits para que sean enteros exactos en JavaScript
+_BITS_ID = 53
+
+
+def id_jugador(clave: tuple) -> int:
+    """ID estable de un jugador a partir de los valores de ``CLAVE_IDENTIDAD`` (los nulos cuentan como vacíos)"""
+    texto = "\x1f".join("" if pd.isna(valor) else str(valor) for valor in clave)
+    resumen = hashlib.sha1(texto.encode("utf-8")).digest()
+    return int.from_bytes(resumen[:8], "big") >> (64 - _BITS_ID)
+
+
+class TablaJugadores:
+    """
+    Jugadores de una versión del dataset, indexados por ID.
+
+    Args:
+        df: Tabla de la versión
+        agrupaciones: Agrupaciones de la versión, que arman los registros
+        anterior: Tabla de la versión anterior; los jugadores cuyas filas no
+            cambiaron reutilizan sus registros
+        mapa_filas: Fila anterior idéntica a cada fila de esta versión, o -1
+    """
+
+    def __init__(self, df: pd.DataFrame, agrupaciones: Agrupaciones, anterior: Optional["TablaJugadores"] = None,
+                 mapa_filas: Optional[np.ndarray] = None):
+        grupos = df.groupby(CLAVE_IDENTIDAD, sort=False, dropna=False, observed=True).indices
+        por_id: Dict[int, np.ndarray] = {}
+        for clave in sorted(grupos, key=lambda clave: tuple("" if pd.isna(v) else str(v) for v in clave)):
+            identificador = id_jugador(clave)
+            while identificador in por_id:
+                # Colisión de hash (muy improbable): el siguiente libre, en orden de clave
+                logger.warning(f"Colisión de ID de jugador para {clave}")
+                identificador = (identificador + 1) % (1 << _BITS_ID)
+            por_id[identificador] = np.sort(grupos[clave])
+
+        self.ids: List[int] = sorted(por_id)
+        self.posicion = {identificador: posicion for posicion, identificador in enumerate(self.ids)}
+        self.filas_por_jugador = [por_id[identificador] for identificador in self.ids]
+        # A diferencia de group_by, un jugador puede tener alguna parte del nombre vacía
+        self._nombres_nulos = df[CLAVE_JUGADOR].isna().to_numpy()
+        self.id_de_fila = np.full(len(df), -1, dtype=np.int64)
+        for identificador, filas in zip(self.ids, self.filas_por_jugador):
+            self.id_de_fila[filas] = identificador
+
+        previas = (anterior.fichas, anterior.trayectorias) if anterior is not None else (None, None)
+        self.fichas = Agrupacion(
+            self.ids, self.filas_por_jugador, lambda filas: self._con_id(filas, agrupaciones.registro("player", filas)),
+            len(df), previas[0], mapa_filas
+        )
+        self.trayectorias = Agrupacion(
+            self.ids, self.filas_por_jugador, lambda filas: self._con_id(filas, agrupaciones.registro("career", filas)),
+            len(df), previas[1], mapa_filas
+        )
+        logger.info(f"Tabla de jugadores: {len(self.ids)} jugadores ({self.fichas.reutilizados} sin cambios)")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _con_id(self, filas: np.ndarray, registro: dict) -> dict:
+        """Registro con el ID del jugador y null en las partes del nombre que faltan"""
+        registro = {"id": int(self.id_de_fila[filas[0]]), **registro}
+        for campo, nulo in zip(_CAMPOS_NOMBRE, self._nombres_nulos[filas[0]]):
+            if nulo:
+                registro[campo] = None
+        return registro
+
+    def filas(self, identificador: int) -> Optional[np.ndarray]:
+        """Row ids de un jugador, o None si el ID no existe en esta versión"""
+        posicion = self.posicion.get(identificador)
+        return None if posicion is None else self.filas_por_jugador[posicion]
+
+    def ficha_json(self, identificador: int) -> Optional[bytes]:
+        """Ficha del jugador (formato de group_by=player más su ID), o None si no existe"""
+        posicion = self.posicion.get(identificador)
+        return None if posicion is None else self.fichas.fragmentos[posicion]
+
+    def trayectoria_json(self, identificador: int) -> Optional[bytes]:
+        """Trayectoria del jugador (formato de group_by=career más su ID), o None si no existe"""
+        posicion = self.posicion.get(identificador)
+        return None if posicion is None else self.trayectorias.fragmentos[posicion]
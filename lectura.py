@@ -0,0 +1,248 @@
+"""
+Lectura del CSV de jugadores en bloques.
+
+El CSV no se arma entero en memoria: los bytes llegan de la fuente en bloques
+(ver ``fuentes.RespuestaFuente``), ``pd.read_csv`` los parsea de a
+``filas_por_bloque`` filas y cada bloque se suma a la representación compacta
+(ver ``compactacion``) antes de leer el siguiente. Así el pico de memoria de
+una carga es la tabla compacta más un bloque, no el archivo más la tabla
+parseada completa.
+
+- Solo se leen las columnas esperadas (``usecols``); las demás se ignoran con
+  un aviso en el log. Las columnas se validan con el encabezado de cada
+  parte, antes de parsear filas: si falta alguna la carga falla con
+  ``ColumnasFaltantes``.
+- Cada columna tiene su tipo explícito (``dtype``), así que ``pandas`` no
+  infiere tipos y todos los bloques salen con el mismo. Las de texto se leen
+  como ``object`` y se van codificando sobre un diccionario que crece bloque a
+  bloque; al final pasan a categóricas con las categorías ordenadas, o a texto
+  si tienen demasiados valores distintos.
+- Las numéricas se leen como ``float64`` (un valor que no es un número hace
+  fallar la carga con ``ValorNoNumerico``) y se unen al final. Si la columna
+  entera no tiene nulos ni decimales pasa a enteros, como la deja una lectura
+  completa, así que la salida JSON no cambia.
+
+La versión (SHA-1 del contenido de todas las partes) se calcula mientras se
+leen los bytes.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import hashlib
+import io
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+
+from compactacion import MAX_PROPORCION_DISTINTOS, compactar_columna, reporte_columnas
+
+logger = logging.getLogger(__name__)
+
+# Columnas que tiene que tener el CSV, en el orden de la planilla
+COLUMNAS_ESPERADAS = (
+    "First name", "Last name", "Adjusted first name", "Adjusted last name",
+    "Team", "Season", "Position", "Height", "Weight", "Nationality", "Birthdate",
+)
+
+# Columnas numéricas; el resto se lee como texto
+COLUMNAS_NUMERICAS = ("Season", "Height", "Weight")
+
+_BYTES_NAN = sys.getsizeof(float("nan"))
+
+# Filas que se parsean por bloque
+FILAS_POR_BLOQUE = 50_000
+
+
+class ColumnasFaltantes(ValueError):
+    """El CSV no tiene todas las columnas esperadas"""
+
+    def __init__(self, faltantes: List[str], encontradas: List[str]):
+        self.faltantes = faltantes
+        self.encontradas = encontradas
+        super().__init__(
+            f"Al CSV le faltan las columnas {', '.join(repr(c) for c in faltantes)}. "
+            f"Columnas encontradas: {', '.join(repr(c) for c in encontradas) or 'ninguna'}"
+        )
+
+
+class ValorNoNumerico(ValueError):
+    """Una columna numérica del CSV tiene un valor que no es un número"""
+
+    def __init__(self, detalle: str):
+        super().__init__(
+            f"El CSV tiene un valor que no es un número en las columnas {', '.join(repr(c) for c in COLUMNAS_NUMERICAS)}: {detalle}"
+        )
+
+
+class LectorPartes(io.RawIOBase):
+    """
+    Archivo de solo lectura sobre un iterable de bloques de bytes, que calcula
+    el hash de lo que se va leyendo.
+
+    Args:
+        bloques: Bloques del archivo, en orden
+        hash_contenido: Hash al que se agregan los bytes leídos (se comparte entre partes)
+    """
+
+    def __init__(self, bloques: Iterable[bytes], hash_contenido):
+        self._bloques = iter(bloques)
+        self._hash = hash_contenido
+        self._pendiente = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        while not len(self._pendiente):
+            bloque = next(self._bloques, None)
+            if bloque is None:
+                return 0
+            self._hash.update(bloque)
+            self._pendiente = memoryview(bloque)
+        cantidad = min(len(destino), len(self._pendiente))
+        destino[:cantidad] = self._pendiente[:cantidad]
+        self._pendiente = self._pendiente[cantidad:]
+        return cantidad
+
+
+class _ColumnaTexto:
+    """
+    Columna de texto como códigos enteros por bloque; los valores distintos de
+    todos los bloques se unifican en un solo diccionario al final.
+    """
+
+    def __init__(self):
+        self.bloques: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Lo que ocuparía la columna parseada (un objeto str por celda), como memory_usage(deep=True)
+        self.bytes = 0
+
+    def agregar(self, serie: pd.Series):
+        codigos, unicos = pd.factorize(serie.to_numpy(dtype=object))
+        tamanos = np.fromiter(map(sys.getsizeof, unicos), dtype=np.int64, count=len(unicos))
+        repeticiones = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+        self.bytes += 8 * len(codigos) + int(tamanos @ repeticiones) + _BYTES_NAN * int((codigos < 0).sum())
+        self.bloques.append((codigos.astype(np.int32), unicos))
+
+    def construir(self, compacto: bool) -> pd.Series:
+        # Código global de los valores distintos de cada bloque
+        globales, valores = pd.factorize(np.concatenate([unicos for _, unicos in self.bloques]))
+        valores = np.asarray(valores, dtype=object)
+        total = sum(len(codigos) for codigos, _ in self.bloques)
+        if compacto and total and len(valores) <= MAX_PROPORCION_DISTINTOS * total:
+            # Mismas categorías (ordenadas) y códigos que astype("category")
+            orden = np.argsort(valores, kind="stable")
+            posicion = np.empty(len(valores), dtype=np.int32)
+            posicion[orden] = np.arange(len(valores), dtype=np.int32)
+            globales, valores = posicion[globales], valores[orden]
+        codigos = np.empty(total, dtype=np.int32)
+        inicio, desde = 0, 0
+        for codigos_bloque, unicos in self.bloques:
+            # El código -1 (nulo) toma el último elemento
+            traduccion = np.append(globales[desde:desde + len(unicos)], -1).astype(np.int32)
+            codigos[inicio:inicio + len(codigos_bloque)] = traduccion[codigos_bloque]
+            inicio, desde = inicio + len(codigos_bloque), desde + len(unicos)
+        self.bloques = []
+        if compacto and total and len(valores) <= MAX_PROPORCION_DISTINTOS * total:
+            return pd.Series(pd.Categorical.from_codes(codigos, categories=valores))
+        return pd.Series(np.append(valores, np.nan)[codigos], dtype=object)
+
+
+class _ColumnaNumerica:
+    """Bloques de una columna numérica, que se unen (y compactan) al final"""
+
+    def __init__(self):
+        self.bloques: List[pd.Series] = []
+        # Tipo de la columna antes de compactar (el de una lectura completa)
+        self.tipo = "float64"
+
+    @property
+    def bytes(self) -> int:
+        return sum(int(bloque.memory_usage(index=False, deep=True)) for bloque in self.bloques)
+
+    def agregar(self, serie: pd.Series):
+        self.bloques.append(serie.reset_index(drop=True))
+
+    def construir(self, compacto: bool) -> pd.Series:
+        serie = pd.concat(self.bloques, ignore_index=True) if len(self.bloques) > 1 else self.bloques[0]
+        self.bloques = []
+        valores = serie.to_numpy()
+        enteros = np.isfinite(valores).all() and (valores == np.floor(valores)).all() and (np.abs(valores) < 2 ** 53).all()
+        if len(valores) and enteros:
+            # Sin nulos ni decimales en toda la columna: enteros, como infiere una lectura completa
+            serie = serie.astype(np.int64)
+        self.tipo = str(serie.dtype)
+        return compactar_columna(serie) if compacto else serie
+
+
+def _bloques_de_parte(bloques: Iterable[bytes], hash_contenido, columnas_vistas: Set[str],
+                      filas_por_bloque: int) -> Iterator[pd.DataFrame]:
+    lector = io.BufferedReader(LectorPartes(bloques, hash_contenido), buffer_size=1 << 20)
+
+    def usar(columna: str) -> bool:
+        columnas_vistas.add(columna)
+        return columna in COLUMNAS_ESPERADAS
+
+    tipos = {col: np.float64 if col in COLUMNAS_NUMERICAS else object for col in COLUMNAS_ESPERADAS}
+    with pd.read_csv(lector, usecols=usar, dtype=tipos, chunksize=filas_por_bloque) as lector_csv:
+        # El encabezado ya se leyó al abrir el lector: se valida aunque la parte no tenga filas
+        faltantes = [col for col in COLUMNAS_ESPERADAS if col not in columnas_vistas]
+        if faltantes:
+            raise ColumnasFaltantes(faltantes, sorted(columnas_vistas))
+        try:
+            yield from lector_csv
+        except pd.errors.ParserError:
+            # Un CSV mal formado (filas con otra cantidad de campos, comillas sin cerrar) no es un valor no numérico
+            raise
+        except ValueError as e:
+            raise ValorNoNumerico(str(e)) from None
+
+
+def leer_csv_en_bloques(partes: Iterable[Iterable[bytes]], compacto: bool = True,
+                        filas_por_bloque: int = FILAS_POR_BLOQUE) -> Tuple[pd.DataFrame, str, Optional[Dict[str, Any]]]:
+    """
+    Parsea uno o más CSVs (cada uno con su encabezado) y los une en una sola tabla.
+
+    Args:
+        partes: Un iterable de bloques de bytes por CSV
+        compacto: Dejar la tabla en la representación compacta
+        filas_por_bloque: Filas que se parsean a la vez
+
+    Returns:
+        La tabla, su versión (los primeros 12 caracteres del SHA-1 del
+        contenido de todas las partes) y, si ``compacto``, el reporte de
+        memoria (ver ``compactacion.reporte_memoria``)
+
+    Raises:
+        ColumnasFaltantes: Si a alguna parte le falta una de las columnas esperadas
+        ValorNoNumerico: Si una columna numérica tiene un valor que no es un número
+    """
+    hash_contenido = hashlib.sha1()
+    columnas: Optional[List[str]] = None
+    acumuladas: Dict[str, Any] = {}
+    ignoradas: Set[str] = set()
+
+    for bloques in partes:
+        vistas: Set[str] = set()
+        for bloque in _bloques_de_parte(bloques, hash_contenido, vistas, filas_por_bloque):
+            if columnas is None:
+                columnas = list(bloque.columns)
+                acumuladas = {
+                    col: _ColumnaNumerica() if col in COLUMNAS_NUMERICAS else _ColumnaTexto()
+                    for col in columnas
+                }
+            for col in columnas:
+                acumuladas[col].agregar(bloque[col])
+        ignoradas |= vistas - set(COLUMNAS_ESPERADAS)
+
+    if columnas is None:
+        raise ValueError("La fuente no devolvió ningún CSV")
+    if ignoradas:
+        logger.warning(f"Se ignoran las columnas del CSV que no se usan: {', '.join(sorted(ignoradas))}")
+
+    bytes_antes = {col: acumuladas[col].bytes for col in columnas}
+    df = pd.DataFrame({col: acumuladas[col].construir(compacto) for col in columnas}, columns=columnas)
+    version = hash_contenido.hexdigest()[:12]
+    if not compacto:
+        return df, version, None
+    tipos_antes = {col: getattr(acumuladas[col], "tipo", "object") for col in columnas}
+    return df, version, reporte_columnas(tipos_antes, bytes_antes, df)
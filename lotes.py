@@ -0,0 +1,141 @@
+"""
+Ejecución de varias consultas de ``/datos`` en una sola petición (``POST /datos/batch``).
+
+Todas las consultas de un lote se resuelven sobre la misma versión del
+dataset, aunque se publique otra mientras tanto. Antes de calcular las
+páginas se filtra una vez cada combinación distinta de filtros (y cada filtro
+individual queda recordado en ``IndiceFiltros``), así que las consultas que
+comparten equipo o temporada reutilizan esos row ids. Las páginas se pueden
+calcular en paralelo en un pool de hilos; cada resultado lleva su tiempo.
+Cada consulta del pool corre con una copia del contexto de la petición, así
+que respeta su plazo y sus tramos quedan en la traza de la petición.
+"""
+from concurrent.futures import Executor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional
+import contextvars
+import logging
+import re
+import time
+
+from cache_respuestas import RespuestaCacheada
+from consultas import Consulta, CursorInvalido, CursorVencido, decodificar_cursor
+from ejecucion import PlazoVencido, comprobar_plazo
+from serializacion import FragmentoJSON, componer_json, lista_json
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResultadoLote:
+    """Resultado de una consulta del lote: el cuerpo que devolvería /datos o el error"""
+    estado: int
+    tiempo_ms: float
+    cuerpo: Optional[bytes] = None
+    detalle: Optional[str] = None
+    siguiente_cursor: Optional[str] = None
+
+    def json(self) -> bytes:
+        contenido: Dict[str, Any] = {"status": self.estado, "time_ms": self.tiempo_ms}
+        if self.cuerpo is not None:
+            if self.siguiente_cursor:
+                contenido["next_cursor"] = self.siguiente_cursor
+            contenido["body"] = FragmentoJSON(self.cuerpo)
+        else:
+            contenido["detail"] = self.detalle
+        return componer_json(contenido)
+
+
+def preparar_consulta(dataset, parametros: Dict[str, Any]) -> Consulta:
+    """
+    Consulta normalizada a partir de los parámetros de una entrada del lote.
+
+    Raises:
+        CursorInvalido: Si el cursor está mal formado o es de otra consulta
+        CursorVencido: Si el cursor es de una versión anterior del dataset
+    """
+    parametros = dict(parametros)
+    cursor = parametros.pop("cursor", None)
+    parametros["include_stats"] = bool(parametros.get("include_stats"))
+    consulta = Consulta(**parametros)
+    if cursor is not None:
+        consulta = replace(consulta, despues_de=decodificar_cursor(cursor, dataset.version, consulta))
+    return consulta
+
+
+def _resolver(dataset, parametros: Dict[str, Any], responder: Callable[[Consulta], RespuestaCacheada]) -> ResultadoLote:
+    # Si el lote ya venció, las consultas que faltan ni empiezan
+    comprobar_plazo()
+    inicio = time.perf_counter()
+    try:
+        consulta = preparar_consulta(dataset, parametros)
+        entrada = responder(consulta)
+        estado, cuerpo, detalle = 200, entrada.cuerpo, None
+        siguiente = entrada.headers.get("X-Next-Cursor")
+    except CursorInvalido as e:
+        estado, cuerpo, detalle, siguiente = 400, None, str(e), None
+    except CursorVencido as e:
+        estado, cuerpo, detalle, siguiente = 410, None, str(e), None
+    except re.error as e:
+        estado, cuerpo, detalle, siguiente = 400, None, f"Expresión regular inválida: {str(e)}", None
+    except PlazoVencido:
+        # Vence el lote entero, no solo esta consulta
+        raise
+    except Exception as e:
+        logger.error(f"Error en una consulta del lote {parametros}: {str(e)}")
+        estado, cuerpo, detalle, siguiente = 500, None, f"Error al leer el archivo CSV: {str(e)}", None
+    tiempo_ms = round((time.perf_counter() - inicio) * 1000, 3)
+    return ResultadoLote(estado, tiempo_ms, cuerpo, detalle, siguiente)
+
+
+def ejecutar_lote(dataset, lote: List[Dict[str, Any]], responder: Callable[[Consulta], RespuestaCacheada],
+                  ejecutor: Optional[Executor] = None) -> bytes:
+    """
+    Resuelve todas las consultas de un lote sobre una versión del dataset.
+
+    Args:
+        dataset: Versión del dataset compartida por todo el lote
+        lote: Parámetros de cada consulta, con los mismos nombres que ``/datos``
+        responder: Calcula (o toma de la caché) la respuesta de /datos de una consulta
+        ejecutor: Pool en el que se calculan las consultas en paralelo; None para hacerlo en orden
+
+    Returns:
+        Cuerpo JSON con la versión usada, el tiempo total y un resultado por
+        consulta, en el mismo orden que el lote
+    """
+    inicio = time.perf_counter()
+
+    # Cada combinación distinta de filtros se calcula una sola vez antes de repartir las páginas.
+    # Es solo un precalentamiento: si una combinación falla, el error se informa en el resultado
+    # de cada consulta afectada y las demás siguen
+    combinaciones = {}
+    for parametros in lote:
+        try:
+            filtros = Consulta(**{k: v for k, v in parametros.items() if k != "cursor"}).filtros_indice()
+        except Exception:
+            continue
+        combinaciones.setdefault(tuple(filtros.items()), filtros)
+    for filtros in combinaciones.values():
+        try:
+            dataset.indices.filtrar(filtros)
+        except Exception:
+            pass
+
+    if ejecutor is None or len(lote) < 2:
+        resultados = [_resolver(dataset, parametros, responder) for parametros in lote]
+    else:
+        # Un contexto por consulta: el mismo Context no puede estar activo en dos hilos a la vez
+        futuros = [
+            ejecutor.submit(contextvars.copy_context().run, _resolver, dataset, parametros, responder)
+            for parametros in lote
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    total_ms = round((time.perf_counter() - inicio) * 1000, 3)
+    logger.info(f"Lote de {len(lote)} consultas resuelto en {total_ms} ms (dataset versión {dataset.version})")
+    return componer_json({
+        "dataset_version": dataset.version,
+        "parallel": ejecutor is not None,
+        "total_time_ms": total_ms,
+        "results": lista_json([resultado.json() for resultado in resultados])
+    })
@@ -1,19 +1,148 @@
 from typing import List, Dict, Any, Optional
-import pandas as pd
-import numpy as np
-from fastapi import FastAPI, HTTPException, Query
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from datetime import date
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
 import logging
+import os
+import tempfile
+
+from arranque import Arranque, precalentar
+from cache_respuestas import CacheRespuestas, calcular_etag, etag_coincide
+from compresion import codificaciones_habilitadas, comprimir, comprimir_en_bloques, elegir_codificacion
+from configuracion import crear_gestor_dataset
+from consultas import Consulta, CursorInvalido, CursorVencido, FacetaDesconocida, contar_facetas, decodificar_cursor, ejecutar_consulta, explicar_consulta, resumir_estadisticas
+from dataset import LectorDataset
+from ejecucion import EjecutorConsultas, PlazoVencido, Saturado
+from estadisticas import PercentilesInvalidos, leer_percentiles
+from exportacion import FORMATOS_EXPORTACION, exportar_csv, exportar_ndjson
+from facetas import FACETAS_POR_DEFECTO
+from lotes import ejecutar_lote
+from metricas import CONTENT_TYPE_PROMETHEUS, MiddlewareMetricas, medir, metrica_simple, registro
+from perfilador import PerfiladorMuestreo
+from serializacion import JSONRapido, lista_json
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Componer /datos a partir de fragmentos JSON precodificados por versión (misma salida, menos CPU)
+JSON_RAPIDO = os.getenv("JSON_RAPIDO", "true").lower() == "true"
+
+# Número máximo de respuestas guardadas en la caché LRU (0 la desactiva)
+CACHE_RESPUESTAS_MAX = int(os.getenv("CACHE_RESPUESTAS_MAX", "512"))
+
+# Cache-Control de las respuestas de datos, para que un CDN pueda absorber el tráfico repetido
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "public, max-age=60")
+
+# Formato de las fechas de los filtros por rango
+FORMATO_FECHA = r"^\d{4}-\d{2}-\d{2}$"
+
+# Codificaciones de las respuestas, en orden de preferencia (br y zstd solo si están instalados; vacío desactiva la compresión)
+COMPRESION = os.getenv("COMPRESION", "br,zstd,gzip")
+
+# Tamaño mínimo en bytes de una respuesta para comprimirla
+COMPRESION_MIN_BYTES = int(os.getenv("COMPRESION_MIN_BYTES", "1024"))
+
+# Número máximo de consultas en un POST /datos/batch
+LOTE_MAX_CONSULTAS = int(os.getenv("LOTE_MAX_CONSULTAS", "20"))
+
+# Hilos para resolver en paralelo las consultas de un lote
+LOTE_HILOS = int(os.getenv("LOTE_HILOS", "4"))
+
+# Consultas que se calculan a la vez en el pool, fuera del event loop
+CONSULTAS_HILOS = int(os.getenv("CONSULTAS_HILOS", "4"))
+
+# Consultas que pueden esperar un hilo libre; con la cola llena se responde 503 con Retry-After
+CONSULTAS_COLA_MAX = int(os.getenv("CONSULTAS_COLA_MAX", "32"))
+
+# Segundos que tiene cada consulta, cola incluida, antes de cancelarla con un 504 (0 sin límite)
+CONSULTAS_PLAZO_SEGUNDOS = float(os.getenv("CONSULTAS_PLAZO_SEGUNDOS", "30"))
+
+# Agregar el header Server-Timing con la duración de los tramos de cada petición
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+
+# Guardar el perfil por muestreo de las peticiones que tarden más de estos milisegundos (0 lo desactiva)
+PERFIL_LENTO_MS = float(os.getenv("PERFIL_LENTO_MS", "0"))
+
+# Milisegundos entre muestras del perfilador
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "5"))
+
+# Carpeta donde se guardan los perfiles de las peticiones lentas
+PERFIL_DIR = os.getenv("PERFIL_DIR", os.path.join(tempfile.gettempdir(), "arg-lnb-perfiles"))
+
+# Respuestas que cada worker precalcula al arrancar, antes de declararse listo en /health/ready (separadas por coma; vacío no precalcula ninguna)
+PRECALENTAR_RUTAS = os.getenv(
+    "PRECALENTAR_RUTAS",
+    "/info,/datos,/datos?group_by=player,/datos?group_by=team,/datos?group_by=season,/datos?group_by=career,/datos/facets,/stats"
+)
+
+# Segundos entre reintentos de una etapa del arranque que falló (p. ej. la fuente del CSV no responde)
+ARRANQUE_REINTENTO_SEGUNDOS = float(os.getenv("ARRANQUE_REINTENTO_SEGUNDOS", "5"))
+
+# Dataset compartido por todas las peticiones
+gestor_dataset = crear_gestor_dataset()
+
+# Respuestas ya codificadas por (versión del dataset, ruta, consulta normalizada)
+cache_respuestas = CacheRespuestas(CACHE_RESPUESTAS_MAX)
+
+# Codificaciones instaladas de las que pidió COMPRESION
+codificaciones = codificaciones_habilitadas(COMPRESION)
+
+# Pool acotado en el que se calculan las consultas, con admisión y plazos
+ejecutor_consultas = EjecutorConsultas(CONSULTAS_HILOS, CONSULTAS_COLA_MAX, CONSULTAS_PLAZO_SEGUNDOS)
+
+# Pool de las consultas de /datos/batch con parallel=true
+ejecutor_lotes = ThreadPoolExecutor(max_workers=LOTE_HILOS, thread_name_prefix="lote")
+
+# Perfilador de peticiones lentas (solo si se activó con PERFIL_LENTO_MS)
+perfilador = PerfiladorMuestreo(PERFIL_LENTO_MS, PERFIL_DIR, PERFIL_INTERVALO_MS) if PERFIL_LENTO_MS > 0 else None
+
+# Etapas del arranque de este worker y bandera de /health/ready
+arranque = Arranque(ARRANQUE_REINTENTO_SEGUNDOS)
+
+def etapas_arranque(app: FastAPI):
+    """
+    Etapas del arranque: cargar el dataset, esperar sus estructuras derivadas
+    (índices, facetas, agrupaciones) y precalcular las respuestas de PRECALENTAR_RUTAS
+    """
+    async def cargar_dataset():
+        await gestor_dataset.iniciar()
+        await gestor_dataset.obtener()
+    
+    async def precalcular_respuestas():
+        rutas = [ruta.strip() for ruta in PRECALENTAR_RUTAS.split(",") if ruta.strip()]
+        # app.router: las peticiones del precálculo no pasan por las métricas de tráfico
+        await precalentar(app.router, rutas, codificaciones)
+    
+    return [
+        ("dataset", cargar_dataset),
+        ("estructuras", gestor_dataset.esperar_preparacion),
+        ("respuestas", precalcular_respuestas),
+    ]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranca en segundo plano la carga del CSV, las estructuras derivadas y el
+    precálculo de las respuestas más pedidas (el servidor ya responde /health
+    mientras tanto) y mantiene el refresco periódico mientras la app está activa
+    """
+    arranque.iniciar(etapas_arranque(app))
+    yield
+    await arranque.detener()
+    await gestor_dataset.detener()
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="API CSV desde Google Drive",
     description="API REST que lee automáticamente un archivo CSV desde Google Drive y lo expone en formato JSON",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -23,10 +152,143 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos los métodos HTTP
     allow_headers=["*"],  # Permite todos los headers
+    expose_headers=["Server-Timing"],
 )
 
-# URL del archivo CSV en Google Drive
-CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vSf4n2VLM5ie-XRD3_ZzwoOfukCTZLoF_KgJRsCKDHVZ-OJ9ugG1hL5gc32Y24gUgngxkzX-FuYpBF7/pub?gid=20714965&single=true&output=csv"
+# Métricas de Prometheus, Server-Timing y perfilador (por fuera de CORS, para medir la petición completa)
+app.add_middleware(MiddlewareMetricas, server_timing=SERVER_TIMING, perfilador=perfilador)
+
+@app.exception_handler(Saturado)
+async def responder_saturado(request: Request, exc: Saturado):
+    """503 con Retry-After cuando el pool de consultas está lleno"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.reintentar_en)})
+
+@app.exception_handler(PlazoVencido)
+async def responder_plazo_vencido(request: Request, exc: PlazoVencido):
+    """504 cuando una consulta no terminó dentro de CONSULTAS_PLAZO_SEGUNDOS"""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+async def responder_con_cache(request: Request, dataset, ruta: str, clave: str, calcular) -> Response:
+    """
+    Devuelve la respuesta cacheada de una consulta (o la calcula), con ETag y Cache-Control.
+
+    El ETag depende solo de la versión del dataset y de la consulta, así que un
+    If-None-Match que coincide se responde con 304 sin calcular nada. Las
+    respuestas que no están en la caché se calculan en el pool de consultas,
+    sin bloquear el event loop.
+
+    Si el cliente acepta alguna de las codificaciones habilitadas y el cuerpo
+    supera COMPRESION_MIN_BYTES, se envía comprimido; la versión comprimida se
+    guarda en la entrada de la caché. Con codificación negociada el ETag es
+    débil, porque los bytes dependen de Accept-Encoding.
+    """
+    codificacion = negociar_codificacion(request)
+    etag = calcular_etag(dataset.version, ruta, clave)
+    etag_enviado = f"W/{etag}" if codificacion else etag
+    headers = {"Cache-Control": CACHE_CONTROL, "X-Dataset-Version": dataset.version, "Vary": "Accept-Encoding"}
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag_enviado, **headers})
+    
+    entrada = cache_respuestas.buscar(dataset.version, ruta, clave)
+    if entrada is None or (codificacion is not None and len(entrada.cuerpo) >= COMPRESION_MIN_BYTES and codificacion not in entrada.comprimidos):
+        # Si buscar ya la encontró (falta comprimirla), el acierto ya está contado
+        entrada = await ejecutor_consultas.ejecutar(obtener_respuesta, dataset.version, ruta, clave, calcular, codificacion, entrada is None)
+    
+    cuerpo = entrada.cuerpo
+    if codificacion is not None and len(cuerpo) >= COMPRESION_MIN_BYTES:
+        cuerpo = entrada.codificado(codificacion)
+        headers["Content-Encoding"] = codificacion
+    return Response(
+        content=cuerpo,
+        media_type="application/json",
+        headers={"ETag": etag_enviado, **headers, **entrada.headers}
+    )
+
+def negociar_codificacion(request: Request) -> Optional[str]:
+    """Codificación habilitada que prefiere el cliente según Accept-Encoding, o None"""
+    return elegir_codificacion(request.headers.get("accept-encoding"), codificaciones)
+
+def codificar_cuerpo(cuerpo: bytes, codificacion: Optional[str]):
+    """Cuerpo de una respuesta que no pasa por la caché, comprimido si corresponde, y sus headers"""
+    if codificacion is None or len(cuerpo) < COMPRESION_MIN_BYTES:
+        return cuerpo, {"Vary": "Accept-Encoding"}
+    with medir("compresion"):
+        return comprimir(cuerpo, codificacion), {"Vary": "Accept-Encoding", "Content-Encoding": codificacion}
+
+def obtener_respuesta(version: str, ruta: str, clave: str, calcular, codificacion: Optional[str], contar_acierto: bool = True):
+    """Entrada de la caché (calculada si falta) con el cuerpo ya comprimido para ``codificacion``"""
+    entrada = cache_respuestas.obtener(version, ruta, clave, calcular, contar_acierto)
+    if codificacion is not None and len(entrada.cuerpo) >= COMPRESION_MIN_BYTES:
+        with medir("compresion"):
+            entrada.codificado(codificacion)
+    return entrada
+
+def filtros_rango(
+    season_from: Optional[int] = Query(default=None, description="Temporada desde (inclusive)"),
+    season_to: Optional[int] = Query(default=None, description="Temporada hasta (inclusive)"),
+    height_min: Optional[float] = Query(default=None, description="Altura mínima en cm"),
+    height_max: Optional[float] = Query(default=None, description="Altura máxima en cm"),
+    weight_min: Optional[float] = Query(default=None, description="Peso mínimo en kg"),
+    weight_max: Optional[float] = Query(default=None, description="Peso máximo en kg"),
+    birthdate_from: Optional[str] = Query(default=None, pattern=FORMATO_FECHA, description="Nacidos desde esta fecha (YYYY-MM-DD, inclusive)"),
+    birthdate_to: Optional[str] = Query(default=None, pattern=FORMATO_FECHA, description="Nacidos hasta esta fecha (YYYY-MM-DD, inclusive)"),
+    age_min: Optional[int] = Query(default=None, ge=0, description="Edad mínima hoy, en años cumplidos"),
+    age_max: Optional[int] = Query(default=None, ge=0, description="Edad máxima hoy, en años cumplidos")
+) -> Dict[str, Any]:
+    """Filtros de rango comunes a /datos, /datos/export y /datos/facets"""
+    return {
+        "season_from": season_from,
+        "season_to": season_to,
+        "height_min": height_min,
+        "height_max": height_max,
+        "weight_min": weight_min,
+        "weight_max": weight_max,
+        "birthdate_from": birthdate_from,
+        "birthdate_to": birthdate_to,
+        "age_min": age_min,
+        "age_max": age_max
+    }
+
+def calcular_datos(dataset, consulta: Consulta):
+    """Cuerpo de /datos para una consulta y el header del cursor siguiente, si lo hay"""
+    resultado = ejecutar_consulta(dataset, consulta, json_rapido=JSON_RAPIDO)
+    headers = {}
+    if resultado.extra.get("next_cursor"):
+        headers["X-Next-Cursor"] = resultado.extra["next_cursor"]
+    with medir("serializacion"):
+        return JSONRapido(resultado.contenido).body, headers
+
+class ConsultaLote(BaseModel):
+    """Una consulta de /datos/batch, con los mismos parámetros que GET /datos"""
+    page: int = Field(default=1, ge=1, description="Número de página (empezando en 1)")
+    limit: int = Field(default=50, ge=1, le=100, description="Número de registros por página (máximo 100)")
+    team: Optional[str] = Field(default=None, description="Filtrar por equipo (varios separados por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)")
+    season: Optional[int] = Field(default=None, description="Filtrar por temporada")
+    position: Optional[str] = Field(default=None, description="Filtrar por posición (G, F, C, PG, SG, SF, PF; varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)")
+    nationality: Optional[str] = Field(default=None, description="Filtrar por nacionalidad (varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)")
+    first_name: Optional[str] = Field(default=None, description="Filtrar por nombre ajustado del jugador")
+    last_name: Optional[str] = Field(default=None, description="Filtrar por apellido ajustado del jugador")
+    birthdate: Optional[str] = Field(default=None, description="Filtrar por fecha de nacimiento (YYYY-MM-DD)")
+    height: Optional[float] = Field(default=None, description="Filtrar por altura en cm")
+    weight: Optional[float] = Field(default=None, description="Filtrar por peso en kg")
+    season_from: Optional[int] = Field(default=None, description="Temporada desde (inclusive)")
+    season_to: Optional[int] = Field(default=None, description="Temporada hasta (inclusive)")
+    height_min: Optional[float] = Field(default=None, description="Altura mínima en cm")
+    height_max: Optional[float] = Field(default=None, description="Altura máxima en cm")
+    weight_min: Optional[float] = Field(default=None, description="Peso mínimo en kg")
+    weight_max: Optional[float] = Field(default=None, description="Peso máximo en kg")
+    birthdate_from: Optional[str] = Field(default=None, pattern=FORMATO_FECHA, description="Nacidos desde esta fecha (YYYY-MM-DD, inclusive)")
+    birthdate_to: Optional[str] = Field(default=None, pattern=FORMATO_FECHA, description="Nacidos hasta esta fecha (YYYY-MM-DD, inclusive)")
+    age_min: Optional[int] = Field(default=None, ge=0, description="Edad mínima hoy, en años cumplidos")
+    age_max: Optional[int] = Field(default=None, ge=0, description="Edad máxima hoy, en años cumplidos")
+    group_by: Optional[str] = Field(default=None, description="Agrupar resultados por: 'player', 'team', 'season' o 'career'")
+    include_stats: Optional[bool] = Field(default=False, description="Incluir estadísticas básicas en la respuesta")
+    cursor: Optional[str] = Field(default=None, description="Paginación por cursor, como en GET /datos")
+
+class Lote(BaseModel):
+    """Cuerpo de POST /datos/batch"""
+    queries: List[ConsultaLote] = Field(description="Consultas a resolver, en orden")
+    parallel: bool = Field(default=False, description="Resolver las consultas en paralelo")
 
 @app.get("/")
 async def root():
@@ -44,19 +306,23 @@ async def root():
 
 @app.get("/datos")
 async def obtener_datos(
+    request: Request,
     page: int = Query(default=1, ge=1, description="Número de página (empezando en 1)"),
     limit: int = Query(default=50, ge=1, le=100, description="Número de registros por página (máximo 100)"),
-    team: Optional[str] = Query(default=None, description="Filtrar por equipo"),
+    team: Optional[str] = Query(default=None, description="Filtrar por equipo (varios separados por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
     season: Optional[int] = Query(default=None, description="Filtrar por temporada"),
-    position: Optional[str] = Query(default=None, description="Filtrar por posición (G, F, C, PG, SG, SF, PF)"),
-    nationality: Optional[str] = Query(default=None, description="Filtrar por nacionalidad"),
+    position: Optional[str] = Query(default=None, description="Filtrar por posición (G, F, C, PG, SG, SF, PF; varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    nationality: Optional[str] = Query(default=None, description="Filtrar por nacionalidad (varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
     first_name: Optional[str] = Query(default=None, description="Filtrar por nombre ajustado del jugador"),
     last_name: Optional[str] = Query(default=None, description="Filtrar por apellido ajustado del jugador"),
     birthdate: Optional[str] = Query(default=None, description="Filtrar por fecha de nacimiento (YYYY-MM-DD)"),
     height: Optional[float] = Query(default=None, description="Filtrar por altura en cm"),
     weight: Optional[float] = Query(default=None, description="Filtrar por peso en kg"),
+    rangos: Dict[str, Any] = Depends(filtros_rango),
     group_by: Optional[str] = Query(default=None, description="Agrupar resultados por: 'player' (jugador único), 'team' (por equipo), 'season' (por temporada), 'career' (trayectoria completa por jugador)"),
-    include_stats: Optional[bool] = Query(default=False, description="Incluir estadísticas básicas en la respuesta")
+    include_stats: Optional[bool] = Query(default=False, description="Incluir estadísticas básicas en la respuesta"),
+    cursor: Optional[str] = Query(default=None, description="Paginación por cursor: vacío para empezar, luego el valor de 'X-Next-Cursor' (o de stats.next_cursor) de la respuesta anterior. Si se indica, 'page' se ignora"),
+    explain: Optional[bool] = Query(default=False, description="En lugar de los datos, devolver el plan de filtrado: el orden en que se evaluaron los filtros, las filas estimadas y las que quedaron en cada paso")
 ):
     """
     Endpoint que lee el archivo CSV desde Google Drive y devuelve los datos en formato JSON con paginación y filtros.
@@ -76,387 +342,463 @@ async def obtener_datos(
         HTTPException: Si hay un error al leer el archivo CSV
     """
     try:
-        logger.info("Iniciando lectura del archivo CSV desde Google Drive")
+        # Obtener la versión del CSV en memoria (solo se descarga si aún no hay ninguna)
+        dataset = await gestor_dataset.obtener()
+        
+        logger.info(f"Usando dataset versión {dataset.version}. Filas: {len(dataset.df)}, Columnas: {len(dataset.df.columns)}")
         
-        # Leer el archivo CSV desde la URL
-        df = pd.read_csv(CSV_URL)
+        consulta = Consulta(
+            page=page,
+            limit=limit,
+            team=team,
+            season=season,
+            position=position,
+            nationality=nationality,
+            first_name=first_name,
+            last_name=last_name,
+            birthdate=birthdate,
+            height=height,
+            weight=weight,
+            **rangos,
+            group_by=group_by,
+            include_stats=bool(include_stats)
+        )
+        if explain:
+            # El plan no se guarda en la caché: sus tiempos son los de esta ejecución
+            plan = await ejecutor_consultas.ejecutar(explicar_consulta, dataset, consulta)
+            return JSONResponse(content=plan, headers={"X-Dataset-Version": dataset.version, "Cache-Control": "no-store"})
+        if cursor is not None:
+            consulta = replace(consulta, despues_de=decodificar_cursor(cursor, dataset.version, consulta))
         
-        logger.info(f"CSV leído exitosamente. Filas: {len(df)}, Columnas: {len(df.columns)}")
+        return await responder_con_cache(request, dataset, "/datos", consulta.clave(), lambda: calcular_datos(dataset, consulta))
         
-        # Aplicar filtros si se proporcionan
-        if team:
-            df = df[df['Team'].str.contains(team, case=False, na=False)]
-            logger.info(f"Filtrado por equipo '{team}': {len(df)} registros")
-            
-        if season:
-            df = df[df['Season'] == season]
-            logger.info(f"Filtrado por temporada {season}: {len(df)} registros")
-            
-        if position:
-            df = df[df['Position'].str.contains(position, case=False, na=False)]
-            logger.info(f"Filtrado por posición '{position}': {len(df)} registros")
-            
-        if nationality:
-            df = df[df['Nationality'].str.contains(nationality, case=False, na=False)]
-            logger.info(f"Filtrado por nacionalidad '{nationality}': {len(df)} registros")
-            
-        if first_name:
-            df = df[df['Adjusted first name'].str.contains(first_name, case=False, na=False)]
-            logger.info(f"Filtrado por nombre ajustado '{first_name}': {len(df)} registros")
-            
-        if last_name:
-            df = df[df['Adjusted last name'].str.contains(last_name, case=False, na=False)]
-            logger.info(f"Filtrado por apellido ajustado '{last_name}': {len(df)} registros")
-            
-        if birthdate:
-            df = df[df['Birthdate'].str.contains(birthdate, case=False, na=False)]
-            logger.info(f"Filtrado por fecha de nacimiento '{birthdate}': {len(df)} registros")
-            
-        if height is not None:
-            df = df[df['Height'] == height]
-            logger.info(f"Filtrado por altura {height}cm: {len(df)} registros")
-            
-        if weight is not None:
-            df = df[df['Weight'] == weight]
-            logger.info(f"Filtrado por peso {weight}kg: {len(df)} registros")
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CursorVencido as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except (Saturado, PlazoVencido):
+        raise
+    except Exception as e:
+        logger.error(f"Error al leer el archivo CSV: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al leer el archivo CSV: {str(e)}"
+        )
+
+@app.post("/datos/batch")
+async def obtener_datos_lote(request: Request, lote: Lote):
+    """
+    Endpoint que resuelve varias consultas de /datos en una sola petición.
+    
+    Todas se ejecutan sobre la misma versión del dataset, compartiendo los
+    filtros en común y la caché de respuestas de /datos. Cada resultado trae
+    su estado HTTP, su tiempo en milisegundos y el mismo cuerpo que devolvería
+    GET /datos (o el detalle del error), en el orden del lote.
+    
+    Raises:
+        HTTPException: Si el lote supera el máximo de consultas o no se pueden leer los datos
+    """
+    if len(lote.queries) > LOTE_MAX_CONSULTAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote tiene {len(lote.queries)} consultas y el máximo es {LOTE_MAX_CONSULTAS}"
+        )
+    try:
+        dataset = await gestor_dataset.obtener()
         
-        # Manejar agrupación si se solicita
-        if group_by:
-            if group_by == "player":
-                # Agrupar por jugador único
-                df_grouped = df.groupby(['First name', 'Last name', 'Adjusted first name', 'Adjusted last name']).agg({
-                    'Team': lambda x: list(set([str(item) for item in x if pd.notna(item)])),
-                    'Season': lambda x: list(set([int(item) for item in x if pd.notna(item)])),
-                    'Position': lambda x: list(set([str(item) for item in x if pd.notna(item)])),
-                    'Height': 'first',
-                    'Weight': 'first',
-                    'Nationality': 'first',
-                    'Birthdate': 'first'
-                }).reset_index()
-                
-                # Convertir a formato de respuesta
-                datos = []
-                for _, row in df_grouped.iterrows():
-                    # Manejar valores NaN e inf para JSON
-                    altura = row['Height']
-                    if pd.isna(altura) or np.isinf(altura):
-                        altura = None
-                        
-                    peso = row['Weight']
-                    if pd.isna(peso) or np.isinf(peso):
-                        peso = None
-                    
-                    # Verificar que no haya valores problemáticos en otros campos
-                    nacionalidad = row['Nationality']
-                    if pd.isna(nacionalidad):
-                        nacionalidad = None
-                        
-                    fecha_nacimiento = row['Birthdate']
-                    if pd.isna(fecha_nacimiento):
-                        fecha_nacimiento = None
-                    
-                    datos.append({
-                        "nombre": row['First name'],
-                        "apellido": row['Last name'],
-                        "nombre_ajustado": row['Adjusted first name'],
-                        "apellido_ajustado": row['Adjusted last name'],
-                        "equipos": row['Team'],
-                        "temporadas": row['Season'],
-                        "posiciones": row['Position'],
-                        "altura": altura,
-                        "peso": peso,
-                        "nacionalidad": nacionalidad,
-                        "fecha_nacimiento": fecha_nacimiento
-                    })
-                
-                # Aplicar paginación a datos agrupados
-                total_records = len(datos)
-                total_pages = (total_records + limit - 1) // limit
-                start_idx = (page - 1) * limit
-                end_idx = start_idx + limit
-                datos = datos[start_idx:end_idx]
-                
-            elif group_by == "team":
-                # Agrupar por equipo
-                df_grouped = df.groupby('Team').agg({
-                    'First name': 'count',
-                    'Season': lambda x: list(set(x)),
-                    'Position': lambda x: list(set(x)),
-                    'Nationality': lambda x: list(set(x))
-                }).reset_index()
-                df_grouped = df_grouped.rename(columns={'First name': 'total_jugadores'})
-                
-                datos = []
-                for _, row in df_grouped.iterrows():
-                    datos.append({
-                        "equipo": str(row['Team']) if pd.notna(row['Team']) else None,
-                        "total_jugadores": int(row['total_jugadores']) if pd.notna(row['total_jugadores']) else 0,
-                        "temporadas": [int(item) for item in row['Season'] if pd.notna(item)] if isinstance(row['Season'], list) else [],
-                        "posiciones": [str(item) for item in row['Position'] if pd.notna(item)] if isinstance(row['Position'], list) else [],
-                        "nacionalidades": [str(item) for item in row['Nationality'] if pd.notna(item)] if isinstance(row['Nationality'], list) else []
-                    })
-                
-                # Aplicar paginación
-                total_records = len(datos)
-                total_pages = (total_records + limit - 1) // limit
-                start_idx = (page - 1) * limit
-                end_idx = start_idx + limit
-                datos = datos[start_idx:end_idx]
-                
-            elif group_by == "season":
-                # Agrupar por temporada
-                df_grouped = df.groupby('Season').agg({
-                    'First name': 'count',
-                    'Team': lambda x: list(set(x)),
-                    'Position': lambda x: list(set(x)),
-                    'Nationality': lambda x: list(set(x))
-                }).reset_index()
-                df_grouped = df_grouped.rename(columns={'First name': 'total_jugadores'})
-                
-                datos = []
-                for _, row in df_grouped.iterrows():
-                    datos.append({
-                        "temporada": int(row['Season']) if pd.notna(row['Season']) else None,
-                        "total_jugadores": int(row['total_jugadores']) if pd.notna(row['total_jugadores']) else 0,
-                        "equipos": [str(item) for item in row['Team'] if pd.notna(item)] if isinstance(row['Team'], list) else [],
-                        "posiciones": [str(item) for item in row['Position'] if pd.notna(item)] if isinstance(row['Position'], list) else [],
-                        "nacionalidades": [str(item) for item in row['Nationality'] if pd.notna(item)] if isinstance(row['Nationality'], list) else []
-                    })
-                
-                # Aplicar paginación
-                total_records = len(datos)
-                total_pages = (total_records + limit - 1) // limit
-                start_idx = (page - 1) * limit
-                end_idx = start_idx + limit
-                datos = datos[start_idx:end_idx]
-                
-            elif group_by == "career":
-                # Agrupar por jugador mostrando su trayectoria completa (temporada + equipo)
-                df_grouped = df.groupby(['First name', 'Last name', 'Adjusted first name', 'Adjusted last name']).agg({
-                    'Team': list,
-                    'Season': list,
-                    'Position': lambda x: list(set([str(item) for item in x if pd.notna(item)])),
-                    'Height': 'first',
-                    'Weight': 'first',
-                    'Nationality': 'first',
-                    'Birthdate': 'first'
-                }).reset_index()
-                
-                # Convertir a formato de respuesta con trayectoria cronológica
-                datos = []
-                for _, row in df_grouped.iterrows():
-                    # Manejar valores NaN e inf para JSON
-                    altura = row['Height']
-                    if pd.isna(altura) or np.isinf(altura):
-                        altura = None
-                        
-                    peso = row['Weight']
-                    if pd.isna(peso) or np.isinf(peso):
-                        peso = None
-                    
-                    # Verificar que no haya valores problemáticos en otros campos
-                    nacionalidad = row['Nationality']
-                    if pd.isna(nacionalidad):
-                        nacionalidad = None
-                        
-                    fecha_nacimiento = row['Birthdate']
-                    if pd.isna(fecha_nacimiento):
-                        fecha_nacimiento = None
-                    
-                    # Crear trayectoria cronológica (temporada + equipo)
-                    trayectoria = []
-                    equipos = row['Team']
-                    temporadas = row['Season']
-                    
-                    # Crear pares temporada-equipo y ordenarlos cronológicamente
-                    pares_temp_equipo: list[dict[str, int | str]] = []
-                    for i in range(len(equipos)):
-                        if pd.notna(equipos[i]) and pd.notna(temporadas[i]):
-                            pares_temp_equipo.append({
-                                'temporada': int(temporadas[i]),
-                                'equipo': str(equipos[i])
-                            })
-                    
-                    # Ordenar por temporada
-                    pares_temp_equipo.sort(key=lambda x: x['temporada'])
-                    
-                    # Agrupar por temporada si un jugador jugó en múltiples equipos en la misma temporada
-                    trayectoria_agrupada: dict[int, list[str]] = {}
-                    for par in pares_temp_equipo:
-                        temp = int(par['temporada'])
-                        equipo = str(par['equipo'])
-                        if temp not in trayectoria_agrupada:
-                            trayectoria_agrupada[temp] = []
-                        if equipo not in trayectoria_agrupada[temp]:
-                            trayectoria_agrupada[temp].append(equipo)
-                    
-                    # Convertir a lista ordenada
-                    for temp in sorted(trayectoria_agrupada.keys()):
-                        trayectoria.append({
-                            'temporada': temp,
-                            'equipos': trayectoria_agrupada[temp]
-                        })
-                    
-                    datos.append({
-                        "nombre": str(row['First name']) if pd.notna(row['First name']) else None,
-                        "apellido": str(row['Last name']) if pd.notna(row['Last name']) else None,
-                        "nombre_ajustado": str(row['Adjusted first name']) if pd.notna(row['Adjusted first name']) else None,
-                        "apellido_ajustado": str(row['Adjusted last name']) if pd.notna(row['Adjusted last name']) else None,
-                        "trayectoria": trayectoria,
-                        "posiciones": [str(item) for item in row['Position'] if pd.notna(item)] if isinstance(row['Position'], list) else [],
-                        "altura": altura,
-                        "peso": peso,
-                        "nacionalidad": nacionalidad,
-                        "fecha_nacimiento": fecha_nacimiento,
-                        "total_temporadas": len(trayectoria_agrupada),
-                        "total_equipos": len(set([equipo for temp in trayectoria_agrupada.values() for equipo in temp]))
-                    })
-                
-                # Aplicar paginación a datos agrupados
-                total_records = len(datos)
-                total_pages = (total_records + limit - 1) // limit
-                start_idx = (page - 1) * limit
-                end_idx = start_idx + limit
-                datos = datos[start_idx:end_idx]
-                
-            else:
-                # Agrupación no válida, continuar con datos normales
-                logger.warning(f"Agrupación '{group_by}' no válida, devolviendo datos sin agrupar")
-                total_records = len(df)
-                total_pages = (total_records + limit - 1) // limit
-                start_idx = (page - 1) * limit
-                end_idx = start_idx + limit
-                df_paginated = df.iloc[start_idx:end_idx]
-                datos = df_paginated.to_dict(orient="records")
-        else:
-            # Sin agrupación, datos normales
-            total_records = len(df)
-            total_pages = (total_records + limit - 1) // limit
-            start_idx = (page - 1) * limit
-            end_idx = start_idx + limit
-            df_paginated = df.iloc[start_idx:end_idx]
-            
-            # Convertir a formato de respuesta con manejo de valores problemáticos
-            datos = []
-            for _, row in df_paginated.iterrows():
-                # Manejar valores NaN e inf para JSON
-                altura = row['Height']
-                if pd.isna(altura) or np.isinf(altura):
-                    altura = None
-                    
-                peso = row['Weight']
-                if pd.isna(peso) or np.isinf(peso):
-                    peso = None
-                
-                # Verificar que no haya valores problemáticos en otros campos
-                nacionalidad = row['Nationality']
-                if pd.isna(nacionalidad):
-                    nacionalidad = None
-                    
-                fecha_nacimiento = row['Birthdate']
-                if pd.isna(fecha_nacimiento):
-                    fecha_nacimiento = None
-                
-                datos.append({
-                    "First name": str(row['First name']) if pd.notna(row['First name']) else None,
-                    "Last name": str(row['Last name']) if pd.notna(row['Last name']) else None,
-                    "Adjusted first name": str(row['Adjusted first name']) if pd.notna(row['Adjusted first name']) else None,
-                    "Adjusted last name": str(row['Adjusted last name']) if pd.notna(row['Adjusted last name']) else None,
-                    "Team": str(row['Team']) if pd.notna(row['Team']) else None,
-                    "Season": int(row['Season']) if pd.notna(row['Season']) else None,
-                    "Position": str(row['Position']) if pd.notna(row['Position']) else None,
-                    "Height": altura,
-                    "Weight": peso,
-                    "Nationality": nacionalidad,
-                    "Birthdate": str(fecha_nacimiento) if fecha_nacimiento is not None else None
-                })
+        def responder(consulta: Consulta):
+            return cache_respuestas.obtener(dataset.version, "/datos", consulta.clave(), lambda: calcular_datos(dataset, consulta))
         
-        # Agregar estadísticas si se solicitan
-        if include_stats:
-            stats = {
-                "total_records": total_records,
-                "total_pages": total_pages,
-                "current_page": page,
-                "records_per_page": limit,
-                "filters_applied": {
-                    "team": team,
-                    "season": season,
-                    "position": position,
-                    "nationality": nationality,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "birthdate": birthdate,
-                    "height": height,
-                    "weight": weight
-                }
-            }
-            
-            # Agregar estadísticas básicas si hay datos
-            if len(df) > 0:
-                stats["data_stats"] = {
-                    "unique_players": len(df.groupby(['First name', 'Last name'])),
-                    "unique_teams": len(df['Team'].unique()),
-                    "unique_seasons": len(df['Season'].unique())
-                }
-            
-            return {
-                "data": datos,
-                "stats": stats
-            }
+        def resolver(codificacion: Optional[str]):
+            cuerpo = ejecutar_lote(
+                dataset, [consulta.model_dump() for consulta in lote.queries], responder, ejecutor_lotes if lote.parallel else None
+            )
+            return codificar_cuerpo(cuerpo, codificacion)
         
-        logger.info(f"Datos procesados: página {page}/{total_pages}, registros {start_idx+1}-{min(end_idx, total_records)} de {total_records}")
-        return datos
+        cuerpo, headers = await ejecutor_consultas.ejecutar(resolver, negociar_codificacion(request))
+        return Response(content=cuerpo, media_type="application/json", headers={"X-Dataset-Version": dataset.version, **headers})
         
+    except (Saturado, PlazoVencido):
+        raise
     except Exception as e:
-        logger.error(f"Error al leer el archivo CSV: {str(e)}")
+        logger.error(f"Error al resolver el lote: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error al leer el archivo CSV: {str(e)}"
+            detail=f"Error al resolver el lote: {str(e)}"
         )
 
+@app.get("/datos/export")
+async def exportar_datos(
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$", description="Formato de salida: 'ndjson' (un registro JSON por línea) o 'csv'"),
+    team: Optional[str] = Query(default=None, description="Filtrar por equipo (varios separados por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    season: Optional[int] = Query(default=None, description="Filtrar por temporada"),
+    position: Optional[str] = Query(default=None, description="Filtrar por posición (G, F, C, PG, SG, SF, PF; varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    nationality: Optional[str] = Query(default=None, description="Filtrar por nacionalidad (varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    first_name: Optional[str] = Query(default=None, description="Filtrar por nombre ajustado del jugador"),
+    last_name: Optional[str] = Query(default=None, description="Filtrar por apellido ajustado del jugador"),
+    birthdate: Optional[str] = Query(default=None, description="Filtrar por fecha de nacimiento (YYYY-MM-DD)"),
+    height: Optional[float] = Query(default=None, description="Filtrar por altura en cm"),
+    weight: Optional[float] = Query(default=None, description="Filtrar por peso en kg"),
+    rangos: Dict[str, Any] = Depends(filtros_rango)
+):
+    """
+    Endpoint que exporta todas las filas que cumplen los filtros de /datos, sin paginación.
+    
+    La respuesta se envía en streaming por bloques, con memoria constante (y
+    comprimida si el cliente lo acepta), y usa siempre la misma versión del
+    dataset aunque se refresque durante la descarga.
+    """
+    try:
+        dataset = await gestor_dataset.obtener()
+        consulta = Consulta(
+            team=team,
+            season=season,
+            position=position,
+            nationality=nationality,
+            first_name=first_name,
+            last_name=last_name,
+            birthdate=birthdate,
+            height=height,
+            weight=weight,
+            **rangos
+        )
+        
+        def filtrar():
+            with medir("filtrado"):
+                return dataset.indices.filtrar(consulta.filtros_indice())
+        
+        filas = await ejecutor_consultas.ejecutar(filtrar)
+        total = len(dataset.df) if filas is None else len(filas)
+        logger.info(f"Exportando {total} registros en formato {format} (dataset versión {dataset.version})")
+        
+        generador = exportar_ndjson(dataset, filas) if format == "ndjson" else exportar_csv(dataset, filas)
+        headers = {"X-Dataset-Version": dataset.version, "X-Total-Records": str(total), "Vary": "Accept-Encoding"}
+        if format == "csv":
+            headers["Content-Disposition"] = 'attachment; filename="datos.csv"'
+        codificacion = negociar_codificacion(request)
+        if codificacion is not None:
+            # Se comprime bloque a bloque en el hilo que genera la exportación
+            generador = comprimir_en_bloques(generador, codificacion)
+            headers["Content-Encoding"] = codificacion
+        return StreamingResponse(generador, media_type=FORMATOS_EXPORTACION[format], headers=headers)
+        
+    except (Saturado, PlazoVencido):
+        raise
+    except Exception as e:
+        logger.error(f"Error al exportar los datos: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al exportar los datos: {str(e)}"
+        )
+
+@app.get("/datos/facets")
+async def obtener_facetas(
+    request: Request,
+    facets: Optional[str] = Query(default=None, description="Columnas a contar, separadas por coma (team, season, position, nationality, first_name, last_name, birthdate, height, weight). Por defecto: team, season, position, nationality"),
+    team: Optional[str] = Query(default=None, description="Filtrar por equipo (varios separados por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    season: Optional[int] = Query(default=None, description="Filtrar por temporada"),
+    position: Optional[str] = Query(default=None, description="Filtrar por posición (G, F, C, PG, SG, SF, PF; varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    nationality: Optional[str] = Query(default=None, description="Filtrar por nacionalidad (varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    first_name: Optional[str] = Query(default=None, description="Filtrar por nombre ajustado del jugador"),
+    last_name: Optional[str] = Query(default=None, description="Filtrar por apellido ajustado del jugador"),
+    birthdate: Optional[str] = Query(default=None, description="Filtrar por fecha de nacimiento (YYYY-MM-DD)"),
+    height: Optional[float] = Query(default=None, description="Filtrar por altura en cm"),
+    weight: Optional[float] = Query(default=None, description="Filtrar por peso en kg"),
+    rangos: Dict[str, Any] = Depends(filtros_rango)
+):
+    """
+    Endpoint de búsqueda facetada: cuántos registros y jugadores hay por cada valor de las columnas filtrables bajo los filtros indicados.
+    
+    Acepta los mismos filtros que /datos. Los valores de cada faceta vienen de
+    mayor a menor cantidad de registros y solo aparecen los que tienen alguno.
+    """
+    nombres = [nombre.strip() for nombre in facets.split(",") if nombre.strip()] if facets else list(FACETAS_POR_DEFECTO)
+    try:
+        dataset = await gestor_dataset.obtener()
+        consulta = Consulta(
+            team=team,
+            season=season,
+            position=position,
+            nationality=nationality,
+            first_name=first_name,
+            last_name=last_name,
+            birthdate=birthdate,
+            height=height,
+            weight=weight,
+            **rangos
+        )
+        return await responder_con_cache(
+            request, dataset, "/datos/facets", f"{consulta.clave()}|{','.join(nombres)}",
+            lambda: JSONRapido(contar_facetas(dataset, consulta, nombres)).body
+        )
+        
+    except FacetaDesconocida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (Saturado, PlazoVencido):
+        raise
+    except Exception as e:
+        logger.error(f"Error al contar las facetas: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al contar las facetas: {str(e)}"
+        )
+
+@app.get("/stats")
+async def obtener_estadisticas(
+    request: Request,
+    group_by: Optional[str] = Query(default=None, pattern="^(team|season|position|nationality)$", description="Agrupar por: 'team', 'season', 'position' o 'nationality'. Sin agrupar, solo el total"),
+    percentiles: Optional[str] = Query(default=None, description="Percentiles a incluir además de la mediana, separados por coma (0 a 100). Por defecto: 10,25,75,90"),
+    team: Optional[str] = Query(default=None, description="Filtrar por equipo (varios separados por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    season: Optional[int] = Query(default=None, description="Filtrar por temporada"),
+    position: Optional[str] = Query(default=None, description="Filtrar por posición (G, F, C, PG, SG, SF, PF; varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    nationality: Optional[str] = Query(default=None, description="Filtrar por nacionalidad (varias separadas por coma; con metacaracteres de expresión regular como {}, () o | el valor es una sola expresión)"),
+    first_name: Optional[str] = Query(default=None, description="Filtrar por nombre ajustado del jugador"),
+    last_name: Optional[str] = Query(default=None, description="Filtrar por apellido ajustado del jugador"),
+    birthdate: Optional[str] = Query(default=None, description="Filtrar por fecha de nacimiento (YYYY-MM-DD)"),
+    height: Optional[float] = Query(default=None, description="Filtrar por altura en cm"),
+    weight: Optional[float] = Query(default=None, description="Filtrar por peso en kg"),
+    rangos: Dict[str, Any] = Depends(filtros_rango)
+):
+    """
+    Endpoint de estadísticas: cantidad, media, mediana, mínimo, máximo y percentiles de altura, peso y edad.
+    
+    Acepta los mismos filtros que /datos. Devuelve el resumen de todas las
+    filas filtradas en ``overall`` y, con ``group_by``, uno por cada valor de
+    la columna en ``groups`` (con sus registros y jugadores distintos). La
+    edad es la de hoy, en años con decimales.
+    """
+    try:
+        lista_percentiles = leer_percentiles(percentiles)
+        dataset = await gestor_dataset.obtener()
+        consulta = Consulta(
+            team=team,
+            season=season,
+            position=position,
+            nationality=nationality,
+            first_name=first_name,
+            last_name=last_name,
+            birthdate=birthdate,
+            height=height,
+            weight=weight,
+            **rangos
+        )
+        hoy = date.today()
+        # La edad depende del día, así que la fecha forma parte de la clave
+        clave = f"{consulta.clave()}|{group_by}|{lista_percentiles}|{hoy.isoformat()}"
+        return await responder_con_cache(
+            request, dataset, "/stats", clave,
+            lambda: JSONRapido(resumir_estadisticas(dataset, consulta, group_by, lista_percentiles, hoy)).body
+        )
+        
+    except PercentilesInvalidos as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (Saturado, PlazoVencido):
+        raise
+    except Exception as e:
+        logger.error(f"Error al calcular las estadísticas: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al calcular las estadísticas: {str(e)}"
+        )
+
+@app.get("/datos/changes")
+async def obtener_cambios(
+    request: Request,
+    since: str = Query(description="Versión del dataset ya sincronizada (header X-Dataset-Version de una respuesta anterior)")
+):
+    """
+    Endpoint que devuelve las filas agregadas, eliminadas y modificadas desde una versión del dataset.
+    
+    Los cambios vienen en orden, uno por cada versión publicada desde ``since``
+    hasta la vigente. Si la versión es demasiado antigua (o de otro worker) y
+    el historial no la alcanza, responde 410 y hay que volver a descargar todo
+    con /datos/export.
+    """
+    dataset = await gestor_dataset.obtener()
+    cadena = gestor_dataset.cambios_desde(since)
+    if cadena is None:
+        raise HTTPException(
+            status_code=410,
+            detail=f"No hay historial de cambios desde la versión '{since}'; descarga los datos completos desde /datos/export"
+        )
+    try:
+        return await responder_con_cache(
+            request, dataset, "/datos/changes", since,
+            lambda: JSONRapido({
+                "desde": since,
+                "hasta": dataset.version,
+                "cambios": lista_json([cambios.json() for cambios in cadena])
+            }).body
+        )
+    except (Saturado, PlazoVencido):
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener los cambios: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al obtener los cambios: {str(e)}"
+        )
+
+@app.get("/jugadores/search")
+async def buscar_jugadores(
+    request: Request,
+    q: str = Query(min_length=1, description="Nombre, apellido o ambos; no importan los acentos, las mayúsculas ni pequeños errores de tipeo"),
+    limit: int = Query(default=10, ge=1, le=50, description="Número máximo de jugadores (máximo 50)"),
+    min_score: float = Query(default=0.3, ge=0, le=1, description="Proporción mínima de la búsqueda que debe aparecer en el nombre (0 a 1)")
+):
+    """
+    Endpoint de búsqueda aproximada de jugadores por nombre.
+    
+    Devuelve los jugadores más parecidos a ``q`` con el mismo registro que
+    ``group_by=player`` y su ``id`` estable, ordenados por ``score`` (proporción
+    de los trigramas de la búsqueda presentes en el nombre) y, a igualdad,
+    por ``similarity``.
+    """
+    try:
+        dataset = await gestor_dataset.obtener()
+        return await responder_con_cache(
+            request, dataset, "/jugadores/search", repr((q, limit, min_score)),
+            lambda: JSONRapido({"query": q, "results": dataset.busqueda.resultados_json(q, limit, min_score)}).body
+        )
+    except (Saturado, PlazoVencido):
+        raise
+    except Exception as e:
+        logger.error(f"Error al buscar jugadores: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al buscar jugadores: {str(e)}"
+        )
+
+async def responder_jugador(request: Request, jugador_id: int, ruta: str, obtener_registro) -> Response:
+    """Respuesta cacheada con el registro precalculado de un jugador, o 404 si el ID no existe"""
+    dataset = await gestor_dataset.obtener()
+    registro = obtener_registro(dataset.jugadores, jugador_id)
+    if registro is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No existe el jugador {jugador_id} en la versión vigente de los datos"
+        )
+    return await responder_con_cache(request, dataset, ruta, str(jugador_id), lambda: registro)
+
+@app.get("/jugadores/{jugador_id}")
+async def obtener_jugador(request: Request, jugador_id: int):
+    """
+    Endpoint que devuelve la ficha de un jugador por su ID.
+    
+    El ID identifica al jugador por nombre, apellido y fecha de nacimiento y
+    no cambia entre actualizaciones del CSV. La ficha tiene el formato de
+    ``group_by=player`` más el campo ``id``.
+    """
+    return await responder_jugador(request, jugador_id, "/jugadores", lambda jugadores, i: jugadores.ficha_json(i))
+
+@app.get("/jugadores/{jugador_id}/trayectoria")
+async def obtener_trayectoria(request: Request, jugador_id: int):
+    """
+    Endpoint que devuelve la trayectoria de un jugador por su ID, con el formato de ``group_by=career`` más el campo ``id``.
+    """
+    return await responder_jugador(request, jugador_id, "/jugadores/trayectoria", lambda jugadores, i: jugadores.trayectoria_json(i))
+
 @app.get("/health")
 async def health_check():
     """
-    Endpoint de verificación de salud de la API
+    Endpoint de verificación de salud de la API (liveness)
+    
+    Responde en cuanto el proceso atiende peticiones, aunque todavía esté
+    arrancando (ver /health/ready). Si hay datos cargados incluye la versión
+    vigente y el reporte de memoria de la tabla en este worker (antes y
+    después de compactarla).
     """
-    return {"status": "healthy", "message": "API funcionando correctamente"}
+    respuesta = {"status": "healthy", "message": "API funcionando correctamente", "ready": arranque.listo}
+    dataset = gestor_dataset.actual
+    if dataset is not None:
+        respuesta["dataset"] = {
+            "version": dataset.version,
+            "filas": len(dataset.df),
+            "memoria_bytes": dataset.memoria_bytes,
+            "compactacion": dataset.memoria
+        }
+    return respuesta
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Endpoint de disponibilidad (readiness)
+    
+    Responde 200 cuando este worker terminó de arrancar: el dataset está
+    cargado, sus estructuras construidas y las respuestas más pedidas en la
+    caché. Mientras tanto responde 503 con la etapa en curso. Incluye la
+    versión y la edad del dataset y lo que tardó cada etapa del arranque y
+    cada estructura de la versión vigente.
+    
+    En un worker que sigue al cargador (DATASET_MODO=lector) también responde
+    503 si el cargador dejó de latir: el worker seguiría sirviendo la última
+    versión sin volver a refrescarla nunca.
+    """
+    respuesta = arranque.estado()
+    if isinstance(gestor_dataset, LectorDataset):
+        cargador = gestor_dataset.estado_cargador()
+        if cargador is not None:
+            respuesta["loader"] = cargador
+            respuesta["ready"] = respuesta["ready"] and cargador["alive"]
+    dataset = gestor_dataset.actual
+    if dataset is not None:
+        respuesta["dataset"] = {
+            "version": dataset.version,
+            "age_seconds": round(dataset.edad, 1),
+            "build_ms": dataset.tiempos_preparacion
+        }
+    if gestor_dataset.ultimo_error:
+        respuesta["last_refresh_error"] = gestor_dataset.ultimo_error
+    return JSONResponse(status_code=200 if respuesta["ready"] else 503, content=respuesta, headers={"Cache-Control": "no-store"})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metricas():
+    """
+    Endpoint de métricas en el formato de texto de Prometheus.
+    
+    Incluye la duración y el tamaño de las respuestas por endpoint y modo
+    group_by, la duración de los tramos internos (descarga, parseo, filtros,
+    agrupación, serialización), la caché de respuestas y el dataset vigente.
+    Las métricas son de este proceso.
+    """
+    cache = cache_respuestas.estadisticas()
+    extra = [
+        *metrica_simple("respuestas_cache_aciertos_total", "counter", "Respuestas servidas desde la caché", cache["aciertos"]),
+        *metrica_simple("respuestas_cache_fallos_total", "counter", "Respuestas calculadas por no estar en la caché", cache["fallos"]),
+        *metrica_simple("respuestas_cache_entradas", "gauge", "Respuestas guardadas en la caché", cache["entradas"]),
+    ]
+    extra.extend(metrica_simple("arranque_listo", "gauge", "1 si este worker terminó de arrancar (ver /health/ready)", int(arranque.listo)))
+    dataset = gestor_dataset.actual
+    if dataset is not None:
+        extra.extend(metrica_simple("dataset_filas", "gauge", "Filas de la versión vigente del dataset", len(dataset.df)))
+        extra.extend(metrica_simple("dataset_edad_segundos", "gauge", "Segundos desde que se confirmó la versión vigente contra la fuente", dataset.edad))
+    consultas = ejecutor_consultas.estadisticas()
+    extra.extend([
+        *metrica_simple("consultas_en_curso", "gauge", "Consultas calculándose en el pool", consultas["en_curso"]),
+        *metrica_simple("consultas_en_cola", "gauge", "Consultas esperando un hilo libre del pool", consultas["en_cola"]),
+        *metrica_simple("consultas_rechazadas_total", "counter", "Consultas rechazadas con 503 por el pool lleno", consultas["rechazadas"]),
+        *metrica_simple("consultas_vencidas_total", "counter", "Consultas canceladas con 504 por superar el plazo", consultas["vencidas"]),
+    ])
+    if perfilador is not None:
+        extra.extend(metrica_simple("perfiles_guardados_total", "counter", "Perfiles de peticiones lentas guardados", perfilador.guardados))
+    return PlainTextResponse(registro.exponer(extra), media_type=CONTENT_TYPE_PROMETHEUS)
 
 @app.get("/info")
-async def obtener_info():
+async def obtener_info(request: Request):
     """
     Endpoint que devuelve información sobre los datos disponibles
     """
     try:
         logger.info("Obteniendo información sobre los datos")
         
-        # Leer el archivo CSV desde la URL
-        df = pd.read_csv(CSV_URL)
-        
-        # Obtener estadísticas básicas
-        total_records = len(df)
-        columns = list(df.columns)
+        # Obtener la versión del CSV en memoria
+        dataset = await gestor_dataset.obtener()
         
-        # Obtener valores únicos para filtros
-        teams = sorted(df['Team'].dropna().unique().tolist())
-        seasons = sorted(df['Season'].dropna().unique().tolist())
-        positions = sorted(df['Position'].dropna().unique().tolist())
-        nationalities = sorted(df['Nationality'].dropna().unique().tolist())
-        
-        return {
-            "total_records": total_records,
-            "columns": columns,
-            "filters_available": {
-                "teams": teams,
-                "seasons": seasons,
-                "positions": positions,
-                "nationalities": nationalities
-            },
-            "pagination": {
-                "default_page_size": 50,
-                "max_page_size": 100
-            }
-        }
+        return await responder_con_cache(request, dataset, "/info", "", lambda: JSONRapido(calcular_info(dataset)).body)
         
+    except (Saturado, PlazoVencido):
+        raise
     except Exception as e:
         logger.error(f"Error al obtener información: {str(e)}")
         raise HTTPException(
@@ -464,6 +806,37 @@ async def obtener_info():
             detail=f"Error al obtener información: {str(e)}"
         )
 
+def calcular_info(dataset) -> Dict[str, Any]:
+    """
+    Información sobre columnas, valores de los filtros y paginación de una versión del dataset
+    """
+    # Obtener estadísticas básicas
+    total_records = len(dataset.df)
+    columns = list(dataset.df.columns)
+    
+    # Valores únicos para filtros, precalculados por versión
+    teams = dataset.facetas.valores("teams")
+    seasons = dataset.facetas.valores("seasons")
+    positions = dataset.facetas.valores("positions")
+    nationalities = dataset.facetas.valores("nationalities")
+    
+    return {
+        "total_records": total_records,
+        "columns": columns,
+        "filters_available": {
+            "teams": teams,
+            "seasons": seasons,
+            "positions": positions,
+            "nationalities": nationalities
+        },
+        "pagination": {
+            "default_page_size": 50,
+            "max_page_size": 100
+        }
+    }
+
+
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,277 @@
+"""
+Instrumentación de la API: métricas de Prometheus, tramos por petición y
+header ``Server-Timing``.
+
+Las métricas se guardan en memoria en este proceso y ``/metrics`` las expone
+en el formato de texto de Prometheus, sin dependencias externas:
+
+- ``http_request_duration_seconds`` y ``http_response_size_bytes``:
+  histogramas por endpoint (la plantilla de la ruta, p. ej.
+  ``/jugadores/{jugador_id}``) y modo ``group_by``.
+- ``http_requests_total``: peticiones por endpoint y código de estado.
+- ``span_duration_seconds``: duración de los tramos internos (descarga del
+  CSV, parseo, cada filtro, agrupación, serialización...) por endpoint.
+
+Un tramo se mide con ``with medir("nombre"):``. Si el código corre dentro de
+una petición, el tramo además se acumula en la traza de esa petición (una
+``ContextVar``), que alimenta ``Server-Timing``; fuera de una petición (el
+refresco en segundo plano) se registra con el endpoint ``-``. Las funciones
+que se ejecutan en otro hilo solo quedan en la traza si se lanzan con el
+contexto copiado (``contextvars.copy_context().run``).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+import bisect
+import threading
+import time
+
+# Límites de los histogramas de duración, en segundos
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Límites de los histogramas de tamaño, en bytes
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Valores de la etiqueta group_by; cualquier otro cuenta como "otro" para acotar las series
+MODOS_GROUP_BY = ("player", "team", "season", "career", "position", "nationality")
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(str(valor))}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != float("inf") else "+Inf"
+
+
+class Histograma:
+    """
+    Histograma acumulativo de Prometheus con etiquetas.
+
+    Args:
+        nombre: Nombre de la métrica
+        ayuda: Descripción (línea ``# HELP``)
+        etiquetas: Nombres de las etiquetas, en orden
+        limites: Límites superiores de los buckets (sin ``+Inf``)
+    """
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str], limites: Sequence[float]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        # Por combinación de etiquetas: conteo por bucket (no acumulado), suma y cantidad
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *etiquetas: str):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = ([0] * (len(self.limites) + 1), [0.0])
+            serie[0][indice] += 1
+            serie[1][0] += valor
+
+    def cantidad(self, *etiquetas: str) -> int:
+        """Observaciones registradas con esas etiquetas"""
+        serie = self._series.get(etiquetas)
+        return sum(serie[0]) if serie else 0
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((etiquetas, list(conteos), suma[0]) for etiquetas, (conteos, suma) in self._series.items())
+        for etiquetas, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (float("inf"),), conteos):
+                acumulado += conteo
+                le = 'le="' + _numero(limite) + '"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, etiquetas, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, etiquetas)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, etiquetas)} {acumulado}")
+        return lineas
+
+
+class Contador:
+    """Contador de Prometheus con etiquetas"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *etiquetas: str, cantidad: float = 1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + cantidad
+
+    def valor(self, *etiquetas: str) -> float:
+        return self._valores.get(etiquetas, 0)
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        lineas.extend(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}" for etiquetas, valor in valores)
+        return lineas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas del proceso, en el orden en que se exponen"""
+
+    def __init__(self):
+        self._metricas: list = []
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str], limites: Sequence[float]) -> Histograma:
+        metrica = Histograma(nombre, ayuda, etiquetas, limites)
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str]) -> Contador:
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def exponer(self, extra: Sequence[str] = ()) -> str:
+        """Todas las métricas en el formato de texto de Prometheus, más líneas ya formateadas"""
+        lineas = [linea for metrica in self._metricas for linea in metrica.exponer()]
+        lineas.extend(extra)
+        return "\n".join(lineas) + "\n"
+
+
+def metrica_simple(nombre: str, tipo: str, ayuda: str, valor: float) -> List[str]:
+    """Líneas de una métrica sin etiquetas calculada al exponer (``gauge`` o ``counter``)"""
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre} {_numero(valor)}"]
+
+
+registro = RegistroMetricas()
+
+DURACION_PETICIONES = registro.histograma(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP", ("endpoint", "group_by"), LIMITES_SEGUNDOS
+)
+TAMANO_RESPUESTAS = registro.histograma(
+    "http_response_size_bytes", "Tamaño del cuerpo de las respuestas HTTP", ("endpoint", "group_by"), LIMITES_BYTES
+)
+PETICIONES = registro.contador("http_requests_total", "Peticiones HTTP por código de estado", ("endpoint", "status"))
+DURACION_TRAMOS = registro.histograma(
+    "span_duration_seconds", "Duración de los tramos internos (descarga, parseo, filtros, agrupación, serialización)",
+    ("span", "endpoint"), LIMITES_SEGUNDOS
+)
+
+
+@dataclass
+class Traza:
+    """Tramos medidos durante una petición, en orden"""
+    tramos: List[Tuple[str, float]] = field(default_factory=list)
+
+    def totales(self) -> Dict[str, float]:
+        """Duración total por nombre de tramo (un filtro puede medirse varias veces)"""
+        totales: Dict[str, float] = {}
+        for nombre, duracion in self.tramos:
+            totales[nombre] = totales.get(nombre, 0.0) + duracion
+        return totales
+
+
+_traza_actual: ContextVar[Optional[Traza]] = ContextVar("traza_actual", default=None)
+
+
+@contextmanager
+def medir(tramo: str) -> Iterator[None]:
+    """Mide la duración de un tramo y la registra en la traza de la petición en curso, si la hay"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        traza = _traza_actual.get()
+        if traza is None:
+            DURACION_TRAMOS.observar(duracion, tramo, "-")
+        else:
+            # Se registra al terminar la petición, cuando ya se conoce la ruta
+            traza.tramos.append((tramo, duracion))
+
+
+def server_timing(traza: Traza, total: float) -> str:
+    """Valor del header ``Server-Timing`` (duraciones en milisegundos)"""
+    partes = [f"{nombre};dur={duracion * 1000:.2f}" for nombre, duracion in traza.totales().items()]
+    partes.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(partes)
+
+
+def _plantilla_ruta(scope: dict) -> str:
+    """Ruta de FastAPI que atendió la petición, sin los parámetros (acota las series)"""
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
+
+
+def _group_by(scope: dict) -> str:
+    valores = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("group_by")
+    if not valores or not valores[-1]:
+        return "none"
+    return valores[-1] if valores[-1] in MODOS_GROUP_BY else "otro"
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide cada petición HTTP.
+
+    Args:
+        app: Aplicación ASGI
+        server_timing: Agregar el header ``Server-Timing`` con los tramos de la petición
+        perfilador: ``PerfiladorMuestreo`` para guardar el perfil de las peticiones lentas, o None
+    """
+
+    def __init__(self, app, server_timing: bool = False, perfilador=None):
+        self.app = app
+        self.server_timing = server_timing
+        self.perfilador = perfilador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traza = Traza()
+        token = _traza_actual.set(traza)
+        muestras = self.perfilador.iniciar() if self.perfilador is not None else None
+        inicio = time.perf_counter()
+        respuesta = {"estado": 500, "bytes": 0}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["estado"] = mensaje["status"]
+                if self.server_timing:
+                    headers = list(mensaje.get("headers", []))
+                    headers.append((b"server-timing", server_timing(traza, time.perf_counter() - inicio).encode("latin-1")))
+                    mensaje = {**mensaje, "headers": headers}
+            elif mensaje["type"] == "http.response.body":
+                respuesta["bytes"] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _traza_actual.reset(token)
+            duracion = time.perf_counter() - inicio
+            endpoint, group_by = _plantilla_ruta(scope), _group_by(scope)
+            DURACION_PETICIONES.observar(duracion, endpoint, group_by)
+            TAMANO_RESPUESTAS.observar(respuesta["bytes"], endpoint, group_by)
+            PETICIONES.incrementar(endpoint, str(respuesta["estado"]))
+            for nombre, duracion_tramo in traza.tramos:
+                DURACION_TRAMOS.observar(duracion_tramo, nombre, endpoint)
+            if muestras is not None:
+                consulta = scope.get("query_string", b"").decode("latin-1")
+                self.perfilador.terminar(muestras, duracion, f"{scope['method']} {scope['path']}{'?' + consulta if consulta else ''}")
@@ -0,0 +1,126 @@
+"""
+Perfilador por muestreo para encontrar regresiones bajo carga real.
+
+Mientras haya peticiones en curso, un hilo toma cada ``intervalo_ms`` las
+pilas de todos los hilos del proceso (``sys._current_frames``) y las suma a
+cada petición activa. Al terminar, si la petición tardó más que el umbral se
+guarda su perfil en formato de pilas colapsadas (``frame;frame;frame N``,
+el que leen ``flamegraph.pl`` y speedscope); si no, se descarta.
+
+Como las peticiones comparten el hilo del event loop y los pools, el perfil
+de una petición es lo que hacía el proceso mientras ella estaba activa: con
+mucha concurrencia incluye trabajo de otras peticiones. Sin peticiones en
+curso el hilo de muestreo queda en espera.
+"""
+from collections import Counter
+from typing import List, Optional
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_NO_SEGURO = re.compile(r"[^0-9A-Za-z_.-]+")
+
+
+def _pila(frame) -> str:
+    """Pila colapsada desde la raíz (``archivo:funcion;...``)"""
+    partes = []
+    while frame is not None:
+        codigo = frame.f_code
+        partes.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(partes))
+
+
+class PerfiladorMuestreo:
+    """
+    Guarda el perfil de las peticiones que superan un umbral de duración.
+
+    Args:
+        umbral_ms: Duración a partir de la cual se guarda el perfil de una petición
+        carpeta: Carpeta donde se escriben los perfiles
+        intervalo_ms: Milisegundos entre muestras
+        conservar: Cantidad de perfiles que se conservan (se borran los más viejos)
+    """
+
+    def __init__(self, umbral_ms: float, carpeta: str, intervalo_ms: float = 5.0, conservar: int = 100):
+        self.umbral_ms = umbral_ms
+        self.carpeta = carpeta
+        self.intervalo = intervalo_ms / 1000
+        self.conservar = conservar
+        self.guardados = 0
+        self._activas: List[Counter] = []
+        self._hay_activas = threading.Event()
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> Counter:
+        """Empieza a muestrear una petición; devuelve sus muestras (pila -> cantidad)"""
+        muestras: Counter = Counter()
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+                self._hilo.start()
+            self._activas.append(muestras)
+            self._hay_activas.set()
+        return muestras
+
+    def terminar(self, muestras: Counter, duracion: float, descripcion: str) -> Optional[str]:
+        """
+        Deja de muestrear una petición y guarda su perfil si fue lenta.
+
+        Args:
+            muestras: Lo devuelto por ``iniciar``
+            duracion: Duración de la petición en segundos
+            descripcion: Método, ruta y consulta, para el log y el nombre del archivo
+
+        Returns:
+            Ruta del perfil guardado, o None si la petición no superó el umbral
+        """
+        with self._lock:
+            self._activas = [activa for activa in self._activas if activa is not muestras]
+            if not self._activas:
+                self._hay_activas.clear()
+        if duracion * 1000 < self.umbral_ms:
+            return None
+        try:
+            return self._guardar(muestras, duracion, descripcion)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el perfil de {descripcion}: {str(e)}")
+            return None
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        nombres = {}
+        while True:
+            self._hay_activas.wait()
+            time.sleep(self.intervalo)
+            frames = sys._current_frames()
+            if len(nombres) != threading.active_count():
+                nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            pilas = [
+                f"{nombres.get(ident, ident)};{_pila(frame)}"
+                for ident, frame in frames.items() if ident != propio
+            ]
+            with self._lock:
+                for muestras in self._activas:
+                    muestras.update(pilas)
+
+    def _guardar(self, muestras: Counter, duracion: float, descripcion: str) -> str:
+        os.makedirs(self.carpeta, exist_ok=True)
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{duracion * 1000:.0f}ms-{_NO_SEGURO.sub('_', descripcion)[:80]}.folded"
+        ruta = os.path.join(self.carpeta, nombre)
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            for pila, cantidad in muestras.most_common():
+                archivo.write(f"{pila} {cantidad}\n")
+        self.guardados += 1
+        logger.warning(f"Petición lenta ({duracion * 1000:.0f}ms, {sum(muestras.values())} muestras): {descripcion}. Perfil en {ruta}")
+
+        perfiles = sorted(f for f in os.listdir(self.carpeta) if f.endswith(".folded"))
+        for viejo in perfiles[:max(0, len(perfiles) - self.conservar)]:
+            os.remove(os.path.join(self.carpeta, viejo))
+        return ruta
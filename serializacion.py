@@ -0,0 +1,174 @@
+"""
+Serialización columnar de las filas de ``/datos``.
+
+La limpieza que antes se hacía celda por celda dentro de ``iterrows()``
+(NaN/inf a null, Season a entero, coerción a string) se aplica una sola vez
+por versión del dataset sobre columnas completas. Una página se arma tomando
+los row ids de cada columna ya limpia y combinándolos en una sola pasada.
+
+Además cada fila se codifica a JSON una sola vez por versión: una página de
+la respuesta es la concatenación de esos fragmentos ya codificados.
+"""
+from functools import cached_property
+from typing import Any, Dict, List
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Campos de cada registro sin agrupar, en el orden de la respuesta
+CAMPOS_FILA = [
+    "First name", "Last name", "Adjusted first name", "Adjusted last name", "Team",
+    "Season", "Position", "Height", "Weight", "Nationality", "Birthdate",
+]
+
+_CAMPOS_TEXTO = {"First name", "Last name", "Adjusted first name", "Adjusted last name", "Team", "Position", "Birthdate"}
+_CAMPOS_NUMERICOS = {"Height", "Weight"}
+
+
+class FragmentoJSON:
+    """JSON ya codificado que se inserta tal cual al componer una respuesta"""
+
+    __slots__ = ("contenido",)
+
+    def __init__(self, contenido: bytes):
+        self.contenido = contenido
+
+
+def codificar_json(contenido: Any) -> bytes:
+    """Codifica con los mismos parámetros que JSONResponse para obtener bytes idénticos"""
+    return json.dumps(
+        contenido,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def lista_json(fragmentos: List[bytes]) -> FragmentoJSON:
+    """Array JSON a partir de elementos ya codificados"""
+    return FragmentoJSON(b"[" + b",".join(fragmentos) + b"]")
+
+
+def componer_json(contenido: Any) -> bytes:
+    """
+    Codifica una respuesta que puede contener fragmentos ya codificados.
+
+    Solo se recorren los diccionarios y listas que contienen fragmentos; el
+    resto pasa por ``jsonable_encoder`` igual que en una respuesta normal de FastAPI.
+    """
+    if isinstance(contenido, FragmentoJSON):
+        return contenido.contenido
+    if isinstance(contenido, dict) and any(isinstance(v, FragmentoJSON) for v in contenido.values()):
+        partes = [codificar_json(str(clave)) + b":" + componer_json(valor) for clave, valor in contenido.items()]
+        return b"{" + b",".join(partes) + b"}"
+    if isinstance(contenido, list) and any(isinstance(v, FragmentoJSON) for v in contenido):
+        return b"[" + b",".join(componer_json(valor) for valor in contenido) + b"]"
+    return codificar_json(jsonable_encoder(contenido))
+
+
+class JSONRapido(Response):
+    """Respuesta JSON que acepta fragmentos precodificados (ver ``componer_json``)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return componer_json(content)
+
+
+def _columna_texto(serie: pd.Series) -> np.ndarray:
+    """str(valor) o None si es nulo"""
+    nulos = serie.isna().to_numpy()
+    resultado = serie.astype(str).to_numpy(dtype=object)
+    resultado[nulos] = None
+    return resultado
+
+
+def _columna_entera(serie: pd.Series) -> np.ndarray:
+    """int(valor) o None si es nulo"""
+    nulos = serie.isna().to_numpy()
+    resultado = np.empty(len(serie), dtype=object)
+    if (~nulos).any():
+        resultado[~nulos] = [int(v) for v in serie.to_numpy()[~nulos].tolist()]
+    resultado[nulos] = None
+    return resultado
+
+
+def _columna_numerica(serie: pd.Series) -> np.ndarray:
+    """El número tal cual (float o int de Python) o None si es NaN o infinito"""
+    valores = serie.to_numpy()
+    invalidos = serie.isna().to_numpy()
+    if np.issubdtype(valores.dtype, np.floating):
+        invalidos |= np.isinf(valores)
+    resultado = valores.astype(object)
+    resultado[invalidos] = None
+    return resultado
+
+
+def _columna_cruda(serie: pd.Series) -> np.ndarray:
+    """El valor sin convertir o None si es nulo"""
+    resultado = serie.to_numpy(dtype=object).copy()
+    resultado[serie.isna().to_numpy()] = None
+    return resultado
+
+
+class SerializadorFilas:
+    """Columnas ya limpias para armar registros sin agrupar de una versión del dataset"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.columnas: Dict[str, np.ndarray] = {}
+        for campo in CAMPOS_FILA:
+            serie = df[campo]
+            if campo == "Season":
+                self.columnas[campo] = _columna_entera(serie)
+            elif campo in _CAMPOS_NUMERICOS:
+                self.columnas[campo] = _columna_numerica(serie)
+            elif campo in _CAMPOS_TEXTO:
+                self.columnas[campo] = _columna_texto(serie)
+            else:
+                self.columnas[campo] = _columna_cruda(serie)
+
+        self.total_filas = len(df)
+        self._anterior = None
+
+    def heredar(self, anterior: "SerializadorFilas", mapa_filas: np.ndarray):
+        """
+        Reutiliza el JSON de las filas idénticas a una de la versión anterior.
+
+        Args:
+            anterior: Serializador de la versión anterior
+            mapa_filas: Fila anterior idéntica a cada fila de esta versión, o -1
+        """
+        self._anterior = (anterior, mapa_filas)
+
+    def registros(self, filas: np.ndarray) -> List[Dict[str, Any]]:
+        """Registros de los row ids indicados, en ese orden"""
+        valores = [self.columnas[campo][filas].tolist() for campo in CAMPOS_FILA]
+        return [dict(zip(CAMPOS_FILA, fila)) for fila in zip(*valores)]
+
+    @cached_property
+    def fragmentos(self) -> np.ndarray:
+        """JSON de cada fila, codificado una vez por versión"""
+        fragmentos = np.empty(self.total_filas, dtype=object)
+        if self._anterior is None:
+            fragmentos[:] = [codificar_json(registro) for registro in self.registros(np.arange(self.total_filas))]
+            return fragmentos
+
+        anterior, mapa_filas = self._anterior
+        self._anterior = None
+        reutilizadas = mapa_filas >= 0
+        fragmentos[reutilizadas] = anterior.fragmentos[mapa_filas[reutilizadas]]
+        nuevas = np.flatnonzero(~reutilizadas)
+        if len(nuevas):
+            fragmentos[nuevas] = [codificar_json(registro) for registro in self.registros(nuevas)]
+        return fragmentos
+
+    def registros_json(self, filas: np.ndarray) -> FragmentoJSON:
+        """Array JSON de los row ids indicados, unido a partir de los fragmentos"""
+        return lista_json(self.fragmentos[filas].tolist())
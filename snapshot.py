@@ -0,0 +1,186 @@
+"""
+Snapshots columnares del dataset en disco para arrancar sin descargar el CSV.
+
+Cada versión publicada se guarda en ``<directorio>/<version>/`` con un
+``manifest.json`` y un archivo ``.npy`` por columna: las columnas numéricas
+tal cual y las categóricas y de texto como códigos enteros más la lista de
+valores distintos (guardada en el manifiesto). Al arrancar se lee el manifiesto de la
+versión más reciente y los ``.npy`` se abren con ``mmap`` de solo lectura,
+así que varios workers de la misma máquina comparten las páginas del sistema
+operativo en lugar de tener cada uno su copia parseada.
+
+Las escrituras son atómicas (directorio temporal + ``rename``, y puntero
+``ACTUAL`` reemplazado con ``os.replace``), de modo que un worker nunca lee
+un snapshot a medio escribir aunque otro lo esté guardando.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMATO_SNAPSHOT = 2
+
+_MANIFIESTO = "manifest.json"
+_PUNTERO = "ACTUAL"
+
+
+@dataclass
+class Snapshot:
+    """Contenido de un snapshot leído de disco"""
+    df: pd.DataFrame
+    version: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    guardado_en: float
+
+
+def _es_texto(serie: pd.Series) -> bool:
+    return serie.dtype == object or pd.api.types.is_string_dtype(serie.dtype)
+
+
+class AlmacenSnapshots:
+    """
+    Directorio con los snapshots de las últimas versiones del dataset.
+
+    Args:
+        directorio: Carpeta donde se guardan los snapshots (se crea si no existe)
+        conservar: Número de versiones que se mantienen en disco
+    """
+
+    def __init__(self, directorio: str, conservar: int = 2):
+        self.directorio = directorio
+        self.conservar = max(conservar, 1)
+
+    def guardar(self, df: pd.DataFrame, version: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """
+        Guarda una versión del dataset y la marca como la más reciente.
+
+        Returns:
+            True si se escribió el snapshot, False si esa versión ya existía
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        destino = os.path.join(self.directorio, version)
+        if os.path.exists(os.path.join(destino, _MANIFIESTO)):
+            self._apuntar(version)
+            return False
+
+        temporal = tempfile.mkdtemp(prefix=f".{version}-", dir=self.directorio)
+        try:
+            columnas: List[Dict[str, Any]] = []
+            for posicion, nombre in enumerate(df.columns):
+                serie = df[nombre]
+                archivo = f"{posicion:03d}.npy"
+                if isinstance(serie.dtype, pd.CategoricalDtype):
+                    np.save(os.path.join(temporal, archivo), serie.cat.codes.to_numpy())
+                    columnas.append({"nombre": nombre, "archivo": archivo, "tipo": "categorica", "categorias": serie.cat.categories.tolist()})
+                elif _es_texto(serie):
+                    codigos, categorias = pd.factorize(serie, use_na_sentinel=True)
+                    np.save(os.path.join(temporal, archivo), codigos.astype(np.int32))
+                    columnas.append({"nombre": nombre, "archivo": archivo, "tipo": "texto", "categorias": categorias.tolist()})
+                else:
+                    np.save(os.path.join(temporal, archivo), serie.to_numpy())
+                    columnas.append({"nombre": nombre, "archivo": archivo, "tipo": "numerico"})
+
+            manifiesto = {
+                "formato": FORMATO_SNAPSHOT,
+                "version": version,
+                "etag": etag,
+                "last_modified": last_modified,
+                "filas": len(df),
+                "guardado_en": time.time(),
+                "columnas": columnas,
+            }
+            with open(os.path.join(temporal, _MANIFIESTO), "w", encoding="utf-8") as f:
+                json.dump(manifiesto, f, ensure_ascii=False)
+
+            try:
+                os.rename(temporal, destino)
+            except OSError:
+                # Otro worker guardó la misma versión mientras tanto
+                shutil.rmtree(temporal, ignore_errors=True)
+                return False
+        except Exception:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+
+        self._apuntar(version)
+        self._podar(version)
+        logger.info(f"Snapshot de la versión {version} guardado en {destino}")
+        return True
+
+    def cargar(self, version: Optional[str] = None) -> Optional[Snapshot]:
+        """
+        Lee el snapshot de una versión (por defecto el más reciente), o None si no hay uno válido.
+
+        Las columnas numéricas y los códigos de las categóricas quedan mapeados
+        en memoria (solo lectura) sin copiarse.
+        """
+        version = version or self.ultima_version()
+        if version is None or not os.path.isdir(os.path.join(self.directorio, version)):
+            return None
+        carpeta = os.path.join(self.directorio, version)
+        try:
+            with open(os.path.join(carpeta, _MANIFIESTO), encoding="utf-8") as f:
+                manifiesto = json.load(f)
+            if manifiesto.get("formato") != FORMATO_SNAPSHOT:
+                logger.warning(f"Snapshot {version} con formato desconocido, se ignora")
+                return None
+
+            columnas = {}
+            for columna in manifiesto["columnas"]:
+                valores = np.load(os.path.join(carpeta, columna["archivo"]), mmap_mode="r", allow_pickle=False)
+                if columna["tipo"] == "categorica":
+                    # Los códigos siguen mapeados en memoria: solo el diccionario es propio del proceso
+                    valores = pd.Categorical.from_codes(valores.view(np.ndarray), categories=columna["categorias"])
+                elif columna["tipo"] == "texto":
+                    categorias = np.empty(len(columna["categorias"]) + 1, dtype=object)
+                    categorias[:-1] = columna["categorias"]
+                    categorias[-1] = np.nan
+                    # El código -1 (nulo) toma el último elemento
+                    valores = categorias[valores]
+                else:
+                    # Vista ndarray del mapa: pandas no debe ver la subclase memmap
+                    valores = valores.view(np.ndarray)
+                columnas[columna["nombre"]] = valores
+            df = pd.DataFrame(columnas, columns=[c["nombre"] for c in manifiesto["columnas"]], copy=False)
+            if len(df) != manifiesto["filas"]:
+                raise ValueError(f"se esperaban {manifiesto['filas']} filas y hay {len(df)}")
+        except Exception as e:
+            logger.warning(f"No se pudo leer el snapshot {version}: {str(e)}")
+            return None
+
+        return Snapshot(df, manifiesto["version"], manifiesto.get("etag"), manifiesto.get("last_modified"), manifiesto["guardado_en"])
+
+    def ultima_version(self) -> Optional[str]:
+        """Versión a la que apunta ``ACTUAL``"""
+        try:
+            with open(os.path.join(self.directorio, _PUNTERO), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _apuntar(self, version: str):
+        temporal = os.path.join(self.directorio, f".{_PUNTERO}.{os.getpid()}")
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(temporal, os.path.join(self.directorio, _PUNTERO))
+
+    def _podar(self, vigente: str):
+        """Borra los snapshots más antiguos (los workers que aún los mapean conservan el acceso)"""
+        carpetas = [
+            nombre for nombre in os.listdir(self.directorio)
+            if not nombre.startswith(".") and os.path.isfile(os.path.join(self.directorio, nombre, _MANIFIESTO))
+        ]
+        carpetas.sort(key=lambda nombre: os.path.getmtime(os.path.join(self.directorio, nombre, _MANIFIESTO)), reverse=True)
+        for nombre in carpetas[self.conservar:]:
+            if nombre != vigente:
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
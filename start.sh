@@ -6,5 +6,5 @@ echo "🚀 Iniciando API CSV desde Google Drive..."
 echo "📊 Puerto: $PORT"
 echo "🐍 Python version: $(python --version)"
 
-# Ejecutar la aplicación
-exec uvicorn main:app --host 0.0.0.0 --port $PORT 
\ No newline at end of file
+# Ejecutar la aplicación con varios workers (WEB_CONCURRENCY, por defecto 2)
+exec gunicorn -c gunicorn.conf.py main:app 
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Fixtures compartidas: un CSV sintético con la forma del de la LNB y una fuente en memoria
+"""
+from typing import Optional
+import hashlib
+import io
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache_respuestas import CacheRespuestas
+from dataset import GestorDataset
+from fuentes import RespuestaFuente
+
+COLUMNAS = [
+    "First name", "Last name", "Adjusted first name", "Adjusted last name", "Team",
+    "Season", "Position", "Height", "Weight", "Nationality", "Birthdate",
+]
+
+NOMBRES = [
+    ("Pablo", "Pablo"), ("José", "Jose"), ("Juan", "Juan"), ("Nicolás", "Nicolas"),
+    ("Martín", "Martin"), ("Agustín", "Agustin"), ("Lucas", "Lucas"), ("Facundo", "Facundo"),
+    ("Tomás", "Tomas"), ("Iván", "Ivan"), ("Germán", "German"), ("Marcos", "Marcos"),
+]
+APELLIDOS = [
+    ("Pérez", "Perez"), ("García", "Garcia"), ("Gómez", "Gomez"), ("Ñañez", "Nanez"),
+    ("Aaron", "Aaron"), ("Fernández", "Fernandez"), ("Delía", "Delia"), ("Scola", "Scola"),
+    ("Prigioni", "Prigioni"), ("Campazzo", "Campazzo"), ("Vildoza", "Vildoza"), ("O'Connor", "O'Connor"),
+]
+EQUIPOS = [
+    "Boca Juniors", "Quimsa", "San Lorenzo", "Instituto", "Obras Basket", "Peñarol",
+    "San Martín (Corrientes)", "Regatas Corrientes", "Ferro Carril Oeste", "Argentino de Junín",
+]
+POSICIONES = ["G", "F", "C", "PG", "SG", "SF", "PF"]
+NACIONALIDADES = ["ARG", "USA", "URU", "BRA", "ARG/ITA"]
+
+
+def generar_filas(n_jugadores: int = 120, semilla: int = 7) -> list:
+    """Filas jugador-temporada-equipo con huecos y casos raros similares al CSV real"""
+    rnd = random.Random(semilla)
+    filas = []
+    for _ in range(n_jugadores):
+        nombre, nombre_aj = rnd.choice(NOMBRES)
+        apellido, apellido_aj = rnd.choice(APELLIDOS)
+        nacimiento = f"{rnd.randint(1975, 2005)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        altura = float(rnd.randint(175, 215)) if rnd.random() > 0.1 else None
+        peso = float(rnd.randint(70, 120)) + rnd.choice([0.0, 0.5]) if rnd.random() > 0.15 else None
+        nacionalidad = rnd.choice(NACIONALIDADES) if rnd.random() > 0.05 else None
+        posicion = rnd.choice(POSICIONES)
+        inicio = rnd.randint(2008, 2022)
+        for temporada in range(inicio, min(inicio + rnd.randint(1, 6), 2025)):
+            equipos = rnd.sample(EQUIPOS, 2 if rnd.random() < 0.1 else 1)
+            for equipo in equipos:
+                filas.append({
+                    "First name": nombre,
+                    "Last name": apellido,
+                    "Adjusted first name": nombre_aj,
+                    "Adjusted last name": apellido_aj,
+                    "Team": equipo,
+                    "Season": temporada,
+                    "Position": posicion if rnd.random() > 0.03 else None,
+                    "Height": altura,
+                    "Weight": peso,
+                    "Nationality": nacionalidad,
+                    "Birthdate": nacimiento if rnd.random() > 0.02 else None,
+                })
+    rnd.shuffle(filas)
+    return filas
+
+
+def generar_csv(n_jugadores: int = 120, semilla: int = 7) -> bytes:
+    """CSV sintético serializado igual que la exportación de Google Sheets"""
+    import pandas as pd
+    df = pd.DataFrame(generar_filas(n_jugadores, semilla), columns=COLUMNAS)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def leer_csv(contenido: bytes):
+    """El CSV parseado de una sola vez, como referencia de la lectura en bloques"""
+    import pandas as pd
+    return pd.read_csv(io.BytesIO(contenido))
+
+
+def calcular_version(contenido: bytes) -> str:
+    """Versión que corresponde a un contenido (ver ``lectura.leer_csv_en_bloques``)"""
+    return hashlib.sha1(contenido).hexdigest()[:12]
+
+
+def con_valores_raros(df):
+    """Variante del CSV con infinitos, temporadas nulas (Season pasa a float) y nombres vacíos"""
+    import numpy as np
+    df = df.copy()
+    df.loc[df.index[::17], "Height"] = np.inf
+    df.loc[df.index[::23], "Weight"] = -np.inf
+    df.loc[df.index[::31], "Season"] = np.nan
+    df.loc[df.index[::29], "Adjusted last name"] = np.nan
+    return df
+
+
+class FuenteMemoria:
+    """Fuente de prueba que sirve un contenido fijo y cuenta las descargas"""
+
+    def __init__(self, contenido: bytes, etag: Optional[str] = None):
+        self.contenido = contenido
+        self.etag = etag
+        self.descargas = 0
+        self.error: Optional[Exception] = None
+
+    def descargar(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[RespuestaFuente]:
+        self.descargas += 1
+        if self.error is not None:
+            raise self.error
+        if etag is not None and etag == self.etag:
+            return None
+        return RespuestaFuente(self.contenido, etag=self.etag)
+
+
+@pytest.fixture
+def csv_sintetico() -> bytes:
+    return generar_csv()
+
+
+@pytest.fixture
+def fuente(csv_sintetico) -> FuenteMemoria:
+    return FuenteMemoria(csv_sintetico, etag='"v1"')
+
+
+@pytest.fixture
+def client(monkeypatch, fuente):
+    """Cliente de la API apuntando a la fuente en memoria, una vez que el arranque terminó (sin precalcular respuestas)"""
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(fuente, ttl=0))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "")
+    with TestClient(main.app) as client:
+        esperar_listo(client)
+        yield client
+
+
+def esperar_listo(client: TestClient, limite: float = 10.0):
+    """Espera a que /health/ready responda 200"""
+    fin = time.monotonic() + limite
+    while client.get("/health/ready").status_code != 200:
+        assert time.monotonic() < fin, "la app no terminó de arrancar a tiempo"
+        time.sleep(0.01)
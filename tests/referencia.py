@@ -0,0 +1,353 @@
+"""
+Implementación original de /datos (anterior a los índices y materializaciones),
+usada como referencia en las pruebas de paridad
+"""
+import numpy as np
+import pandas as pd
+
+
+def datos_como_antes(df, page=1, limit=50, team=None, season=None, position=None, nationality=None,
+                     first_name=None, last_name=None, birthdate=None, height=None, weight=None,
+                     group_by=None, include_stats=False):
+    # Aplicar filtros si se proporcionan
+    if team:
+        df = df[df['Team'].str.contains(team, case=False, na=False)]
+        
+    if season:
+        df = df[df['Season'] == season]
+        
+    if position:
+        df = df[df['Position'].str.contains(position, case=False, na=False)]
+        
+    if nationality:
+        df = df[df['Nationality'].str.contains(nationality, case=False, na=False)]
+        
+    if first_name:
+        df = df[df['Adjusted first name'].str.contains(first_name, case=False, na=False)]
+        
+    if last_name:
+        df = df[df['Adjusted last name'].str.contains(last_name, case=False, na=False)]
+        
+    if birthdate:
+        df = df[df['Birthdate'].str.contains(birthdate, case=False, na=False)]
+        
+    if height is not None:
+        df = df[df['Height'] == height]
+        
+    if weight is not None:
+        df = df[df['Weight'] == weight]
+    
+    # Manejar agrupación si se solicita
+    if group_by:
+        if group_by == "player":
+            # Agrupar por jugador único
+            df_grouped = df.groupby(['First name', 'Last name', 'Adjusted first name', 'Adjusted last name']).agg({
+                'Team': lambda x: sorted(set([str(item) for item in x if pd.notna(item)])),
+                'Season': lambda x: sorted(set([int(item) for item in x if pd.notna(item)])),
+                'Position': lambda x: sorted(set([str(item) for item in x if pd.notna(item)])),
+                'Height': 'first',
+                'Weight': 'first',
+                'Nationality': 'first',
+                'Birthdate': 'first'
+            }).reset_index()
+            
+            # Convertir a formato de respuesta
+            datos = []
+            for _, row in df_grouped.iterrows():
+                # Manejar valores NaN e inf para JSON
+                altura = row['Height']
+                if pd.isna(altura) or np.isinf(altura):
+                    altura = None
+                    
+                peso = row['Weight']
+                if pd.isna(peso) or np.isinf(peso):
+                    peso = None
+                
+                # Verificar que no haya valores problemáticos en otros campos
+                nacionalidad = row['Nationality']
+                if pd.isna(nacionalidad):
+                    nacionalidad = None
+                    
+                fecha_nacimiento = row['Birthdate']
+                if pd.isna(fecha_nacimiento):
+                    fecha_nacimiento = None
+                
+                datos.append({
+                    "nombre": row['First name'],
+                    "apellido": row['Last name'],
+                    "nombre_ajustado": row['Adjusted first name'],
+                    "apellido_ajustado": row['Adjusted last name'],
+                    "equipos": row['Team'],
+                    "temporadas": row['Season'],
+                    "posiciones": row['Position'],
+                    "altura": altura,
+                    "peso": peso,
+                    "nacionalidad": nacionalidad,
+                    "fecha_nacimiento": fecha_nacimiento
+                })
+            
+            # Aplicar paginación a datos agrupados
+            total_records = len(datos)
+            total_pages = (total_records + limit - 1) // limit
+            start_idx = (page - 1) * limit
+            end_idx = start_idx + limit
+            datos = datos[start_idx:end_idx]
+            
+        elif group_by == "team":
+            # Agrupar por equipo
+            df_grouped = df.groupby('Team').agg({
+                'First name': 'count',
+                'Season': lambda x: list(set(x)),
+                'Position': lambda x: list(set(x)),
+                'Nationality': lambda x: list(set(x))
+            }).reset_index()
+            df_grouped = df_grouped.rename(columns={'First name': 'total_jugadores'})
+            
+            datos = []
+            for _, row in df_grouped.iterrows():
+                datos.append({
+                    "equipo": str(row['Team']) if pd.notna(row['Team']) else None,
+                    "total_jugadores": int(row['total_jugadores']) if pd.notna(row['total_jugadores']) else 0,
+                    "temporadas": sorted(set([int(item) for item in row['Season'] if pd.notna(item)])) if isinstance(row['Season'], list) else [],
+                    "posiciones": sorted(set([str(item) for item in row['Position'] if pd.notna(item)])) if isinstance(row['Position'], list) else [],
+                    "nacionalidades": sorted(set([str(item) for item in row['Nationality'] if pd.notna(item)])) if isinstance(row['Nationality'], list) else []
+                })
+            
+            # Aplicar paginación
+            total_records = len(datos)
+            total_pages = (total_records + limit - 1) // limit
+            start_idx = (page - 1) * limit
+            end_idx = start_idx + limit
+            datos = datos[start_idx:end_idx]
+            
+        elif group_by == "season":
+            # Agrupar por temporada
+            df_grouped = df.groupby('Season').agg({
+                'First name': 'count',
+                'Team': lambda x: list(set(x)),
+                'Position': lambda x: list(set(x)),
+                'Nationality': lambda x: list(set(x))
+            }).reset_index()
+            df_grouped = df_grouped.rename(columns={'First name': 'total_jugadores'})
+            
+            datos = []
+            for _, row in df_grouped.iterrows():
+                datos.append({
+                    "temporada": int(row['Season']) if pd.notna(row['Season']) else None,
+                    "total_jugadores": int(row['total_jugadores']) if pd.notna(row['total_jugadores']) else 0,
+                    "equipos": sorted(set([str(item) for item in row['Team'] if pd.notna(item)])) if isinstance(row['Team'], list) else [],
+                    "posiciones": sorted(set([str(item) for item in row['Position'] if pd.notna(item)])) if isinstance(row['Position'], list) else [],
+                    "nacionalidades": sorted(set([str(item) for item in row['Nationality'] if pd.notna(item)])) if isinstance(row['Nationality'], list) else []
+                })
+            
+            # Aplicar paginación
+            total_records = len(datos)
+            total_pages = (total_records + limit - 1) // limit
+            start_idx = (page - 1) * limit
+            end_idx = start_idx + limit
+            datos = datos[start_idx:end_idx]
+            
+        elif group_by == "career":
+            # Agrupar por jugador mostrando su trayectoria completa (temporada + equipo)
+            df_grouped = df.groupby(['First name', 'Last name', 'Adjusted first name', 'Adjusted last name']).agg({
+                'Team': list,
+                'Season': list,
+                'Position': lambda x: sorted(set([str(item) for item in x if pd.notna(item)])),
+                'Height': 'first',
+                'Weight': 'first',
+                'Nationality': 'first',
+                'Birthdate': 'first'
+            }).reset_index()
+            
+            # Convertir a formato de respuesta con trayectoria cronológica
+            datos = []
+            for _, row in df_grouped.iterrows():
+                # Manejar valores NaN e inf para JSON
+                altura = row['Height']
+                if pd.isna(altura) or np.isinf(altura):
+                    altura = None
+                    
+                peso = row['Weight']
+                if pd.isna(peso) or np.isinf(peso):
+                    peso = None
+                
+                # Verificar que no haya valores problemáticos en otros campos
+                nacionalidad = row['Nationality']
+                if pd.isna(nacionalidad):
+                    nacionalidad = None
+                    
+                fecha_nacimiento = row['Birthdate']
+                if pd.isna(fecha_nacimiento):
+                    fecha_nacimiento = None
+                
+                # Crear trayectoria cronológica (temporada + equipo)
+                trayectoria = []
+                equipos = row['Team']
+                temporadas = row['Season']
+                
+                # Crear pares temporada-equipo y ordenarlos cronológicamente
+                pares_temp_equipo: list[dict[str, int | str]] = []
+                for i in range(len(equipos)):
+                    if pd.notna(equipos[i]) and pd.notna(temporadas[i]):
+                        pares_temp_equipo.append({
+                            'temporada': int(temporadas[i]),
+                            'equipo': str(equipos[i])
+                        })
+                
+                # Ordenar por temporada
+                pares_temp_equipo.sort(key=lambda x: x['temporada'])
+                
+                # Agrupar por temporada si un jugador jugó en múltiples equipos en la misma temporada
+                trayectoria_agrupada: dict[int, list[str]] = {}
+                for par in pares_temp_equipo:
+                    temp = int(par['temporada'])
+                    equipo = str(par['equipo'])
+                    if temp not in trayectoria_agrupada:
+                        trayectoria_agrupada[temp] = []
+                    if equipo not in trayectoria_agrupada[temp]:
+                        trayectoria_agrupada[temp].append(equipo)
+                
+                # Convertir a lista ordenada
+                for temp in sorted(trayectoria_agrupada.keys()):
+                    trayectoria.append({
+                        'temporada': temp,
+                        'equipos': trayectoria_agrupada[temp]
+                    })
+                
+                datos.append({
+                    "nombre": str(row['First name']) if pd.notna(row['First name']) else None,
+                    "apellido": str(row['Last name']) if pd.notna(row['Last name']) else None,
+                    "nombre_ajustado": str(row['Adjusted first name']) if pd.notna(row['Adjusted first name']) else None,
+                    "apellido_ajustado": str(row['Adjusted last name']) if pd.notna(row['Adjusted last name']) else None,
+                    "trayectoria": trayectoria,
+                    "posiciones": sorted(set([str(item) for item in row['Position'] if pd.notna(item)])) if isinstance(row['Position'], list) else [],
+                    "altura": altura,
+                    "peso": peso,
+                    "nacionalidad": nacionalidad,
+                    "fecha_nacimiento": fecha_nacimiento,
+                    "total_temporadas": len(trayectoria_agrupada),
+                    "total_equipos": len(set([equipo for temp in trayectoria_agrupada.values() for equipo in temp]))
+                })
+            
+            # Aplicar paginación a datos agrupados
+            total_records = len(datos)
+            total_pages = (total_records + limit - 1) // limit
+            start_idx = (page - 1) * limit
+            end_idx = start_idx + limit
+            datos = datos[start_idx:end_idx]
+            
+        else:
+            # Agrupación no válida, continuar con datos normales
+            total_records = len(df)
+            total_pages = (total_records + limit - 1) // limit
+            start_idx = (page - 1) * limit
+            end_idx = start_idx + limit
+            df_paginated = df.iloc[start_idx:end_idx]
+            datos = df_paginated.to_dict(orient="records")
+    else:
+        # Sin agrupación, datos normales
+        total_records = len(df)
+        total_pages = (total_records + limit - 1) // limit
+        start_idx = (page - 1) * limit
+        end_idx = start_idx + limit
+        df_paginated = df.iloc[start_idx:end_idx]
+        
+        # Convertir a formato de respuesta con manejo de valores problemáticos
+        datos = []
+        for _, row in df_paginated.iterrows():
+            # Manejar valores NaN e inf para JSON
+            altura = row['Height']
+            if pd.isna(altura) or np.isinf(altura):
+                altura = None
+                
+            peso = row['Weight']
+            if pd.isna(peso) or np.isinf(peso):
+                peso = None
+            
+            # Verificar que no haya valores problemáticos en otros campos
+            nacionalidad = row['Nationality']
+            if pd.isna(nacionalidad):
+                nacionalidad = None
+                
+            fecha_nacimiento = row['Birthdate']
+            if pd.isna(fecha_nacimiento):
+                fecha_nacimiento = None
+            
+            datos.append({
+                "First name": str(row['First name']) if pd.notna(row['First name']) else None,
+                "Last name": str(row['Last name']) if pd.notna(row['Last name']) else None,
+                "Adjusted first name": str(row['Adjusted first name']) if pd.notna(row['Adjusted first name']) else None,
+                "Adjusted last name": str(row['Adjusted last name']) if pd.notna(row['Adjusted last name']) else None,
+                "Team": str(row['Team']) if pd.notna(row['Team']) else None,
+                "Season": int(row['Season']) if pd.notna(row['Season']) else None,
+                "Position": str(row['Position']) if pd.notna(row['Position']) else None,
+                "Height": altura,
+                "Weight": peso,
+                "Nationality": nacionalidad,
+                "Birthdate": str(fecha_nacimiento) if fecha_nacimiento is not None else None
+            })
+    
+    # Agregar estadísticas si se solicitan
+    if include_stats:
+        stats = {
+            "total_records": total_records,
+            "total_pages": total_pages,
+            "current_page": page,
+            "records_per_page": limit,
+            "filters_applied": {
+                "team": team,
+                "season": season,
+                "position": position,
+                "nationality": nationality,
+                "first_name": first_name,
+                "last_name": last_name,
+                "birthdate": birthdate,
+                "height": height,
+                "weight": weight
+            }
+        }
+        
+        # Agregar estadísticas básicas si hay datos
+        if len(df) > 0:
+            stats["data_stats"] = {
+                "unique_players": len(df.groupby(['First name', 'Last name'])),
+                "unique_teams": len(df['Team'].unique()),
+                "unique_seasons": len(df['Season'].unique())
+            }
+        
+        return {
+            "data": datos,
+            "stats": stats
+        }
+    return datos
+
+
+
+def respuesta_como_antes(df, **params) -> bytes:
+    """Cuerpo JSON que devolvía /datos con la implementación original"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    return JSONResponse(jsonable_encoder(datos_como_antes(df, **params))).body
+
+
+def info_como_antes(df) -> bytes:
+    """Cuerpo JSON que devolvía /info con la implementación original"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    info = {
+        "total_records": len(df),
+        "columns": list(df.columns),
+        "filters_available": {
+            "teams": sorted(df['Team'].dropna().unique().tolist()),
+            "seasons": sorted(df['Season'].dropna().unique().tolist()),
+            "positions": sorted(df['Position'].dropna().unique().tolist()),
+            "nationalities": sorted(df['Nationality'].dropna().unique().tolist())
+        },
+        "pagination": {
+            "default_page_size": 50,
+            "max_page_size": 100
+        }
+    }
+    return JSONResponse(jsonable_encoder(info)).body
@@ -0,0 +1,85 @@
+"""
+Las agrupaciones materializadas deben producir exactamente la misma respuesta que los groupby originales
+"""
+import io
+import os
+import pathlib
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from agrupaciones import Agrupaciones
+from referencia import respuesta_como_antes
+
+
+@pytest.fixture
+def df(csv_sintetico):
+    return pd.read_csv(io.BytesIO(csv_sintetico))
+
+
+CONSULTAS = [
+    {},
+    {"page": 2, "limit": 7},
+    {"page": 50, "limit": 100},
+    {"team": "Boca"},
+    {"season": 2018},
+    {"first_name": "Pablo"},
+    {"last_name": "ez", "position": "G"},
+    {"nationality": "ARG", "season": 2015, "limit": 5, "page": 2},
+    {"birthdate": "199", "include_stats": True},
+    {"team": "zzz"},
+    {"height": 200.0},
+]
+
+
+@pytest.mark.parametrize("group_by", ["player", "team", "season", "career"])
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_respuesta_identica_a_groupby(client, df, group_by, consulta):
+    params = dict(consulta, group_by=group_by)
+    respuesta = client.get("/datos", params=params)
+    assert respuesta.status_code == 200
+    assert respuesta.content == respuesta_como_antes(df, **params)
+
+
+def test_sin_filtros_la_pagina_es_un_slice_precalculado(df):
+    agrupaciones = Agrupaciones(df)
+    total, pagina, _ = agrupaciones.pagina("career", None, 10, 20)
+    assert total == len(agrupaciones.obtener("career"))
+    assert pagina[0] is agrupaciones.obtener("career").registros[10]
+
+
+def test_grupos_completos_reutilizan_el_registro(df):
+    agrupaciones = Agrupaciones(df)
+    equipos = agrupaciones.obtener("team")
+    filas = equipos.filas_por_grupo[0]
+    total, pagina, _ = agrupaciones.pagina("team", filas, 0, 10)
+    assert total == 1
+    assert pagina[0] is equipos.registros[0]
+
+
+SERIALIZAR = """
+import hashlib, sys
+import pandas as pd
+from agrupaciones import Agrupaciones
+agrupaciones = Agrupaciones(pd.read_csv(sys.argv[1]))
+for modo in ("player", "team", "season", "career"):
+    print(modo, hashlib.sha256(b"".join(agrupaciones.obtener(modo).fragmentos)).hexdigest())
+"""
+
+
+def test_bytes_independientes_del_hash_de_la_sesion(tmp_path, csv_sintetico):
+    # Dos workers con distinto PYTHONHASHSEED deben servir los mismos bytes bajo el mismo ETag
+    archivo = tmp_path / "datos.csv"
+    archivo.write_bytes(csv_sintetico)
+    raiz = pathlib.Path(__file__).resolve().parent.parent
+    salidas = []
+    for semilla in ("1", "2"):
+        entorno = dict(os.environ, PYTHONHASHSEED=semilla, PYTHONPATH=str(raiz))
+        proceso = subprocess.run(
+            [sys.executable, "-c", SERIALIZAR, str(archivo)],
+            env=entorno, capture_output=True, check=True,
+        )
+        salidas.append(proceso.stdout)
+    assert salidas[0] == salidas[1]
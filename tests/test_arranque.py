@@ -0,0 +1,108 @@
+"""
+Arranque en segundo plano: liveness mientras carga, readiness al terminar y respuestas precalculadas
+"""
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+from arranque import Arranque
+from cache_respuestas import CacheRespuestas
+from conftest import FuenteMemoria, esperar_listo
+from dataset import GestorDataset
+from snapshot import AlmacenSnapshots
+
+
+class FuenteLenta(FuenteMemoria):
+    """Fuente que no entrega el CSV hasta que se libera el evento"""
+
+    def __init__(self, contenido: bytes):
+        super().__init__(contenido)
+        self.liberar = threading.Event()
+
+    def descargar(self, etag=None, last_modified=None):
+        self.liberar.wait(10)
+        return super().descargar(etag, last_modified)
+
+
+def test_listo_solo_despues_de_cargar(monkeypatch, csv_sintetico):
+    fuente = FuenteLenta(csv_sintetico)
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(fuente, ttl=0))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "")
+    with TestClient(main.app) as client:
+        try:
+            # El servidor responde mientras descarga: vivo pero todavía no listo
+            vivo = client.get("/health")
+            assert vivo.status_code == 200 and vivo.json()["ready"] is False
+            pendiente = client.get("/health/ready")
+            assert pendiente.status_code == 503
+            assert pendiente.json()["stage"] == "dataset"
+        finally:
+            fuente.liberar.set()
+        esperar_listo(client)
+
+        listo = client.get("/health/ready").json()
+        assert listo["ready"] is True
+        assert list(listo["stages_ms"]) == ["dataset", "estructuras", "respuestas"]
+        assert listo["dataset"]["version"] == main.gestor_dataset.actual.version
+        assert {"indices", "agrupaciones", "facetas"} <= set(listo["dataset"]["build_ms"])
+        assert client.get("/health").json()["ready"] is True
+        assert "arranque_listo 1.0" in client.get("/metrics").text
+
+
+def test_respuestas_precalculadas(monkeypatch, fuente):
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(fuente, ttl=0))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "/info, /datos?group_by=player,/stats?group_by=nada")
+    with TestClient(main.app) as client:
+        esperar_listo(client)
+        cache = main.cache_respuestas.estadisticas()
+        # La ruta con un parámetro inválido no frena el arranque ni queda en la caché
+        assert cache["entradas"] == 2
+
+        assert client.get("/info").status_code == 200
+        respuesta = client.get("/datos?group_by=player", headers={"Accept-Encoding": "gzip"})
+        assert respuesta.headers["content-encoding"] == "gzip"
+        # Servidas desde la caché, con la versión comprimida ya guardada
+        assert main.cache_respuestas.estadisticas()["fallos"] == cache["fallos"]
+        # El precálculo no cuenta como tráfico
+        assert 'http_requests_total{endpoint="/info",status="200"} 1.0' in client.get("/metrics").text
+
+
+def test_estructuras_del_snapshot(monkeypatch, fuente, tmp_path):
+    snapshots = AlmacenSnapshots(str(tmp_path))
+    asyncio.run(GestorDataset(fuente, ttl=0, snapshots=snapshots).refrescar())
+
+    # Con snapshot la versión se publica enseguida y sus estructuras se construyen en segundo plano
+    gestor = GestorDataset(fuente, ttl=0, snapshots=snapshots)
+    monkeypatch.setattr(main, "gestor_dataset", gestor)
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "/datos")
+    with TestClient(main.app) as client:
+        esperar_listo(client)
+        assert "indices" in gestor.actual.tiempos_preparacion
+        assert main.cache_respuestas.estadisticas()["entradas"] == 1
+
+
+def test_etapa_fallida_se_reintenta():
+    arranque = Arranque(reintento=0.01)
+    intentos = []
+
+    async def etapa_inestable():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise RuntimeError("la fuente no responde")
+
+    async def escenario():
+        arranque.iniciar([("dataset", etapa_inestable)])
+        await asyncio.sleep(0.005)
+        pendiente = arranque.estado()
+        await arranque.esperar()
+        return pendiente
+
+    pendiente = asyncio.run(escenario())
+    assert pendiente["ready"] is False and "la fuente no responde" in pendiente["error"]
+    assert len(intentos) == 3
+    assert arranque.listo and "error" not in arranque.estado()
@@ -0,0 +1,48 @@
+"""
+Suite de benchmarks: servidor local de CSVs y comparación entre corridas
+"""
+import json
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import main
+from bench_suite import comparar, ejecutar
+from fuentes import FuenteHTTP
+from servidor_csv import ServidorCSV
+
+
+def test_servidor_csv_con_etag():
+    with ServidorCSV() as servidor:
+        fuente = FuenteHTTP(servidor.url(300))
+        respuesta = fuente.descargar()
+        assert b"".join(respuesta.partes_en_bloques()[0]).count(b"\n") == 301
+        assert respuesta.etag and respuesta.last_modified
+        assert fuente.descargar(respuesta.etag) is None
+        assert requests.get(f"http://127.0.0.1:{servidor.puerto}/otro.csv", timeout=5).status_code == 404
+
+
+def test_comparar_detecta_regresiones():
+    base = {"tamanos": {"1000": {"filtros": {"team": {"p50_ms": 1.0, "filas": 10}}, "http": {"datos": {"req_s": 100.0, "p99_ms": 0.01}}}}}
+    igual = comparar(base, base, 0.2)
+    assert igual == []
+    peor = {"tamanos": {"1000": {"filtros": {"team": {"p50_ms": 1.5, "filas": 99}}, "http": {"datos": {"req_s": 70.0, "p99_ms": 0.04}}}}}
+    regresiones = {r["metrica"]: r["empeora_pct"] for r in comparar(base, peor, 0.2)}
+    # Las filas no son una métrica de rendimiento y los tiempos bajo el piso se ignoran
+    assert regresiones == {"1000.filtros.team.p50_ms": 50.0, "1000.http.datos.req_s": 30.0}
+
+
+def test_suite_chica(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "gestor_dataset", main.gestor_dataset)
+    monkeypatch.setattr(main, "cache_respuestas", main.cache_respuestas)
+    resultados = ejecutar([400], repeticiones=1, duracion=0.1, concurrencia=2, semilla=1, cache=True)
+    tamano = resultados["tamanos"]["400"]
+    assert tamano["carga"]["parseo_ms"] > 0
+    assert {"team", "season_rango", "combinado"} <= set(tamano["filtros"])
+    assert {"player", "career_team", "sin_agrupar"} <= set(tamano["serializacion"])
+    assert all(escenario["peticiones"] > 0 and escenario["errores"] == 0 for escenario in tamano["http"].values())
+    json.dumps(resultados)
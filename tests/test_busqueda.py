@@ -0,0 +1,85 @@
+"""
+Búsqueda aproximada de jugadores por trigramas (/jugadores/search)
+"""
+import io
+
+import pandas as pd
+import pytest
+
+from busqueda import IndiceJugadores, plegar, trigramas
+from dataset import Dataset
+
+
+@pytest.fixture
+def dataset(csv_sintetico):
+    return Dataset(pd.read_csv(io.BytesIO(csv_sintetico)), "v")
+
+
+def test_plegar():
+    assert plegar("Ñañez") == "nanez"
+    assert plegar("  O'Connor  Delía ") == "o connor delia"
+    assert plegar(float("nan")) == ""
+    assert trigramas("nanez") == {"  n", " na", "nan", "ane", "nez", "ez "}
+
+
+@pytest.mark.parametrize("consulta,esperado", [
+    ("Ñañez", "Nanez"),
+    ("nanez", "Nanez"),
+    ("campazo", "Campazzo"),
+    ("PRIGIONI", "Prigioni"),
+])
+def test_acentos_y_errores(dataset, consulta, esperado):
+    agrupacion = dataset.agrupaciones.obtener("player")
+    resultados = dataset.busqueda.buscar(consulta, limite=5)
+    assert resultados
+    for jugador, puntaje, _ in resultados:
+        assert agrupacion.claves[jugador][3] == esperado
+        assert puntaje >= 0.8
+
+
+def test_orden_y_limite(dataset):
+    resultados = dataset.busqueda.buscar("Pablo Perez", limite=4)
+    assert len(resultados) == 4
+    claves = [(puntaje, similitud) for _, puntaje, similitud in resultados]
+    assert claves == sorted(claves, reverse=True)
+    agrupacion = dataset.agrupaciones.obtener("player")
+    mejor = agrupacion.claves[resultados[0][0]]
+    assert (mejor[2], mejor[3]) == ("Pablo", "Perez")
+    assert resultados[0][2] == 1.0
+
+
+def test_minimo(dataset):
+    assert dataset.busqueda.buscar("xqzw") == []
+    assert all(puntaje >= 0.9 for _, puntaje, _ in dataset.busqueda.buscar("Garcia", limite=50, minimo=0.9))
+
+
+def test_indice_vacio():
+    vacio = Dataset(pd.DataFrame(columns=["First name", "Last name", "Adjusted first name", "Adjusted last name", "Birthdate"]), "v")
+    indice = IndiceJugadores(vacio.agrupaciones.obtener("player"), vacio.jugadores.id_de_fila)
+    assert indice.buscar("juan") == []
+
+
+def test_endpoint_con_registro_de_group_by_player(client):
+    respuesta = client.get("/jugadores/search", params={"q": "campazo", "limit": 3})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["query"] == "campazo"
+    assert 0 < len(cuerpo["results"]) <= 3
+    jugadores = []
+    pagina = 1
+    while True:
+        datos = client.get("/datos", params={"group_by": "player", "limit": 100, "page": pagina}).json()
+        jugadores.extend(datos)
+        if len(datos) < 100:
+            break
+        pagina += 1
+    for resultado in cuerpo["results"]:
+        assert resultado["jugador"] in jugadores
+        assert resultado["jugador"]["apellido_ajustado"] == "Campazzo"
+        # El ID lleva a la ficha estable de un jugador con ese nombre (con homónimos, el de la primera fila)
+        ficha = client.get(f"/jugadores/{resultado['id']}").json()
+        assert ficha["id"] == resultado["id"]
+        for campo in ("nombre", "apellido", "nombre_ajustado", "apellido_ajustado"):
+            assert ficha[campo] == resultado["jugador"][campo]
+
+    assert client.get("/jugadores/search", params={"q": ""}).status_code == 422
@@ -0,0 +1,78 @@
+"""
+Caché de respuestas, ETag y 304
+"""
+import main
+from cache_respuestas import CacheRespuestas, etag_coincide
+from conftest import generar_csv
+
+
+def test_consultas_equivalentes_comparten_entrada(client):
+    primera = client.get("/datos?team=Boca&season=2015")
+    segunda = client.get("/datos?season=2015&team=Boca&page=1&limit=50")
+    assert primera.content == segunda.content
+    assert primera.headers["etag"] == segunda.headers["etag"]
+    assert main.cache_respuestas.aciertos == 1
+
+
+def test_if_none_match_devuelve_304(client):
+    primera = client.get("/datos", params={"group_by": "career", "limit": 10})
+    etag = primera.headers["etag"]
+    assert primera.headers["cache-control"] == main.CACHE_CONTROL
+
+    repetida = client.get("/datos", params={"group_by": "career", "limit": 10}, headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+
+    otra = client.get("/datos", params={"group_by": "career", "limit": 11}, headers={"If-None-Match": etag})
+    assert otra.status_code == 200
+
+
+def test_info_tiene_etag(client):
+    respuesta = client.get("/info")
+    assert respuesta.status_code == 200
+    assert client.get("/info", headers={"If-None-Match": respuesta.headers["etag"]}).status_code == 304
+
+
+def test_version_nueva_invalida_la_cache(client, fuente):
+    antes = client.get("/datos?limit=5")
+    fuente.contenido = generar_csv(semilla=99)
+    fuente.etag = '"v2"'
+    client.portal.call(main.gestor_dataset.refrescar)
+    despues = client.get("/datos?limit=5", headers={"If-None-Match": antes.headers["etag"]})
+    assert despues.status_code == 200
+    assert despues.headers["etag"] != antes.headers["etag"]
+    # La respuesta de la versión anterior no se descarta de golpe: sale por LRU
+    assert len(main.cache_respuestas) == 2
+
+
+def test_versiones_intercaladas_no_vacian_la_cache():
+    cache = CacheRespuestas(max_entradas=4)
+    for _ in range(3):
+        for version in ("v1", "v2"):
+            cache.obtener(version, "/datos", "a", lambda: version.encode())
+    assert cache.fallos == 2 and cache.aciertos == 4
+    assert cache.buscar("v1", "/datos", "a").cuerpo == b"v1"
+
+
+def test_lru_acotada():
+    cache = CacheRespuestas(max_entradas=2)
+    for clave in ("a", "b", "a", "c"):
+        cache.obtener("v1", "/datos", clave, lambda: clave.encode())
+    assert len(cache) == 2
+    assert cache.aciertos == 1
+    cache.obtener("v1", "/datos", "b", lambda: b"b")
+    assert cache.fallos == 4
+
+
+def test_errores_no_se_cachean(client):
+    assert client.get("/datos?team=Boca(").status_code == 500
+    assert len(main.cache_respuestas) == 0
+
+
+def test_etag_coincide():
+    assert etag_coincide('"x", "v1-abc"', '"v1-abc"')
+    assert etag_coincide('W/"v1-abc"', '"v1-abc"')
+    assert etag_coincide("*", '"v1-abc"')
+    assert not etag_coincide(None, '"v1-abc"')
+    assert not etag_coincide('"v1-abd"', '"v1-abc"')
@@ -0,0 +1,96 @@
+"""
+Refresco incremental y /datos/changes
+"""
+import io
+
+import pandas as pd
+import pytest
+
+import main
+from cambios import calcular_diferencia
+from conftest import generar_csv
+from referencia import info_como_antes, respuesta_como_antes
+from serializacion import SerializadorFilas
+
+
+def _editar(contenido: bytes, eliminar=(), agregar: int = 0, pesos: dict = None) -> bytes:
+    """Versión del CSV con filas eliminadas, filas de otro CSV agregadas al final y pesos modificados"""
+    df = pd.read_csv(io.BytesIO(contenido))
+    for fila, peso in (pesos or {}).items():
+        df.loc[fila, "Weight"] = peso
+    df = df.drop(index=list(eliminar))
+    if agregar:
+        nuevas = pd.read_csv(io.BytesIO(generar_csv(n_jugadores=10, semilla=123))).head(agregar)
+        df = pd.concat([df, nuevas], ignore_index=True)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _publicar(client, fuente, contenido: bytes, etag: str):
+    fuente.contenido = contenido
+    fuente.etag = etag
+    client.portal.call(main.gestor_dataset.refrescar)
+
+
+def test_diferencia_por_clave(csv_sintetico):
+    anterior = pd.read_csv(io.BytesIO(csv_sintetico))
+    nuevo = pd.read_csv(io.BytesIO(_editar(csv_sintetico, eliminar=[0, 5, 9], agregar=4, pesos={20: 250.0, 21: 251.0})))
+    diferencia = calcular_diferencia(SerializadorFilas(anterior).columnas, SerializadorFilas(nuevo).columnas)
+    assert list(diferencia.eliminadas) == [0, 5, 9]
+    assert list(diferencia.agregadas) == list(range(len(nuevo) - 4, len(nuevo)))
+    assert list(nuevo.loc[diferencia.modificadas, "Weight"]) == [250.0, 251.0]
+    assert list(diferencia.modificadas_antes) == [20, 21]
+    assert (diferencia.mapa_filas >= 0).sum() == len(anterior) - 5
+
+
+def test_refresco_incremental_identico_a_reconstruir(client, fuente, csv_sintetico):
+    client.get("/datos")
+    contenido = _editar(csv_sintetico, eliminar=[3, 4], agregar=6, pesos={30: 99.5})
+    _publicar(client, fuente, contenido, '"v2"')
+    df = pd.read_csv(io.BytesIO(contenido))
+
+    agrupaciones = main.gestor_dataset.actual.agrupaciones
+    assert 0 < agrupaciones.obtener("player").reutilizados < len(agrupaciones.obtener("player"))
+    for params in ({}, {"limit": 100, "page": 4}, {"group_by": "player", "limit": 100}, {"group_by": "team"},
+                   {"group_by": "career", "team": "San"}, {"group_by": "season", "include_stats": True}):
+        assert client.get("/datos", params=params).content == respuesta_como_antes(df, **params), params
+    assert client.get("/info").content == info_como_antes(df)
+
+
+def test_info_con_cambio_de_tipo(client, fuente, csv_sintetico):
+    client.get("/info")
+    # Una temporada vacía hace que Season pase a decimales: la faceta se vuelve a contar
+    df = pd.read_csv(io.BytesIO(csv_sintetico))
+    df.loc[7, "Season"] = None
+    contenido = df.to_csv(index=False).encode("utf-8")
+    _publicar(client, fuente, contenido, '"v2"')
+    assert client.get("/info").content == info_como_antes(pd.read_csv(io.BytesIO(contenido)))
+
+
+def test_cambios_desde_una_version(client, fuente, csv_sintetico):
+    v1 = client.get("/datos").headers["x-dataset-version"]
+    v2_csv = _editar(csv_sintetico, eliminar=[0], agregar=2)
+    _publicar(client, fuente, v2_csv, '"v2"')
+    v2 = main.gestor_dataset.actual.version
+    _publicar(client, fuente, _editar(v2_csv, pesos={10: 300.0}), '"v3"')
+    v3 = main.gestor_dataset.actual.version
+
+    respuesta = client.get("/datos/changes", params={"since": v1})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert (cuerpo["desde"], cuerpo["hasta"]) == (v1, v3)
+    assert [(c["desde"], c["hasta"]) for c in cuerpo["cambios"]] == [(v1, v2), (v2, v3)]
+    primero, segundo = cuerpo["cambios"]
+    assert primero["totales"] == {"agregadas": 2, "eliminadas": 1, "modificadas": 0}
+    assert len(primero["agregadas"]) == 2 and len(primero["eliminadas"]) == 1
+    assert segundo["totales"] == {"agregadas": 0, "eliminadas": 0, "modificadas": 1}
+    assert segundo["modificadas"][0]["Weight"] == 300.0
+
+    assert client.get("/datos/changes", params={"since": v2}).json()["cambios"] == [segundo]
+    assert client.get("/datos/changes", params={"since": v3}).json()["cambios"] == []
+    assert client.get("/datos/changes", params={"since": "desconocida"}).status_code == 410
+
+
+def test_recarga_completa_corta_el_historial(client, fuente):
+    v1 = client.get("/datos").headers["x-dataset-version"]
+    _publicar(client, fuente, generar_csv(semilla=99), '"v2"')
+    assert client.get("/datos/changes", params={"since": v1}).status_code == 410
@@ -0,0 +1,80 @@
+"""
+Representación compacta de la tabla: mismos valores con menos memoria
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compactacion import columna_fecha, compactar, reporte_memoria
+from indices import IndiceFiltros
+from test_indices import PATRONES_TEXTO, filtrar_como_antes
+
+
+@pytest.fixture
+def df(csv_sintetico):
+    return pd.read_csv(io.BytesIO(csv_sintetico))
+
+
+def _valores(serie):
+    return [None if pd.isna(v) else v for v in serie.tolist()]
+
+
+def test_mismos_valores_con_menos_memoria(df):
+    compacto = compactar(df)
+    assert isinstance(compacto["Team"].dtype, pd.CategoricalDtype)
+    assert compacto["Season"].dtype == np.int16
+    assert compacto["Weight"].dtype == np.float32
+    for col in df.columns:
+        assert _valores(compacto[col]) == _valores(df[col]), col
+    reporte = reporte_memoria(df, compacto)
+    assert reporte["bytes_despues"] < reporte["bytes_antes"] / 3
+
+
+def test_solo_reduce_sin_perdida():
+    df = pd.DataFrame({
+        "decimales": [0.1, 0.2, 0.3, 0.4],
+        "medios": [85.5, np.nan, np.inf, 90.0],
+        "mezcla": ["a", 1, "a", "a"],
+        "unicos": ["a", "b", "c", "d"],
+    })
+    compacto = compactar(df)
+    assert compacto["decimales"].dtype == np.float64
+    assert compacto["medios"].dtype == np.float32
+    assert compacto["mezcla"].dtype == object
+    assert compacto["unicos"].dtype == object
+
+
+def test_nulos_como_centinelas(df):
+    compacto = compactar(df)
+    for col in ("Nationality", "Birthdate"):
+        assert ((compacto[col].cat.codes.to_numpy() < 0) == df[col].isna().to_numpy()).all()
+    assert (np.isnan(compacto["Height"].to_numpy()) == df["Height"].isna().to_numpy()).all()
+
+
+def test_fechas_de_nacimiento(df):
+    serie = pd.Series(["2000-01-27", None, "no es fecha", "1999-12-31"])
+    esperado = np.array(["2000-01-27", "NaT", "NaT", "1999-12-31"], dtype="datetime64[D]")
+    np.testing.assert_array_equal(columna_fecha(serie), esperado)
+    np.testing.assert_array_equal(columna_fecha(serie.astype("category")), esperado)
+    np.testing.assert_array_equal(columna_fecha(compactar(df)["Birthdate"]), columna_fecha(df["Birthdate"]))
+
+
+@pytest.mark.parametrize("param,patron", PATRONES_TEXTO)
+def test_filtros_sobre_el_diccionario(df, param, patron):
+    indices = IndiceFiltros(compactar(df))
+    try:
+        esperado = filtrar_como_antes(df, **{param: patron})
+    except Exception as e:
+        with pytest.raises(type(e)):
+            indices.filtrar({param: patron})
+        return
+    filas = indices.filtrar({param: patron})
+    assert list(filas) == list(esperado.index)
+
+
+def test_health_reporta_la_memoria(client):
+    dataset = client.get("/health").json()["dataset"]
+    assert dataset["compactacion"]["bytes_despues"] == dataset["memoria_bytes"]
+    assert dataset["compactacion"]["columnas"]["Team"]["tipo_despues"] == "category"
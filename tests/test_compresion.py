@@ -0,0 +1,102 @@
+"""
+Compresión de respuestas: negociación de Accept-Encoding y versiones comprimidas en la caché
+"""
+import gzip
+
+import pytest
+
+import cache_respuestas
+import main
+from compresion import codificaciones_habilitadas, comprimir, comprimir_en_bloques, elegir_codificacion
+
+
+@pytest.mark.parametrize("accept_encoding, esperada", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br, gzip", "br"),
+    ("gzip;q=0, *", "br"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+    ("zstd, GZIP;q=0.8", "zstd"),
+])
+def test_elegir_codificacion(accept_encoding, esperada):
+    assert elegir_codificacion(accept_encoding, ("br", "zstd", "gzip")) == esperada
+
+
+def test_codificaciones_habilitadas():
+    assert codificaciones_habilitadas("gzip, inexistente") == ("gzip",)
+    assert codificaciones_habilitadas("") == ()
+    assert gzip.decompress(comprimir(b"{}" * 1000, "gzip")) == b"{}" * 1000
+
+
+def test_respuesta_comprimida_una_sola_vez(client, monkeypatch):
+    llamadas = []
+
+    def comprimir_contando(cuerpo, codificacion):
+        llamadas.append(codificacion)
+        return comprimir(cuerpo, codificacion)
+
+    monkeypatch.setattr(cache_respuestas, "comprimir", comprimir_contando)
+    sin_comprimir = client.get("/datos?group_by=career&limit=100", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in sin_comprimir.headers
+    assert sin_comprimir.headers["vary"] == "Accept-Encoding"
+
+    for _ in range(3):
+        respuesta = client.get("/datos?group_by=career&limit=100", headers={"Accept-Encoding": "gzip"})
+        assert respuesta.headers["content-encoding"] == "gzip"
+        assert respuesta.content == sin_comprimir.content
+    assert llamadas == ["gzip"]
+
+    entrada = main.cache_respuestas.buscar(main.gestor_dataset.actual.version, "/datos", main.Consulta(group_by="career", limit=100).clave())
+    assert gzip.decompress(entrada.comprimidos["gzip"]) == sin_comprimir.content
+    assert len(entrada.comprimidos["gzip"]) < len(sin_comprimir.content) / 3
+
+
+def test_acierto_comprimido_cuenta_una_vez(client):
+    ruta = "/datos?group_by=career&limit=100"
+    client.get(ruta, headers={"Accept-Encoding": "identity"})
+    # La entrada ya está, pero sin la versión gzip: se comprime y cuenta como un solo acierto
+    assert client.get(ruta, headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    assert client.get(ruta, headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    assert (main.cache_respuestas.aciertos, main.cache_respuestas.fallos) == (2, 1)
+    texto = client.get("/metrics").text
+    assert "respuestas_cache_aciertos_total 2.0" in texto.splitlines()
+    assert "respuestas_cache_fallos_total 1.0" in texto.splitlines()
+
+
+def test_etag_debil_con_codificacion(client):
+    comprimida = client.get("/info", headers={"Accept-Encoding": "gzip"})
+    identidad = client.get("/info", headers={"Accept-Encoding": "identity"})
+    assert comprimida.headers["etag"] == "W/" + identidad.headers["etag"]
+
+    for etag in (comprimida.headers["etag"], identidad.headers["etag"]):
+        repetida = client.get("/info", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert repetida.status_code == 304
+        assert repetida.headers["etag"] == comprimida.headers["etag"]
+
+
+def test_respuestas_chicas_sin_comprimir(client, monkeypatch):
+    monkeypatch.setattr(main, "COMPRESION_MIN_BYTES", 10_000_000)
+    respuesta = client.get("/info", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in respuesta.headers
+
+
+def test_lote_y_exportacion_comprimidos(client):
+    lote = {"queries": [{"group_by": "career", "limit": 100}, {"limit": 100}]}
+    respuesta = client.post("/datos/batch", json=lote, headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert len(respuesta.json()["results"]) == 2
+
+    identidad = client.get("/datos/export?format=csv", headers={"Accept-Encoding": "identity"})
+    comprimida = client.get("/datos/export?format=csv", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in identidad.headers
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert comprimida.content == identidad.content
+
+
+def test_comprimir_en_bloques():
+    bloques = [f'{{"fila":{i},"equipo":"Boca Juniors"}}\n'.encode() for i in range(5000)]
+    comprimido = b"".join(comprimir_en_bloques(iter(bloques), "gzip"))
+    assert gzip.decompress(comprimido) == b"".join(bloques)
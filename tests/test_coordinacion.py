@@ -0,0 +1,287 @@
+"""
+Descarga única del CSV con muchas peticiones concurrentes y varios workers,
+contra un servidor HTTP local que reemplaza a Google Sheets
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import importlib.util
+import os
+import sys
+import threading
+import time
+import types
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import cargador
+import main
+from cache_respuestas import CacheRespuestas
+from coordinacion import CoordinadorRefresco
+from conftest import calcular_version, generar_csv
+from dataset import GestorDataset, LectorDataset
+from fuentes import FuenteHTTP
+from snapshot import AlmacenSnapshots
+
+
+class ServidorCSV:
+    """Sirve un CSV con ETag, cuenta las descargas y tarda un poco en responder"""
+
+    def __init__(self, contenido: bytes, demora: float = 0.2):
+        self.contenido = contenido
+        self.etag = '"v1"'
+        self.demora = demora
+        self.descargas = 0
+        self.no_modificados = 0
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(servidor.demora)
+                with servidor._lock:
+                    if self.headers.get("If-None-Match") == servidor.etag:
+                        servidor.no_modificados += 1
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    servidor.descargas += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("ETag", servidor.etag)
+                self.send_header("Content-Length", str(len(servidor.contenido)))
+                self.end_headers()
+                self.wfile.write(servidor.contenido)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}/pub?output=csv"
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *args):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+@pytest.fixture
+def servidor(csv_sintetico):
+    with ServidorCSV(csv_sintetico) as servidor:
+        yield servidor
+
+
+def test_cien_peticiones_una_descarga(servidor, monkeypatch):
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(FuenteHTTP(servidor.url), ttl=300))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+
+    async def escenario():
+        # Sin lifespan: el dataset se carga con la primera ola de peticiones
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            rutas = ["/datos?limit=5", "/info", "/datos?team=Boca", "/datos?group_by=player"]
+            return await asyncio.gather(*[cliente.get(rutas[i % len(rutas)]) for i in range(100)])
+
+    respuestas = asyncio.run(escenario())
+    assert all(r.status_code == 200 for r in respuestas)
+    assert servidor.descargas == 1
+
+
+def test_varios_workers_una_descarga(servidor, tmp_path):
+    directorio = str(tmp_path)
+    versiones = []
+
+    def worker():
+        async def escenario():
+            gestor = GestorDataset(
+                FuenteHTTP(servidor.url),
+                ttl=300,
+                snapshots=AlmacenSnapshots(directorio),
+                coordinador=CoordinadorRefresco(directorio)
+            )
+            datasets = await asyncio.gather(*[gestor.obtener() for _ in range(25)])
+            return {d.version for d in datasets}
+        versiones.append(asyncio.run(escenario()))
+
+    # Cada hilo tiene su event loop y su propio descriptor del candado, como un worker aparte
+    hilos = [threading.Thread(target=worker) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert servidor.descargas == 1
+    assert servidor.no_modificados == 0
+    assert len(set().union(*versiones)) == 1
+
+
+def test_estado_vencido_se_confirma_con_la_fuente(servidor, tmp_path):
+    directorio = str(tmp_path)
+
+    async def escenario():
+        primero = GestorDataset(FuenteHTTP(servidor.url), ttl=0.2, snapshots=AlmacenSnapshots(directorio), coordinador=CoordinadorRefresco(directorio))
+        await primero.refrescar()
+        await asyncio.sleep(0.3)
+        segundo = GestorDataset(FuenteHTTP(servidor.url), ttl=0.2, snapshots=AlmacenSnapshots(directorio), coordinador=CoordinadorRefresco(directorio))
+        return await segundo.refrescar()
+
+    dataset = asyncio.run(escenario())
+    # El segundo worker parte del snapshot vencido y lo confirma con una petición condicional
+    assert servidor.descargas == 1
+    assert servidor.no_modificados == 1
+    assert dataset.etag == '"v1"'
+
+
+def test_candado_con_espera_maxima(tmp_path):
+    retenedor = CoordinadorRefresco(str(tmp_path))
+    retenedor.adquirir()
+    try:
+        with pytest.raises(TimeoutError):
+            CoordinadorRefresco(str(tmp_path), espera_maxima=0.1).adquirir()
+    finally:
+        retenedor.liberar()
+    otro = CoordinadorRefresco(str(tmp_path), espera_maxima=0.1)
+    otro.adquirir()
+    otro.liberar()
+
+
+def test_lector_sigue_las_generaciones_del_cargador(servidor, tmp_path, csv_sintetico):
+    directorio = str(tmp_path)
+
+    async def escenario():
+        cargador = GestorDataset(
+            FuenteHTTP(servidor.url), ttl=0, snapshots=AlmacenSnapshots(directorio),
+            coordinador=CoordinadorRefresco(directorio), estructuras=False
+        )
+        lector = LectorDataset(AlmacenSnapshots(directorio), CoordinadorRefresco(directorio), sondeo=0.02, ttl=0)
+        # El lector arranca antes de que haya una versión: la primera petición espera al cargador
+        await lector.iniciar()
+        pendiente = asyncio.create_task(lector.obtener())
+        await asyncio.sleep(0.05)
+        primero = await cargador.refrescar()
+        leido = await pendiente
+        assert leido.version == primero.version and lector.generacion == 1
+        assert "indices" not in vars(primero) and primero.df is not leido.df
+
+        # Un refresco sin cambios no cambia la generación
+        await cargador.refrescar()
+        assert CoordinadorRefresco(directorio).leer_estado().generacion == 1
+
+        servidor.contenido, servidor.etag = generar_csv(semilla=99), '"v2"'
+        segundo = await cargador.refrescar()
+        for _ in range(100):
+            if lector.actual.version == segundo.version:
+                break
+            await asyncio.sleep(0.02)
+        await lector.detener()
+        return lector.actual, lector.generacion
+
+    actual, generacion = asyncio.run(escenario())
+    assert generacion == 2
+    assert actual.version == calcular_version(generar_csv(semilla=99))
+    # Las columnas numéricas del lector están mapeadas desde el snapshot del cargador
+    assert not actual.df["Height"].to_numpy().flags.owndata
+    assert servidor.descargas == 2
+
+
+def test_lector_sin_cargador(tmp_path):
+    lector = LectorDataset(AlmacenSnapshots(str(tmp_path)), CoordinadorRefresco(str(tmp_path)), sondeo=0.01, espera_inicial=0.05)
+    with pytest.raises(RuntimeError, match="cargador"):
+        asyncio.run(lector.obtener())
+
+
+def test_lector_no_listo_sin_latido_del_cargador(monkeypatch, fuente, tmp_path):
+    directorio = str(tmp_path)
+    coordinador = CoordinadorRefresco(directorio)
+    asyncio.run(GestorDataset(fuente, ttl=0, snapshots=AlmacenSnapshots(directorio), coordinador=coordinador, estructuras=False).refrescar())
+
+    async def cargador_activo():
+        parar = asyncio.Event()
+        tarea = asyncio.create_task(cargador.latir(coordinador, parar))
+        await asyncio.sleep(0.01)
+        parar.set()
+        await tarea
+
+    lector = LectorDataset(AlmacenSnapshots(directorio), CoordinadorRefresco(directorio), sondeo=0.02, latido_max=30, ttl=0)
+    monkeypatch.setattr(main, "gestor_dataset", lector)
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "")
+    with TestClient(main.app) as client:
+        # Nunca latió: el worker sirve la versión publicada pero no se declara listo
+        fin = time.monotonic() + 10
+        while not main.arranque.listo:
+            assert time.monotonic() < fin, "la app no terminó de arrancar a tiempo"
+            time.sleep(0.01)
+        pendiente = client.get("/health/ready")
+        assert pendiente.status_code == 503 and pendiente.json()["loader"] == {"alive": False, "heartbeat_age_seconds": None}
+        assert client.get("/datos?limit=1").status_code == 200
+
+        asyncio.run(cargador_activo())
+        listo = client.get("/health/ready")
+        assert listo.status_code == 200 and listo.json()["loader"]["alive"] is True
+
+        # El cargador dejó de latir hace más de latido_max
+        viejo = time.time() - 60
+        os.utime(os.path.join(directorio, "cargador.latido"), (viejo, viejo))
+        caido = client.get("/health/ready")
+        assert caido.status_code == 503 and caido.json()["loader"]["heartbeat_age_seconds"] >= 60
+
+
+def _configuracion_gunicorn(monkeypatch, modo):
+    # La configuración completa DATASET_MODO para los workers: monkeypatch lo restaura al terminar
+    if modo is None:
+        # setenv antes de borrarla, para que monkeypatch registre el valor original aunque no exista
+        monkeypatch.setenv("DATASET_MODO", "")
+        monkeypatch.delenv("DATASET_MODO")
+    else:
+        monkeypatch.setenv("DATASET_MODO", modo)
+    ruta = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+    especificacion = importlib.util.spec_from_file_location("configuracion_gunicorn", ruta)
+    configuracion = importlib.util.module_from_spec(especificacion)
+    especificacion.loader.exec_module(configuracion)
+    return configuracion
+
+
+def test_master_respeta_el_modo_del_entorno(monkeypatch):
+    configuracion = _configuracion_gunicorn(monkeypatch, "autonomo")
+    assert os.environ["DATASET_MODO"] == "autonomo"
+    monkeypatch.setattr(configuracion, "comando_cargador", lambda: pytest.fail("no debe lanzar el cargador"))
+    servidor = types.SimpleNamespace(log=types.SimpleNamespace(info=lambda mensaje: None))
+    configuracion.on_starting(servidor)
+    configuracion.on_exit(servidor)
+    assert configuracion._cargador is None and configuracion._vigilante is None
+
+
+def test_master_relanza_el_cargador(monkeypatch):
+    configuracion = _configuracion_gunicorn(monkeypatch, None)
+    assert os.environ["DATASET_MODO"] == "lector"
+    # Un "cargador" que termina enseguida
+    monkeypatch.setattr(configuracion, "comando_cargador", lambda: [sys.executable, "-c", "pass"])
+    monkeypatch.setattr(configuracion, "VIGILANCIA_SEGUNDOS", 0.02)
+    monkeypatch.setattr(configuracion, "ESPERA_MAXIMA_SEGUNDOS", 0.02)
+
+    lanzados = []
+
+    class Registro:
+        def info(self, mensaje):
+            lanzados.append(mensaje)
+
+        def error(self, mensaje):
+            pass
+
+    servidor = types.SimpleNamespace(log=Registro())
+    configuracion.on_starting(servidor)
+    try:
+        fin = time.monotonic() + 10
+        while len(lanzados) < 3:
+            assert time.monotonic() < fin, "el cargador no se relanzó"
+            time.sleep(0.02)
+    finally:
+        configuracion.on_exit(servidor)
+    assert not configuracion._vigilante.is_alive()
+    assert configuracion._cargador.poll() is not None
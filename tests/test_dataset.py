@@ -0,0 +1,99 @@
+"""
+Pruebas del gestor del dataset en memoria
+"""
+import asyncio
+
+import pytest
+
+from dataset import GestorDataset
+from conftest import FuenteMemoria, generar_csv
+
+
+def test_carga_una_sola_vez_y_reutiliza(fuente):
+    async def escenario():
+        gestor = GestorDataset(fuente, ttl=300)
+        primero = await gestor.obtener()
+        segundo = await gestor.obtener()
+        return primero, segundo
+
+    primero, segundo = asyncio.run(escenario())
+    assert primero is segundo
+    assert fuente.descargas == 1
+    assert len(primero.df) > 0
+
+
+def test_refresco_condicional_conserva_la_version(fuente):
+    async def escenario():
+        gestor = GestorDataset(fuente, ttl=300)
+        primero = await gestor.refrescar()
+        segundo = await gestor.refrescar()
+        return primero, segundo
+
+    primero, segundo = asyncio.run(escenario())
+    # La segunda descarga recibe 304 y no se reemplaza el objeto
+    assert segundo is primero
+    assert fuente.descargas == 2
+
+
+def test_refresco_publica_version_nueva(fuente):
+    async def escenario():
+        gestor = GestorDataset(fuente, ttl=300)
+        primero = await gestor.refrescar()
+        fuente.contenido = generar_csv(semilla=99)
+        fuente.etag = '"v2"'
+        segundo = await gestor.refrescar()
+        return primero, segundo
+
+    primero, segundo = asyncio.run(escenario())
+    assert segundo is not primero
+    assert segundo.version != primero.version
+    assert segundo.etag == '"v2"'
+
+
+def test_fallo_de_refresco_mantiene_la_ultima_copia(fuente):
+    async def escenario():
+        gestor = GestorDataset(fuente, ttl=0.01, stale_while_revalidate=False)
+        primero = await gestor.obtener()
+        fuente.error = ConnectionError("Google Sheets no responde")
+        await asyncio.sleep(0.02)
+        segundo = await gestor.obtener()
+        return gestor, primero, segundo
+
+    gestor, primero, segundo = asyncio.run(escenario())
+    assert segundo is primero
+    assert "no responde" in gestor.ultimo_error
+
+
+def test_sin_copia_previa_el_error_se_propaga():
+    fuente = FuenteMemoria(b"")
+    fuente.error = ConnectionError("sin red")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(GestorDataset(fuente).obtener())
+
+
+def test_stale_while_revalidate_no_espera_al_refresco(fuente):
+    async def escenario():
+        gestor = GestorDataset(fuente, ttl=0.01, stale_while_revalidate=True)
+        primero = await gestor.obtener()
+        fuente.contenido = generar_csv(semilla=99)
+        fuente.etag = '"v2"'
+        await asyncio.sleep(0.02)
+        vencido = await gestor.obtener()
+        # El refresco sigue en segundo plano; se espera a que publique la versión nueva
+        for _ in range(100):
+            if gestor.actual.version != primero.version:
+                break
+            await asyncio.sleep(0.02)
+        return primero, vencido, gestor.actual
+
+    primero, vencido, refrescado = asyncio.run(escenario())
+    assert vencido is primero
+    assert refrescado.version != primero.version
+
+
+def test_endpoints_usan_el_dataset_en_memoria(client, fuente):
+    assert client.get("/datos?limit=5").status_code == 200
+    assert client.get("/info").status_code == 200
+    assert client.get("/datos?team=Boca&group_by=player").status_code == 200
+    assert fuente.descargas == 1
@@ -0,0 +1,124 @@
+"""
+Pool de consultas: admisión con 503 y Retry-After, plazos con 504 y un event loop que no se bloquea
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import main
+from ejecucion import EjecutorConsultas, PlazoVencido, Saturado, comprobar_plazo
+
+
+@pytest.fixture
+def bloqueo(monkeypatch):
+    """Hace que cada consulta de /datos espere hasta que se libere el evento"""
+    liberar = threading.Event()
+    calcular = main.calcular_datos
+
+    def calcular_bloqueado(dataset, consulta):
+        liberar.wait(10)
+        return calcular(dataset, consulta)
+
+    monkeypatch.setattr(main, "calcular_datos", calcular_bloqueado)
+    yield liberar
+    liberar.set()
+
+
+def _en_segundo_plano(client, url):
+    resultado = {}
+    hilo = threading.Thread(target=lambda: resultado.setdefault("respuesta", client.get(url)))
+    hilo.start()
+    return hilo, resultado
+
+
+def _esperar(condicion, limite: float = 5.0):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, "la condición no se cumplió a tiempo"
+        time.sleep(0.01)
+
+
+def test_pool_lleno_responde_503_y_health_sigue_respondiendo(client, monkeypatch, bloqueo):
+    ejecutor = EjecutorConsultas(hilos=1, cola_max=1, plazo=0)
+    monkeypatch.setattr(main, "ejecutor_consultas", ejecutor)
+    pesadas = [_en_segundo_plano(client, f"/datos?group_by=career&page={pagina}") for pagina in (1, 2)]
+    _esperar(lambda: ejecutor.pendientes == 2)
+
+    respuesta = client.get("/stats?group_by=team")
+    assert respuesta.status_code == 503
+    assert int(respuesta.headers["Retry-After"]) >= 1
+
+    # El event loop no está ocupado con las consultas: /health responde enseguida
+    inicio = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    assert time.perf_counter() - inicio < 1.0
+
+    bloqueo.set()
+    for hilo, resultado in pesadas:
+        hilo.join(10)
+        assert resultado["respuesta"].status_code == 200
+    assert ejecutor.estadisticas() == {"en_curso": 0, "en_cola": 0, "rechazadas": 1, "vencidas": 0}
+    assert "consultas_rechazadas_total 1.0" in client.get("/metrics").text
+
+
+def test_consulta_fuera_de_plazo_responde_504(client, monkeypatch, bloqueo):
+    ejecutor = EjecutorConsultas(hilos=1, cola_max=4, plazo=0.2)
+    monkeypatch.setattr(main, "ejecutor_consultas", ejecutor)
+
+    respuesta = client.get("/datos?group_by=career")
+    assert respuesta.status_code == 504
+    assert ejecutor.vencidas == 1
+
+    # La consulta abandonada termina en su punto de control y libera el pool
+    bloqueo.set()
+    _esperar(lambda: ejecutor.pendientes == 0)
+    assert client.get("/datos?group_by=career").status_code == 200
+    # No quedó nada guardado en la caché de la consulta cancelada
+    assert main.cache_respuestas.estadisticas()["entradas"] == 1
+
+
+def test_cache_responde_sin_pasar_por_el_pool(client, monkeypatch):
+    assert client.get("/datos?team=San").status_code == 200
+    ejecutor = EjecutorConsultas(hilos=1, cola_max=0, plazo=0)
+    ejecutor.pendientes = 1
+    monkeypatch.setattr(main, "ejecutor_consultas", ejecutor)
+    assert client.get("/datos?team=San").status_code == 200
+    assert client.get("/datos?team=Otro").status_code == 503
+
+
+def test_cancelacion_cooperativa():
+    ejecutor = EjecutorConsultas(hilos=1, cola_max=1, plazo=0.05)
+    puntos = []
+
+    def consulta_larga():
+        for _ in range(100):
+            time.sleep(0.01)
+            comprobar_plazo()
+            puntos.append(1)
+
+    with pytest.raises(PlazoVencido):
+        asyncio.run(ejecutor.ejecutar(consulta_larga))
+    _esperar(lambda: ejecutor.pendientes == 0)
+    # Se cortó en el primer punto de control después del plazo, no al terminar
+    assert len(puntos) < 20
+    # Fuera del pool no hay plazo
+    comprobar_plazo()
+
+
+def test_admision():
+    ejecutor = EjecutorConsultas(hilos=1, cola_max=0, plazo=0)
+    liberar = threading.Event()
+
+    async def escenario():
+        primera = asyncio.ensure_future(ejecutor.ejecutar(liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Saturado):
+            await ejecutor.ejecutar(int, "1")
+        liberar.set()
+        assert await primera is True
+        return await ejecutor.ejecutar(int, "1")
+
+    assert asyncio.run(escenario()) == 1
+    assert ejecutor.rechazadas == 1
@@ -0,0 +1,139 @@
+"""
+Estadísticos vectorizados de /stats
+"""
+from datetime import date
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache_respuestas import CacheRespuestas
+from compactacion import columna_fecha, compactar
+from conftest import FuenteMemoria, con_valores_raros, esperar_listo
+from estadisticas import DIAS_POR_ANIO, PercentilesInvalidos, leer_percentiles, resumir_por_grupo
+from dataset import Dataset, GestorDataset
+
+HOY = date(2024, 6, 30)
+
+
+@pytest.fixture(params=[False, True], ids=["crudo", "compacto"])
+def df(request, csv_sintetico):
+    df = pd.read_csv(io.BytesIO(csv_sintetico))
+    df.loc[3, "Height"] = np.nan
+    df.loc[4, "Team"] = np.nan
+    df.loc[5, "Birthdate"] = np.nan
+    return compactar(df) if request.param else df
+
+
+def _referencia(df: pd.DataFrame, col: str, percentiles) -> pd.DataFrame:
+    """Estadísticos por grupo con groupby, como referencia"""
+    edad = (pd.Timestamp(HOY) - pd.to_datetime(df["Birthdate"].astype(object), errors="coerce")).dt.days / DIAS_POR_ANIO
+    tabla = pd.DataFrame({"grupo": df[col].astype(object), "height": df["Height"].astype(float), "age": edad})
+    agrupado = tabla.groupby("grupo")
+    filas = {}
+    for metrica in ("height", "age"):
+        filas[(metrica, "count")] = agrupado[metrica].count()
+        filas[(metrica, "mean")] = agrupado[metrica].mean()
+        filas[(metrica, "median")] = agrupado[metrica].median()
+        filas[(metrica, "min")] = agrupado[metrica].min()
+        filas[(metrica, "max")] = agrupado[metrica].max()
+        for p in percentiles:
+            filas[(metrica, f"p{p:g}")] = agrupado[metrica].quantile(p / 100)
+    return pd.DataFrame(filas)
+
+
+def test_resumir_por_grupo_como_numpy():
+    rng = np.random.default_rng(1)
+    grupos = rng.integers(0, 5, 200)
+    valores = rng.normal(190, 10, 200)
+    valores[::7] = np.nan
+    resumen = resumir_por_grupo(grupos, valores, 6, (5, 33.3, 99))
+    for g in range(5):
+        v = valores[(grupos == g) & ~np.isnan(valores)]
+        assert resumen["count"][g] == len(v)
+        assert resumen["mean"][g] == pytest.approx(v.mean())
+        assert resumen["median"][g] == pytest.approx(np.median(v))
+        assert (resumen["min"][g], resumen["max"][g]) == (v.min(), v.max())
+        for p in (5, 33.3, 99):
+            assert resumen[f"p{p:g}"][g] == pytest.approx(np.percentile(v, p))
+    # El grupo 5 no tiene filas
+    assert resumen["count"][5] == 0 and np.isnan(resumen["median"][5])
+    assert resumir_por_grupo(np.array([], dtype=np.int32), np.array([]), 2, (50,))["count"].tolist() == [0, 0]
+
+
+@pytest.mark.parametrize("agrupar_por,col", [("team", "Team"), ("season", "Season"), ("position", "Position")])
+def test_resumen_como_groupby(df, agrupar_por, col):
+    estadisticas = Dataset(df, "v").estadisticas
+    filas = np.flatnonzero((df["Season"] >= 2012).to_numpy())
+    sub = df.iloc[filas]
+    esperado = _referencia(sub, col, (10, 90))
+    grupos = estadisticas.resumen(filas, agrupar_por, (10, 90), HOY)
+    assert [g["value"] for g in grupos] == esperado.index.tolist()
+    assert [g["records"] for g in grupos] == sub[col].value_counts().sort_index().tolist()
+    for grupo in grupos:
+        referencia = esperado.loc[grupo["value"]]
+        for (metrica, nombre), valor in referencia.items():
+            assert grupo[metrica][nombre] == pytest.approx(valor, abs=0.005)
+        jugadores = sub[sub[col] == grupo["value"]].groupby(["First name", "Last name"], observed=True)
+        assert grupo["players"] == len(jugadores)
+
+
+def test_total_sin_agrupar(df):
+    estadisticas = Dataset(df, "v").estadisticas
+    total, = estadisticas.resumen(None, None, (50,), HOY)
+    assert "value" not in total
+    assert total["records"] == len(df)
+    assert total["height"]["count"] == int(df["Height"].notna().sum())
+    assert total["weight"]["median"] == total["weight"]["p50"] == pytest.approx(float(df["Weight"].astype(float).median()), abs=0.005)
+    vacio, = estadisticas.resumen(np.array([], dtype=np.int64), None, (50,), HOY)
+    assert vacio["records"] == 0 and vacio["age"]["mean"] is None
+
+
+def test_leer_percentiles():
+    assert leer_percentiles(None) == (10, 25, 75, 90)
+    assert leer_percentiles("90, 5,97.5,5") == (5, 90, 97.5)
+    for texto in ("a,50", "101", "-1"):
+        with pytest.raises(PercentilesInvalidos):
+            leer_percentiles(texto)
+
+
+def test_endpoint_stats(client):
+    respuesta = client.get("/stats", params={"group_by": "season", "team": "Boca,Quimsa", "height_min": 190, "percentiles": "50"})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"]
+    cuerpo = respuesta.json()
+    assert cuerpo["percentiles"] == [50]
+    assert cuerpo["filters_applied"]["height_min"] == 190
+    assert sum(g["records"] for g in cuerpo["groups"]) == cuerpo["total_records"] == cuerpo["overall"]["records"]
+    assert "value" not in cuerpo["overall"]
+    assert all(g["height"]["min"] >= 190 for g in cuerpo["groups"])
+    datos = client.get("/datos", params={"team": "Boca,Quimsa", "height_min": 190, "include_stats": True}).json()
+    assert cuerpo["total_records"] == datos["stats"]["total_records"]
+
+    sin_agrupar = client.get("/stats").json()
+    assert sin_agrupar["groups"] == [] and sin_agrupar["group_by"] is None
+    assert client.get("/stats", headers={"If-None-Match": client.get("/stats").headers["etag"]}).status_code == 304
+    assert client.get("/stats", params={"group_by": "player"}).status_code == 422
+    assert client.get("/stats", params={"percentiles": "x"}).status_code == 400
+
+
+@pytest.mark.filterwarnings("error")
+def test_stats_con_valores_raros(monkeypatch, csv_sintetico):
+    df = con_valores_raros(pd.read_csv(io.BytesIO(csv_sintetico)))
+    contenido = df.to_csv(index=False).encode("utf-8")
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(FuenteMemoria(contenido), ttl=0))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "")
+    with TestClient(main.app) as client:
+        esperar_listo(client)
+        for params in ({}, {"group_by": "team"}, {"group_by": "season", "height_min": 200}):
+            respuesta = client.get("/stats", params=params)
+            assert respuesta.status_code == 200
+        # Los infinitos cuentan como valores faltantes, igual que los nulos
+        total = client.get("/stats").json()["overall"]
+        assert total["height"]["count"] == int(np.isfinite(df["Height"]).sum())
+        assert total["weight"]["count"] == int(np.isfinite(df["Weight"]).sum())
+        assert total["height"]["max"] <= df["Height"][np.isfinite(df["Height"])].max()
@@ -0,0 +1,91 @@
+"""
+Facetas por versión y conteos filtrados de /datos/facets
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache_respuestas import CacheRespuestas
+from compactacion import compactar
+from conftest import FuenteMemoria, con_valores_raros, esperar_listo
+from dataset import GestorDataset
+from facetas import COLUMNAS_FILTRABLES, Facetas
+
+
+@pytest.fixture(params=[False, True], ids=["crudo", "compacto"])
+def df(request, csv_sintetico):
+    df = pd.read_csv(io.BytesIO(csv_sintetico))
+    df.loc[3, "First name"] = np.nan
+    df.loc[4, "Team"] = np.nan
+    return compactar(df) if request.param else df
+
+
+def _esperado(df: pd.DataFrame, param: str) -> dict:
+    """Conteos con groupby, como referencia"""
+    col = COLUMNAS_FILTRABLES[param]
+    registros = df[col].value_counts(dropna=True)
+    # len(groupby) con dos claves cuenta los pares con nulos, como unique_players de /datos
+    jugadores = df.dropna(subset=[col]).groupby(col, observed=True).apply(
+        lambda g: len(g.groupby(["First name", "Last name"], observed=True)), include_groups=False)
+    return {valor: (int(cantidad), int(jugadores[valor])) for valor, cantidad in registros.items() if cantidad > 0}
+
+
+@pytest.mark.parametrize("param", ["team", "season", "position", "nationality", "height", "birthdate"])
+def test_conteos_como_groupby(df, param):
+    facetas = Facetas(df)
+    filas = np.flatnonzero((df["Season"] >= 2015).to_numpy())
+    for seleccion, sub in ((None, df), (filas, df.iloc[filas])):
+        conteos = facetas.conteos_filtrados(param, seleccion)
+        assert {c["value"]: (c["records"], c["players"]) for c in conteos} == _esperado(sub, param)
+        assert [c["records"] for c in conteos] == sorted((c["records"] for c in conteos), reverse=True)
+
+
+def test_distintos_como_pandas(df):
+    facetas = Facetas(df)
+    filas = np.flatnonzero((df["Position"] == "G").to_numpy())
+    for seleccion, sub in ((None, df), (filas, df.iloc[filas])):
+        assert facetas.jugadores_distintos(seleccion) == len(sub.groupby(["First name", "Last name"], observed=True))
+        assert facetas.distintos("Team", seleccion) == len(sub["Team"].unique())
+        assert facetas.distintos("Season", seleccion) == len(sub["Season"].unique())
+
+
+def test_endpoint_facetas(client):
+    respuesta = client.get("/datos/facets", params={"season": 2016, "facets": "team,position"})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert set(cuerpo["facets"]) == {"team", "position"}
+    assert sum(c["records"] for c in cuerpo["facets"]["team"]) == cuerpo["total_records"]
+    datos = client.get("/datos", params={"season": 2016, "limit": 1, "include_stats": True}).json()
+    assert cuerpo["total_records"] == datos["stats"]["total_records"]
+    assert len(cuerpo["facets"]["team"]) == datos["stats"]["data_stats"]["unique_teams"]
+
+    por_defecto = client.get("/datos/facets").json()
+    assert list(por_defecto["facets"]) == ["team", "season", "position", "nationality"]
+
+
+def test_endpoint_facetas_desconocidas(client):
+    respuesta = client.get("/datos/facets", params={"facets": "team,altura"})
+    assert respuesta.status_code == 400
+    assert "altura" in respuesta.json()["detail"]
+
+
+def test_valores_no_finitos_cuentan_como_nulos(monkeypatch, csv_sintetico):
+    df = con_valores_raros(pd.read_csv(io.BytesIO(csv_sintetico)))
+    for tabla in (df, compactar(df)):
+        conteos = Facetas(tabla).conteos_filtrados("height")
+        assert all(np.isfinite(c["value"]) for c in conteos)
+        assert sum(c["records"] for c in conteos) == int(np.isfinite(df["Height"]).sum())
+
+    contenido = df.to_csv(index=False).encode("utf-8")
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(FuenteMemoria(contenido), ttl=0))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    monkeypatch.setattr(main, "PRECALENTAR_RUTAS", "")
+    with TestClient(main.app) as client:
+        esperar_listo(client)
+        respuesta = client.get("/datos/facets", params={"facets": "height,weight,season"})
+        assert respuesta.status_code == 200
+        assert sum(c["records"] for c in respuesta.json()["facets"]["weight"]) == int(np.isfinite(df["Weight"]).sum())
@@ -0,0 +1,87 @@
+"""
+Fuentes del CSV: archivo local, varias pestañas combinadas y configuración
+"""
+import asyncio
+import os
+
+import pytest
+
+from conftest import calcular_version, generar_csv
+from dataset import GestorDataset
+from fuentes import FuenteArchivo, FuenteCombinada, FuenteHTTP, crear_fuente
+from lectura import ColumnasFaltantes
+
+
+def _leer(respuesta) -> list:
+    return [b"".join(parte) for parte in respuesta.partes_en_bloques()]
+
+
+def test_archivo_con_validadores(tmp_path):
+    ruta = tmp_path / "lnb.csv"
+    ruta.write_bytes(generar_csv())
+    fuente = FuenteArchivo(str(ruta))
+
+    respuesta = fuente.descargar()
+    assert _leer(respuesta) == [generar_csv()]
+    assert fuente.descargar(respuesta.etag) is None
+
+    ruta.write_bytes(generar_csv(semilla=99))
+    os.utime(ruta, ns=(1, 1))
+    assert _leer(fuente.descargar(respuesta.etag)) == [generar_csv(semilla=99)]
+
+
+def test_combinada_descarga_todo_si_cambia_una_parte(tmp_path):
+    rutas = [tmp_path / "a.csv", tmp_path / "b.csv"]
+    for semilla, ruta in enumerate(rutas):
+        ruta.write_bytes(generar_csv(30, semilla))
+    fuente = FuenteCombinada([FuenteArchivo(str(ruta)) for ruta in rutas])
+
+    respuesta = fuente.descargar()
+    assert _leer(respuesta) == [generar_csv(30, 0), generar_csv(30, 1)]
+    assert fuente.descargar(respuesta.etag, respuesta.last_modified) is None
+
+    rutas[1].write_bytes(generar_csv(30, 5))
+    os.utime(rutas[1], ns=(1, 1))
+    assert _leer(fuente.descargar(respuesta.etag, respuesta.last_modified)) == [generar_csv(30, 0), generar_csv(30, 5)]
+    # Validadores que no son de esta fuente: se descarga todo
+    assert len(_leer(fuente.descargar('"otro"'))) == 2
+
+
+def test_crear_fuente(tmp_path):
+    url = "https://docs.google.com/spreadsheets/d/e/X/pub?gid=1&single=true&output=csv"
+    assert isinstance(crear_fuente(url), FuenteHTTP)
+
+    combinada = crear_fuente(url, "10, 20")
+    assert isinstance(combinada, FuenteCombinada)
+    assert [f.url for f in combinada.fuentes] == [
+        "https://docs.google.com/spreadsheets/d/e/X/pub?gid=10&single=true&output=csv",
+        "https://docs.google.com/spreadsheets/d/e/X/pub?gid=20&single=true&output=csv",
+    ]
+
+    archivo = crear_fuente(f"file://{tmp_path}/mi%20planilla.csv")
+    assert isinstance(archivo, FuenteArchivo) and archivo.ruta == f"{tmp_path}/mi planilla.csv"
+    assert [f.ruta for f in crear_fuente("a.csv,b.csv").fuentes] == ["a.csv", "b.csv"]
+    with pytest.raises(ValueError):
+        crear_fuente(" , ")
+
+
+def test_gestor_con_varias_pestanas(tmp_path):
+    rutas = [tmp_path / "a.csv", tmp_path / "b.csv"]
+    for semilla, ruta in enumerate(rutas):
+        ruta.write_bytes(generar_csv(30, semilla))
+    gestor = GestorDataset(crear_fuente(",".join(str(ruta) for ruta in rutas)), ttl=0)
+
+    dataset = asyncio.run(gestor.obtener())
+    esperadas = sum(generar_csv(30, semilla).count(b"\n") - 1 for semilla in range(2))
+    assert len(dataset.df) == esperadas
+    assert dataset.version == calcular_version(generar_csv(30, 0) + generar_csv(30, 1))
+
+
+def test_gestor_informa_columnas_faltantes(tmp_path):
+    ruta = tmp_path / "lnb.csv"
+    ruta.write_bytes(generar_csv().replace(b"Birthdate", b"Nacimiento", 1))
+    gestor = GestorDataset(FuenteArchivo(str(ruta)), ttl=0)
+
+    with pytest.raises(ColumnasFaltantes):
+        asyncio.run(gestor.obtener())
+    assert "'Birthdate'" in gestor.ultimo_error
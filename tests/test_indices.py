@@ -0,0 +1,251 @@
+"""
+Paridad de los índices de filtrado con los filtros originales basados en str.contains
+"""
+from datetime import date
+import io
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compactacion import columna_fecha
+from consultas import Consulta
+from indices import IndiceFiltros, IndiceTexto
+
+
+def filtrar_como_antes(df, team=None, season=None, position=None, nationality=None, first_name=None,
+                       last_name=None, birthdate=None, height=None, weight=None):
+    """Cadena de filtros original de obtener_datos"""
+    if team:
+        df = df[df['Team'].str.contains(team, case=False, na=False)]
+    if season:
+        df = df[df['Season'] == season]
+    if position:
+        df = df[df['Position'].str.contains(position, case=False, na=False)]
+    if nationality:
+        df = df[df['Nationality'].str.contains(nationality, case=False, na=False)]
+    if first_name:
+        df = df[df['Adjusted first name'].str.contains(first_name, case=False, na=False)]
+    if last_name:
+        df = df[df['Adjusted last name'].str.contains(last_name, case=False, na=False)]
+    if birthdate:
+        df = df[df['Birthdate'].str.contains(birthdate, case=False, na=False)]
+    if height is not None:
+        df = df[df['Height'] == height]
+    if weight is not None:
+        df = df[df['Weight'] == weight]
+    return df
+
+
+@pytest.fixture
+def df(csv_sintetico):
+    return pd.read_csv(io.BytesIO(csv_sintetico))
+
+
+@pytest.fixture
+def indices(df):
+    return IndiceFiltros(df)
+
+
+def assert_misma_seleccion(df, indices, **filtros):
+    try:
+        esperado = filtrar_como_antes(df, **filtros)
+    except re.error:
+        with pytest.raises(re.error):
+            indices.filtrar(filtros)
+        return
+    filas = indices.filtrar(filtros)
+    obtenido = df if filas is None else df.iloc[filas]
+    assert list(obtenido.index) == list(esperado.index), filtros
+
+
+PATRONES_TEXTO = [
+    ("team", "Boca"), ("team", "boca juniors"), ("team", "SAN"), ("team", "n"), ("team", "ñ"),
+    ("team", "Corrientes)"[:-1]), ("team", r"\(Corrientes\)"), ("team", "^San"), ("team", "Boca|Quimsa"),
+    ("team", "o.a"), ("team", "zzz"), ("position", "G"), ("position", "pg"), ("position", "F$"),
+    ("nationality", "arg"), ("nationality", "/"), ("first_name", "Pablo"), ("first_name", "ni"),
+    ("first_name", "Nicolás"), ("last_name", "o'con"), ("last_name", "ez"), ("last_name", "Aaron"),
+    ("birthdate", "2000"), ("birthdate", "-01-"), ("birthdate", "1999-0[1-3]"),
+]
+
+
+@pytest.mark.parametrize("param,patron", PATRONES_TEXTO)
+def test_paridad_filtros_de_texto(df, indices, param, patron):
+    assert_misma_seleccion(df, indices, **{param: patron})
+
+
+# Los nombres de equipo con paréntesis ("San Martín (Corrientes)") son grupos de captura para str.contains
+@pytest.mark.filterwarnings("ignore:This pattern is interpreted as a regular expression, and has match groups:UserWarning")
+def test_paridad_con_valores_reales(df, indices):
+    # Subcadenas de valores existentes, en distintas capitalizaciones
+    for param, col in [("team", "Team"), ("last_name", "Adjusted last name"), ("first_name", "Adjusted first name")]:
+        for valor in df[col].dropna().unique()[:10]:
+            for patron in (valor, valor[1:4], valor.upper(), valor.lower()[-3:]):
+                assert_misma_seleccion(df, indices, **{param: patron})
+
+
+@pytest.mark.parametrize("param", ["season", "height", "weight"])
+def test_paridad_filtros_numericos(df, indices, param):
+    col = {"season": "Season", "height": "Height", "weight": "Weight"}[param]
+    for valor in list(df[col].dropna().unique()[:15]) + [0, 1.5, 99999]:
+        assert_misma_seleccion(df, indices, **{param: valor})
+    assert_misma_seleccion(df, indices, **{param: float("nan")})
+
+
+def test_paridad_combinaciones(df, indices):
+    combinaciones = [
+        dict(team="Boca", season=2015),
+        dict(season=2020, position="G", nationality="ARG"),
+        dict(first_name="Pablo", last_name="e", birthdate="19"),
+        dict(team="San", height=200.0),
+        dict(team="o", position="F", weight=90.5),
+        dict(team="Boca", season=2015, position="C", nationality="USA", first_name="J", last_name="z",
+             birthdate="-0", height=190.0, weight=80.0),
+        dict(team="zzz", season=2015),
+        dict(team="", season=0, position=None),
+    ]
+    for filtros in combinaciones:
+        assert_misma_seleccion(df, indices, **filtros)
+
+
+def test_sin_filtros_devuelve_none(indices):
+    assert indices.filtrar({}) is None
+    assert indices.filtrar({"team": "", "season": 0, "height": None}) is None
+
+
+def test_regex_invalida_falla_igual_que_str_contains(df, indices):
+    with pytest.raises(re.error):
+        df['Team'].str.contains("Boca(", case=False, na=False)
+    with pytest.raises(re.error):
+        indices.filtrar({"team": "Boca("})
+
+
+def test_columna_no_textual_falla_igual_que_str_contains():
+    indice = IndiceTexto(pd.Series([np.nan, np.nan]))
+    with pytest.raises(AttributeError):
+        indice.buscar("x")
+
+
+def test_endpoint_devuelve_las_mismas_filas(client, df):
+    esperado = filtrar_como_antes(df, team="San", season=2018)
+    respuesta = client.get("/datos", params={"team": "San", "season": 2018, "limit": 100})
+    assert respuesta.status_code == 200
+    nombres = [(r["Adjusted last name"], r["Team"]) for r in respuesta.json()]
+    assert nombres == list(zip(esperado["Adjusted last name"], esperado["Team"]))[:100]
+
+
+@pytest.fixture
+def indices_con_fechas(df):
+    return IndiceFiltros(df, fechas=columna_fecha(df["Birthdate"]))
+
+
+@pytest.mark.parametrize("filtros,mascara", [
+    ({"season_from": 2015, "season_to": 2018}, lambda d: d["Season"].between(2015, 2018)),
+    ({"season_from": 2020}, lambda d: d["Season"] >= 2020),
+    ({"height_min": 200, "height_max": 210}, lambda d: d["Height"].between(200, 210)),
+    ({"height_max": 180.0}, lambda d: d["Height"] <= 180),
+    ({"weight_min": 90.5, "weight_max": 90.5}, lambda d: d["Weight"] == 90.5),
+    ({"weight_min": 120, "weight_max": 80}, lambda d: d["Weight"] < 0),
+    ({"birthdate_from": "1990-01-01", "birthdate_to": "1995-06-30"},
+     lambda d: pd.to_datetime(d["Birthdate"]).between("1990-01-01", "1995-06-30")),
+    ({"team": "Boca,Quimsa"}, lambda d: d["Team"].str.contains("Boca|Quimsa", case=False, na=False)),
+    ({"position": "PG, C", "season_from": 2012, "height_min": 195},
+     lambda d: d["Position"].str.contains("PG|C", case=False, na=False) & (d["Season"] >= 2012) & (d["Height"] >= 195)),
+    # Con metacaracteres el valor es una sola expresión regular, aunque tenga comas
+    ({"team": "z{1,2}"}, lambda d: d["Team"].str.contains("z{1,2}", case=False, na=False)),
+    ({"last_name": "^[a-f]{2,4}"}, lambda d: d["Adjusted last name"].str.contains("^[a-f]{2,4}", case=False, na=False)),
+    ({"team": "(?:Boca|Quimsa),San"}, lambda d: d["Team"].str.contains("(?:Boca|Quimsa),San", case=False, na=False)),
+    ({"team": r"Boca\,Quimsa"}, lambda d: d["Team"].str.contains(r"Boca\,Quimsa", case=False, na=False)),
+])
+def test_rangos_y_varios_valores(df, indices_con_fechas, filtros, mascara):
+    filas = indices_con_fechas.filtrar(filtros)
+    assert list(filas) == list(np.flatnonzero(mascara(df).to_numpy()))
+
+
+def test_edad_como_rango_de_fechas(df, indices_con_fechas):
+    hoy = date(2024, 2, 29)
+    filtros = Consulta(age_min=25, age_max=30).filtros_indice(hoy)
+    assert (filtros["birthdate_from"], filtros["birthdate_to"]) == ("1993-03-01", "1999-02-28")
+    # Se combina con un rango de fechas explícito quedándose con el más estrecho
+    filtros = Consulta(age_min=25, birthdate_to="1990-12-31", birthdate_from="1980-01-01").filtros_indice(hoy)
+    assert (filtros["birthdate_from"], filtros["birthdate_to"]) == ("1980-01-01", "1990-12-31")
+
+    nacimiento = pd.to_datetime(df["Birthdate"])
+    edad = (hoy.year - nacimiento.dt.year) - ((nacimiento.dt.month * 100 + nacimiento.dt.day) > hoy.month * 100 + hoy.day)
+    filas = indices_con_fechas.filtrar(Consulta(age_min=25, age_max=30).filtros_indice(hoy))
+    assert list(filas) == list(np.flatnonzero(edad.between(25, 30).to_numpy()))
+
+
+def test_endpoint_con_rangos(client, df):
+    respuesta = client.get("/datos", params={"season_from": 2015, "season_to": 2016, "team": "Boca,San", "limit": 100, "include_stats": True})
+    assert respuesta.status_code == 200
+    stats = respuesta.json()["stats"]
+    esperado = df[df["Season"].between(2015, 2016) & df["Team"].str.contains("Boca|San", case=False, na=False)]
+    assert stats["total_records"] == len(esperado)
+    assert stats["filters_applied"]["season_from"] == 2015
+    assert stats["filters_applied"]["team"] == "Boca,San"
+    # Sin rangos, filters_applied conserva los nueve filtros originales
+    assert len(client.get("/datos", params={"include_stats": True}).json()["stats"]["filters_applied"]) == 9
+
+    assert client.get("/datos", params={"birthdate_from": "1990/01/01"}).status_code == 422
+    export = client.get("/datos/export", params={"height_min": 200})
+    assert int(export.headers["x-total-records"]) == int((df["Height"] >= 200).sum())
+
+
+def test_plan_de_la_mas_selectiva_a_la_menos(df, indices_con_fechas):
+    filtros = {"team": "Boca", "season": 2015, "height_min": 200}
+    filas, pasos = indices_con_fechas.explicar(filtros)
+    mascara = df["Team"].str.contains("Boca", case=False, na=False) & (df["Season"] == 2015) & (df["Height"] >= 200)
+    assert list(filas) == list(np.flatnonzero(mascara.to_numpy()))
+
+    # Las filas estimadas de cada condición son exactas y el plan las recorre de menor a mayor
+    estimadas = {next(iter(paso.condicion)): paso.estimadas for paso in pasos}
+    assert estimadas == {
+        "team": int(df["Team"].str.contains("Boca", case=False, na=False).sum()),
+        "season": int((df["Season"] == 2015).sum()),
+        "height_min": int((df["Height"] >= 200).sum()),
+    }
+    assert [paso.estimadas for paso in pasos] == sorted(estimadas.values())
+    assert pasos[-1].estrategia == "verificacion"
+    assert pasos[-1].filas == len(filas)
+    assert all(paso.filas is not None for paso in pasos)
+
+
+@pytest.mark.parametrize("filtros", [
+    {"last_name": "ez", "season_from": 2010, "weight_max": 85},
+    {"first_name": "Pablo", "position": "G,F", "birthdate_from": "1990-01-01", "height_max": 200},
+    {"nationality": "ARG", "team": "San", "weight": 90.5, "season_to": 2020},
+    {"team": "o", "height": 200.0, "birthdate_to": "1995-12-31"},
+])
+def test_verificacion_igual_que_el_indice(indices_con_fechas, filtros):
+    filas, pasos = indices_con_fechas.explicar(filtros)
+    esperado = None
+    for paso in pasos:
+        condicion = indices_con_fechas._condicion(paso.condicion)
+        esperado = condicion if esperado is None else np.intersect1d(esperado, condicion)
+    assert list(filas) == list(esperado)
+
+
+def test_condicion_vacia_corta_el_plan(indices):
+    filas, pasos = indices.explicar({"team": "zzz", "season": 2015, "position": "C"})
+    assert len(filas) == 0
+    assert (pasos[0].condicion, pasos[0].filas) == ({"team": "zzz"}, 0)
+    assert [paso.estrategia for paso in pasos] == ["omitido"] * 3
+    assert indices.explicar({}) == (None, [])
+
+
+def test_endpoint_explain(client, df):
+    respuesta = client.get("/datos", params={"team": "San", "season": 2016, "height_min": 195, "explain": True})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["cache-control"] == "no-store"
+    plan = respuesta.json()
+    mascara = df["Team"].str.contains("San", case=False, na=False) & (df["Season"] == 2016) & (df["Height"] >= 195)
+    assert plan["total_records"] == int(mascara.sum())
+    assert plan["filters_applied"]["height_min"] == 195
+    assert [paso["estimated_rows"] for paso in plan["plan"]] == sorted(paso["estimated_rows"] for paso in plan["plan"])
+    assert set(plan["plan"][0]) == {"condition", "estimated_rows", "strategy", "rows_after", "time_ms"}
+    assert plan["plan"][-1]["rows_after"] == plan["total_records"]
+    # Los datos de la misma consulta no cambian ni quedan tapados por el plan en la caché
+    datos = client.get("/datos", params={"team": "San", "season": 2016, "height_min": 195, "include_stats": True})
+    assert datos.json()["stats"]["total_records"] == plan["total_records"]
@@ -0,0 +1,82 @@
+"""
+IDs estables de jugadores y /jugadores/{id}
+"""
+import io
+
+import pandas as pd
+import pytest
+
+import main
+from compactacion import compactar
+from dataset import Dataset
+from jugadores import CLAVE_IDENTIDAD, id_jugador
+from test_cambios import _editar, _publicar
+
+
+@pytest.fixture
+def df(csv_sintetico):
+    return pd.read_csv(io.BytesIO(csv_sintetico))
+
+
+def test_ids_estables(df):
+    jugadores = Dataset(df, "v1").jugadores
+    # Otro orden de filas y la representación compacta no cambian los IDs
+    mezclado = Dataset(compactar(df.sample(frac=1, random_state=3).reset_index(drop=True)), "v2").jugadores
+    assert jugadores.ids == mezclado.ids
+    assert len(jugadores) == len(df.groupby(CLAVE_IDENTIDAD, dropna=False))
+
+    fila = df.iloc[0]
+    identificador = id_jugador(tuple(fila[col] for col in CLAVE_IDENTIDAD))
+    assert 0 in jugadores.filas(identificador)
+    assert jugadores.id_de_fila[0] == identificador
+    assert identificador < 2 ** 53
+    assert jugadores.filas(12345) is None
+
+
+def test_filas_por_jugador(df):
+    jugadores = Dataset(df, "v1").jugadores
+    for identificador in jugadores.ids[:10]:
+        filas = jugadores.filas(identificador)
+        claves = {tuple(df.iloc[i][col] for col in CLAVE_IDENTIDAD) for i in filas}
+        assert len({id_jugador(clave) for clave in claves}) == 1
+    assert sum(len(f) for f in jugadores.filas_por_jugador) == len(df)
+
+
+def test_endpoints(client, df):
+    client.get("/datos")
+    dataset = main.gestor_dataset.actual
+    identificador = dataset.jugadores.ids[0]
+    filas = dataset.jugadores.filas(identificador)
+
+    ficha = client.get(f"/jugadores/{identificador}")
+    assert ficha.status_code == 200
+    assert ficha.headers["etag"]
+    cuerpo = ficha.json()
+    assert cuerpo["id"] == identificador
+    assert cuerpo["nombre"] == df.iloc[filas[0]]["First name"]
+    assert sorted(cuerpo["temporadas"]) == sorted(set(df.iloc[filas]["Season"]))
+
+    trayectoria = client.get(f"/jugadores/{identificador}/trayectoria").json()
+    assert trayectoria["id"] == identificador
+    assert [t["temporada"] for t in trayectoria["trayectoria"]] == sorted(set(df.iloc[filas]["Season"]))
+    assert trayectoria["total_temporadas"] == len(trayectoria["trayectoria"])
+
+    assert client.get("/jugadores/12345").status_code == 404
+    assert client.get("/jugadores/12345/trayectoria").status_code == 404
+    assert client.get("/jugadores/abc").status_code == 422
+
+
+def test_ids_y_registros_tras_refresco(client, fuente, csv_sintetico):
+    client.get("/datos")
+    anterior = main.gestor_dataset.actual.jugadores
+    _publicar(client, fuente, _editar(csv_sintetico, pesos={5: 321.5}), '"v2"')
+    jugadores = main.gestor_dataset.actual.jugadores
+    assert jugadores.ids == anterior.ids
+    assert 0 < jugadores.fichas.reutilizados < len(jugadores)
+
+    # El jugador de la fila modificada tiene su ficha reconstruida, igual a construirla desde cero
+    dataset = main.gestor_dataset.actual
+    cambiado = int(jugadores.id_de_fila[5])
+    esperado = {"id": cambiado, **dataset.agrupaciones.registro("player", jugadores.filas(cambiado))}
+    assert client.get(f"/jugadores/{cambiado}").json() == esperado
+    assert jugadores.posicion[cambiado] not in jugadores.fichas._previos
@@ -0,0 +1,124 @@
+"""
+Lectura del CSV en bloques: misma tabla que leer el archivo entero, con menos memoria
+"""
+import io
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compactacion import compactar, reporte_memoria
+from conftest import COLUMNAS, calcular_version, generar_csv, generar_filas, leer_csv
+from lectura import ColumnasFaltantes, ValorNoNumerico, leer_csv_en_bloques
+
+
+def _en_bloques(contenido: bytes, tamano: int = 997):
+    return [contenido[i:i + tamano] for i in range(0, len(contenido), tamano)]
+
+
+def _csv(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def generar_dataframe(n_jugadores: int = 120) -> pd.DataFrame:
+    return pd.DataFrame(generar_filas(n_jugadores), columns=COLUMNAS)
+
+
+def _variantes():
+    df = generar_dataframe()
+    raros = df.copy()
+    raros.loc[raros.index[::17], "Height"] = np.inf
+    raros.loc[raros.index[::29], "Adjusted last name"] = np.nan
+    # Temporadas nulas solo al final: los primeros bloques son enteros y el último decimal
+    raros.loc[raros.index[-3:], "Season"] = np.nan
+    enteros = df.copy()
+    enteros["Height"] = enteros["Height"].fillna(200).astype(int)
+    return {"original": _csv(df), "raros": _csv(raros), "enteros": _csv(enteros)}
+
+
+@pytest.mark.parametrize("variante", ["original", "raros", "enteros"])
+@pytest.mark.parametrize("filas_por_bloque", [7, 100_000])
+def test_misma_tabla_que_la_lectura_completa(variante, filas_por_bloque):
+    contenido = _variantes()[variante]
+    completa = leer_csv(contenido)
+
+    df, version, memoria = leer_csv_en_bloques([_en_bloques(contenido)], filas_por_bloque=filas_por_bloque)
+    pd.testing.assert_frame_equal(df, compactar(completa))
+    assert version == calcular_version(contenido)
+    assert memoria == reporte_memoria(completa, df)
+
+    sin_compactar, _, memoria = leer_csv_en_bloques([[contenido]], compacto=False, filas_por_bloque=filas_por_bloque)
+    pd.testing.assert_frame_equal(sin_compactar, completa)
+    assert memoria is None
+
+
+def test_varias_partes_se_unen():
+    df = generar_dataframe(80)
+    primera, segunda = df.iloc[:100], df.iloc[100:]
+    # La segunda parte tiene las columnas en otro orden y una columna de más
+    segunda = segunda[list(reversed(df.columns))].assign(Notas="x")
+    partes = [_csv(primera), _csv(segunda)]
+
+    unida, version, _ = leer_csv_en_bloques([_en_bloques(parte) for parte in partes], filas_por_bloque=50)
+    pd.testing.assert_frame_equal(unida, compactar(df.reset_index(drop=True)))
+    assert version == calcular_version(b"".join(partes))
+
+
+def test_columnas_faltantes():
+    df = generar_dataframe(5).drop(columns=["Team", "Birthdate"])
+    with pytest.raises(ColumnasFaltantes) as error:
+        leer_csv_en_bloques([[_csv(df)]])
+    assert error.value.faltantes == ["Team", "Birthdate"]
+    assert "'Team', 'Birthdate'" in str(error.value) and "'Season'" in str(error.value)
+
+    # Se valida el encabezado de cada parte, aunque no tenga filas
+    sin_filas = generar_dataframe(5).iloc[:0].drop(columns=["Weight"])
+    with pytest.raises(ColumnasFaltantes) as error:
+        leer_csv_en_bloques([[_csv(generar_dataframe(5))], [_csv(sin_filas)]])
+    assert error.value.faltantes == ["Weight"]
+
+
+def test_tipos_explicitos():
+    df = generar_dataframe(40)
+    # Un bloque sin nulos en Height no la deja en enteros si la columna entera los tiene
+    df.loc[df.index[:7], "Height"] = 200.0
+    df.loc[df.index[-1], "Height"] = np.nan
+    tabla, _, _ = leer_csv_en_bloques([[_csv(df)]], compacto=False, filas_por_bloque=7)
+    assert tabla["Height"].dtype == np.float64 and tabla["Season"].dtype == np.int64
+
+    df["Weight"] = df["Weight"].astype(object)
+    df.loc[df.index[3], "Weight"] = "noventa"
+    with pytest.raises(ValorNoNumerico) as error:
+        leer_csv_en_bloques([[_csv(df)]], filas_por_bloque=7)
+    assert "noventa" in str(error.value)
+
+
+def test_csv_mal_formado_no_es_valor_no_numerico():
+    contenido = _csv(generar_dataframe(40)).splitlines(keepends=True)
+    # Con usecols pandas descarta los campos de más; una comilla sin cerrar sí rompe la fila
+    contenido[10] = b'"sin cerrar,' + contenido[10]
+    with pytest.raises(pd.errors.ParserError) as error:
+        leer_csv_en_bloques([[b"".join(contenido)]], filas_por_bloque=7)
+    assert not isinstance(error.value, ValorNoNumerico)
+
+
+def test_pico_de_memoria_acotado_por_el_bloque():
+    contenido = generar_csv(15_000)
+
+    def pico(funcion) -> int:
+        tracemalloc.start()
+        try:
+            funcion()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def bloques():
+        # Como una descarga: cada bloque se crea recién cuando se lee
+        for inicio in range(0, len(contenido), 1 << 16):
+            yield contenido[inicio:inicio + (1 << 16)]
+
+    en_bloques = pico(lambda: leer_csv_en_bloques([bloques()], filas_por_bloque=5000))
+    completa = pico(lambda: compactar(pd.read_csv(io.BytesIO(b"".join(bloques())))))
+    assert en_bloques < completa / 2
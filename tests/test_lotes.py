@@ -0,0 +1,100 @@
+"""
+POST /datos/batch y reutilización de filtros entre consultas
+"""
+import threading
+import time
+
+import pytest
+
+import main
+from ejecucion import EjecutorConsultas
+
+CONSULTAS = [
+    {"team": "San", "season": 2016},
+    {"team": "San", "season": 2017, "include_stats": True},
+    {"season": 2016, "group_by": "team"},
+    {"group_by": "career", "nationality": "ARG", "limit": 5, "page": 2},
+    {"position": "G", "cursor": ""},
+]
+
+
+@pytest.mark.parametrize("paralelo", [False, True])
+def test_lote_como_consultas_individuales(client, paralelo):
+    respuesta = client.post("/datos/batch", json={"queries": CONSULTAS, "parallel": paralelo})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["dataset_version"] == respuesta.headers["X-Dataset-Version"]
+    assert cuerpo["parallel"] is paralelo
+    assert len(cuerpo["results"]) == len(CONSULTAS)
+    for consulta, resultado in zip(CONSULTAS, cuerpo["results"]):
+        individual = client.get("/datos", params=consulta)
+        assert resultado["status"] == 200
+        assert resultado["time_ms"] >= 0
+        assert resultado["body"] == individual.json()
+        assert resultado.get("next_cursor") == individual.headers.get("X-Next-Cursor")
+
+
+def test_lote_errores_por_consulta(client):
+    cuerpo = client.post("/datos/batch", json={"queries": [{"season": 2016}, {"cursor": "no-es-un-cursor"}]}).json()
+    assert [r["status"] for r in cuerpo["results"]] == [200, 400]
+    assert "detail" in cuerpo["results"][1]
+
+
+def test_lote_regex_invalida_solo_afecta_a_su_consulta(client):
+    respuesta = client.post("/datos/batch", json={"queries": [{"season": 2016}, {"team": "("}]})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert [r["status"] for r in cuerpo["results"]] == [200, 400]
+    assert "detail" in cuerpo["results"][1]
+
+
+def test_lote_validacion(client, monkeypatch):
+    assert client.post("/datos/batch", json={"queries": [{"limit": 500}]}).status_code == 422
+    monkeypatch.setattr(main, "LOTE_MAX_CONSULTAS", 2)
+    respuesta = client.post("/datos/batch", json={"queries": [{}, {}, {}]})
+    assert respuesta.status_code == 400
+
+
+def test_filtros_compartidos(client):
+    client.get("/datos", params={"team": "San", "season": 2016})
+    indices = main.gestor_dataset.actual.indices
+    # Cada condición quedó recordada por separado y se reutiliza en otras combinaciones
+    assert (("season", 2016),) in indices._recordados
+    assert (("team", "San"),) in indices._recordados
+    temporada = indices.filtrar({"season": 2016})
+    assert indices.filtrar({"season": 2016}) is temporada
+
+
+def test_lote_en_paralelo_respeta_el_plazo(client, monkeypatch):
+    ejecutor = EjecutorConsultas(hilos=1, cola_max=4, plazo=0.2)
+    monkeypatch.setattr(main, "ejecutor_consultas", ejecutor)
+    liberar = threading.Event()
+    calcular = main.calcular_datos
+
+    def calcular_bloqueado(dataset, consulta):
+        liberar.wait(10)
+        return calcular(dataset, consulta)
+
+    monkeypatch.setattr(main, "calcular_datos", calcular_bloqueado)
+    lote = {"queries": [{"season": 2016, "group_by": "team"}, {"group_by": "career"}], "parallel": True}
+    assert client.post("/datos/batch", json=lote).status_code == 504
+
+    # Las consultas del pool de lotes ven el plazo de la petición y se cortan en su punto de control
+    liberar.set()
+    fin = time.monotonic() + 5
+    while ejecutor.pendientes:
+        assert time.monotonic() < fin
+        time.sleep(0.01)
+    assert main.cache_respuestas.estadisticas()["entradas"] == 0
+
+
+def test_lote_en_paralelo_registra_sus_tramos(client):
+    def serializaciones():
+        serie = 'span_duration_seconds_count{span="serializacion",endpoint="/datos/batch"} '
+        lineas = [linea for linea in client.get("/metrics").text.splitlines() if linea.startswith(serie)]
+        return float(lineas[0].split()[-1]) if lineas else 0.0
+
+    antes = serializaciones()
+    client.post("/datos/batch", json={"queries": [{"group_by": "career"}, {"season": 2016}], "parallel": True})
+    # Los tramos de las consultas del pool de lotes cuentan en la petición del lote
+    assert serializaciones() == antes + 2
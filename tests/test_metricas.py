@@ -0,0 +1,98 @@
+"""
+Métricas de Prometheus, Server-Timing y perfilador de peticiones lentas
+"""
+import os
+import time
+
+import pytest
+
+import main
+from metricas import DURACION_TRAMOS, Histograma, MiddlewareMetricas, Traza, _traza_actual, medir, server_timing
+from perfilador import PerfiladorMuestreo
+
+
+def test_histograma_prometheus():
+    histograma = Histograma("demora_seconds", "Demora", ("endpoint",), (0.1, 1.0))
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        histograma.observar(valor, "/datos")
+    lineas = histograma.exponer()
+    assert lineas[:2] == ["# HELP demora_seconds Demora", "# TYPE demora_seconds histogram"]
+    assert 'demora_seconds_bucket{endpoint="/datos",le="0.1"} 2' in lineas
+    assert 'demora_seconds_bucket{endpoint="/datos",le="1.0"} 3' in lineas
+    assert 'demora_seconds_bucket{endpoint="/datos",le="+Inf"} 4' in lineas
+    assert 'demora_seconds_sum{endpoint="/datos"} 3.65' in lineas
+    assert 'demora_seconds_count{endpoint="/datos"} 4' in lineas
+
+
+def test_tramos_en_la_traza():
+    traza = Traza()
+    token = _traza_actual.set(traza)
+    try:
+        with medir("filtro_team"):
+            pass
+        with medir("filtro_team"):
+            pass
+        with medir("serializacion"):
+            pass
+    finally:
+        _traza_actual.reset(token)
+    assert [nombre for nombre, _ in traza.tramos] == ["filtro_team", "filtro_team", "serializacion"]
+    assert set(traza.totales()) == {"filtro_team", "serializacion"}
+    assert server_timing(traza, 0.0125).endswith("total;dur=12.50")
+
+    # Fuera de una petición el tramo va directo al histograma con endpoint "-"
+    antes = DURACION_TRAMOS.cantidad("suelto", "-")
+    with medir("suelto"):
+        pass
+    assert DURACION_TRAMOS.cantidad("suelto", "-") == antes + 1
+
+
+def test_endpoint_metrics(client):
+    client.get("/datos", params={"team": "Boca", "season": 2015, "group_by": "player"})
+    client.get("/jugadores/12345")
+    cuerpo = client.get("/metrics")
+    assert cuerpo.status_code == 200
+    assert cuerpo.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texto = cuerpo.text
+    assert 'http_request_duration_seconds_count{endpoint="/datos",group_by="player"}' in texto
+    assert 'http_response_size_bytes_bucket{endpoint="/datos",group_by="player",le="+Inf"}' in texto
+    # Las rutas con parámetros se etiquetan con su plantilla
+    assert 'http_requests_total{endpoint="/jugadores/{jugador_id}",status="404"}' in texto
+    for tramo in ("filtro_team", "filtro_season", "agrupacion", "serializacion"):
+        assert f'span_duration_seconds_count{{span="{tramo}",endpoint="/datos"}}' in texto
+    # La carga inicial del dataset ocurre en el arranque, fuera de una petición
+    assert 'span_duration_seconds_count{span="parseo",endpoint="-"}' in texto
+    assert "respuestas_cache_fallos_total" in texto and "dataset_filas" in texto
+
+
+def test_server_timing(client, monkeypatch):
+    assert "server-timing" not in client.get("/datos").headers
+    middleware = MiddlewareMetricas(main.app.router, server_timing=True)
+    monkeypatch.setattr(main.app, "middleware_stack", middleware)
+    respuesta = client.get("/datos", params={"team": "Quimsa", "height_min": 190})
+    tramos = dict(parte.split(";dur=") for parte in respuesta.headers["server-timing"].split(", "))
+    assert {"filtrado", "filtro_team", "filtro_height_rango", "registros", "serializacion", "total"} <= set(tramos)
+    assert all(float(valor) >= 0 for valor in tramos.values())
+
+
+def test_perfilador_guarda_solo_las_lentas(tmp_path):
+    perfilador = PerfiladorMuestreo(umbral_ms=30, carpeta=str(tmp_path), intervalo_ms=1, conservar=2)
+    rapida = perfilador.iniciar()
+    assert perfilador.terminar(rapida, 0.001, "GET /rapida") is None
+
+    for i in range(3):
+        muestras = perfilador.iniciar()
+        fin = time.perf_counter() + 0.05
+        while time.perf_counter() < fin:
+            sum(range(1000))
+        ruta = perfilador.terminar(muestras, 0.05, f"GET /datos?page={i}")
+        assert ruta is not None
+    assert perfilador.guardados == 3
+    archivos = sorted(os.listdir(tmp_path))
+    assert len(archivos) == 2
+    with open(os.path.join(tmp_path, archivos[-1]), encoding="utf-8") as archivo:
+        lineas = archivo.read().splitlines()
+    assert lineas
+    pila, cantidad = lineas[0].rsplit(" ", 1)
+    assert int(cantidad) >= 1
+    assert any("test_metricas.py:test_perfilador_guarda_solo_las_lentas" in linea for linea in lineas)
@@ -0,0 +1,95 @@
+"""
+Paginación por cursor y exportación en streaming
+"""
+import csv
+import io
+import json
+
+import pytest
+
+import main
+from conftest import generar_csv
+
+
+def _por_paginas(client, params):
+    """Todas las páginas de una consulta paginando con page"""
+    registros, page = [], 1
+    while True:
+        pagina = client.get("/datos", params={**params, "limit": 100, "page": page}).json()
+        registros.extend(pagina)
+        if len(pagina) < 100:
+            return registros
+        page += 1
+
+
+def _recorrer(client, params):
+    """Todas las páginas de una consulta siguiendo X-Next-Cursor"""
+    registros, cursor = [], ""
+    while cursor is not None:
+        respuesta = client.get("/datos", params={**params, "cursor": cursor})
+        assert respuesta.status_code == 200
+        registros.extend(respuesta.json())
+        cursor = respuesta.headers.get("x-next-cursor")
+    return registros
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"team": "San"},
+    {"position": "G", "season": 2015},
+    {"group_by": "player"},
+    {"group_by": "team", "nationality": "ARG"},
+])
+def test_cursor_recorre_el_resultado_completo(client, params):
+    completo = _por_paginas(client, params)
+    assert _recorrer(client, {**params, "limit": 7}) == completo
+
+
+def test_cursor_en_stats(client):
+    stats = client.get("/datos", params={"limit": 5, "cursor": "", "include_stats": True}).json()["stats"]
+    siguiente = client.get("/datos", params={"limit": 5, "cursor": stats["next_cursor"]})
+    assert siguiente.status_code == 200
+    assert len(siguiente.json()) == 5
+
+
+def test_cursor_invalido_o_de_otra_consulta(client):
+    assert client.get("/datos", params={"cursor": "no-es-un-cursor"}).status_code == 400
+    cursor = client.get("/datos", params={"limit": 5, "cursor": "", "team": "Boca"}).headers["x-next-cursor"]
+    assert client.get("/datos", params={"limit": 5, "cursor": cursor, "team": "Quimsa"}).status_code == 400
+    # El tamaño de página puede cambiar entre páginas
+    assert client.get("/datos", params={"limit": 9, "cursor": cursor, "team": "Boca"}).status_code == 200
+
+
+def test_cursor_de_version_anterior(client, fuente):
+    cursor = client.get("/datos", params={"limit": 5, "cursor": ""}).headers["x-next-cursor"]
+    fuente.contenido = generar_csv(semilla=99)
+    fuente.etag = '"v2"'
+    client.portal.call(main.gestor_dataset.refrescar)
+    assert client.get("/datos", params={"limit": 5, "cursor": cursor}).status_code == 410
+
+
+@pytest.mark.parametrize("params", [{}, {"team": "San", "season": 2016}, {"last_name": "zzz"}])
+def test_exportar_ndjson(client, params):
+    completo = _por_paginas(client, params)
+    respuesta = client.get("/datos/export", params=params)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    assert int(respuesta.headers["x-total-records"]) == len(completo)
+    assert [json.loads(linea) for linea in respuesta.text.splitlines()] == completo
+
+
+def test_exportar_csv(client):
+    completo = _por_paginas(client, {"team": "Boca"})
+    respuesta = client.get("/datos/export", params={"team": "Boca", "format": "csv"})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/csv")
+    filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+    assert len(filas) == len(completo)
+    for fila, registro in zip(filas, completo):
+        assert fila["Last name"] == registro["Last name"]
+        assert fila["Season"] == str(registro["Season"])
+        assert fila["Height"] == ("" if registro["Height"] is None else str(registro["Height"]))
+
+
+def test_exportar_formato_invalido(client):
+    assert client.get("/datos/export", params={"format": "xml"}).status_code == 422
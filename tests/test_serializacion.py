@@ -0,0 +1,84 @@
+"""
+Salida dorada: los registros sin agrupar deben ser byte a byte iguales a los que generaba iterrows()
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import FuenteMemoria, con_valores_raros
+from cache_respuestas import CacheRespuestas
+from dataset import GestorDataset
+from referencia import respuesta_como_antes
+from serializacion import SerializadorFilas
+
+
+def _variante_con_enteros(df: pd.DataFrame) -> pd.DataFrame:
+    """Altura sin nulos: pandas la lee como int64 y se serializa sin decimales"""
+    df = df.copy()
+    df["Height"] = df["Height"].fillna(199).astype(int)
+    return df
+
+
+VARIANTES = {
+    "original": lambda df: df,
+    "valores_raros": con_valores_raros,
+    "enteros": _variante_con_enteros,
+}
+
+CONSULTAS = [
+    {},
+    {"limit": 100, "page": 3},
+    {"team": "San", "limit": 100},
+    {"season": 2016, "include_stats": True},
+    {"last_name": "z", "page": 2, "limit": 10},
+    {"team": "zzz"},
+    {"page": 1000},
+]
+
+
+@pytest.fixture(params=sorted(VARIANTES))
+def variante(request, csv_sintetico, monkeypatch):
+    df = VARIANTES[request.param](pd.read_csv(io.BytesIO(csv_sintetico)))
+    contenido = df.to_csv(index=False).encode("utf-8")
+    monkeypatch.setattr(main, "gestor_dataset", GestorDataset(FuenteMemoria(contenido), ttl=0))
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas())
+    with TestClient(main.app) as client:
+        yield client, pd.read_csv(io.BytesIO(contenido))
+
+
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_salida_dorada(variante, consulta):
+    client, df = variante
+    respuesta = client.get("/datos", params=consulta)
+    assert respuesta.status_code == 200
+    assert respuesta.content == respuesta_como_antes(df, **consulta)
+
+
+def test_tipos_limpios(csv_sintetico):
+    df = con_valores_raros(pd.read_csv(io.BytesIO(csv_sintetico)))
+    registros = SerializadorFilas(df).registros(np.arange(len(df)))
+    assert all(r["Height"] is None or isinstance(r["Height"], float) for r in registros)
+    assert all(r["Season"] is None or type(r["Season"]) is int for r in registros)
+    assert any(r["Height"] is None for r in registros)
+
+
+@pytest.mark.parametrize("consulta", [{}, {"team": "San", "include_stats": True}, {"group_by": "career", "season": 2015}])
+def test_fragmentos_y_codificacion_normal_coinciden(client, monkeypatch, consulta):
+    monkeypatch.setattr(main, "cache_respuestas", CacheRespuestas(0))
+    rapida = client.get("/datos", params=consulta).content
+    monkeypatch.setattr(main, "JSON_RAPIDO", False)
+    normal = client.get("/datos", params=consulta).content
+    assert rapida == normal
+
+
+def test_componer_json_inserta_fragmentos():
+    from fastapi.responses import JSONResponse
+    from serializacion import componer_json, lista_json
+
+    contenido = {"data": lista_json([b'{"a":1}', b'{"a":null}']), "stats": {"total": 2, "altura": 190.5, "x": "ñ"}}
+    esperado = JSONResponse({"data": [{"a": 1}, {"a": None}], "stats": {"total": 2, "altura": 190.5, "x": "ñ"}}).body
+    assert componer_json(contenido) == esperado
@@ -0,0 +1,84 @@
+"""
+Snapshots columnares del dataset en disco
+"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from conftest import FuenteMemoria, calcular_version, generar_csv, leer_csv
+from dataset import GestorDataset
+from snapshot import AlmacenSnapshots
+
+
+def test_ida_y_vuelta_conserva_el_dataframe(tmp_path, csv_sintetico):
+    df = leer_csv(csv_sintetico)
+    almacen = AlmacenSnapshots(str(tmp_path))
+    assert almacen.guardar(df, "v1", etag='"e1"')
+    assert not almacen.guardar(df, "v1", etag='"e1"')
+
+    snapshot = almacen.cargar()
+    assert snapshot.version == "v1"
+    assert snapshot.etag == '"e1"'
+    pd.testing.assert_frame_equal(snapshot.df, df)
+
+
+def test_columnas_numericas_mapeadas_solo_lectura(tmp_path, csv_sintetico):
+    almacen = AlmacenSnapshots(str(tmp_path))
+    almacen.guardar(leer_csv(csv_sintetico), "v1")
+    df = almacen.cargar().df
+    altura = df["Height"].to_numpy()
+    base = altura
+    while not isinstance(base, np.memmap) and getattr(base, "base", None) is not None:
+        base = base.base
+    assert isinstance(base, np.memmap)
+    assert not altura.flags.writeable
+
+
+def test_poda_y_puntero_a_la_ultima(tmp_path):
+    almacen = AlmacenSnapshots(str(tmp_path), conservar=2)
+    for semilla in (1, 2, 3):
+        almacen.guardar(leer_csv(generar_csv(20, semilla)), f"v{semilla}")
+    assert almacen.ultima_version() == "v3"
+    assert sorted(p.name for p in tmp_path.iterdir() if not p.name.startswith(".") and p.is_dir()) == ["v2", "v3"]
+
+
+def test_snapshot_corrupto_se_ignora(tmp_path, csv_sintetico):
+    almacen = AlmacenSnapshots(str(tmp_path))
+    almacen.guardar(leer_csv(csv_sintetico), "v1")
+    (tmp_path / "v1" / "manifest.json").write_text("{")
+    assert almacen.cargar() is None
+
+
+def test_arranque_desde_snapshot_sin_esperar_a_la_fuente(tmp_path, csv_sintetico):
+    almacen = AlmacenSnapshots(str(tmp_path))
+    almacen.guardar(leer_csv(csv_sintetico), calcular_version(csv_sintetico), etag='"v1"')
+
+    async def escenario():
+        fuente = FuenteMemoria(csv_sintetico, etag='"v1"')
+        fuente.error = ConnectionError("Google Sheets no responde")
+        gestor = GestorDataset(fuente, ttl=300, snapshots=almacen)
+        await gestor.iniciar()
+        dataset = await gestor.obtener()
+        await gestor.detener()
+        return dataset
+
+    dataset = asyncio.run(escenario())
+    assert dataset.version == calcular_version(csv_sintetico)
+    assert len(dataset.indices.filtrar({"team": "Boca"})) > 0
+
+
+def test_refresco_guarda_la_version_nueva(tmp_path, fuente, csv_sintetico):
+    almacen = AlmacenSnapshots(str(tmp_path))
+
+    async def escenario():
+        gestor = GestorDataset(fuente, ttl=300, snapshots=almacen)
+        await gestor.refrescar()
+        fuente.contenido = generar_csv(semilla=99)
+        fuente.etag = '"v2"'
+        return await gestor.refrescar()
+
+    nuevo = asyncio.run(escenario())
+    snapshot = almacen.cargar()
+    assert snapshot.version == nuevo.version
+    assert snapshot.etag == '"v2"'